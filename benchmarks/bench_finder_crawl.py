@@ -0,0 +1,102 @@
+"""Benchmark Finder's serial and parallel directory walkers.
+
+Builds a synthetic deep/wide directory tree in a temporary directory, crawls it
+with `Finder.walk()` and `Finder.walk_parallel()`, checks both return the same
+result set, and reports the time each took. `--latency-ms` adds a sleep to every
+directory scan to simulate a network filesystem (SMB/NFS).
+
+Usage:
+    python benchmarks/bench_finder_crawl.py [--depth 4] [--width 6] [--files 5] \
+        [--workers 8] [--latency-ms 0]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from bookmark_backup.finder import Finder
+
+class LatentFinder(Finder):
+    """Finder whose directory scans each take an extra `latency` seconds."""
+
+    latency: float = 0.0
+
+    def _scan(self, dir_path: str) -> list[os.DirEntry]:
+        time.sleep(self.latency)
+
+        return super()._scan(dir_path)
+
+
+def make_tree(root: Path, depth: int, width: int, files: int) -> int:
+    """Create a tree `depth` levels deep with `width` subdirectories per directory.
+
+    Returns:
+        (int): The number of directories created.
+
+    """
+    count: int = 0
+    level: list[Path] = [root]
+    for _ in range(depth):
+        next_level: list[Path] = []
+        for parent in level:
+            for i in range(width):
+                child = parent / f"dir{i}"
+                child.mkdir()
+                for j in range(files):
+                    (child / f"file{j}.txt").touch()
+                next_level.append(child)
+                count += 1
+        level = next_level
+
+    return count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--width", type=int, default=6)
+    parser.add_argument("--files", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    LatentFinder.latency = args.latency_ms / 1000
+
+    with tempfile.TemporaryDirectory(prefix="bench-finder-") as tmp_dir:
+        dirs = make_tree(Path(tmp_dir), args.depth, args.width, args.files)
+        print(f"Synthetic tree: {dirs} directories, {dirs * args.files} files")
+
+        start = time.perf_counter()
+        serial = sorted(entry.path for entry in LatentFinder(tmp_dir).walk())
+        serial_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parallel = [
+            entry.path
+            for entry in LatentFinder(tmp_dir).walk_parallel(
+                workers=args.workers, ordered=True
+            )
+        ]
+        parallel_time = time.perf_counter() - start
+
+    if serial != parallel:
+        print("[FAILED] Serial and parallel crawls returned different results")
+        return 1
+
+    print(f"serial:   {serial_time:8.3f}s")
+    print(
+        f"parallel: {parallel_time:8.3f}s ({args.workers} workers, {serial_time / parallel_time:.1f}x)"
+    )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
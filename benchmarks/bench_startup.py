@@ -0,0 +1,96 @@
+"""Benchmark `bookmark-backup --help` startup time.
+
+Runs the CLI's `--help` in fresh interpreters, reports the median wall time and
+the slowest imports (from `python -X importtime`), and exits non-zero when the
+median is over the target latency.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10] [--target-ms 150]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR: Path = Path(__file__).resolve().parent.parent / "src"
+HELP_CMD: list[str] = [sys.executable, "-m", "bookmark_backup", "--help"]
+## Default maximum median `--help` latency, in milliseconds
+DEFAULT_TARGET_MS: float = 150.0
+
+
+def _env() -> dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in [str(SRC_DIR), env.get("PYTHONPATH")] if p
+    )
+
+    return env
+
+
+def time_startup(runs: int) -> list[float]:
+    """Return the wall time in milliseconds of `runs` separate `--help` invocations."""
+    timings: list[float] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(HELP_CMD, env=_env(), check=True, capture_output=True)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return timings
+
+
+def slowest_imports(limit: int = 10) -> list[tuple[int, str]]:
+    """Return the `limit` imports with the highest cumulative time, in microseconds."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *HELP_CMD[1:]],
+        env=_env(),
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    imports: list[tuple[int, str]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line.split("|")
+        imports.append((int(cumulative), name.strip()))
+
+    return sorted(imports, reverse=True)[:limit]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--target-ms", type=float, default=DEFAULT_TARGET_MS)
+    args = parser.parse_args()
+
+    ## Warm up the filesystem & bytecode caches
+    time_startup(1)
+    timings = time_startup(args.runs)
+    median = statistics.median(timings)
+
+    print(f"bookmark-backup --help: median {median:.1f}ms over {args.runs} runs")
+    print(f"  min {min(timings):.1f}ms, max {max(timings):.1f}ms")
+    print("\nSlowest imports (cumulative):")
+    for cumulative, name in slowest_imports():
+        print(f"  {cumulative / 1000:8.2f}ms  {name}")
+
+    if median > args.target_ms:
+        print(
+            f"\n[FAILED] Median startup {median:.1f}ms is over target {args.target_ms}ms"
+        )
+        return 1
+
+    print(f"\n[OK] Median startup is under target {args.target_ms}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
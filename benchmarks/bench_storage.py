@@ -0,0 +1,113 @@
+"""Benchmark pushing and pulling a backup store to the S3 and WebDAV backends.
+
+Builds a local backup store holding `--snapshots` synthetic bookmarks files,
+then, against an in-process fake S3 and WebDAV server, times:
+
+- push: uploading every blob and the manifest
+- re-push: pushing again, which should upload nothing
+- pull: downloading the store into an empty local copy
+- large object: one `--large-mb` upload (multipart on S3)
+
+and reports MB/s and requests per snapshot. `--latency-ms` adds a delay to every
+request, to show how pooled connections and parallel uploads hide round trips.
+
+Usage:
+    python benchmarks/bench_storage.py [--snapshots 20] [--nodes 5000] \
+        [--workers 8] [--latency-ms 0] [--large-mb 64]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bookmark_backup.storage import RemoteStore, SyncStats, open_backend
+from bookmark_backup.storage.fake import FakeObjectServer
+from bookmark_backup.store import BackupStore
+
+from synthetic import write_bookmarks
+
+def make_store(root: Path, snapshots: int, nodes: int) -> int:
+    """Fill a backup store with `snapshots` distinct bookmarks files.
+
+    Returns:
+        (int): Total size of the store's blobs, in bytes.
+
+    """
+    store = BackupStore(root)
+    src: Path = root.parent / "Bookmarks"
+    for seed in range(snapshots):
+        write_bookmarks(src, nodes, seed=seed)
+        store.add_file(src=src, browser="chrome", profile=f"Profile {seed % 4}")
+
+    return sum(p.stat().st_size for p in (root / "blobs").rglob("*") if p.is_file())
+
+
+def report(label: str, stats: SyncStats) -> None:
+    per_snapshot: float = stats.requests / stats.snapshots if stats.snapshots else 0.0
+    print(
+        f"  {label:<9} {stats.duration:7.3f}s {stats.mb_per_second:8.1f} MB/s "
+        f"{stats.blobs_transferred:4} sent {stats.blobs_skipped:4} skipped "
+        f"{stats.requests:5} requests ({per_snapshot:.2f}/snapshot)"
+    )
+
+
+def bench_protocol(
+    protocol: str, store_root: Path, tmp_dir: Path, args: argparse.Namespace
+) -> None:
+    with FakeObjectServer(protocol, latency=args.latency_ms / 1000) as server:
+        url: str = server.storage_url(f"bench/{protocol}")
+        print(f"{protocol}:")
+
+        with RemoteStore(url, cache_dir=store_root, max_workers=args.workers) as remote:
+            report("push", remote.push())
+            report("re-push", remote.push())
+
+        with RemoteStore(
+            url, cache_dir=tmp_dir / f"pull-{protocol}", max_workers=args.workers
+        ) as remote:
+            report("pull", remote.pull())
+
+        data: bytes = os.urandom(args.large_mb * 1024 * 1024)
+        with open_backend(url) as backend:
+            start = time.perf_counter()
+            backend.put_bytes("large.bin", data)
+            elapsed = time.perf_counter() - start
+            print(
+                f"  {'large':<9} {elapsed:7.3f}s {len(data) / 1e6 / elapsed:8.1f} MB/s "
+                f"{backend.stats.requests:5} requests"
+            )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--snapshots", type=int, default=20)
+    parser.add_argument("--nodes", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--large-mb", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-storage-") as tmp:
+        tmp_dir = Path(tmp)
+        store_root: Path = tmp_dir / "store"
+        size: int = make_store(store_root, args.snapshots, args.nodes)
+        print(
+            f"Synthetic store: {args.snapshots} snapshots, {size / 1e6:.1f} MB of blobs"
+        )
+
+        for protocol in ("s3", "webdav"):
+            bench_protocol(protocol, store_root, tmp_dir, args)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,509 @@
+"""Run the benchmark suite for the backup pipeline and save the results as JSON.
+
+Generates synthetic Chromium Bookmarks files (`--sizes` nodes each) and a synthetic
+home directory holding `--profiles` profiles per supported browser, then measures:
+
+- startup: `bookmark-backup --help` in a fresh interpreter
+- resolve_path: building a BookmarksFile (OS detection and path lookup)
+- discover: finding every browser profile in the synthetic home
+- finder_crawl: `Finder.walk()` over a synthetic directory tree
+- backup.copy, backup.<format>, backup.store, backup.unchanged, backup.incremental
+- restore.copy, restore.store
+- compress.<format>, decompress.<format>
+- parse.json, parse.tree, parse.stream
+- export.html, export.csv, export.ndjson
+
+Each case runs `--repeat` times and keeps the median. Results are written to
+`.benchmarks/<commit>.json`; pass an earlier file to `--compare` to print the change
+per case, exiting non-zero when any case got slower by more than `--threshold`.
+
+1M-node files are about 500MB and parsing one as plain dicts needs a few GB of
+memory, so they are not in the default sizes. Add them with `--sizes`.
+
+Usage:
+    python benchmarks/bench_suite.py [--sizes 1000,10000,100000] [--repeat 3] \
+        [--profiles 4] [--output PATH] [--compare PATH] [--threshold 0.1]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+import io
+import json
+import os
+from pathlib import Path
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import typing as t
+
+REPO_DIR: Path = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bookmark_backup.core import compression
+from bookmark_backup.core.metrics import collect
+from bookmark_backup.domain.checksum import repair_checksum
+from bookmark_backup.domain.export import export_bookmarks
+from bookmark_backup.domain.stream import BookmarkStream
+from bookmark_backup.domain.tree import BookmarkTree
+from bookmark_backup.finder import Finder
+from bookmark_backup.store import BackupStore
+
+from bench_finder_crawl import make_tree
+from bench_startup import time_startup
+from synthetic import write_bookmarks
+
+## Default bookmarks file sizes, in nodes
+DEFAULT_SIZES: list[int] = [1_000, 10_000, 100_000]
+## Default slowdown, as a fraction, reported as a regression by `--compare`
+DEFAULT_THRESHOLD: float = 0.1
+RESULTS_DIR: Path = REPO_DIR / ".benchmarks"
+## Where the supported browsers keep their profiles, relative to the synthetic home
+BROWSER_DIRS: dict[str, str] = {
+    "chrome": ".config/google-chrome",
+    "edge": ".config/microsoft-edge",
+    "vivaldi": ".config/vivaldi",
+}
+
+
+@dataclass
+class CaseResult:
+    name: str
+    ## Nodes in the bookmarks file, 0 for cases that do not read one
+    nodes: int
+    seconds: float
+    runs: list[float]
+    ## Bytes processed per run, for throughput
+    bytes: int = 0
+    ## Per-phase metrics of the last run, for pipeline cases
+    phases: dict = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}[{self.nodes}]" if self.nodes else self.name
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes / 1e6 / self.seconds if self.bytes and self.seconds else 0.0
+
+
+class Suite:
+    """Collects case results, printing each as it finishes."""
+
+    def __init__(self, repeat: int):
+        self.repeat: int = repeat
+        self.results: list[CaseResult] = []
+
+    def run(
+        self,
+        name: str,
+        fn: t.Callable[[int], t.Any],
+        nodes: int = 0,
+        nbytes: int = 0,
+        setup: t.Callable[[int], t.Any] | None = None,
+        repeat: int | None = None,
+    ) -> CaseResult:
+        """Time `fn(run)` for each run, calling the untimed `setup(run)` first.
+
+        Description:
+            The last run is recorded with `core.metrics`, so pipeline cases also
+            report where their time went.
+        """
+        runs: list[float] = []
+        phases: dict = {}
+        total: int = repeat or self.repeat
+        for run in range(total):
+            if setup is not None:
+                setup(run)
+            with collect() as metrics, contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                fn(run)
+                runs.append(time.perf_counter() - start)
+            if run == total - 1:
+                phases = metrics.to_dict()["phases"]
+
+        result = CaseResult(
+            name=name,
+            nodes=nodes,
+            seconds=statistics.median(runs),
+            runs=runs,
+            bytes=nbytes,
+            phases=phases,
+        )
+        self.results.append(result)
+
+        rate: str = f"{result.mb_per_second:9.1f} MB/s" if result.bytes else ""
+        print(f"  {result.key:<32} {result.seconds * 1000:10.2f}ms {rate}")
+
+        return result
+
+
+def git_commit() -> tuple[str, bool]:
+    """Return the short hash of HEAD and whether the work tree has changes."""
+    try:
+        commit: str = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_DIR,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+        status: str = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=REPO_DIR,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+    return commit, bool(status.strip())
+
+
+def make_profiles(home: Path, profiles: int, src: Path) -> int:
+    """Copy `src` into `profiles` profiles of every supported browser under `home`.
+
+    Returns:
+        (int): The number of bookmarks files created.
+
+    """
+    created: int = 0
+    for browser_dir in BROWSER_DIRS.values():
+        for i in range(profiles):
+            profile: str = "Default" if i == 0 else f"Profile {i}"
+            dest: Path = home / browser_dir / profile / "Bookmarks"
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(src, dest)
+            ## Other files a real profile holds, which discovery has to skip past
+            (dest.parent / "History").touch()
+            (dest.parent / "Preferences").touch()
+            created += 1
+        (home / browser_dir / "System Profile").mkdir(exist_ok=True)
+        (home / browser_dir / "Local State").touch()
+
+    return created
+
+
+def modified_copy(src: Path, dest: Path, every: int = 100) -> Path:
+    """Write `src` to `dest` with every `every`-th bookmark renamed, for incremental backups."""
+    with open(src, "r", encoding="utf-8") as f:
+        data: dict = json.load(f)
+
+    stack: list[dict] = list(data["roots"].values())
+    seen: int = 0
+    while stack:
+        node: dict = stack.pop()
+        if node.get("type") == "url":
+            seen += 1
+            if seen % every == 0:
+                node["name"] = f"{node['name']} (edited)"
+        stack.extend(node.get("children", []))
+
+    with open(dest, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=3, ensure_ascii=False)
+    repair_checksum(dest)
+
+    return dest
+
+
+def bench_host(suite: Suite, tmp_dir: Path, args: argparse.Namespace) -> None:
+    from bookmark_backup.domain.Bookmarks import get_bookmarks_file
+    from bookmark_backup.jobs.fleet import discover_bookmarks_files
+
+    print("host:")
+    startup: list[float] = time_startup(args.startup_runs)
+    suite.results.append(
+        CaseResult(
+            name="startup",
+            nodes=0,
+            seconds=statistics.median(startup) / 1000,
+            runs=[ms / 1000 for ms in startup],
+        )
+    )
+    print(f"  {'startup':<32} {statistics.median(startup):10.2f}ms")
+
+    ## Many lookups per run, a single one is too quick to time
+    lookups: int = 1000
+    suite.run(
+        "resolve_path",
+        lambda run: [
+            get_bookmarks_file(browser="chrome", profile=f"Profile {i % 8}")
+            for i in range(lookups)
+        ],
+    )
+    suite.run("discover", lambda run: discover_bookmarks_files())
+
+    crawl_root: Path = tmp_dir / "crawl"
+    crawl_root.mkdir()
+    make_tree(crawl_root, depth=4, width=6, files=5)
+    suite.run("finder_crawl", lambda run: sum(1 for _ in Finder(crawl_root).walk()))
+
+
+def bench_size(suite: Suite, tmp_dir: Path, home: Path, nodes: int) -> None:
+    from bookmark_backup.domain.Bookmarks import get_bookmarks_file
+
+    work: Path = tmp_dir / f"n{nodes}"
+    work.mkdir()
+    src: Path = write_bookmarks(work / "Bookmarks", nodes)
+    repair_checksum(src)
+    size: int = src.stat().st_size
+    print(f"{nodes} nodes ({size / 1e6:.1f} MB):")
+
+    live: Path = home / BROWSER_DIRS["chrome"] / "Default" / "Bookmarks"
+    shutil.copyfile(src, live)
+    bookmarks = get_bookmarks_file(browser="chrome")
+
+    ## Backups
+    suite.run(
+        "backup.copy",
+        lambda run: bookmarks.backup_bookmarks_file(work / f"copy-{run}.json"),
+        nodes=nodes,
+        nbytes=size,
+    )
+    for fmt in compression.supported_compression_formats():
+        suite.run(
+            f"backup.{fmt}",
+            lambda run, fmt=fmt: bookmarks.backup_bookmarks_file(
+                work / f"{fmt}-{run}.json", compress=fmt
+            ),
+            nodes=nodes,
+            nbytes=size,
+        )
+    suite.run(
+        "backup.store",
+        lambda run: bookmarks.backup_bookmarks_file(
+            work / f"store-{run}", mode="store"
+        ),
+        nodes=nodes,
+        nbytes=size,
+    )
+
+    base_store: Path = work / "store-0"
+    ## The file is unchanged since it was backed up to `base_store`, so only its
+    #  signature is checked
+    suite.run(
+        "backup.unchanged",
+        lambda run: bookmarks.backup_bookmarks_file(base_store, mode="store"),
+        nodes=nodes,
+    )
+    edited: Path = modified_copy(src, work / "Bookmarks.edited")
+
+    def incremental_setup(run: int) -> None:
+        store_root: Path = work / f"incremental-{run}"
+        BackupStore(store_root).add_file(src=src, browser="chrome", profile="Default")
+        shutil.copyfile(edited, live)
+
+    suite.run(
+        "backup.incremental",
+        lambda run: bookmarks.backup_bookmarks_file(
+            work / f"incremental-{run}", mode="incremental"
+        ),
+        nodes=nodes,
+        nbytes=size,
+        setup=incremental_setup,
+    )
+
+    ## Restores
+    snapshot_id: str = BackupStore(base_store).snapshots()[-1].id
+    suite.run(
+        "restore.copy",
+        lambda run: bookmarks.restore_bookmarks_file(str(work / "copy-0.json")),
+        nodes=nodes,
+        nbytes=size,
+    )
+    suite.run(
+        "restore.store",
+        lambda run: bookmarks.restore_bookmarks_file(
+            str(base_store), snapshot_id=snapshot_id
+        ),
+        nodes=nodes,
+        nbytes=size,
+    )
+
+    ## Compression on its own, without the backup around it
+    for fmt in compression.supported_compression_formats():
+        packed: Path = work / f"packed.{fmt}"
+        suite.run(
+            f"compress.{fmt}",
+            lambda run, fmt=fmt, packed=packed: compression.compress_file(
+                src, packed, fmt
+            ),
+            nodes=nodes,
+            nbytes=size,
+        )
+        suite.run(
+            f"decompress.{fmt}",
+            lambda run, packed=packed: compression.decompress_file(
+                packed, work / "unpacked.json"
+            ),
+            nodes=nodes,
+            nbytes=size,
+        )
+
+    ## Parsing and exports
+    def parse_json(run: int) -> None:
+        with open(src, "r", encoding="utf-8") as f:
+            json.load(f)
+
+    suite.run("parse.json", parse_json, nodes=nodes, nbytes=size)
+    suite.run(
+        "parse.tree",
+        lambda run: BookmarkTree.load(src),
+        nodes=nodes,
+        nbytes=size,
+    )
+    suite.run(
+        "parse.stream",
+        lambda run: sum(1 for _ in BookmarkStream(src)),
+        nodes=nodes,
+        nbytes=size,
+    )
+    for fmt in ("html", "csv", "ndjson"):
+        suite.run(
+            f"export.{fmt}",
+            lambda run, fmt=fmt: export_bookmarks(src, work / f"export.{fmt}"),
+            nodes=nodes,
+            nbytes=size,
+        )
+
+    shutil.rmtree(work)
+
+
+def compare(results: list[CaseResult], baseline_path: Path, threshold: float) -> int:
+    """Print the change per case against an earlier run.
+
+    Returns:
+        (int): The number of cases slower than the baseline by more than `threshold`.
+
+    """
+    with open(baseline_path, "r") as f:
+        baseline: dict = json.load(f)
+
+    before: dict[str, float] = {
+        case["key"]: case["seconds"] for case in baseline.get("results", [])
+    }
+    print(f"\nCompared to {baseline.get('commit', baseline_path)}:")
+
+    regressions: int = 0
+    for result in results:
+        old: float | None = before.get(result.key)
+        if not old:
+            print(f"  {result.key:<32} {'new':>10}")
+            continue
+
+        change: float = result.seconds / old - 1
+        flag: str = ""
+        if change > threshold:
+            flag = "  [SLOWER]"
+            regressions += 1
+        elif change < -threshold:
+            flag = "  [FASTER]"
+        print(
+            f"  {result.key:<32} {old * 1000:10.2f}ms -> {result.seconds * 1000:10.2f}ms {change:+7.1%}{flag}"
+        )
+
+    return regressions
+
+
+def write_results(path: Path, results: list[CaseResult], meta: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data: dict = {
+        **meta,
+        "results": [
+            {
+                "key": result.key,
+                **asdict(result),
+                "mb_per_second": round(result.mb_per_second, 3),
+            }
+            for result in results
+        ],
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(n) for n in value.split(",") if n],
+        default=DEFAULT_SIZES,
+        help="Comma-separated bookmarks file sizes, in nodes",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--startup-runs", type=int, default=10)
+    parser.add_argument("--profiles", type=int, default=4)
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Results file, defaults to .benchmarks/<commit>.json",
+    )
+    parser.add_argument("--compare", type=Path, default=None)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    commit, dirty = git_commit()
+    output: Path = args.output or RESULTS_DIR / (
+        f"{commit}-dirty.json" if dirty else f"{commit}.json"
+    )
+
+    suite = Suite(repeat=args.repeat)
+    with tempfile.TemporaryDirectory(prefix="bench-suite-") as tmp:
+        tmp_dir = Path(tmp)
+        home: Path = tmp_dir / "home"
+        ## Browser paths are expanded from $HOME when first resolved, so set it
+        #  before anything looks one up
+        os.environ["HOME"] = str(home)
+
+        seed_file: Path = write_bookmarks(tmp_dir / "profile-Bookmarks", 1_000)
+        repair_checksum(seed_file)
+        files: int = make_profiles(home, args.profiles, seed_file)
+        print(
+            f"Synthetic home: {files} bookmarks files in {len(BROWSER_DIRS)} browsers"
+        )
+
+        bench_host(suite, tmp_dir, args)
+        for nodes in args.sizes:
+            bench_size(suite, tmp_dir, home, nodes)
+
+    write_results(
+        output,
+        suite.results,
+        {
+            "commit": commit,
+            "dirty": dirty,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "sizes": args.sizes,
+            "repeat": args.repeat,
+            "compression_formats": compression.supported_compression_formats(),
+        },
+    )
+    print(f"\nSaved results to {output}")
+
+    if args.compare is not None:
+        regressions: int = compare(suite.results, args.compare, args.threshold)
+        if regressions:
+            print(
+                f"[FAILED] {regressions} case(s) slower than {args.compare} by more than {args.threshold:.0%}"
+            )
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
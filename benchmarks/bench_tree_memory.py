@@ -0,0 +1,86 @@
+"""Compare the memory used by `json.load` and `BookmarkTree` for a bookmarks file.
+
+Generates a synthetic Chromium Bookmarks file (or uses `--file`), then measures the
+memory retained and peak memory (via `tracemalloc`) and time taken to load it as
+plain dicts, as a `BookmarkTree`, and as a `BookmarkTree` built from the streaming
+reader, and checks the trees round-trip back to the same dicts.
+
+Usage:
+    python benchmarks/bench_tree_memory.py [--nodes 100000] [--seed 0] [--file PATH]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+from pathlib import Path
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing as t
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bookmark_backup.domain.tree import BookmarkTree
+
+from synthetic import write_bookmarks
+
+def measure(load: t.Callable[[], t.Any]) -> tuple[t.Any, int, int, float]:
+    """Run `load`, returning its result, the memory it still holds, its peak memory
+    and the time taken.
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, retained, peak, elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--file", type=str, default=None, help="Measure this file instead"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(args.file) if args.file else Path(tmp) / "Bookmarks"
+        if not args.file:
+            write_bookmarks(path, nodes=args.nodes, seed=args.seed)
+
+        def load_json() -> dict:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+
+        data, *json_stats = measure(load_json)
+        results: dict[str, list] = {"json.load": json_stats}
+        for label, stream in (("BookmarkTree", False), ("BookmarkTree stream", True)):
+            tree, *stats = measure(lambda: BookmarkTree.load(path, stream=stream))
+            if tree.to_dict() != data:
+                print(f"{label} round trip does not match json.load", file=sys.stderr)
+                return 1
+            results[label] = stats
+
+        size = path.stat().st_size
+        print(f"File: {path} ({size / 1e6:.1f} MB, {len(tree)} nodes)")
+        print(f"  {'':<20}  {'retained':>10}  {'peak':>10}  {'time':>7}")
+        for label, (retained, peak, elapsed) in results.items():
+            print(
+                f"  {label:<20}  {retained / 1e6:8.1f}MB  {peak / 1e6:8.1f}MB  {elapsed:6.2f}s"
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Generate synthetic Chromium bookmarks files for benchmarks.
+
+Usage:
+    python benchmarks/synthetic.py NODES OUTPUT [--seed 0]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import random
+import sys
+import typing as t
+import uuid
+
+## Chromium's timestamps are microseconds since 1601-01-01
+BASE_TIMESTAMP: int = 13_300_000_000_000_000
+## Number of distinct hosts URLs are spread over
+URL_HOSTS: int = 97
+
+
+def _root_folder(node_id: int, guid: str, name: str, children: list[dict]) -> dict:
+    return {
+        "children": children,
+        "date_added": str(BASE_TIMESTAMP),
+        "date_last_used": "0",
+        "date_modified": "0",
+        "guid": guid,
+        "id": str(node_id),
+        "name": name,
+        "type": "folder",
+    }
+
+
+def generate_bookmarks(nodes: int, seed: int = 0, folder_ratio: float = 0.1) -> dict:
+    """Build a Chromium Bookmarks structure with about `nodes` bookmarks and folders.
+
+    Description:
+        Nodes are laid out in folders up to 4 levels deep under the bookmarks bar,
+        with a few in "Other bookmarks". Titles include non-ASCII characters and
+        URLs repeat across a fixed set of hosts, like real bookmark collections.
+    """
+    rand = random.Random(seed)
+    next_id: list[int] = [3]
+
+    def new_id() -> int:
+        next_id[0] += 1
+        return next_id[0]
+
+    def new_guid() -> str:
+        return str(uuid.UUID(int=rand.getrandbits(128), version=4))
+
+    remaining: list[int] = [nodes]
+
+    def make_node(depth: int) -> dict:
+        remaining[0] -= 1
+        node_id = new_id()
+        added = str(BASE_TIMESTAMP + node_id * 1_000_000)
+
+        if depth < 4 and rand.random() < folder_ratio:
+            children = []
+            for _ in range(rand.randint(1, 12)):
+                if remaining[0] <= 0:
+                    break
+                children.append(make_node(depth + 1))
+
+            return {
+                "children": children,
+                "date_added": added,
+                "date_last_used": "0",
+                "date_modified": added,
+                "guid": new_guid(),
+                "id": str(node_id),
+                "name": f"Folder {node_id} – ärchive",
+                "type": "folder",
+            }
+
+        return {
+            "date_added": added,
+            "date_last_used": "0",
+            "guid": new_guid(),
+            "id": str(node_id),
+            "meta_info": {"power_bookmark_meta": ""},
+            "name": f'Page {node_id}: "Notes" ☃',
+            "type": "url",
+            "url": f"https://host{node_id % URL_HOSTS}.example.com/path/{node_id}?ref=bench",
+        }
+
+    bar: list[dict] = []
+    other: list[dict] = []
+    while remaining[0] > 0:
+        (other if rand.random() < 0.05 else bar).append(make_node(0))
+
+    return {
+        "checksum": "",
+        "roots": {
+            "bookmark_bar": _root_folder(
+                1, "0bc5d13f-2cba-5d74-951f-3f233fe6c908", "Bookmarks bar", bar
+            ),
+            "other": _root_folder(
+                2, "82b081ec-3dd3-529c-8475-ab6c344590dd", "Other bookmarks", other
+            ),
+            "synced": _root_folder(
+                3, "4cf2e351-0e85-532b-bb37-df045d8f8d0f", "Mobile bookmarks", []
+            ),
+        },
+        "version": 1,
+    }
+
+
+def write_bookmarks(path: t.Union[str, Path], nodes: int, seed: int = 0) -> Path:
+    """Write a synthetic Bookmarks file with about `nodes` nodes to `path`."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(generate_bookmarks(nodes, seed=seed), f, indent=3, ensure_ascii=False)
+
+    return path
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("nodes", type=int)
+    parser.add_argument("output", type=str)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    path = write_bookmarks(args.output, args.nodes, seed=args.seed)
+    print(f"Wrote {path} ({path.stat().st_size} bytes)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
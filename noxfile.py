@@ -168,6 +168,29 @@ Double check imports in __init__.py files, ruff removes unused imports by defaul
     )
 
 
+@nox.session(python=PY_VERSIONS, name="tests", tags=["tests"])
+def run_tests(session: nox.Session):
+    """Run the test suite with pytest.
+
+    Pytest options go after `--`, i.e. `nox -s tests -- -k checksum`.
+    """
+    session.install("pytest")
+    ## pyproject.toml puts ./src on pytest's path, so the checked out code is tested
+    session.run("pytest", *session.posargs)
+
+
+@nox.session(python=[DEFAULT_PYTHON], name="bench", tags=["bench"])
+def run_benchmarks(session: nox.Session):
+    """Run the benchmark suite, saving the results to .benchmarks/<commit>.json.
+
+    Suite options go after `--`, i.e. compare against an earlier commit with:
+    `nox -s bench -- --compare .benchmarks/<commit>.json`.
+    """
+    ## The suite imports the package from ./src, so the commit being measured is
+    #  the checked out one and not whatever was last installed in the session
+    session.run("python", "benchmarks/bench_suite.py", *session.posargs)
+
+
 @nox.session(python=[DEFAULT_PYTHON], name="uv-export")
 @nox.parametrize("requirements_output_dir", REQUIREMENTS_OUTPUT_DIR)
 def export_requirements(session: nox.Session, requirements_output_dir: Path):
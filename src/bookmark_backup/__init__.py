@@ -1,3 +1,23 @@
 from __future__ import annotations
 
-from . import finder
+import importlib
+
+## Import subpackages on first use to keep CLI startup fast
+_SUBPACKAGES: set[str] = {
+    "cli",
+    "core",
+    "domain",
+    "finder",
+    "jobs",
+    "search",
+    "server",
+    "storage",
+    "store",
+}
+
+
+def __getattr__(name: str):
+    if name in _SUBPACKAGES:
+        return importlib.import_module(f".{name}", __name__)
+
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
@@ -3,20 +3,45 @@ from __future__ import annotations
 import argparse
 import logging
 import sys
+import typing as t
 
 log = logging.getLogger(__name__)
 
-from bookmark_backup import finder
-from bookmark_backup.core import detect_env
-from bookmark_backup.core.validators import validate_browser, validate_os_type
-from bookmark_backup.domain.Bookmarks import (
-    BookmarksFile,
-    ChromeBookmarksFile,
-    EdgeBookmarksFile,
-    VivaldiBookmarksFile,
+from bookmark_backup.core.constants import (
+    DEFAULT_DEST_CONCURRENCY,
+    DEFAULT_MAX_WORKERS,
+    NO_DAEMON_ENV,
+    SOCKET_ENV,
 )
 
-def backup(browser: str, dest: str, overwrite: bool):
+## The domain, store & jobs modules are imported inside the commands that use them,
+#  so `--help` and argument errors do not pay for importing them. Validation and
+#  compression are imported when the parser is built, after a command is forwarded.
+
+## Commands never forwarded to a running server: `serve` is the server, and `watch`
+#  runs until it is stopped
+LOCAL_COMMANDS: frozenset[str] = frozenset({"serve", "watch"})
+## Options before the command that take a value, read by `forwardable()`
+TOP_LEVEL_VALUE_OPTIONS: tuple[str, ...] = ("--browser", "--metrics-json")
+
+
+def backup(
+    browser: str,
+    dest: str,
+    overwrite: bool,
+    mode: str = "copy",
+    compress: str | None = None,
+    verify: bool = True,
+    force: bool = False,
+):
+    from bookmark_backup.domain.Bookmarks import (
+        ChromeBookmarksFile,
+        EdgeBookmarksFile,
+        VivaldiBookmarksFile,
+    )
+    from bookmark_backup.storage import StorageError
+    from bookmark_backup.store import Snapshot
+
     # Backup functionality (not yet implemented)
     match browser:
         case "vivaldi":
@@ -33,8 +58,36 @@ def backup(browser: str, dest: str, overwrite: bool):
     )
 
     try:
-        bookmarks.backup_bookmarks_file(backup_dest=dest, overwrite=overwrite)
-        print(f"Saved [{browser}] bookmarks to file: {dest}")
+        previous = (
+            None
+            if force
+            else bookmarks.unchanged_backup(dest, mode=mode, compress=compress)
+        )
+        if isinstance(previous, Snapshot):
+            print(
+                f"[{browser}] bookmarks are unchanged since snapshot {previous.id} in store {dest}. Skipped backup (use --force to back up anyway)."
+            )
+            return True
+        elif previous:
+            print(
+                f"[{browser}] bookmarks are unchanged since they were copied to {dest}. Skipped backup (use --force to back up anyway)."
+            )
+            return True
+
+        result = bookmarks.backup_bookmarks_file(
+            backup_dest=dest,
+            overwrite=overwrite,
+            mode=mode,
+            compress=compress,
+            verify=verify,
+            skip_unchanged=False,
+        )
+        if isinstance(result, Snapshot):
+            print(
+                f"Saved [{browser}] bookmarks to store {dest} as snapshot: {result.id}"
+            )
+        else:
+            print(f"Saved [{browser}] bookmarks to file: {dest}")
 
         return True
     except FileExistsError as file_exists:
@@ -47,6 +100,11 @@ def backup(browser: str, dest: str, overwrite: bool):
             f"[ERROR] Permission denied copying [{browser}] bookmarks file to path: {dest}. Details: {perm_err}"
         )
         sys.exit(1)
+    except StorageError as storage_err:
+        print(
+            f"[ERROR] Could not upload [{browser}] bookmarks to {dest}. Details: {storage_err}"
+        )
+        sys.exit(1)
     except Exception as exc:
         msg = f"({type(exc)}) Error backing up [{browser}] bookmarks. Details: {exc}"
         log.error(msg)
@@ -54,7 +112,16 @@ def backup(browser: str, dest: str, overwrite: bool):
         raise exc
 
 
-def restore(browser: str, src: str):
+def restore(
+    browser: str, src: str, snapshot_id: str | None = None, verify: bool = True
+):
+    from bookmark_backup.domain.Bookmarks import (
+        ChromeBookmarksFile,
+        EdgeBookmarksFile,
+        VivaldiBookmarksFile,
+    )
+    from bookmark_backup.storage import StorageError
+
     # Raise NotImplementedError as restore is not yet implemented
     match browser:
         case "vivaldi":
@@ -67,8 +134,15 @@ def restore(browser: str, src: str):
             raise ValueError(f"Invalid browser: {browser}.")
 
     try:
-        bookmarks.restore_bookmarks_file(backup_src=src)
-        print(f"Restored [{browser}] bookmarks from file: {src}")
+        bookmarks.restore_bookmarks_file(
+            backup_src=src, snapshot_id=snapshot_id, verify=verify
+        )
+        if snapshot_id:
+            print(
+                f"Restored [{browser}] bookmarks from snapshot {snapshot_id} in store: {src}"
+            )
+        else:
+            print(f"Restored [{browser}] bookmarks from file: {src}")
 
         return True
     except FileNotFoundError as fnf_err:
@@ -80,6 +154,11 @@ def restore(browser: str, src: str):
             f"[ERROR] Permission denied restoring [{browser}] bookmarks file from path: {src}. Details: {perm_err}"
         )
         sys.exit(1)
+    except StorageError as storage_err:
+        print(
+            f"[ERROR] Could not download [{browser}] bookmarks from {src}. Details: {storage_err}"
+        )
+        sys.exit(1)
     except Exception as exc:
         msg = f"({type(exc)}) Error restoring [{browser}] bookmarks. Details: {exc}"
         log.error(msg)
@@ -87,24 +166,508 @@ def restore(browser: str, src: str):
         raise exc
 
 
+def backup_all(
+    dest: str,
+    overwrite: bool,
+    mode: str = "copy",
+    compress: str | None = None,
+    browsers: list[str] | None = None,
+    workers: int = DEFAULT_MAX_WORKERS,
+    verify: bool = True,
+    dest_concurrency: int = DEFAULT_DEST_CONCURRENCY,
+    max_rate: float | None = None,
+    force: bool = False,
+):
+    from bookmark_backup import jobs
+
+    print(
+        f"Backing up all browser profiles to destination: {dest} (mode: {mode}, workers: {workers})"
+    )
+
+    results = jobs.backup_all(
+        dest=dest,
+        mode=mode,
+        overwrite=overwrite,
+        compress=compress,
+        browsers=browsers,
+        max_workers=workers,
+        verify=verify,
+        dest_concurrency=dest_concurrency,
+        bytes_per_second=max_rate * 1024 * 1024 if max_rate else None,
+        skip_unchanged=not force,
+    )
+    if not results:
+        print("No browser profiles with a bookmarks file were found.")
+        return True
+
+    for result in results:
+        status = "OK" if result.ok else "FAILED"
+        target = result.snapshot_id or result.dest
+        unchanged = " (unchanged)" if result.skipped else ""
+        print(
+            f"[{status}] [{result.browser}] {result.profile} -> {target}{unchanged} ({result.duration:.2f}s)"
+        )
+
+    failed = [result for result in results if not result.ok]
+    skipped = [result for result in results if result.skipped]
+    print(
+        f"\nBacked up {len(results) - len(failed)}/{len(results)} profile(s), {len(skipped)} unchanged since their last backup."
+    )
+
+    if failed:
+        print("Errors:")
+        for result in failed:
+            print(f"  [{result.browser}] {result.profile}: {result.error}")
+        sys.exit(1)
+
+    return True
+
+
+def watch(
+    dest: str,
+    mode: str = "store",
+    compress: str | None = None,
+    browsers: list[str] | None = None,
+    settle: float = 2.0,
+    poll_interval: float = 1.0,
+    max_poll_interval: float = 30.0,
+    use_inotify: bool = True,
+    initial: bool = False,
+    verify: bool = True,
+):
+    import asyncio
+
+    from bookmark_backup import jobs
+
+    bookmarks_files = jobs.discover_bookmarks_files(browsers=browsers)
+    if not bookmarks_files:
+        print("No browser profiles with a bookmarks file were found.")
+        sys.exit(1)
+
+    def report(result):
+        status = "OK" if result.ok else "FAILED"
+        target = result.snapshot_id or result.dest
+        print(
+            f"[{status}] [{result.browser}] {result.profile} -> {target} ({result.duration:.2f}s)",
+            flush=True,
+        )
+        if result.error:
+            print(f"  {result.error}", flush=True)
+
+    watcher = jobs.BookmarksWatcher(
+        bookmarks_files,
+        dest=dest,
+        mode=mode,
+        compress=compress,
+        verify=verify,
+        settle=settle,
+        poll_interval=poll_interval,
+        max_poll_interval=max_poll_interval,
+        use_inotify=use_inotify,
+        on_result=report,
+    )
+    print(
+        f"Watching {len(watcher.files)} bookmarks file(s) with {watcher.method}, backing up to: {dest} (mode: {mode}). Press Ctrl+C to stop.",
+        flush=True,
+    )
+    for path in watcher.files:
+        print(f"  {path}")
+
+    try:
+        asyncio.run(watcher.run(initial=initial))
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+
+    return True
+
+
+def list_snapshots(browser: str | None, store: str):
+    from bookmark_backup.storage import RemoteStore, StorageError, is_remote_url
+    from bookmark_backup.store import BackupStore
+
+    if is_remote_url(store):
+        ## Only the manifest is needed to list snapshots
+        try:
+            with RemoteStore(store) as remote:
+                remote.pull(snapshot_ids=[])
+                snapshots = remote.store.snapshots(browser=browser)
+        except StorageError as storage_err:
+            print(f"[ERROR] Could not read store: {store}. Details: {storage_err}")
+            sys.exit(1)
+    else:
+        snapshots = BackupStore(store).snapshots(browser=browser)
+    if not snapshots:
+        print(f"No snapshots found in store: {store}")
+        return
+
+    for snapshot in snapshots:
+        print(
+            f"{snapshot.id}  {snapshot.timestamp}  {snapshot.browser:<8}  {snapshot.profile}  {snapshot.kind:<5}  {snapshot.size} bytes  {snapshot.hash[:12]}"
+        )
+
+
+def find(
+    root: str,
+    name: str = "Bookmarks",
+    workers: int | None = None,
+    use_cache: bool = True,
+    clear_cache: bool = False,
+    cache_path: str | None = None,
+):
+    from bookmark_backup.finder import CrawlCache, Finder
+
+    cache = CrawlCache(cache_path) if use_cache else None
+    if cache is not None and clear_cache:
+        print(f"Clearing crawl cache: {cache.path}")
+        cache.invalidate()
+
+    try:
+        finder = Finder(root, include=[name], cache=cache)
+        finder.crawl_directory(workers=workers)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    for file in sorted(finder.files):
+        print(file)
+
+    if cache is not None:
+        print(
+            f"\nFound {len(finder.files)} file(s) named '{name}' ({cache.hits} cached, {cache.misses} scanned directories)"
+        )
+    else:
+        print(f"\nFound {len(finder.files)} file(s) named '{name}'")
+
+    return True
+
+
+def search(
+    query: str,
+    browser: str | None = None,
+    stores: list[str] | None = None,
+    limit: int = 20,
+    index_path: str | None = None,
+    update: bool = True,
+    raw: bool = False,
+):
+    import time
+
+    from bookmark_backup import jobs
+    from bookmark_backup.search import SearchIndex
+    from bookmark_backup.store import BackupStore
+
+    with SearchIndex(index_path) as index:
+        if update:
+            stats = index.update_live(jobs.discover_bookmarks_files())
+            for store in stores or []:
+                index.update_store(BackupStore(store), stats=stats)
+            if stats.indexed or stats.removed:
+                print(
+                    f"Updated search index: {stats.indexed} file(s) indexed, {stats.reused} reused, {stats.removed} removed\n"
+                )
+
+        start = time.perf_counter()
+        results = index.search(query, limit=limit, browser=browser, raw=raw)
+        elapsed = time.perf_counter() - start
+
+    for result in results:
+        locations = sorted(
+            {
+                f"{source_browser}/{profile}"
+                for source_browser, profile, _, _ in result.sources
+            }
+        )
+        found_in = []
+        if result.live:
+            found_in.append("live")
+        if result.snapshot_count:
+            found_in.append(f"{result.snapshot_count} snapshot(s)")
+
+        print(result.title or "(untitled)")
+        print(f"    {result.url}")
+        print(f"    {result.folder}  [{', '.join(locations)}: {', '.join(found_in)}]")
+
+    print(f"\n{len(results)} result(s) in {elapsed * 1000:.1f} ms")
+
+    return True
+
+
+def merge(
+    dest: str,
+    files: list[str] | None = None,
+    browsers: list[str] | None = None,
+    overwrite: bool = False,
+):
+    from pathlib import Path
+
+    from bookmark_backup import jobs
+    from bookmark_backup.domain.merge import merge_bookmarks_files
+
+    if files:
+        sources = files
+    else:
+        sources = [
+            bookmarks.bookmarks_file
+            for bookmarks in jobs.discover_bookmarks_files(browsers=browsers)
+        ]
+    if not sources:
+        print("No bookmarks files to merge were found.")
+        sys.exit(1)
+
+    if Path(dest).expanduser().exists() and not overwrite:
+        print(
+            f"[WARNING] Merge destination '{dest}' already exists, and overwrite=False. Did not merge bookmarks."
+        )
+        sys.exit(1)
+
+    print(f"Merging {len(sources)} bookmarks file(s) into: {dest}")
+    for source in sources:
+        print(f"  {source}")
+
+    stats = merge_bookmarks_files(sources, dest)
+    print(
+        f"\nRead {stats.bookmarks_read} bookmark(s), wrote {stats.bookmarks_merged} unique bookmark(s) in {stats.folders} folder(s) ({stats.duplicates} duplicate(s) removed, {stats.conflicts} conflict(s) resolved)."
+    )
+    print(
+        f"Restore it into a browser with: bookmark-backup --browser <browser> restore --src {dest}"
+    )
+
+    return True
+
+
+def export(
+    dest: str,
+    browser: str | None = None,
+    src: str | None = None,
+    fmt: str | None = None,
+    overwrite: bool = False,
+    include_folders: bool = False,
+):
+    from pathlib import Path
+
+    from bookmark_backup.domain.Bookmarks import get_bookmarks_file
+    from bookmark_backup.domain.export import export_bookmarks
+
+    source = src or browser
+    try:
+        if src:
+            if Path(dest).expanduser().exists() and not overwrite:
+                raise FileExistsError(dest)
+            count = export_bookmarks(
+                src, dest, fmt=fmt, include_folders=include_folders
+            )
+        else:
+            count = get_bookmarks_file(browser).export_bookmarks_file(
+                dest, fmt=fmt, overwrite=overwrite, include_folders=include_folders
+            )
+    except FileExistsError:
+        print(
+            f"[WARNING] Export destination '{dest}' already exists, and overwrite=False. Did not export bookmarks."
+        )
+        sys.exit(1)
+    except FileNotFoundError as fnf_err:
+        print(f"[ERROR] Could not find bookmarks to export. Details: {fnf_err}")
+        sys.exit(1)
+    except (RuntimeError, ValueError) as exc:
+        print(f"[ERROR] Could not export [{source}] bookmarks. Details: {exc}")
+        sys.exit(1)
+
+    print(f"Exported {count} row(s) from [{source}] bookmarks to: {dest}")
+
+    return True
+
+
+def verify(store: str, browser: str | None = None, workers: int = DEFAULT_MAX_WORKERS):
+    from bookmark_backup import jobs
+    from bookmark_backup.storage import RemoteStore, StorageError, is_remote_url
+
+    print(f"Verifying snapshots in store: {store} (workers: {workers})")
+    store_root = store
+    if is_remote_url(store):
+        ## Download the blobs the local copy lacks, then check the local copy
+        try:
+            with RemoteStore(store, max_workers=workers) as remote:
+                remote.pull()
+                store_root = remote.store.root
+        except StorageError as storage_err:
+            print(f"[ERROR] Could not read store: {store}. Details: {storage_err}")
+            sys.exit(1)
+    results = jobs.verify_store(store_root, max_workers=workers, browser=browser)
+    if not results:
+        print(f"No snapshots found in store: {store}")
+        return True
+
+    for result in results:
+        status = "OK" if result.ok else "FAILED"
+        print(
+            f"[{status}] {result.snapshot_id}  [{result.browser}] {result.profile}  {result.kind:<5} ({result.duration:.2f}s)"
+        )
+
+    failed = [result for result in results if not result.ok]
+    print(f"\nVerified {len(results) - len(failed)}/{len(results)} snapshot(s).")
+
+    if failed:
+        print("Errors:")
+        for result in failed:
+            print(f"  {result.snapshot_id}: {result.error}")
+        sys.exit(1)
+
+    return True
+
+
+def prune(
+    store: str,
+    browser: str | None = None,
+    last: int = 1,
+    hourly: int = 0,
+    daily: int = 0,
+    weekly: int = 0,
+    monthly: int = 0,
+    yearly: int = 0,
+    dry_run: bool = False,
+):
+    import time
+
+    from bookmark_backup.storage import is_remote_url
+    from bookmark_backup.store import RetentionPolicy, prune_store
+
+    if is_remote_url(store):
+        print(f"[ERROR] Pruning remote stores is not supported yet: {store}")
+        sys.exit(1)
+
+    try:
+        policy = RetentionPolicy(
+            last=last,
+            hourly=hourly,
+            daily=daily,
+            weekly=weekly,
+            monthly=monthly,
+            yearly=yearly,
+        )
+    except ValueError as exc:
+        print(f"[ERROR] Invalid retention policy. Details: {exc}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    try:
+        plan = prune_store(store, policy, browser=browser, dry_run=dry_run)
+    except ValueError as exc:
+        print(f"[ERROR] Could not prune store: {store}. Details: {exc}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    if dry_run:
+        for snapshot in plan.remove:
+            print(
+                f"Would remove {snapshot.id}  {snapshot.timestamp}  [{snapshot.browser}] {snapshot.profile}  {snapshot.kind}"
+            )
+        print(
+            f"\nWould keep {len(plan.keep)} and remove {len(plan.remove)} snapshot(s) ({plan.dependencies} kept for incremental snapshots)."
+        )
+    else:
+        print(
+            f"Kept {len(plan.keep)} and removed {len(plan.remove)} snapshot(s) and {plan.blobs_removed} blob(s) in {elapsed:.2f}s ({plan.dependencies} kept for incremental snapshots)."
+        )
+
+    return True
+
+
+def serve(socket_path: str | None = None, status: bool = False, stop: bool = False):
+    import os
+    import signal
+
+    from bookmark_backup.server import (
+        BackupServer,
+        ServerAlreadyRunning,
+        ServerError,
+        ServerUnavailable,
+        call,
+    )
+
+    if status or stop:
+        try:
+            result = call("shutdown" if stop else "stats", socket_path=socket_path)
+        except ServerUnavailable:
+            print("[ERROR] No bookmark-backup server is running.")
+            sys.exit(1)
+        except ServerError as exc:
+            print(f"[ERROR] Could not reach the bookmark-backup server. Details: {exc}")
+            sys.exit(1)
+
+        if stop:
+            print("Stopped the bookmark-backup server.")
+            return True
+
+        print(
+            f"Server pid {result['pid']} on {result['socket']}, up {result['uptime']:.0f}s"
+        )
+        for method, calls in sorted(result["requests"].items()):
+            print(f"  {method:<10} {calls} request(s)")
+        print(f"  {result['failed_commands']} failed command(s)")
+        for name, cache in result["caches"].items():
+            print(
+                f"  {name} cache: {cache['files']} file(s), {cache['hits']} hit(s), {cache['misses']} miss(es)"
+            )
+        return True
+
+    server = BackupServer(socket_path)
+    try:
+        server.start()
+    except ServerAlreadyRunning as exc:
+        print(f"[ERROR] {exc}")
+        sys.exit(1)
+
+    ## Remove the socket when stopped by a service manager, too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(
+        f"Serving on {server.socket_path} (pid {os.getpid()}). Stop with Ctrl+C or 'bookmark-backup serve --stop'.",
+        flush=True,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+    return True
+
+
 def check_inputs(browser: str):
+    from bookmark_backup.core import detect_env
+    from bookmark_backup.core.validators import validate_browser, validate_os_type
+
     browser = validate_browser(browser)
-    os_type: str = validate_os_type(os_type=detect_env.os_type())
+    os_type: str = validate_os_type(os_type=detect_env.get_environment().os_type)
 
 
-def main(log_level: str = "CRITICAL"):
-    log_level = log_level.upper()
-    logging.basicConfig(
-        level=log_level.upper(),
-        format="%(asctime)s | [%(levelname)s] | (%(name)s) > %(module)s.%(funcName)s:%(lineno)s|> %(message)s",
-        datefmt="%Y-%m-%dT%H:%M:%S",
-    )
-    logging.getLogger("bookmarks_backup").setLevel("NOTSET")
-    logging.getLogger("Bookmarks").setLevel("NOTSET")
+def build_parser() -> argparse.ArgumentParser:
+    from bookmark_backup.core.compression import supported_compression_formats
 
     parser = argparse.ArgumentParser(description="Browser bookmarks management CLI.")
     parser.add_argument(
-        "--browser", type=str, required=True, help="Specify the browser name."
+        "--browser",
+        type=str,
+        default=None,
+        help="Specify the browser name. Required for 'backup' and 'restore'.",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print the time spent and bytes moved in each phase (path resolution, copy, fsync, ...) when the command finishes",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="Write the per-phase timings and counters as JSON to PATH ('-' for stdout), i.e. for monitoring to scrape",
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        default=False,
+        help=f"Run the command in this process even if a 'serve' server is running (or set {NO_DAEMON_ENV}=1)",
     )
 
     # Define subparsers for the 'backup' and 'restore' commands
@@ -123,6 +686,310 @@ def main(log_level: str = "CRITICAL"):
         default=False,
         help="Overwrite existing backup",
     )
+    backup_parser.add_argument(
+        "--mode",
+        type=str,
+        choices=["copy", "store", "incremental"],
+        default="copy",
+        help="'copy' writes the file to --dest, 'store' adds a deduplicated snapshot to the backup store at --dest, 'incremental' stores only the bookmarks changed since the last snapshot",
+    )
+    backup_parser.add_argument(
+        "--compress",
+        type=str,
+        choices=supported_compression_formats(),
+        default=None,
+        help="Compress the backup (zstd requires the 'zstandard' package)",
+    )
+    backup_parser.add_argument(
+        "--no-verify",
+        action="store_true",
+        default=False,
+        help="Skip checking the bookmarks file's checksum while backing it up",
+    )
+    backup_parser.add_argument(
+        "--force",
+        action="store_true",
+        default=False,
+        help="Back up even if the bookmarks file is unchanged since its last backup to --dest",
+    )
+
+    # 'backup-all' command
+    backup_all_parser = subparsers.add_parser(
+        "backup-all", help="Backup every browser profile found on this host"
+    )
+    backup_all_parser.add_argument(
+        "--dest",
+        type=str,
+        required=True,
+        help="Destination directory for the backups, or the backup store path for store modes",
+    )
+    backup_all_parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        default=False,
+        help="Overwrite existing backups",
+    )
+    backup_all_parser.add_argument(
+        "--mode",
+        type=str,
+        choices=["copy", "store", "incremental"],
+        default="copy",
+        help="Backup mode, see 'backup --help'",
+    )
+    backup_all_parser.add_argument(
+        "--compress",
+        type=str,
+        choices=supported_compression_formats(),
+        default=None,
+        help="Compress the backups",
+    )
+    backup_all_parser.add_argument(
+        "--browsers",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Only backup these browsers (default: all supported browsers)",
+    )
+    backup_all_parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help="Maximum number of profiles to back up concurrently",
+    )
+    backup_all_parser.add_argument(
+        "--no-verify",
+        action="store_true",
+        default=False,
+        help="Skip checking each bookmarks file's checksum while backing it up",
+    )
+    backup_all_parser.add_argument(
+        "--dest-concurrency",
+        type=int,
+        default=DEFAULT_DEST_CONCURRENCY,
+        help="Maximum number of backups written to the destination at the same time",
+    )
+    backup_all_parser.add_argument(
+        "--max-rate",
+        type=float,
+        default=None,
+        help="Maximum write rate to the destination, in MiB/s (default: unlimited)",
+    )
+    backup_all_parser.add_argument(
+        "--force",
+        action="store_true",
+        default=False,
+        help="Back up every profile, even those unchanged since their last backup to --dest",
+    )
+
+    # 'watch' command
+    watch_parser = subparsers.add_parser(
+        "watch",
+        help="Back up every browser profile whenever its bookmarks change",
+    )
+    watch_parser.add_argument(
+        "--dest",
+        type=str,
+        required=True,
+        help="Backup store path for store modes, or destination directory for copy mode",
+    )
+    watch_parser.add_argument(
+        "--mode",
+        type=str,
+        choices=["copy", "store", "incremental"],
+        default="store",
+        help="Backup mode, see 'backup --help'. Copy mode overwrites the previous copy",
+    )
+    watch_parser.add_argument(
+        "--compress",
+        type=str,
+        choices=supported_compression_formats(),
+        default=None,
+        help="Compress the backups",
+    )
+    watch_parser.add_argument(
+        "--browsers",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Only watch these browsers (default: all supported browsers)",
+    )
+    watch_parser.add_argument(
+        "--settle",
+        type=float,
+        default=2.0,
+        help="Seconds a bookmarks file must go unchanged before it is backed up",
+    )
+    watch_parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="Seconds between checks when polling, doubling while nothing changes",
+    )
+    watch_parser.add_argument(
+        "--max-poll-interval",
+        type=float,
+        default=30.0,
+        help="Longest time between checks when polling",
+    )
+    watch_parser.add_argument(
+        "--poll",
+        action="store_true",
+        default=False,
+        help="Poll the files instead of using inotify",
+    )
+    watch_parser.add_argument(
+        "--initial",
+        action="store_true",
+        default=False,
+        help="Back up every profile when starting, before waiting for changes",
+    )
+    watch_parser.add_argument(
+        "--no-verify",
+        action="store_true",
+        default=False,
+        help="Skip checking each bookmarks file's checksum while backing it up",
+    )
+
+    # 'find' command
+    find_parser = subparsers.add_parser(
+        "find", help="Search a directory tree for bookmarks files"
+    )
+    find_parser.add_argument(
+        "--root", type=str, required=True, help="Directory to search"
+    )
+    find_parser.add_argument(
+        "--name",
+        type=str,
+        default="Bookmarks",
+        help="File name (or glob) to search for",
+    )
+    find_parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Scan directories on this many threads",
+    )
+    find_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        default=False,
+        help="Scan every directory instead of reusing the crawl cache",
+    )
+    find_parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        default=False,
+        help="Drop the crawl cache before searching",
+    )
+    find_parser.add_argument(
+        "--cache-path",
+        type=str,
+        default=None,
+        help="Path to the crawl cache (default: ~/.cache/bookmark-backup/crawl_cache.sqlite3)",
+    )
+
+    # 'search' command
+    search_parser = subparsers.add_parser(
+        "search", help="Search bookmarks in every browser profile and backup snapshot"
+    )
+    search_parser.add_argument("query", type=str, help="Words to search for")
+    search_parser.add_argument(
+        "--store",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Also search the snapshots in these backup stores",
+    )
+    search_parser.add_argument(
+        "--limit", type=int, default=20, help="Maximum number of results"
+    )
+    search_parser.add_argument(
+        "--index-path",
+        type=str,
+        default=None,
+        help="Path to the search index (default: ~/.cache/bookmark-backup/search_index.sqlite3)",
+    )
+    search_parser.add_argument(
+        "--no-update",
+        action="store_true",
+        default=False,
+        help="Search the index as-is, without checking for changed bookmarks",
+    )
+    search_parser.add_argument(
+        "--raw",
+        action="store_true",
+        default=False,
+        help="Pass the query to SQLite FTS5 as-is, i.e. 'title:python NOT url:reddit'",
+    )
+
+    # 'merge' command
+    merge_parser = subparsers.add_parser(
+        "merge",
+        help="Merge and deduplicate bookmarks from several browsers into one file",
+    )
+    merge_parser.add_argument(
+        "--dest",
+        type=str,
+        required=True,
+        help="Path to write the merged bookmarks file",
+    )
+    merge_parser.add_argument(
+        "--files",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Bookmarks files to merge, highest priority first (default: every browser profile found)",
+    )
+    merge_parser.add_argument(
+        "--browsers",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Only merge these browsers' profiles",
+    )
+    merge_parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        default=False,
+        help="Overwrite an existing merged file",
+    )
+
+    # 'export' command
+    export_parser = subparsers.add_parser(
+        "export",
+        help="Export bookmarks to Netscape HTML, CSV, NDJSON or Parquet",
+    )
+    export_parser.add_argument(
+        "--dest",
+        type=str,
+        required=True,
+        help="Path to write the export, its extension picks the format unless --format is given",
+    )
+    export_parser.add_argument(
+        "--format",
+        type=str,
+        default=None,
+        choices=["html", "csv", "ndjson", "parquet"],
+        help="Export format (parquet needs the 'pyarrow' package)",
+    )
+    export_parser.add_argument(
+        "--src",
+        type=str,
+        default=None,
+        help="Export this Bookmarks file or plain/compressed backup instead of the --browser's bookmarks",
+    )
+    export_parser.add_argument(
+        "--folders",
+        action="store_true",
+        default=False,
+        help="Also write a row for each folder (CSV, NDJSON and Parquet)",
+    )
+    export_parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        default=False,
+        help="Overwrite an existing export file",
+    )
 
     # 'restore' command
     restore_parser = subparsers.add_parser("restore", help="Restore browser bookmarks")
@@ -130,18 +997,290 @@ def main(log_level: str = "CRITICAL"):
         "--src",
         type=str,
         required=True,
-        help="Source path for the backups file .json to restore",
+        help="Source path for the backups file .json to restore, or the backup store path when using --snapshot",
+    )
+    restore_parser.add_argument(
+        "--snapshot",
+        type=str,
+        default=None,
+        help="ID of a snapshot to restore from the backup store at --src",
+    )
+    restore_parser.add_argument(
+        "--no-verify",
+        action="store_true",
+        default=False,
+        help="Restore the backup as-is, without checking and repairing its checksum",
+    )
+
+    # 'verify' command
+    verify_parser = subparsers.add_parser(
+        "verify", help="Check the integrity and checksums of a backup store"
+    )
+    verify_parser.add_argument(
+        "--store", type=str, required=True, help="Path to the backup store"
+    )
+    verify_parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help="Maximum number of snapshots to verify concurrently",
+    )
+
+    # 'prune' command
+    prune_parser = subparsers.add_parser(
+        "prune",
+        help="Remove old snapshots from a backup store, keeping hourly/daily/weekly/monthly ones",
+    )
+    prune_parser.add_argument(
+        "--store", type=str, required=True, help="Path to the backup store"
+    )
+    prune_parser.add_argument(
+        "--keep-last",
+        type=int,
+        default=1,
+        help="Keep this many of the newest snapshots per browser profile (minimum 1)",
+    )
+    for period, unit in [
+        ("hourly", "hours"),
+        ("daily", "days"),
+        ("weekly", "weeks"),
+        ("monthly", "months"),
+        ("yearly", "years"),
+    ]:
+        prune_parser.add_argument(
+            f"--keep-{period}",
+            type=int,
+            default=0,
+            help=f"Keep the newest snapshot in each of this many {unit} per browser profile",
+        )
+    prune_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        default=False,
+        help="List the snapshots that would be removed without removing them",
+    )
+
+    # 'snapshots' command
+    snapshots_parser = subparsers.add_parser(
+        "snapshots", help="List snapshots in a backup store"
+    )
+    snapshots_parser.add_argument(
+        "--store", type=str, required=True, help="Path to the backup store"
+    )
+
+    # 'serve' command
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Run a server that other bookmark-backup commands are forwarded to, keeping paths, hashes and stores warm",
+    )
+    serve_parser.add_argument(
+        "--socket",
+        type=str,
+        default=None,
+        help=f"Unix socket to listen on (default: ${SOCKET_ENV}, or bookmark-backup.sock in $XDG_RUNTIME_DIR or ~/.cache/bookmark-backup)",
+    )
+    serve_actions = serve_parser.add_mutually_exclusive_group()
+    serve_actions.add_argument(
+        "--status",
+        action="store_true",
+        default=False,
+        help="Show the running server's requests and cache hits",
     )
+    serve_actions.add_argument(
+        "--stop",
+        action="store_true",
+        default=False,
+        help="Stop the running server",
+    )
+
+    return parser
+
+
+def parse_args(
+    parser: argparse.ArgumentParser, argv: list[str] | None = None
+) -> argparse.Namespace:
+    args = parser.parse_args(argv)
 
-    args = parser.parse_args()
+    if args.command in ["backup", "restore"] and args.browser is None:
+        parser.error(f"--browser is required for the '{args.command}' command")
+    if args.command == "export" and args.browser is None and args.src is None:
+        parser.error("--browser or --src is required for the 'export' command")
+    if args.browser is not None:
+        check_inputs(browser=args.browser)
 
-    check_inputs(browser=args.browser)
+    return args
+
+
+def main(log_level: str = "CRITICAL"):
+    log_level = log_level.upper()
+    logging.basicConfig(
+        level=log_level.upper(),
+        format="%(asctime)s | [%(levelname)s] | (%(name)s) > %(module)s.%(funcName)s:%(lineno)s|> %(message)s",
+        datefmt="%Y-%m-%dT%H:%M:%S",
+    )
+    logging.getLogger("bookmarks_backup").setLevel("NOTSET")
+    logging.getLogger("Bookmarks").setLevel("NOTSET")
 
+    argv: list[str] = sys.argv[1:]
+    ## Forwarded as typed, the server parses and checks the command line itself
+    if forwardable(argv):
+        from bookmark_backup.server.methods import forward_command, forwarding_disabled
+
+        exit_code: int | None = None if forwarding_disabled() else forward_command(argv)
+        if exit_code is not None:
+            if exit_code:
+                sys.exit(exit_code)
+            return
+
+    execute(parse_args(build_parser(), argv))
+
+
+def forwardable(argv: list[str]) -> bool:
+    """Return True if a command line may be forwarded to a running server.
+
+    Description:
+        Reads the options before the command and the command's name from the raw
+        command line, without building the parser. Commands in `LOCAL_COMMANDS`
+        and command lines with `--no-daemon` run in this process.
+    """
+    args: t.Iterator[str] = iter(argv)
+    for arg in args:
+        option: str = arg.split("=", 1)[0]
+        if arg == "--":
+            return True
+        if len(option) > 2 and "--no-daemon".startswith(option):
+            return False
+        if any(
+            len(option) > 2 and name.startswith(option)
+            for name in TOP_LEVEL_VALUE_OPTIONS
+        ):
+            if "=" not in arg:
+                next(args, None)
+            continue
+        if not arg.startswith("-"):
+            return arg not in LOCAL_COMMANDS
+
+    return True
+
+
+def execute(args: argparse.Namespace) -> None:
+    """Run a parsed command, recording its timings if asked to."""
+    if not (args.timings or args.metrics_json):
+        run_command(args)
+        return
+
+    from bookmark_backup.core.metrics import collect
+
+    ok: bool = False
+    try:
+        with collect() as metrics:
+            run_command(args)
+        ok = True
+    finally:
+        if args.timings:
+            print(metrics.report(), file=sys.stderr)
+        if args.metrics_json:
+            metrics.write_json(args.metrics_json, command=args.command, ok=ok)
+
+
+def run_command(args: argparse.Namespace) -> None:
     # Route to the appropriate function based on the command
     if args.command == "backup":
-        backup(browser=args.browser, dest=args.dest, overwrite=args.overwrite)
+        backup(
+            browser=args.browser,
+            dest=args.dest,
+            overwrite=args.overwrite,
+            mode=args.mode,
+            compress=args.compress,
+            verify=not args.no_verify,
+            force=args.force,
+        )
+    elif args.command == "backup-all":
+        backup_all(
+            dest=args.dest,
+            overwrite=args.overwrite,
+            mode=args.mode,
+            compress=args.compress,
+            browsers=args.browsers,
+            workers=args.workers,
+            verify=not args.no_verify,
+            dest_concurrency=args.dest_concurrency,
+            max_rate=args.max_rate,
+            force=args.force,
+        )
+    elif args.command == "watch":
+        watch(
+            dest=args.dest,
+            mode=args.mode,
+            compress=args.compress,
+            browsers=args.browsers,
+            settle=args.settle,
+            poll_interval=args.poll_interval,
+            max_poll_interval=args.max_poll_interval,
+            use_inotify=not args.poll,
+            initial=args.initial,
+            verify=not args.no_verify,
+        )
+    elif args.command == "find":
+        find(
+            root=args.root,
+            name=args.name,
+            workers=args.workers,
+            use_cache=not args.no_cache,
+            clear_cache=args.clear_cache,
+            cache_path=args.cache_path,
+        )
+    elif args.command == "search":
+        search(
+            query=args.query,
+            browser=args.browser,
+            stores=args.store,
+            limit=args.limit,
+            index_path=args.index_path,
+            update=not args.no_update,
+            raw=args.raw,
+        )
+    elif args.command == "merge":
+        merge(
+            dest=args.dest,
+            files=args.files,
+            browsers=args.browsers,
+            overwrite=args.overwrite,
+        )
+    elif args.command == "export":
+        export(
+            dest=args.dest,
+            browser=args.browser,
+            src=args.src,
+            fmt=args.format,
+            overwrite=args.overwrite,
+            include_folders=args.folders,
+        )
     elif args.command == "restore":
-        restore(browser=args.browser, src=args.src)
+        restore(
+            browser=args.browser,
+            src=args.src,
+            snapshot_id=args.snapshot,
+            verify=not args.no_verify,
+        )
+    elif args.command == "verify":
+        verify(store=args.store, browser=args.browser, workers=args.workers)
+    elif args.command == "prune":
+        prune(
+            store=args.store,
+            browser=args.browser,
+            last=args.keep_last,
+            hourly=args.keep_hourly,
+            daily=args.keep_daily,
+            weekly=args.keep_weekly,
+            monthly=args.keep_monthly,
+            yearly=args.keep_yearly,
+            dry_run=args.dry_run,
+        )
+    elif args.command == "snapshots":
+        list_snapshots(browser=args.browser, store=args.store)
+    elif args.command == "serve":
+        serve(socket_path=args.socket, status=args.status, stop=args.stop)
     else:
         print("Unknown command")
         sys.exit(1)
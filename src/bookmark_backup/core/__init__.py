@@ -1,4 +1,28 @@
 from __future__ import annotations
 
-from . import constants, detect_env, setup, validators
+import importlib
+
 from .setup import setup_logging
+
+## Submodules are imported on first attribute access, so importing the package
+#  (i.e. for `--help`) does not pay for modules the command never uses
+_SUBMODULES: set[str] = {
+    "backup_state",
+    "compression",
+    "constants",
+    "copy_engine",
+    "detect_env",
+    "fileio",
+    "inotify",
+    "metrics",
+    "setup",
+    "throttle",
+    "validators",
+}
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
@@ -0,0 +1,173 @@
+"""Persistent record of the last backup of each browser profile to each destination.
+
+A backup records the bookmarks file's signature (size, mtime, inode) and the
+signature of the file that shows the backup is still in place. While both are
+unchanged, the next backup of that profile to the same destination can be skipped
+without reading the bookmarks file, so a nightly run over unchanged profiles costs
+a few `stat` calls per profile.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+import json
+import logging
+import os
+from pathlib import Path
+import sqlite3
+import threading
+import typing as t
+
+log = logging.getLogger(__name__)
+
+BACKUP_STATE_FILENAME: str = "backup_state.sqlite3"
+
+
+def default_state_path() -> Path:
+    """Return the default backup state location, under `$XDG_CACHE_HOME` or `~/.cache`."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+
+    return Path(cache_home) / "bookmark-backup" / BACKUP_STATE_FILENAME
+
+
+@dataclass
+class BackupRecord:
+    """The last backup of one browser profile to one destination."""
+
+    dest: str
+    browser: str
+    profile: str
+    mode: str
+    compress: str | None
+    ## (size, mtime_ns, inode) of the bookmarks file that was backed up
+    source_signature: tuple[int, int, int]
+    ## The file whose signature shows the backup is still in place: the copy itself,
+    #  or the store's manifest, which is only appended to until it is pruned
+    check_path: str
+    check_signature: tuple[int, int, int]
+    ## The snapshot recorded in store modes
+    snapshot: dict | None = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> BackupRecord:
+        data = dict(data)
+        data["source_signature"] = tuple(data["source_signature"])
+        data["check_signature"] = tuple(data["check_signature"])
+
+        return cls(**data)
+
+
+class BackupState:
+    """Last backup of each (destination, browser, profile), kept in a sqlite database.
+
+    Description:
+        Only a cache: a missing, unreadable or out of date record means the next
+        backup runs in full, so database errors are logged instead of raised.
+
+        Safe to share between threads. Each record is committed when it is written,
+        so concurrent processes see each other's backups.
+    """
+
+    def __init__(self, path: t.Union[str, Path, None] = None):
+        self.path: Path = Path(path).expanduser() if path else default_state_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        ## Losing the last few records in a crash only costs a full backup, so
+        #  commits are not synced to disk
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS backups (dest TEXT NOT NULL, browser TEXT NOT NULL, profile TEXT NOT NULL, record TEXT NOT NULL, PRIMARY KEY (dest, browser, profile))"
+        )
+
+    def __enter__(self) -> BackupState:
+        return self
+
+    def __exit__(self, exc_type, exc_val, traceback):
+        self.close()
+
+        return False
+
+    def get(self, dest: str, browser: str, profile: str) -> BackupRecord | None:
+        try:
+            with self._lock:
+                row: tuple[str] | None = self._conn.execute(
+                    "SELECT record FROM backups WHERE dest = ? AND browser = ? AND profile = ?",
+                    (dest, browser, profile),
+                ).fetchone()
+        except sqlite3.Error as exc:
+            log.warning(f"Could not read backup state from '{self.path}': {exc}")
+            return None
+
+        if row is None:
+            return None
+
+        try:
+            return BackupRecord.from_dict(json.loads(row[0]))
+        except (ValueError, TypeError, KeyError) as exc:
+            log.debug(f"Ignoring unreadable backup state for '{dest}': {exc}")
+            return None
+
+    def put(self, record: BackupRecord) -> None:
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO backups (dest, browser, profile, record) VALUES (?, ?, ?, ?)",
+                    (
+                        record.dest,
+                        record.browser,
+                        record.profile,
+                        json.dumps(record.to_dict(), separators=(",", ":")),
+                    ),
+                )
+        except sqlite3.Error as exc:
+            log.warning(f"Could not save backup state to '{self.path}': {exc}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_backup_state: BackupState | None = None
+_backup_state_failed: bool = False
+## The database `_backup_state` and `_backup_state_failed` refer to
+_backup_state_path: Path | None = None
+_backup_state_lock = threading.Lock()
+
+
+def get_backup_state() -> BackupState | None:
+    """Return the process-wide BackupState, opening the database on first use.
+
+    Description:
+        Opened again if `default_state_path()` changes, i.e. when a `serve` server
+        runs a command with another user's `XDG_CACHE_HOME`.
+
+    Returns:
+        (None): If the database cannot be opened, in which case every backup runs
+            in full.
+
+    """
+    global _backup_state, _backup_state_failed, _backup_state_path
+
+    path: Path = default_state_path()
+    with _backup_state_lock:
+        if path != _backup_state_path:
+            if _backup_state is not None:
+                _backup_state.close()
+            _backup_state, _backup_state_failed = None, False
+            _backup_state_path = path
+        if _backup_state is None and not _backup_state_failed:
+            try:
+                _backup_state = BackupState(path)
+            except (OSError, sqlite3.Error) as exc:
+                log.warning(
+                    f"Could not open backup state, backups will not be skipped: {exc}"
+                )
+                _backup_state_failed = True
+
+    return _backup_state
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import importlib.util
+import logging
+from pathlib import Path
+import shutil
+import typing as t
+
+log = logging.getLogger(__name__)
+
+## Stream files in 1MiB chunks when (de)compressing
+COMPRESSION_CHUNK_SIZE: int = 1024 * 1024
+
+## Leading bytes identifying each compressed format
+MAGIC_BYTES: dict[str, bytes] = {
+    "gzip": b"\x1f\x8b",
+    "bz2": b"BZh",
+    "lzma": b"\xfd7zXZ\x00",
+    "zstd": b"\x28\xb5\x2f\xfd",
+}
+
+FILE_EXTENSIONS: dict[str, str] = {
+    "gzip": ".gz",
+    "bz2": ".bz2",
+    "lzma": ".xz",
+    "zstd": ".zst",
+}
+
+
+def zstd_available() -> bool:
+    return importlib.util.find_spec("zstandard") is not None
+
+
+def supported_compression_formats() -> list[str]:
+    """Return the compression formats usable on this host.
+
+    Description:
+        gzip, bz2 and lzma come with the standard library. zstd is only offered
+        when the optional `zstandard` package is installed.
+    """
+    formats: list[str] = ["gzip", "bz2", "lzma"]
+    if zstd_available():
+        formats.append("zstd")
+
+    return formats
+
+
+def validate_compression(compress: str | None) -> str | None:
+    if compress is None:
+        return None
+
+    compress = compress.lower()
+    valid_formats = supported_compression_formats()
+
+    if compress not in valid_formats:
+        raise ValueError(
+            f"Unsupported compression format: {compress}. Must be one of {valid_formats}"
+        )
+
+    return compress
+
+
+def detect_compression(path: t.Union[str, Path]) -> str | None:
+    """Detect a file's compression format from its leading bytes.
+
+    Returns:
+        (str): The compression format, i.e. "gzip".
+        (None): If the file is not compressed.
+
+    """
+    with open(path, "rb") as f:
+        header: bytes = f.read(8)
+
+    for fmt, magic in MAGIC_BYTES.items():
+        if header.startswith(magic):
+            return fmt
+
+    return None
+
+
+def open_compressed_writer(path: t.Union[str, Path], compress: str) -> t.BinaryIO:
+    """Open `path` for writing, compressing everything written to it."""
+    ## Codec modules are imported on use to keep CLI startup fast
+    match compress:
+        case "gzip":
+            import gzip
+
+            return gzip.open(path, "wb")
+        case "bz2":
+            import bz2
+
+            return bz2.open(path, "wb")
+        case "lzma":
+            import lzma
+
+            return lzma.open(path, "wb")
+        case "zstd":
+            import zstandard
+
+            return zstandard.open(path, "wb")
+        case _:
+            raise ValueError(f"Unsupported compression format: {compress}")
+
+
+def compress_bytes(data: bytes, compress: str) -> bytes:
+    """Compress `data` in memory, in the same format `open_compressed_writer` writes."""
+    match compress:
+        case "gzip":
+            import gzip
+
+            return gzip.compress(data)
+        case "bz2":
+            import bz2
+
+            return bz2.compress(data)
+        case "lzma":
+            import lzma
+
+            return lzma.compress(data)
+        case "zstd":
+            import zstandard
+
+            return zstandard.ZstdCompressor().compress(data)
+        case _:
+            raise ValueError(f"Unsupported compression format: {compress}")
+
+
+def open_decompressed(path: t.Union[str, Path]) -> t.BinaryIO:
+    """Open `path` for reading, transparently decompressing it if needed."""
+    match detect_compression(path):
+        case "gzip":
+            import gzip
+
+            return gzip.open(path, "rb")
+        case "bz2":
+            import bz2
+
+            return bz2.open(path, "rb")
+        case "lzma":
+            import lzma
+
+            return lzma.open(path, "rb")
+        case "zstd":
+            if not zstd_available():
+                raise ValueError(
+                    f"File '{path}' is zstd-compressed, but the 'zstandard' package is not installed."
+                )
+
+            import zstandard
+
+            return zstandard.open(path, "rb")
+        case _:
+            return open(path, "rb")
+
+
+def compress_file(
+    src: t.Union[str, Path],
+    dest: t.Union[str, Path],
+    compress: str,
+    chunk_size: int = COMPRESSION_CHUNK_SIZE,
+) -> None:
+    """Stream `src` into `dest`, compressing it in `chunk_size` chunks."""
+    with open(src, "rb") as f_in, open_compressed_writer(dest, compress) as f_out:
+        shutil.copyfileobj(f_in, f_out, chunk_size)
+
+
+def decompress_file(
+    src: t.Union[str, Path],
+    dest: t.Union[str, Path],
+    chunk_size: int = COMPRESSION_CHUNK_SIZE,
+) -> None:
+    """Stream `src` into `dest`, decompressing it in `chunk_size` chunks if needed."""
+    with open_decompressed(src) as f_in, open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out, chunk_size)
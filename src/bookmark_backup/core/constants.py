@@ -1,5 +1,15 @@
 from __future__ import annotations
 
+## Default number of browser profiles backed up at the same time
+DEFAULT_MAX_WORKERS: int = 4
+## Default number of backups written to one destination at the same time
+DEFAULT_DEST_CONCURRENCY: int = 2
+## Overrides the socket path used by `serve` and by the CLI
+SOCKET_ENV: str = "BOOKMARK_BACKUP_SOCKET"
+## Set to 1 to never forward commands to a running `serve` server
+NO_DAEMON_ENV: str = "BOOKMARK_BACKUP_NO_DAEMON"
+
+
 def supported_browsers() -> list[str]:
     return ["chrome", "edge", "vivaldi"]
 
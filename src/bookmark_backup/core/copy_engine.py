@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import errno
+import logging
+import os
+from pathlib import Path
+import shutil
+import sys
+import threading
+import typing as t
+
+log = logging.getLogger(__name__)
+
+## Copy methods, fastest first
+COPY_METHODS: tuple[str, ...] = ("reflink", "copy_file_range", "sendfile", "buffered")
+## Copy methods tried when the caller needs to see the bytes being copied. A reflink
+#  copies nothing and copy_file_range() can be offloaded to the filesystem, so they
+#  are still worth a separate read afterwards; sendfile() is not, and is skipped for
+#  a buffered copy that passes each chunk to the caller
+OBSERVED_COPY_METHODS: tuple[str, ...] = ("reflink", "copy_file_range", "buffered")
+
+## ioctl request number for FICLONE, from <linux/fs.h>
+FICLONE: int = 0x40049409
+## Bytes copied per copy_file_range()/sendfile() call
+COPY_CHUNK_SIZE: int = 64 * 1024 * 1024
+## Bytes read per chunk by a buffered copy that passes its chunks to the caller
+BUFFERED_CHUNK_SIZE: int = 1024 * 1024
+
+## errno values meaning "this copy method is not supported here", as opposed to a
+#  real I/O error
+UNSUPPORTED_ERRNOS: frozenset[int] = frozenset(
+    {
+        errno.EXDEV,
+        errno.EINVAL,
+        errno.ENOSYS,
+        errno.ENOTTY,
+        errno.EOPNOTSUPP,
+        errno.EBADF,
+        getattr(errno, "ENOTSUP", errno.EOPNOTSUPP),
+    }
+)
+
+
+class CopyMethodUnsupported(Exception):
+    pass
+
+
+def _reflink(src_fd: int, dest_fd: int, size: int) -> None:
+    if not sys.platform.startswith("linux"):
+        raise CopyMethodUnsupported("reflink requires Linux")
+
+    import fcntl
+
+    fcntl.ioctl(dest_fd, FICLONE, src_fd)
+
+
+def _copy_file_range(src_fd: int, dest_fd: int, size: int) -> None:
+    if not hasattr(os, "copy_file_range"):
+        raise CopyMethodUnsupported("os.copy_file_range is not available")
+
+    copied: int = 0
+    while copied < size:
+        sent = os.copy_file_range(src_fd, dest_fd, min(COPY_CHUNK_SIZE, size - copied))
+        if sent == 0:
+            ## Some filesystems report success without copying anything
+            raise CopyMethodUnsupported(f"short copy ({copied}/{size} bytes)")
+        copied += sent
+
+
+def _sendfile(src_fd: int, dest_fd: int, size: int) -> None:
+    if not hasattr(os, "sendfile") or not sys.platform.startswith("linux"):
+        ## Only Linux supports sendfile() between regular files
+        raise CopyMethodUnsupported("file-to-file sendfile requires Linux")
+
+    copied: int = 0
+    while copied < size:
+        sent = os.sendfile(dest_fd, src_fd, copied, min(COPY_CHUNK_SIZE, size - copied))
+        if sent == 0:
+            ## Some filesystems report success without copying anything
+            raise CopyMethodUnsupported(f"short copy ({copied}/{size} bytes)")
+        copied += sent
+
+
+def _buffered(
+    src_fd: int,
+    dest_fd: int,
+    size: int,
+    on_chunk: t.Callable[[bytes], None] | None = None,
+) -> None:
+    with (
+        open(src_fd, "rb", closefd=False) as f_src,
+        open(dest_fd, "wb", closefd=False) as f_dest,
+    ):
+        if on_chunk is None:
+            shutil.copyfileobj(f_src, f_dest)
+            return
+
+        while chunk := f_src.read(BUFFERED_CHUNK_SIZE):
+            f_dest.write(chunk)
+            on_chunk(chunk)
+
+
+_COPY_FUNCS: dict[str, t.Callable[[int, int, int], None]] = {
+    "reflink": _reflink,
+    "copy_file_range": _copy_file_range,
+    "sendfile": _sendfile,
+    "buffered": _buffered,
+}
+
+
+class CopyEngine:
+    """Copies files with the fastest method the filesystems involved support.
+
+    Description:
+        Tries a reflink (`FICLONE`, instant and space-sharing on btrfs/XFS), then
+        `os.copy_file_range`, then `os.sendfile`, then a buffered userspace copy.
+        The first method that works for a (source device, destination device) pair
+        is cached, so later copies between the same filesystems skip the probing.
+    """
+
+    def __init__(self):
+        self._methods: dict[tuple[int, int], str] = {}
+        self._lock = threading.Lock()
+
+    def method_for(self, src_dev: int, dest_dev: int) -> str | None:
+        return self._methods.get((src_dev, dest_dev))
+
+    def copy(
+        self,
+        src: t.Union[str, Path],
+        dest: t.Union[str, Path],
+        on_chunk: t.Callable[[bytes], None] | None = None,
+    ) -> str:
+        """Copy `src` to `dest` with its metadata, like `shutil.copy2`.
+
+        Params:
+            on_chunk (Callable | None): Called with each chunk of `src` when it is
+                copied through userspace. Only a "buffered" copy calls it, a
+                reflink or copy_file_range() copy never reads the bytes in Python.
+
+        Returns:
+            (str): The copy method that was used.
+
+        """
+        src, dest = Path(src), Path(dest)
+        src_stat = os.stat(src)
+        dest_dev: int = os.stat(dest.parent).st_dev
+        key: tuple[int, int] = (src_stat.st_dev, dest_dev)
+
+        cached: str | None = self._methods.get(key)
+        methods = COPY_METHODS[COPY_METHODS.index(cached) :] if cached else COPY_METHODS
+        if on_chunk is not None:
+            methods = tuple(m for m in methods if m in OBSERVED_COPY_METHODS)
+
+        with open(src, "rb") as f_src, open(dest, "wb") as f_dest:
+            for method in methods:
+                try:
+                    if method == "buffered":
+                        _buffered(
+                            f_src.fileno(), f_dest.fileno(), src_stat.st_size, on_chunk
+                        )
+                    else:
+                        _COPY_FUNCS[method](
+                            f_src.fileno(), f_dest.fileno(), src_stat.st_size
+                        )
+                except CopyMethodUnsupported as exc:
+                    log.debug(f"Copy method '{method}' unavailable: {exc}")
+                except OSError as exc:
+                    if exc.errno not in UNSUPPORTED_ERRNOS:
+                        raise
+                    log.debug(f"Copy method '{method}' unsupported here: {exc}")
+                else:
+                    break
+
+                ## Discard anything a failed method wrote before trying the next
+                f_dest.seek(0)
+                f_dest.truncate()
+                f_src.seek(0)
+
+        shutil.copystat(src, dest)
+
+        ## A buffered copy chosen because sendfile() was skipped says nothing about
+        #  which method works between these filesystems
+        skipped: bool = on_chunk is not None and method == "buffered"
+        if cached != method and not skipped:
+            with self._lock:
+                self._methods[key] = method
+        log.info(f"Copied '{src}' to '{dest}' using {method}")
+
+        return method
+
+
+_copy_engine: CopyEngine | None = None
+
+
+def get_copy_engine() -> CopyEngine:
+    """Return the process-wide CopyEngine, so probed methods are shared."""
+    global _copy_engine
+
+    if _copy_engine is None:
+        _copy_engine = CopyEngine()
+
+    return _copy_engine
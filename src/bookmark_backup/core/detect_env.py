@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from functools import cache, cached_property
 import logging
 import os
 from pathlib import Path
@@ -8,6 +9,38 @@ import platform
 log = logging.getLogger(__name__)
 
 
+class Environment:
+    """Snapshot of the host environment.
+
+    Description:
+        Each property is probed the first time it is read and then cached, so
+        importing this module or creating the snapshot does no I/O. Use
+        `get_environment()` to share one snapshot across the process.
+    """
+
+    @cached_property
+    def os_type(self) -> str:
+        return os_type()
+
+    @cached_property
+    def os_release(self) -> dict:
+        return os_release()
+
+    @cached_property
+    def is_docker(self) -> bool:
+        return is_docker()
+
+    @cached_property
+    def is_wsl(self) -> bool:
+        return is_wsl()
+
+
+@cache
+def get_environment() -> Environment:
+    """Return the process-wide, lazily computed environment snapshot."""
+    return Environment()
+
+
 def os_type() -> str:
     """Detect environment's OS type.
 
@@ -102,7 +135,13 @@ def is_wsl() -> bool:
     return False
 
 
-def chrome_bookmarks_path(os_type: str = os_type(), os_release: str = os_release()):
+def chrome_bookmarks_path(os_type: str | None = None, os_release: str | None = None):
+    ## Detect the environment at call time, not when the module is imported
+    if os_type is None:
+        os_type = get_environment().os_type
+    if os_release is None:
+        os_release = get_environment().os_release
+
     match os_type:
         case "Windows":
             local_appdata = Path(os.getenv("LOCALAPPDATA"))
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+import logging
+import os
+from pathlib import Path
+import shutil
+import threading
+import typing as t
+
+log = logging.getLogger(__name__)
+
+from .metrics import timed
+
+## (size, mtime_ns, inode) of a file, None if it does not exist
+FileSignature = t.Optional[tuple[int, int, int]]
+## Files remembered by a SignatureCache before the oldest is dropped
+DEFAULT_SIGNATURE_CACHE_SIZE: int = 1024
+
+T = t.TypeVar("T")
+
+
+def file_signature(path: t.Union[str, Path]) -> FileSignature:
+    try:
+        st: os.stat_result = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+class SignatureCache(t.Generic[T]):
+    """Values computed from files' contents, kept while each file's signature is unchanged.
+
+    Description:
+        Browsers replace or rewrite the bookmarks file when it changes, which changes
+        its size, mtime or inode, so a value cached for a signature stays valid until
+        the file is written again. Take the signature before reading the file: if it
+        changes during the read, the cached value is never matched.
+
+        Safe to use from several threads. Holds at most `maxsize` files, dropping the
+        least recently stored.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_SIGNATURE_CACHE_SIZE):
+        self.maxsize: int = maxsize
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: dict[str, tuple[FileSignature, T]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, path: t.Union[str, Path], signature: FileSignature) -> T | None:
+        """Return the value stored for `path`, if it was stored at `signature`."""
+        if signature is None:
+            return None
+
+        with self._lock:
+            entry: tuple[FileSignature, T] | None = self._entries.get(str(path))
+            if entry is None or entry[0] != signature:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+
+            return entry[1]
+
+    def put(self, path: t.Union[str, Path], signature: FileSignature, value: T) -> None:
+        if signature is None:
+            return
+
+        with self._lock:
+            self._entries.pop(str(path), None)
+            self._entries[str(path)] = (signature, value)
+            while len(self._entries) > self.maxsize:
+                del self._entries[next(iter(self._entries))]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+def fsync_file(path: t.Union[str, Path]) -> None:
+    """Flush a file's contents to disk."""
+    with timed("fsync"), open(path, "r+b") as f:
+        os.fsync(f.fileno())
+
+
+def fsync_dir(path: t.Union[str, Path]) -> None:
+    """Flush a directory entry change (i.e. a rename) to disk.
+
+    Description:
+        Directories cannot be opened for fsync on Windows, where this is a no-op.
+    """
+    if os.name == "nt":
+        return
+
+    fd: int = os.open(path, os.O_RDONLY)
+    try:
+        with timed("fsync"):
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def file_lock(path: t.Union[str, Path]) -> t.Iterator[None]:
+    """Hold an exclusive lock on `path`, shared with other threads and processes.
+
+    Description:
+        Locks `.<name>.lock` next to `path` with `flock`, so `path` itself can be
+        replaced while the lock is held. Where `fcntl` is not available (Windows),
+        no lock is taken.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+
+    path = Path(path)
+    ## A separate open file per holder, so threads of one process exclude each other too
+    with open(path.with_name(f".{path.name}.lock"), "ab") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def link_or_copy(src: t.Union[str, Path], dest: t.Union[str, Path]) -> bool:
+    """Hard-link `src` to `dest`, copying it instead if the filesystem can't link.
+
+    Returns:
+        (True): If `dest` was hard-linked.
+        (False): If `src` was copied to `dest`.
+
+    """
+    try:
+        os.link(src, dest)
+
+        return True
+    except FileExistsError:
+        raise
+    except OSError as exc:
+        log.debug(f"Could not hard-link '{src}' to '{dest}', copying instead: {exc}")
+        shutil.copy2(src, dest)
+
+        return False
@@ -0,0 +1,137 @@
+"""Minimal Linux inotify binding over ctypes, for watching bookmarks directories."""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+from dataclasses import dataclass
+import errno
+import logging
+import os
+from pathlib import Path
+import struct
+import sys
+import typing as t
+
+log = logging.getLogger(__name__)
+
+## Event masks, from <sys/inotify.h>
+IN_MODIFY: int = 0x00000002
+IN_ATTRIB: int = 0x00000004
+IN_CLOSE_WRITE: int = 0x00000008
+IN_MOVED_FROM: int = 0x00000040
+IN_MOVED_TO: int = 0x00000080
+IN_CREATE: int = 0x00000100
+IN_DELETE: int = 0x00000200
+IN_DELETE_SELF: int = 0x00000400
+IN_MOVE_SELF: int = 0x00000800
+IN_Q_OVERFLOW: int = 0x00004000
+IN_IGNORED: int = 0x00008000
+IN_ONLYDIR: int = 0x01000000
+
+IN_NONBLOCK: int = os.O_NONBLOCK
+IN_CLOEXEC: int = 0o2000000
+
+## struct inotify_event { int wd; uint32_t mask, cookie, len; char name[]; }
+EVENT_HEADER = struct.Struct("iIII")
+## Enough for many events per read() without risking EINVAL
+READ_SIZE: int = 64 * 1024
+
+_libc: ctypes.CDLL | None = None
+
+
+@dataclass(slots=True)
+class InotifyEvent:
+    wd: int
+    mask: int
+    cookie: int
+    name: str
+
+
+def _load_libc() -> ctypes.CDLL | None:
+    global _libc
+
+    if _libc is None and sys.platform.startswith("linux"):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+            ## Raises AttributeError if this libc has no inotify
+            libc.inotify_init1
+            libc.inotify_add_watch.argtypes = [
+                ctypes.c_int,
+                ctypes.c_char_p,
+                ctypes.c_uint32,
+            ]
+            libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+            _libc = libc
+        except (OSError, AttributeError) as exc:
+            log.debug(f"inotify is not available: {exc}")
+
+    return _libc
+
+
+def inotify_available() -> bool:
+    return _load_libc() is not None
+
+
+class Inotify:
+    """A non-blocking inotify instance.
+
+    Description:
+        `fileno()` becomes readable when events are queued, so it can be waited on
+        with `select` or an asyncio event loop's `add_reader()` at no CPU cost.
+    """
+
+    def __init__(self):
+        libc = _load_libc()
+        if libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+
+        self._libc = libc
+        self._fd: int = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            err: int = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def add_watch(self, path: t.Union[str, Path], mask: int) -> int:
+        """Watch `path` for the events in `mask`, returning the watch descriptor."""
+        wd: int = self._libc.inotify_add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            err: int = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch '{path}' failed: {os.strerror(err)}")
+
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        self._libc.inotify_rm_watch(self._fd, wd)
+
+    def read_events(self) -> list[InotifyEvent]:
+        """Return the queued events, or [] if there are none."""
+        try:
+            data: bytes = os.read(self._fd, READ_SIZE)
+        except BlockingIOError:
+            return []
+
+        events: list[InotifyEvent] = []
+        offset: int = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name: str = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            events.append(InotifyEvent(wd=wd, mask=mask, cookie=cookie, name=name))
+
+        return events
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self) -> Inotify:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
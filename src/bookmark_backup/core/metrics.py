@@ -0,0 +1,192 @@
+"""Per-phase timers and byte counters for backups and restores.
+
+Code marks its phases with `timed("copy")` and its events with `count(...)`. Both
+do nothing unless a recorder is active, so the instrumentation can stay in the hot
+paths. Wrap a run in `collect()` to record it:
+
+    with collect() as metrics:
+        bookmarks.backup_bookmarks_file(dest)
+    print(metrics.report())
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+import threading
+import time
+import typing as t
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class PhaseStats:
+    calls: int = 0
+    seconds: float = 0.0
+    bytes: int = 0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes / 1e6 / self.seconds if self.bytes and self.seconds else 0.0
+
+
+class Phase:
+    """An open `timed()` block. Set `bytes` to record how much data it moved."""
+
+    __slots__ = ("bytes",)
+
+    def __init__(self, nbytes: int = 0):
+        self.bytes: int = nbytes
+
+
+class Metrics:
+    """Time spent and bytes moved per phase, plus event counters, for one run.
+
+    Description:
+        Safe to update from worker threads. Phases that run concurrently (i.e. in
+        `backup-all`) each add their own time, so phase totals can add up to more
+        than the wall time.
+    """
+
+    def __init__(self):
+        self.phases: dict[str, PhaseStats] = {}
+        self.counters: dict[str, int] = {}
+        self.started: float = time.perf_counter()
+        self.finished: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def wall_seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def add(self, name: str, seconds: float, nbytes: int = 0) -> None:
+        with self._lock:
+            stats: PhaseStats | None = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = PhaseStats()
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.bytes += nbytes
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "wall_seconds": round(self.wall_seconds, 6),
+                "phases": {
+                    name: {
+                        "calls": stats.calls,
+                        "seconds": round(stats.seconds, 6),
+                        "bytes": stats.bytes,
+                    }
+                    for name, stats in self.phases.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+    def report(self) -> str:
+        """Return a table of the phases, slowest first."""
+        wall: float = self.wall_seconds
+        lines: list[str] = [
+            f"{'phase':<18} {'calls':>6} {'ms':>10} {'% wall':>7} {'MB':>9} {'MB/s':>9}"
+        ]
+        with self._lock:
+            phases = sorted(self.phases.items(), key=lambda item: -item[1].seconds)
+            counters = sorted(self.counters.items())
+        for name, stats in phases:
+            share: float = stats.seconds / wall * 100 if wall else 0.0
+            mb: str = f"{stats.bytes / 1e6:9.2f}" if stats.bytes else f"{'-':>9}"
+            rate: str = (
+                f"{stats.mb_per_second:9.1f}" if stats.mb_per_second else f"{'-':>9}"
+            )
+            lines.append(
+                f"{name:<18} {stats.calls:>6} {stats.seconds * 1000:>10.2f} {share:>6.1f}% {mb} {rate}"
+            )
+        lines.append(f"{'total (wall)':<18} {'':>6} {wall * 1000:>10.2f}")
+        for name, value in counters:
+            lines.append(f"{name:<18} {value:>6}")
+
+        return "\n".join(lines)
+
+    def write_json(self, path: t.Union[str, Path], **extra) -> None:
+        """Write the metrics, plus `extra` top-level fields, as JSON.
+
+        Description:
+            The file is replaced atomically, so a scraper never reads a partial file.
+            A path of "-" writes to stdout.
+        """
+        data: str = json.dumps({**extra, **self.to_dict()}, indent=2)
+        if str(path) == "-":
+            print(data)
+            return
+
+        path = Path(path).expanduser()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.tmp-")
+        try:
+            with os.fdopen(fd, "w") as tmp:
+                tmp.write(data + "\n")
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+
+## The recorder `timed()` and `count()` report to, None while not collecting
+_active: Metrics | None = None
+
+
+def active() -> Metrics | None:
+    return _active
+
+
+@contextmanager
+def collect() -> t.Iterator[Metrics]:
+    """Record the phases run inside the block, on every thread, into a new Metrics."""
+    global _active
+
+    previous: Metrics | None = _active
+    metrics = Metrics()
+    _active = metrics
+    try:
+        yield metrics
+    finally:
+        metrics.finished = time.perf_counter()
+        _active = previous
+
+
+@contextmanager
+def timed(name: str, nbytes: int = 0) -> t.Iterator[Phase]:
+    """Time the block as phase `name`, if metrics are being collected.
+
+    Params:
+        nbytes (int): Bytes the phase moves, if known up front. Otherwise set
+            `bytes` on the yielded Phase.
+    """
+    metrics: Metrics | None = _active
+    phase = Phase(nbytes)
+    if metrics is None:
+        yield phase
+        return
+
+    start: float = time.perf_counter()
+    try:
+        yield phase
+    finally:
+        metrics.add(name, time.perf_counter() - start, phase.bytes)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add `n` to counter `name`, if metrics are being collected."""
+    metrics: Metrics | None = _active
+    if metrics is not None:
+        metrics.count(name, n)
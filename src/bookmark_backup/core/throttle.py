@@ -0,0 +1,76 @@
+"""Concurrency and bandwidth limits for asyncio backup writes."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+import logging
+import time
+import typing as t
+
+log = logging.getLogger(__name__)
+
+from bookmark_backup.core.constants import DEFAULT_DEST_CONCURRENCY
+
+class RateLimiter:
+    """Token bucket limiting how many bytes per second pass through it.
+
+    Description:
+        Up to `burst` bytes (one second's worth by default) can pass at once, then
+        callers wait for the bucket to refill. A request larger than the bucket is
+        let through once the bucket is full, so it is never starved.
+    """
+
+    def __init__(self, bytes_per_second: float, burst: float | None = None):
+        if bytes_per_second <= 0:
+            raise ValueError(f"bytes_per_second must be > 0, got {bytes_per_second}")
+
+        self.rate: float = float(bytes_per_second)
+        self.burst: float = float(burst or bytes_per_second)
+        self._tokens: float = self.burst
+        self._updated: float = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now: float = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, nbytes: int) -> None:
+        """Wait until `nbytes` may pass."""
+        needed: float = min(float(nbytes), self.burst)
+        ## Callers are served in order, so one large write cannot be overtaken forever
+        async with self._lock:
+            self._refill()
+            while self._tokens < needed:
+                await asyncio.sleep((needed - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= nbytes
+
+
+class DestinationLimiter:
+    """Limits on the backups written to one destination.
+
+    Params:
+        concurrency (int): Maximum number of writes in flight at the same time.
+        bytes_per_second (float | None): Maximum write rate, unlimited if None.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_DEST_CONCURRENCY,
+        bytes_per_second: float | None = None,
+    ):
+        self.concurrency: int = max(1, concurrency)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.rate: RateLimiter | None = (
+            RateLimiter(bytes_per_second) if bytes_per_second else None
+        )
+
+    @asynccontextmanager
+    async def slot(self, nbytes: int = 0) -> t.AsyncIterator[None]:
+        """Hold one of the destination's write slots, after paying for `nbytes`."""
+        async with self._semaphore:
+            if self.rate is not None and nbytes:
+                await self.rate.acquire(nbytes)
+            yield
@@ -1,42 +1,82 @@
 from __future__ import annotations
 
-from contextlib import contextmanager
+import asyncio
+from contextlib import contextmanager, nullcontext
 from dataclasses import dataclass, field
+from functools import cached_property
 import logging
+import os
 from pathlib import Path
 import shutil
+import tempfile
+import threading
 import typing as t
 
 log: logging.Logger = logging.getLogger(__name__)
 
 from bookmark_backup import finder
-from bookmark_backup.core import detect_env
+from bookmark_backup.core import compression, detect_env, fileio
+from bookmark_backup.core.backup_state import BackupRecord, get_backup_state
+from bookmark_backup.core.copy_engine import CopyEngine, get_copy_engine
+from bookmark_backup.core.fileio import FileSignature
+from bookmark_backup.core.metrics import count, timed
+from bookmark_backup.core.throttle import DestinationLimiter
 from bookmark_backup.core.validators import validate_browser, validate_os_type
+from bookmark_backup.domain.checksum import (
+    CHECKSUM_CACHE,
+    ChecksumResult,
+    ChecksumVerifier,
+    copy_verified,
+    repair_checksum,
+    verify_file,
+)
+from bookmark_backup.domain.export import export_bookmarks
+from bookmark_backup.storage import is_remote_url, split_object_url
+from bookmark_backup.store import BackupStore, Snapshot
 
 @dataclass
 class BookmarksFile:
     browser: str = field(init=False)
+    profile: str = "Default"
+    ## Shared by default, so the copy method probed for a filesystem is reused
+    copy_engine: CopyEngine = field(
+        default_factory=get_copy_engine, repr=False, compare=False
+    )
 
     def __post_init__(self):
-        self.os_type: str = validate_os_type(os_type=detect_env.os_type())
-        self.browser: str = validate_browser(browser=self.browser)
-        self.bookmarks_file: str = finder.get_browser_bookmarks_filepath(
-            os_type=self.os_type, browser=self.browser
-        ).title()
+        with timed("detect_os"):
+            self.os_type: str = validate_os_type(
+                os_type=detect_env.get_environment().os_type
+            )
+            self.browser: str = validate_browser(browser=self.browser)
+        with timed("resolve_path"):
+            self.bookmarks_file: str = finder.get_browser_bookmarks_filepath(
+                os_type=self.os_type, browser=self.browser, profile=self.profile
+            )
+
+    @cached_property
+    def bookmarks_path(self) -> Path:
+        """The bookmarks file as an expanded Path, built once instead of on every use."""
+        return Path(self.bookmarks_file).expanduser()
 
     @property
     def bookmarks_file_exists(self) -> bool:
         if self.bookmarks_file is None:
             return False
 
-        _path = Path(self.bookmarks_file)
-        if "~" in str(_path):
-            _path: Path = _path.expanduser()
+        count("exists_checks")
 
-        return _path.exists()
+        return self.bookmarks_path.exists()
 
     @contextmanager
-    def _safe_copy(self, dest: t.Union[str, Path], overwrite: bool = False):
+    def _safe_copy(
+        self,
+        dest: t.Union[str, Path],
+        overwrite: bool = False,
+        compress: str | None = None,
+        verify: bool = False,
+        signature: FileSignature = None,
+    ):
         if self.bookmarks_file is None:
             raise ValueError("bookmarks_file should not be None.")
         if not self.bookmarks_file_exists:
@@ -44,7 +84,7 @@ class BookmarksFile:
                 f"Could not find bookmarks file: {self.bookmarks_file}"
             )
 
-        src_path = Path(self.bookmarks_file)
+        src_path = self.bookmarks_path
         dest_path = Path(str(dest))
         if "~" in str(dest_path):
             dest_path = dest_path.expanduser()
@@ -62,7 +102,7 @@ class BookmarksFile:
 
         if not dest_path.parent.exists():
             try:
-                dest_path.mkdir(parents=True, exist_ok=True)
+                dest_path.parent.mkdir(parents=True, exist_ok=True)
             except FileNotFoundError as fnf:
                 log.warning(f"Could not find file '{dest_path}'.")
                 yield
@@ -81,9 +121,49 @@ class BookmarksFile:
 
         log.info(f"Copying file '{src_path}' to destination '{dest_path}'")
         try:
-            shutil.copy2(src_path, dest_path)
-
-            yield
+            if signature is None:
+                signature = fileio.file_signature(src_path)
+            ## A file this process already checked is not read again just to verify it
+            checksum: ChecksumResult | None = (
+                CHECKSUM_CACHE.get(src_path, signature) if verify else None
+            )
+            with timed("copy", nbytes=src_path.stat().st_size):
+                if compress and verify and checksum is None:
+                    ## Compressing reads the file in userspace anyway, so check the
+                    #  checksum on the bytes being compressed
+                    with (
+                        open(src_path, "rb") as src_f,
+                        compression.open_compressed_writer(
+                            dest_path, compress
+                        ) as dest_f,
+                    ):
+                        checksum = copy_verified(src_f, dest_f)
+                    shutil.copystat(src_path, dest_path)
+                elif compress:
+                    ## Stream through the compressor in chunks, never holding the whole file
+                    compression.compress_file(src_path, dest_path, compress=compress)
+                    shutil.copystat(src_path, dest_path)
+                else:
+                    ## A buffered copy checks the checksum on the bytes it copies
+                    verifier: ChecksumVerifier | None = (
+                        ChecksumVerifier() if verify and checksum is None else None
+                    )
+                    method: str = self.copy_engine.copy(
+                        src_path,
+                        dest_path,
+                        on_chunk=verifier.feed if verifier else None,
+                    )
+                    if verifier is not None and method == "buffered":
+                        checksum = verifier.close()
+            if verify and checksum is None:
+                ## A reflink or copy_file_range() copy never passes the bytes through
+                #  Python, so check the copy with a separate read
+                with timed("verify"):
+                    checksum = verify_file(dest_path)
+            if verify and fileio.file_signature(src_path) == signature:
+                CHECKSUM_CACHE.put(src_path, signature, checksum)
+
+            yield checksum
         except PermissionError as perm_exc:
             log.error(
                 f"Permission denied copying file '{src_path}' to destination '{dest_path}'. Details: {perm_exc}"
@@ -96,22 +176,117 @@ class BookmarksFile:
             raise
 
     def backup_bookmarks_file(
-        self, backup_dest: t.Union[str, Path], overwrite: bool = False
-    ):
+        self,
+        backup_dest: t.Union[str, Path],
+        overwrite: bool = False,
+        mode: str = "copy",
+        compress: str | None = None,
+        verify: bool = True,
+        skip_unchanged: bool = True,
+    ) -> t.Union[bool, Snapshot]:
+        """Back up the browser's bookmarks file.
+
+        Params:
+            backup_dest (str | Path): Destination file path, or the root of a
+                backup store when `mode="store"`. Either can be a storage URL, i.e.
+                `s3://bucket/backups`, see `bookmark_backup.storage.open_backend()`.
+            overwrite (bool): Overwrite an existing destination file (copy mode only).
+            mode (str): "copy" to copy the file to `backup_dest`, "store" to add a
+                snapshot to the content-addressed store at `backup_dest`, "incremental"
+                to add a snapshot holding only the bookmarks changed since the last one.
+            compress (str | None): Compress the backup with this format, i.e. "gzip".
+            verify (bool): Check the file's Chromium checksum while it is read for
+                the backup, and warn if it does not match.
+            skip_unchanged (bool): Return the last backup to `backup_dest` instead
+                of backing up again if the file has not changed since, see
+                `unchanged_backup()`.
+
+        Returns:
+            (True): If the file was copied, or its copy is up to date.
+            (Snapshot): The snapshot recorded in the backup store.
+
+        """
         if backup_dest is None:
             raise ValueError(f"Must pass a destination path as backup_dest.")
 
+        if is_remote_url(backup_dest):
+            return self._backup_remote(
+                str(backup_dest),
+                overwrite=overwrite,
+                mode=mode,
+                compress=compress,
+                verify=verify,
+            )
+
         backup_dest = (
             Path(str(backup_dest)).expanduser()
             if "~" in str(backup_dest)
             else Path(str(backup_dest))
         )
 
+        compress = compression.validate_compression(compress)
+
+        if skip_unchanged:
+            previous: t.Union[bool, Snapshot, None] = self.unchanged_backup(
+                backup_dest, mode=mode, compress=compress
+            )
+            if previous is not None:
+                return previous
+        ## Taken before the file is read, so a change made during the backup is
+        #  backed up by the next one
+        signature: FileSignature = fileio.file_signature(self.bookmarks_path)
+
+        if mode in ("store", "incremental"):
+            if not self.bookmarks_file_exists:
+                raise FileNotFoundError(
+                    f"Could not find bookmarks file: {self.bookmarks_file}"
+                )
+
+            store = BackupStore(backup_dest, compress=compress)
+            add_snapshot = store.add_file if mode == "store" else store.add_incremental
+            ## A file this process already checked is not read again just to verify it
+            checksum: ChecksumResult | None = (
+                CHECKSUM_CACHE.get(self.bookmarks_path, signature) if verify else None
+            )
+            verifier: ChecksumVerifier | None = (
+                ChecksumVerifier() if verify and checksum is None else None
+            )
+            snapshot: Snapshot = add_snapshot(
+                src=self.bookmarks_path,
+                browser=self.browser,
+                profile=self.profile,
+                on_chunk=verifier.feed if verifier else None,
+            )
+            if verifier is not None:
+                checksum = verifier.close()
+                CHECKSUM_CACHE.put(self.bookmarks_path, signature, checksum)
+            if checksum is not None:
+                self._warn_checksum(checksum)
+            log.info(
+                f"Saved bookmarks file '{self.bookmarks_file}' to store '{backup_dest}' as snapshot {snapshot.id}."
+            )
+            self._record_backup(backup_dest, mode, compress, signature, snapshot)
+
+            return snapshot
+        elif mode != "copy":
+            raise ValueError(
+                f"Invalid backup mode: {mode}. Must be one of ['copy', 'store', 'incremental']"
+            )
+
         try:
-            with self._safe_copy(dest=backup_dest, overwrite=overwrite):
+            with self._safe_copy(
+                dest=backup_dest,
+                overwrite=overwrite,
+                compress=compress,
+                verify=verify,
+                signature=signature,
+            ) as checksum:
+                if checksum is not None:
+                    self._warn_checksum(checksum)
                 log.info(
                     f"Successfully copied bookmarks file '{self.bookmarks_file}' to destination path '{backup_dest}'."
                 )
+            self._record_backup(backup_dest, mode, compress, signature)
 
             return True
         except PermissionError as perm_err:
@@ -125,61 +300,573 @@ class BookmarksFile:
 
             raise exc
 
-    def restore_bookmarks_file(self, backup_src: str):
+    def _state_dest(self, backup_dest: t.Union[str, Path]) -> str:
+        """Return the absolute destination path the backup state is keyed by."""
+        return os.path.abspath(Path(str(backup_dest)).expanduser())
+
+    def unchanged_backup(
+        self,
+        backup_dest: t.Union[str, Path],
+        mode: str = "copy",
+        compress: str | None = None,
+    ) -> t.Union[bool, Snapshot, None]:
+        """Return the last backup to `backup_dest` if the bookmarks file has not changed since.
+
+        Description:
+            The file's (size, mtime, inode) is compared with the one recorded by the
+            last backup of this profile to `backup_dest` with the same mode and
+            compression. The backup must also still be in place: the copy is
+            unchanged, or the store's manifest has only been appended to and the
+            snapshot's blob exists. Costs a few `stat` calls, the file is not read.
+
+            Backups to storage URLs are never skipped, the remote store may have
+            changed without this host noticing.
+
+        Returns:
+            (True): If the copy at `backup_dest` is up to date.
+            (Snapshot): The up to date snapshot in the store at `backup_dest`.
+            (None): If the file should be backed up.
+
+        """
+        if is_remote_url(backup_dest):
+            return None
+        state = get_backup_state()
+        if state is None:
+            return None
+
+        dest: str = self._state_dest(backup_dest)
+        record: BackupRecord | None = state.get(dest, self.browser, self.profile)
+        if (
+            record is None
+            or record.mode != mode
+            or record.compress != compression.validate_compression(compress)
+            or fileio.file_signature(self.bookmarks_path) != record.source_signature
+        ):
+            return None
+
+        check: FileSignature = fileio.file_signature(record.check_path)
+        if check is None:
+            return None
+        if mode == "copy":
+            if check != record.check_signature:
+                return None
+            previous: t.Union[bool, Snapshot] = True
+        else:
+            size, _, ino = record.check_signature
+            ## Appends by later backups are fine, a prune replaces the manifest
+            if check[2] != ino or check[0] < size or record.snapshot is None:
+                return None
+            previous = Snapshot.from_dict(record.snapshot)
+            if not BackupStore(dest).has_blob(previous.hash):
+                return None
+
+        count("skipped_unchanged")
+        log.info(
+            f"Bookmarks file '{self.bookmarks_file}' is unchanged since its last backup to '{dest}', skipping backup."
+        )
+
+        return previous
+
+    def _record_backup(
+        self,
+        backup_dest: t.Union[str, Path],
+        mode: str,
+        compress: str | None,
+        signature: FileSignature,
+        snapshot: Snapshot | None = None,
+    ) -> None:
+        """Record a finished backup, so `unchanged_backup()` can skip the next one."""
+        state = get_backup_state()
+        if state is None or signature is None:
+            return
+
+        dest: str = self._state_dest(backup_dest)
+        check_path: str = (
+            dest if mode == "copy" else str(BackupStore(dest).manifest_path)
+        )
+        check: FileSignature = fileio.file_signature(check_path)
+        if check is None:
+            return
+
+        state.put(
+            BackupRecord(
+                dest=dest,
+                browser=self.browser,
+                profile=self.profile,
+                mode=mode,
+                compress=compress,
+                source_signature=signature,
+                check_path=check_path,
+                check_signature=check,
+                snapshot=snapshot.to_dict() if snapshot is not None else None,
+            )
+        )
+
+    def _backup_remote(
+        self,
+        backup_dest: str,
+        overwrite: bool = False,
+        mode: str = "copy",
+        compress: str | None = None,
+        verify: bool = True,
+    ) -> t.Union[bool, Snapshot]:
+        """Back up the bookmarks file to a storage URL.
+
+        Description:
+            Store modes add the snapshot to the local copy of the remote store, then
+            push it, uploading only the blobs the remote store does not have. Copy
+            mode uploads the (checked and compressed) file as a single object.
+        """
+        from bookmark_backup.storage import RemoteStore, open_backend
+
+        compress = compression.validate_compression(compress)
+        if not self.bookmarks_file_exists:
+            raise FileNotFoundError(
+                f"Could not find bookmarks file: {self.bookmarks_file}"
+            )
+
+        if mode in ("store", "incremental"):
+            with RemoteStore(backup_dest, compress=compress) as remote:
+                ## An incremental snapshot is built on the blobs of the last one
+                remote.pull(
+                    snapshot_ids=[] if mode == "store" else None,
+                    latest_of=(self.browser, self.profile)
+                    if mode == "incremental"
+                    else None,
+                )
+                snapshot: Snapshot = self.backup_bookmarks_file(
+                    remote.store.root,
+                    mode=mode,
+                    compress=compress,
+                    verify=verify,
+                    skip_unchanged=False,
+                )
+                remote.push()
+
+            return snapshot
+        elif mode != "copy":
+            raise ValueError(
+                f"Invalid backup mode: {mode}. Must be one of ['copy', 'store', 'incremental']"
+            )
+
+        container, name = split_object_url(backup_dest)
+        signature: FileSignature = fileio.file_signature(self.bookmarks_path)
+        with timed("prepare", nbytes=self.bookmarks_path.stat().st_size):
+            payload, checksum = self._prepare_backup(compress, verify, signature)
+        try:
+            with open_backend(container) as backend:
+                if not overwrite and backend.exists(name):
+                    raise FileExistsError(
+                        f"File '{backup_dest}' already exists. Skipping file copy."
+                    )
+                with timed("upload", nbytes=payload.stat().st_size):
+                    backend.put_file(name, payload)
+        finally:
+            if payload != self.bookmarks_path:
+                payload.unlink(missing_ok=True)
+
+        if checksum is not None:
+            self._warn_checksum(checksum)
+        log.info(
+            f"Successfully uploaded bookmarks file '{self.bookmarks_file}' to '{backup_dest}'."
+        )
+
+        return True
+
+    async def abackup(
+        self,
+        backup_dest: t.Union[str, Path],
+        overwrite: bool = False,
+        mode: str = "copy",
+        compress: str | None = None,
+        verify: bool = True,
+        limiter: DestinationLimiter | None = None,
+        skip_unchanged: bool = True,
+    ) -> t.Union[bool, Snapshot]:
+        """Back up the browser's bookmarks file without blocking the event loop.
+
+        Description:
+            Takes the same arguments as `backup_bookmarks_file()`. In copy mode the
+            file is checked and compressed (to a local temporary file) in a worker
+            thread first, and only the write to `backup_dest` waits for a slot from
+            `limiter`, paying the rate limit for the prepared file's size, so a slow
+            destination does not hold up preparing other backups. Store modes run
+            `backup_bookmarks_file()` in a worker thread while holding a slot,
+            paying the rate limit for the file's size.
+
+            If the task is cancelled, a backup that is still being written is
+            discarded instead of replacing `backup_dest`. Backups to a storage URL
+            run `backup_bookmarks_file()` in a worker thread, like store modes.
+            A backup skipped by `skip_unchanged` does not wait for a slot.
+
+        Params:
+            limiter (DestinationLimiter | None): Concurrency and rate limits of the
+                destination. Unlimited if None.
+
+        """
+        if backup_dest is None:
+            raise ValueError(f"Must pass a destination path as backup_dest.")
+        compress = compression.validate_compression(compress)
+        ## Checked before waiting for the destination, a skipped backup writes nothing
+        if skip_unchanged:
+            previous: t.Union[bool, Snapshot, None] = await asyncio.to_thread(
+                self.unchanged_backup, backup_dest, mode, compress
+            )
+            if previous is not None:
+                return previous
+
+        if mode != "copy" or is_remote_url(backup_dest):
+            nbytes: int = (
+                self.bookmarks_path.stat().st_size
+                if limiter is not None and self.bookmarks_file_exists
+                else 0
+            )
+            async with limiter.slot(nbytes) if limiter else nullcontext():
+                return await asyncio.to_thread(
+                    self.backup_bookmarks_file,
+                    backup_dest,
+                    overwrite=overwrite,
+                    mode=mode,
+                    compress=compress,
+                    verify=verify,
+                    skip_unchanged=False,
+                )
+
+        if not self.bookmarks_file_exists:
+            raise FileNotFoundError(
+                f"Could not find bookmarks file: {self.bookmarks_file}"
+            )
+
+        src_path = self.bookmarks_path
+        dest_path = Path(str(backup_dest)).expanduser()
+        signature: FileSignature = fileio.file_signature(src_path)
+
+        with timed("prepare", nbytes=src_path.stat().st_size):
+            payload, checksum = await asyncio.to_thread(
+                self._prepare_backup, compress, verify, signature
+            )
+
+        cancelled = threading.Event()
+        try:
+            nbytes: int = payload.stat().st_size
+            async with limiter.slot(nbytes) if limiter else nullcontext():
+                with timed("write", nbytes=nbytes):
+                    await asyncio.to_thread(
+                        self._write_backup,
+                        payload,
+                        dest_path,
+                        overwrite,
+                        cancelled,
+                    )
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        finally:
+            if payload != src_path:
+                payload.unlink(missing_ok=True)
+
+        if checksum is not None:
+            self._warn_checksum(checksum)
+        log.info(
+            f"Successfully copied bookmarks file '{self.bookmarks_file}' to destination path '{dest_path}'."
+        )
+        await asyncio.to_thread(
+            self._record_backup, dest_path, mode, compress, signature
+        )
+
+        return True
+
+    def _prepare_backup(
+        self, compress: str | None, verify: bool, signature: FileSignature
+    ) -> tuple[Path, ChecksumResult | None]:
+        """Check the checksum of, and compress, the bookmarks file.
+
+        Description:
+            Streams the file in chunks, never holding it in memory. A compressed
+            backup is written to a local temporary file, checked on the bytes being
+            compressed; the caller removes it. An uncompressed backup is the bookmarks
+            file itself, checked with a read unless `CHECKSUM_CACHE` has its result.
+
+        Returns:
+            (tuple[Path, ChecksumResult | None]): The file to write to the destination,
+                and the checksum result if `verify` is set.
+
+        """
+        src_path: Path = self.bookmarks_path
+        checksum: ChecksumResult | None = (
+            CHECKSUM_CACHE.get(src_path, signature) if verify else None
+        )
+        payload: Path = src_path
+        if compress:
+            fd, tmp_name = tempfile.mkstemp(prefix=f".{src_path.name}.", suffix=".tmp")
+            os.close(fd)
+            payload = Path(tmp_name)
+            try:
+                if verify and checksum is None:
+                    with (
+                        open(src_path, "rb") as src_f,
+                        compression.open_compressed_writer(payload, compress) as dest_f,
+                    ):
+                        checksum = copy_verified(src_f, dest_f)
+                else:
+                    compression.compress_file(src_path, payload, compress=compress)
+                shutil.copystat(src_path, payload)
+            except BaseException:
+                payload.unlink(missing_ok=True)
+                raise
+        elif verify and checksum is None:
+            checksum = verify_file(src_path)
+
+        if verify and fileio.file_signature(src_path) == signature:
+            CHECKSUM_CACHE.put(src_path, signature, checksum)
+
+        return payload, checksum
+
+    def _write_backup(
+        self,
+        payload: Path,
+        dest_path: Path,
+        overwrite: bool,
+        cancelled: threading.Event,
+    ) -> None:
+        """Copy a prepared backup to a temporary file, then move it into place."""
+        if dest_path.exists() and not overwrite:
+            raise FileExistsError(
+                f"File '{dest_path}' already exists. Skipping file copy."
+            )
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+
+        fd, tmp_name = tempfile.mkstemp(
+            dir=dest_path.parent, prefix=f".{dest_path.name}.tmp-"
+        )
+        os.close(fd)
+        try:
+            self.copy_engine.copy(payload, tmp_name)
+            if cancelled.is_set():
+                raise asyncio.CancelledError()
+            os.replace(tmp_name, dest_path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    def _warn_checksum(self, checksum: ChecksumResult) -> None:
+        if checksum.error:
+            print(
+                f"[WARNING] [{self.browser}] bookmarks file '{self.bookmarks_file}' could not be parsed, the backup may not restore. Details: {checksum.error}"
+            )
+        elif not checksum.valid:
+            print(
+                f"[WARNING] [{self.browser}] bookmarks file '{self.bookmarks_file}' has checksum {checksum.expected!r}, expected {checksum.actual!r}. It will be repaired on restore."
+            )
+
+    def export_bookmarks_file(
+        self,
+        dest: t.Union[str, Path],
+        fmt: str | None = None,
+        overwrite: bool = False,
+        include_folders: bool = False,
+    ) -> int:
+        """Export the browser's bookmarks to HTML, CSV, NDJSON or Parquet.
+
+        Params:
+            dest (str | Path): The file to write.
+            fmt (str | None): The export format, guessed from `dest` if not given.
+            overwrite (bool): Replace `dest` if it exists.
+            include_folders (bool): Also write a row per folder (not for HTML).
+
+        Returns:
+            (int): The number of rows written.
+
+        """
+        if not self.bookmarks_file_exists:
+            raise FileNotFoundError(
+                f"Could not find [{self.browser}] bookmarks file: {self.bookmarks_file}"
+            )
+
+        dest = Path(str(dest)).expanduser()
+        if dest.exists() and not overwrite:
+            raise FileExistsError(f"Export destination already exists: {dest}")
+
+        return export_bookmarks(
+            self.bookmarks_path,
+            dest,
+            fmt=fmt,
+            include_folders=include_folders,
+        )
+
+    def _keep_previous_version(self, store: BackupStore | None = None) -> None:
+        """Preserve the live bookmarks file before a restore replaces it.
+
+        Description:
+            The live file is hard-linked to `<bookmarks_file>.bak`. When restoring from
+            a backup store, it is also recorded there as a snapshot. The blob is a
+            reflink or a copy, never a hard link, so editing the `.bak` file cannot
+            change the snapshots stored under it.
+        """
+        live_path = self.bookmarks_path
+        bak_path = Path(f"{self.bookmarks_file}.bak")
+
+        print(f"Backing up existing [{self.browser}] bookmarks to .bak file.")
+        bak_path.unlink(missing_ok=True)
+        fileio.link_or_copy(live_path, bak_path)
+
+        if store is not None:
+            snapshot: Snapshot = store.add_file(
+                src=live_path, browser=self.browser, profile=self.profile
+            )
+            print(
+                f"Saved previous [{self.browser}] bookmarks to store {store.root} as snapshot: {snapshot.id}"
+            )
+
+    def restore_bookmarks_file(
+        self, backup_src: str, snapshot_id: str | None = None, verify: bool = True
+    ):
+        """Restore the browser's bookmarks file from a backup.
+
+        Description:
+            The backup is written (and decompressed or rebuilt, if needed) into a
+            temporary file next to the bookmarks file, flushed to disk, then renamed
+            over the bookmarks file. If the process dies mid-restore, the browser is
+            left with either the old or the new file, never a partial one.
+
+        Params:
+            backup_src (str): Path to a backup file, or the root of a backup store
+                when `snapshot_id` is given. Either can be a storage URL.
+            snapshot_id (str | None): ID of a snapshot in the store at `backup_src`.
+            verify (bool): Check the backup's Chromium checksum while writing it, and
+                recompute it if it does not match (i.e. after edits or a merge), so
+                the browser does not discard the restored file.
+
+        """
         if backup_src is None:
             raise ValueError(f"Must pass a destination path as backup_dest.")
 
+        if is_remote_url(backup_src):
+            return self._restore_remote(
+                str(backup_src), snapshot_id=snapshot_id, verify=verify
+            )
+
         backup_src = (
             Path(str(backup_src)).expanduser()
             if "~" in str(backup_src)
             else Path(str(backup_src))
         )
 
-        if not Path(str(backup_src)).exists:
+        store: BackupStore | None = None
+        if snapshot_id is not None:
+            store = BackupStore(backup_src)
+            ## Fail early if the snapshot is not in the store
+            store.get_snapshot(snapshot_id)
+        elif not backup_src.exists():
             raise FileNotFoundError(f"Could not find backup source file: {backup_src}")
 
-        bookmarks_bak = f"{self.bookmarks_file}.bak"
-
-        if self.bookmarks_file_exists:
-            print(f"Backing up existing [{self.browser}] bookmarks to .bak file.")
-            ## Copy existing file to .bak
-            try:
-                with self._safe_copy(dest=bookmarks_bak, overwrite=True):
-                    log.info(
-                        f"Successfully copied bookmarks file '{self.bookmarks_file}' to destination path '{bookmarks_bak}'."
-                    )
-
-            except PermissionError as perm_err:
-                # log.error("Permission denied copying bookmarks file.")
-                raise perm_err
-            except FileExistsError as file_exists:
-                raise file_exists
-            except Exception as exc:
-                msg = f"({type(exc)}) Failed copying bookmarks file."
-                # log.error(msg)
-
-                raise exc
+        bookmarks_path = self.bookmarks_path
+        bookmarks_path.parent.mkdir(parents=True, exist_ok=True)
 
         print(f"Restoring [{self.browser}] bookmarks from file: {backup_src}")
-        ## Overwrite existing file
-        if self.bookmarks_file_exists:
-            try:
-                Path(str(self.bookmarks_file)).unlink()
-            except Exception as exc:
-                msg = f"({type(exc)}) Error removing existing bookmarks file '{self.bookmarks_file}'. Details: {exc}"
-                log.error(msg)
-
-                raise exc
+        fd, tmp_name = tempfile.mkstemp(
+            dir=bookmarks_path.parent, prefix=f".{bookmarks_path.name}-", suffix=".tmp"
+        )
+        os.close(fd)
+        tmp_path = Path(tmp_name)
 
-        print(f"Copying bookmarks from file '{backup_src}' to '{self.bookmarks_file}'")
         try:
-            shutil.copy2(src=backup_src, dst=self.bookmarks_file)
+            with timed("restore_write") as phase:
+                if verify:
+                    checksum: ChecksumResult = self._write_verified(
+                        backup_src, tmp_path, store=store, snapshot_id=snapshot_id
+                    )
+                elif store is not None:
+                    store.materialize(snapshot_id, dest=tmp_path)
+                elif compression.detect_compression(backup_src):
+                    ## Decompress on the fly while copying into place
+                    compression.decompress_file(backup_src, tmp_path)
+                else:
+                    self.copy_engine.copy(backup_src, tmp_path)
+                phase.bytes = tmp_path.stat().st_size
+
+            if verify:
+                if checksum.error:
+                    raise ValueError(
+                        f"Backup '{backup_src}' is not a valid bookmarks file. Details: {checksum.error}"
+                    )
+                if not checksum.matches:
+                    print(
+                        f"Repairing checksum of restored [{self.browser}] bookmarks (was {checksum.expected!r})"
+                    )
+                    with timed("repair_checksum"):
+                        repair_checksum(tmp_path)
+            fileio.fsync_file(tmp_path)
+
+            if self.bookmarks_file_exists:
+                with timed("keep_previous"):
+                    self._keep_previous_version(store=store)
+
+            print(
+                f"Moving restored bookmarks from '{backup_src}' into place at '{self.bookmarks_file}'"
+            )
+            os.replace(tmp_path, bookmarks_path)
+            fileio.fsync_dir(bookmarks_path.parent)
         except Exception as exc:
             msg = f"({type(exc)}) Error restoring bookmarks from backup file '{backup_src}'. Details: {exc}"
             log.error(msg)
 
+            tmp_path.unlink(missing_ok=True)
             raise exc
 
+    def _restore_remote(
+        self, backup_src: str, snapshot_id: str | None = None, verify: bool = True
+    ) -> None:
+        """Restore the bookmarks file from a storage URL.
+
+        Description:
+            Snapshots are pulled into the local copy of the remote store and restored
+            from there. The snapshot of the replaced bookmarks is pushed back. A single
+            backup file is downloaded to a temporary file first.
+        """
+        from bookmark_backup.storage import RemoteStore, open_backend
+
+        if snapshot_id is not None:
+            with RemoteStore(backup_src) as remote:
+                remote.pull(snapshot_ids=[snapshot_id])
+                self.restore_bookmarks_file(
+                    remote.store.root, snapshot_id=snapshot_id, verify=verify
+                )
+                remote.push()
+
+            return
+
+        container, name = split_object_url(backup_src)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{name}-", suffix=".download")
+        os.close(fd)
+        try:
+            with open_backend(container) as backend:
+                backend.get_file(name, tmp_name)
+            self.restore_bookmarks_file(tmp_name, verify=verify)
+        finally:
+            Path(tmp_name).unlink(missing_ok=True)
+
+    def _write_verified(
+        self,
+        backup_src: Path,
+        dest: Path,
+        store: BackupStore | None = None,
+        snapshot_id: str | None = None,
+    ) -> ChecksumResult:
+        """Write a backup's plain contents to `dest`, checking its checksum on the way."""
+        if store is not None:
+            if store.get_snapshot(snapshot_id).kind != "full":
+                ## Incremental snapshots are rebuilt in memory, check the result
+                store.materialize(snapshot_id, dest=dest)
+                return verify_file(dest)
+            backup_src = store.snapshot_path(snapshot_id)
+
+        with (
+            compression.open_decompressed(backup_src) as src_f,
+            open(dest, "wb") as dest_f,
+        ):
+            return copy_verified(src_f, dest_f)
+
 
 @dataclass
 class VivaldiBookmarksFile(BookmarksFile):
@@ -203,3 +890,16 @@ class EdgeBookmarksFile(BookmarksFile):
         self.browser: str = "edge"
 
         super().__post_init__()
+
+
+def get_bookmarks_file(browser: str, profile: str = "Default") -> BookmarksFile:
+    """Return the BookmarksFile class for `browser`, initialized for `profile`."""
+    match validate_browser(browser):
+        case "vivaldi":
+            return VivaldiBookmarksFile(profile=profile)
+        case "chrome":
+            return ChromeBookmarksFile(profile=profile)
+        case "edge":
+            return EdgeBookmarksFile(profile=profile)
+        case _:
+            raise ValueError(f"Invalid browser: {browser}.")
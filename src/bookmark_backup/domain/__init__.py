@@ -1,3 +1,7 @@
 from __future__ import annotations
 
 from . import Bookmarks
+from .export import EXPORT_FORMATS, export_bookmarks
+from .merge import BookmarksMerger, merge_bookmarks_files, normalize_url
+from .stream import BookmarkStream, StreamedNode, iter_nodes
+from .tree import BookmarkNode, BookmarkTree
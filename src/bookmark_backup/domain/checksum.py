@@ -0,0 +1,213 @@
+"""Compute, verify and repair the `checksum` field of Chromium Bookmarks files.
+
+Chromium hashes every node under the permanent folders with MD5, in pre-order:
+the node's id, its title as UTF-16LE, then "url" and the URL for bookmarks or
+"folder" for folders. When the stored checksum does not match, the browser treats
+the file as corrupt.
+"""
+
+from __future__ import annotations
+
+import codecs
+from dataclasses import dataclass
+import hashlib
+import json
+import logging
+from pathlib import Path
+import typing as t
+
+log: logging.Logger = logging.getLogger(__name__)
+
+from bookmark_backup.core import compression
+from bookmark_backup.core.fileio import SignatureCache
+from bookmark_backup.domain.stream import (
+    NODE_DEPTH,
+    JsonTokenizer,
+    NodeAssembler,
+    StreamedNode,
+    StreamParseError,
+)
+from bookmark_backup.store.incremental import dump_tree
+
+## Permanent folders covered by the checksum, in the order Chromium hashes them
+CHECKSUM_ROOTS: tuple[str, ...] = ("bookmark_bar", "other", "synced")
+
+
+def node_checksum_input(node: dict) -> bytes:
+    """Return the bytes a node adds to the checksum."""
+    data: bytes = str(node.get("id", "")).encode("utf-8") + node.get("name", "").encode(
+        "utf-16-le"
+    )
+    if node.get("type") == "url":
+        return data + b"url" + node.get("url", "").encode("utf-8")
+
+    return data + b"folder"
+
+
+def compute_checksum(data: dict) -> str:
+    """Compute the checksum of parsed Chromium Bookmarks data."""
+    md5 = hashlib.md5(usedforsecurity=False)
+    roots: dict = data.get("roots", {})
+
+    for name in CHECKSUM_ROOTS:
+        if not isinstance(roots.get(name), dict):
+            continue
+        stack: list[dict] = [roots[name]]
+        while stack:
+            node: dict = stack.pop()
+            md5.update(node_checksum_input(node))
+            stack.extend(reversed(node.get("children", [])))
+
+    return md5.hexdigest()
+
+
+@dataclass
+class ChecksumResult:
+    ## The checksum stored in the file, None if it has none
+    expected: str | None
+    ## The checksum computed from the file's nodes
+    actual: str | None
+    ## Set if the file could not be parsed
+    error: str | None = None
+
+    @property
+    def valid(self) -> bool:
+        """True if the file parsed and its stored checksum matches its nodes.
+
+        Description:
+            A file without a checksum is valid, Chromium accepts it and adds one the
+            next time it saves the file.
+        """
+        return self.error is None and self.expected in (None, self.actual)
+
+    @property
+    def matches(self) -> bool:
+        """True if the file parsed and stores exactly its computed checksum."""
+        return self.error is None and self.expected == self.actual
+
+
+## Checksum results of live bookmarks files checked by this process, reused until
+#  the browser writes the file again
+CHECKSUM_CACHE: SignatureCache[ChecksumResult] = SignatureCache()
+
+
+class ChecksumVerifier:
+    """Compute a Bookmarks file's checksum from raw bytes fed in chunks.
+
+    Description:
+        Lets a copy (or hash) of the file check its checksum in the same pass, see
+        `copy_verified()`. Chromium writes a folder's name after its children, but
+        hashes folders before their children, so each node's checksum input is kept
+        (not the parsed node) until the end of the file, then hashed in order.
+
+        Parse errors do not raise, they are reported on the ChecksumResult.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._tokenizer = JsonTokenizer(whole_objects_from=NODE_DEPTH)
+        self._assembler = NodeAssembler()
+        ## Checksum input of each node, by pre-order position
+        self._inputs: list[bytes | None] = []
+        ## Root folder name -> position
+        self._roots: dict[str, int] = {}
+        self._error: str | None = None
+
+    def _add_nodes(self, nodes: list[StreamedNode]) -> None:
+        for streamed in nodes:
+            if streamed.position >= len(self._inputs):
+                self._inputs.extend(
+                    [None] * (streamed.position + 1 - len(self._inputs))
+                )
+            self._inputs[streamed.position] = node_checksum_input(streamed.node)
+            if streamed.parent == -1:
+                self._roots[streamed.root] = streamed.position
+
+    def feed(self, chunk: bytes) -> None:
+        if self._error is not None:
+            return
+
+        try:
+            text: str = self._decoder.decode(chunk)
+            self._add_nodes(self._assembler.feed(self._tokenizer.feed(text)))
+        except (StreamParseError, UnicodeDecodeError) as exc:
+            self._error = f"({type(exc).__name__}) {exc}"
+
+    def close(self) -> ChecksumResult:
+        if self._error is None:
+            try:
+                text = self._decoder.decode(b"", final=True)
+                events = self._tokenizer.feed(text) + self._tokenizer.close()
+                self._add_nodes(self._assembler.feed(events))
+            except (StreamParseError, UnicodeDecodeError) as exc:
+                self._error = f"({type(exc).__name__}) {exc}"
+
+        if self._error is not None:
+            return ChecksumResult(expected=None, actual=None, error=self._error)
+
+        ## Each root's subtree runs from its position up to the next root's
+        starts: list[int] = sorted(self._roots.values()) + [len(self._inputs)]
+        ends: dict[int, int] = dict(zip(starts, starts[1:]))
+
+        md5 = hashlib.md5(usedforsecurity=False)
+        for name in CHECKSUM_ROOTS:
+            if name not in self._roots:
+                continue
+            start: int = self._roots[name]
+            for data in self._inputs[start : ends[start]]:
+                md5.update(data or b"")
+
+        expected = self._assembler.meta.get("checksum")
+
+        return ChecksumResult(
+            expected=expected if isinstance(expected, str) else None,
+            actual=md5.hexdigest(),
+        )
+
+
+def copy_verified(
+    src: t.BinaryIO,
+    dest: t.BinaryIO,
+    chunk_size: int = compression.COMPRESSION_CHUNK_SIZE,
+) -> ChecksumResult:
+    """Copy `src` to `dest` in chunks, checking the Bookmarks checksum as it goes."""
+    verifier = ChecksumVerifier()
+    while chunk := src.read(chunk_size):
+        dest.write(chunk)
+        verifier.feed(chunk)
+
+    return verifier.close()
+
+
+def verify_file(
+    path: t.Union[str, Path], chunk_size: int = compression.COMPRESSION_CHUNK_SIZE
+) -> ChecksumResult:
+    """Check the checksum of a (optionally compressed) Bookmarks file."""
+    verifier = ChecksumVerifier()
+    with compression.open_decompressed(Path(path).expanduser()) as f:
+        while chunk := f.read(chunk_size):
+            verifier.feed(chunk)
+
+    return verifier.close()
+
+
+def with_checksum(data: dict) -> dict:
+    """Return Bookmarks data with its checksum recomputed, as the first field."""
+    fields: dict = {k: v for k, v in data.items() if k != "checksum"}
+
+    return {"checksum": compute_checksum(data), **fields}
+
+
+def repair_checksum(path: t.Union[str, Path]) -> str:
+    """Rewrite a plain Bookmarks file with its checksum recomputed.
+
+    Returns:
+        (str): The new checksum.
+
+    """
+    path = Path(path).expanduser()
+    with open(path, "r", encoding="utf-8") as f:
+        data: dict = with_checksum(json.load(f))
+    dump_tree(data, path)
+
+    return data["checksum"]
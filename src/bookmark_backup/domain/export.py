@@ -0,0 +1,351 @@
+"""Export Chromium Bookmarks files to Netscape HTML, CSV, NDJSON or Parquet.
+
+Every exporter reads the file with `BookmarkStream` and writes rows in batches, so
+memory use does not grow with the size of the file or of the output.
+"""
+
+from __future__ import annotations
+
+import csv
+from datetime import datetime, timedelta, timezone
+import html
+import importlib.util
+import json
+import logging
+from pathlib import Path
+import typing as t
+
+log: logging.Logger = logging.getLogger(__name__)
+
+from bookmark_backup.domain.stream import BookmarkStream, StreamedNode
+
+## Rows buffered before each write
+EXPORT_BATCH_SIZE: int = 10_000
+EXPORT_FORMATS: tuple[str, ...] = ("html", "csv", "ndjson", "parquet")
+FILE_EXTENSIONS: dict[str, str] = {
+    ".html": "html",
+    ".htm": "html",
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".parquet": "parquet",
+}
+## Columns of the CSV, NDJSON and Parquet exports
+EXPORT_COLUMNS: tuple[str, ...] = (
+    "id",
+    "guid",
+    "type",
+    "title",
+    "url",
+    "folder",
+    "root",
+    "depth",
+    "date_added",
+    "date_modified",
+    "date_last_used",
+)
+## Separates folder titles in the "folder" column
+FOLDER_SEPARATOR: str = " / "
+## Chromium timestamps count microseconds from 1601-01-01
+CHROMIUM_EPOCH: datetime = datetime(1601, 1, 1, tzinfo=timezone.utc)
+CHROMIUM_EPOCH_OFFSET_SECONDS: int = 11_644_473_600
+
+
+def parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def supported_export_formats() -> list[str]:
+    """Return the export formats usable in this environment."""
+    return [fmt for fmt in EXPORT_FORMATS if fmt != "parquet" or parquet_available()]
+
+
+def export_format_for(path: t.Union[str, Path]) -> str:
+    """Guess the export format from a destination file's extension."""
+    fmt: str | None = FILE_EXTENSIONS.get(Path(str(path)).suffix.lower())
+    if fmt is None:
+        raise ValueError(
+            f"Cannot tell the export format of '{path}' from its extension. Must be one of {list(FILE_EXTENSIONS)}"
+        )
+
+    return fmt
+
+
+def chromium_time_to_iso(value: t.Any) -> str:
+    """Convert a Chromium timestamp to an ISO 8601 string, "" if unset."""
+    microseconds: int = int(value or 0)
+    if microseconds <= 0:
+        return ""
+
+    return (CHROMIUM_EPOCH + timedelta(microseconds=microseconds)).isoformat()
+
+
+def chromium_time_to_unix(value: t.Any) -> int:
+    """Convert a Chromium timestamp to Unix seconds, 0 if unset."""
+    microseconds: int = int(value or 0)
+    if microseconds <= 0:
+        return 0
+
+    return max(0, microseconds // 1_000_000 - CHROMIUM_EPOCH_OFFSET_SECONDS)
+
+
+def node_row(streamed: StreamedNode) -> dict:
+    """Flatten a streamed node into one export row."""
+    node: dict = streamed.node
+
+    return {
+        "id": node.get("id", ""),
+        "guid": node.get("guid", ""),
+        "type": node.get("type", ""),
+        "title": node.get("name", ""),
+        "url": node.get("url", ""),
+        "folder": FOLDER_SEPARATOR.join(streamed.path or ()),
+        "root": streamed.root,
+        "depth": streamed.depth,
+        "date_added": chromium_time_to_iso(node.get("date_added")),
+        "date_modified": chromium_time_to_iso(node.get("date_modified")),
+        "date_last_used": chromium_time_to_iso(node.get("date_last_used")),
+    }
+
+
+def iter_rows(
+    source: t.Union[str, Path], include_folders: bool = False
+) -> t.Iterator[dict]:
+    """Yield an export row per bookmark (and folder, if `include_folders`).
+
+    Description:
+        Folders are yielded after their contents, in the order the streaming reader
+        completes them.
+    """
+    for streamed in BookmarkStream(source):
+        if streamed.is_folder and not include_folders:
+            continue
+        yield node_row(streamed)
+
+
+def _batches(rows: t.Iterable[dict], size: int) -> t.Iterator[list[dict]]:
+    batch: list[dict] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_csv(
+    rows: t.Iterable[dict], dest: Path, batch_size: int = EXPORT_BATCH_SIZE
+) -> int:
+    count: int = 0
+    with open(dest, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        for batch in _batches(rows, batch_size):
+            writer.writerows(batch)
+            count += len(batch)
+
+    return count
+
+
+def export_ndjson(
+    rows: t.Iterable[dict], dest: Path, batch_size: int = EXPORT_BATCH_SIZE
+) -> int:
+    count: int = 0
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    with open(dest, "w", encoding="utf-8") as f:
+        for batch in _batches(rows, batch_size):
+            f.write("".join(encoder.encode(row) + "\n" for row in batch))
+            count += len(batch)
+
+    return count
+
+
+def export_parquet(
+    rows: t.Iterable[dict], dest: Path, batch_size: int = EXPORT_BATCH_SIZE
+) -> int:
+    """Write rows to a Parquet file, one row group per batch.
+
+    Raises:
+        RuntimeError: If the optional `pyarrow` package is not installed.
+
+    """
+    if not parquet_available():
+        raise RuntimeError(
+            "Parquet export requires the 'pyarrow' package. Install it with: pip install pyarrow"
+        )
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            (column, pa.int32() if column == "depth" else pa.string())
+            for column in EXPORT_COLUMNS
+        ]
+    )
+
+    count: int = 0
+    with pq.ParquetWriter(dest, schema) as writer:
+        for batch in _batches(rows, batch_size):
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+            count += len(batch)
+
+    return count
+
+
+class _NetscapeWriter:
+    """Write the Netscape bookmarks HTML format browsers import, folder by folder.
+
+    Description:
+        Nodes arrive from BookmarkStream with folders after their contents, so each
+        folder's heading is written when its first child (or the folder itself, if
+        empty) arrives, using the folder fields from the stream's first pass.
+        Like Chromium's own export, the bookmarks bar is marked as the toolbar
+        folder and "Other bookmarks" are written at the top level.
+    """
+
+    HEADER: str = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<!-- This is an automatically generated file.
+     It will be read and overwritten.
+     DO NOT EDIT! -->
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+"""
+    FOOTER: str = "</DL><p>\n"
+
+    def __init__(self, f: t.TextIO, stream: BookmarkStream, batch_size: int):
+        self.f = f
+        self.stream = stream
+        self.batch_size = batch_size
+        ## Folder numbers with an open <DL>
+        self.open: list[int] = []
+        ## Root folders written at the top level, without their own heading
+        self.flattened: set[int] = set()
+        self.lines: list[str] = []
+
+    def _indent(self) -> str:
+        return "    " * (1 + len(self.open) - len(self.flattened & set(self.open)))
+
+    def _open_folder(self, folder: int, root: str, depth: int) -> None:
+        if depth == 0 and root == "other":
+            self.flattened.add(folder)
+        else:
+            node: dict = self.stream.folder_nodes[folder]
+            toolbar: str = (
+                ' PERSONAL_TOOLBAR_FOLDER="true"'
+                if depth == 0 and root == "bookmark_bar"
+                else ""
+            )
+            self.lines.append(
+                f'{self._indent()}<DT><H3 ADD_DATE="{chromium_time_to_unix(node.get("date_added"))}" LAST_MODIFIED="{chromium_time_to_unix(node.get("date_modified"))}"{toolbar}>{html.escape(node.get("name", ""), quote=False)}</H3>\n'
+            )
+            self.lines.append(f"{self._indent()}<DL><p>\n")
+        self.open.append(folder)
+
+    def _close_folder(self) -> None:
+        folder: int = self.open.pop()
+        if folder in self.flattened:
+            self.flattened.discard(folder)
+            return
+        self.lines.append(f"{self._indent()}</DL><p>\n")
+
+    def _enter(self, ancestors: tuple[int, ...], root: str) -> None:
+        """Close and open folders until exactly `ancestors` are open."""
+        common: int = 0
+        while (
+            common < len(self.open)
+            and common < len(ancestors)
+            and self.open[common] == ancestors[common]
+        ):
+            common += 1
+        while len(self.open) > common:
+            self._close_folder()
+        for depth in range(common, len(ancestors)):
+            self._open_folder(ancestors[depth], root=root, depth=depth)
+
+    def add(self, streamed: StreamedNode) -> None:
+        if streamed.is_folder:
+            path: tuple[int, ...] = streamed.ancestors + (streamed.folder,)
+            if streamed.depth == 0 and self.open[:1] != [streamed.folder]:
+                ## Skip empty root folders, like Chromium's export
+                return
+            self._enter(path, root=streamed.root)
+            self._close_folder()
+        else:
+            self._enter(streamed.ancestors, root=streamed.root)
+            node: dict = streamed.node
+            self.lines.append(
+                f'{self._indent()}<DT><A HREF="{html.escape(node.get("url", ""))}" ADD_DATE="{chromium_time_to_unix(node.get("date_added"))}">{html.escape(node.get("name", ""), quote=False)}</A>\n'
+            )
+
+        if len(self.lines) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        self.f.write("".join(self.lines))
+        self.lines = []
+
+
+def export_html(
+    source: t.Union[str, Path], dest: Path, batch_size: int = EXPORT_BATCH_SIZE
+) -> int:
+    stream = BookmarkStream(source)
+    count: int = 0
+    with open(dest, "w", encoding="utf-8") as f:
+        f.write(_NetscapeWriter.HEADER)
+        writer = _NetscapeWriter(f, stream, batch_size=batch_size)
+        for streamed in stream:
+            writer.add(streamed)
+            count += not streamed.is_folder
+        writer._enter((), root="")
+        writer.flush()
+        f.write(_NetscapeWriter.FOOTER)
+
+    return count
+
+
+def export_bookmarks(
+    source: t.Union[str, Path],
+    dest: t.Union[str, Path],
+    fmt: str | None = None,
+    include_folders: bool = False,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> int:
+    """Export a (optionally compressed) Chromium Bookmarks file.
+
+    Params:
+        source (str | Path): The bookmarks file to export.
+        dest (str | Path): The file to write.
+        fmt (str | None): One of EXPORT_FORMATS. Guessed from `dest` if not given.
+        include_folders (bool): Also write a row per folder (CSV, NDJSON and Parquet).
+        batch_size (int): Rows buffered before each write.
+
+    Returns:
+        (int): The number of bookmarks (and folder rows) written.
+
+    """
+    dest = Path(str(dest)).expanduser()
+    fmt = fmt or export_format_for(dest)
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Invalid export format: {fmt}. Must be one of {EXPORT_FORMATS}"
+        )
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    log.info(f"Exporting bookmarks from '{source}' to {fmt} file '{dest}'")
+
+    match fmt:
+        case "html":
+            return export_html(source, dest, batch_size=batch_size)
+        case "csv":
+            writer = export_csv
+        case "ndjson":
+            writer = export_ndjson
+        case "parquet":
+            writer = export_parquet
+
+    return writer(
+        iter_rows(source, include_folders=include_folders), dest, batch_size=batch_size
+    )
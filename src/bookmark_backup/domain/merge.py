@@ -0,0 +1,281 @@
+"""Merge several Chromium Bookmarks files into one deduplicated set.
+
+Bookmarks are matched by normalized URL and folders by their path from the root
+folder, using dicts so merging stays linear in the number of bookmarks.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import json
+import logging
+from pathlib import Path
+import typing as t
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import uuid
+
+log: logging.Logger = logging.getLogger(__name__)
+
+from bookmark_backup.core import compression
+from bookmark_backup.domain.checksum import with_checksum
+from bookmark_backup.store.incremental import dump_tree
+
+## Chromium's permanent folders, in the order it writes them
+ROOT_FOLDERS: tuple[str, ...] = ("bookmark_bar", "other", "synced")
+## Ids Chromium gives the permanent folders, new nodes are numbered after them
+ROOT_FOLDER_IDS: dict[str, int] = {"bookmark_bar": 1, "other": 2, "synced": 3}
+DEFAULT_PORTS: dict[str, int] = {"http": 80, "https": 443, "ftp": 21}
+## Top-level fields that describe one source file, and are not merged
+SOURCE_ONLY_FIELDS: frozenset[str] = frozenset({"checksum", "roots", "sync_metadata"})
+## Query parameters that only track where a link was clicked
+TRACKING_PARAMS: frozenset[str] = frozenset(
+    {"fbclid", "gclid", "mc_cid", "mc_eid", "msclkid", "yclid"}
+)
+TRACKING_PARAM_PREFIXES: tuple[str, ...] = ("utm_",)
+
+## (root folder name, folder titles below it)
+FolderKey = tuple[str, tuple[str, ...]]
+
+
+def normalize_url(url: str) -> str:
+    """Return a canonical form of `url` for finding duplicate bookmarks.
+
+    Description:
+        Lowercases the scheme and host, drops default ports, tracking parameters
+        (i.e. `utm_source`) and empty fragments, sorts the query parameters and
+        strips a trailing slash from the path. URLs that cannot be parsed (i.e.
+        `javascript:` bookmarklets) are returned unchanged.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port: int | None = parts.port
+    except ValueError:
+        return url
+
+    scheme: str = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS and scheme != "file":
+        return url
+
+    host: str = (parts.hostname or "").lower()
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else "")
+        host = f"{userinfo}@{host}"
+
+    query: list[tuple[str, str]] = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+        and not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+    )
+
+    return urlunsplit(
+        (scheme, host, parts.path.rstrip("/"), urlencode(query), parts.fragment)
+    )
+
+
+def _modified(node: dict) -> int:
+    """Chromium timestamp used to pick between conflicting copies of a node."""
+    return int(node.get("date_modified") or node.get("date_added") or 0)
+
+
+@dataclass
+class _Folder:
+    node: dict
+    ## Child keys in order: a FolderKey for folders, a normalized URL for bookmarks.
+    #  A dict is used as an ordered set, so moving a bookmark out is O(1).
+    children: dict[t.Union[FolderKey, str], None] = field(default_factory=dict)
+
+
+@dataclass
+class _Bookmark:
+    node: dict
+    folder: FolderKey
+    source: int
+
+
+@dataclass
+class MergeStats:
+    sources: int = 0
+    bookmarks_read: int = 0
+    bookmarks_merged: int = 0
+    duplicates: int = 0
+    conflicts: int = 0
+    folders: int = 0
+
+
+class BookmarksMerger:
+    """Merge Chromium Bookmarks data into one tree.
+
+    Description:
+        Sources are added in priority order. Folders with the same path from the
+        same root folder are merged, keeping the order children were first seen.
+        Bookmarks with the same normalized URL are deduplicated; when copies differ
+        in title or folder, the copy with the newest `date_modified` (falling back
+        to `date_added`) wins, and earlier sources win ties.
+    """
+
+    def __init__(self):
+        self.folders: dict[FolderKey, _Folder] = {}
+        self.bookmarks: dict[str, _Bookmark] = {}
+        self.meta: dict = {}
+        self.stats = MergeStats()
+
+    def add(self, data: dict) -> None:
+        """Merge one parsed Chromium Bookmarks file into the result."""
+        source: int = self.stats.sources
+        self.stats.sources += 1
+        for key, value in data.items():
+            if key not in SOURCE_ONLY_FIELDS:
+                self.meta.setdefault(key, value)
+
+        for root_name, root in data.get("roots", {}).items():
+            if not isinstance(root, dict):
+                continue
+            ## (folder node, its key), walked depth-first
+            stack: list[tuple[dict, FolderKey]] = [(root, (root_name, ()))]
+            while stack:
+                folder_node, folder_key = stack.pop()
+                folder = self._folder(folder_key, folder_node)
+
+                subfolders: list[tuple[dict, FolderKey]] = []
+                for child in folder_node.get("children", []):
+                    if child.get("type") == "folder":
+                        child_key: FolderKey = (
+                            root_name,
+                            folder_key[1] + (child.get("name", ""),),
+                        )
+                        folder.children.setdefault(child_key, None)
+                        ## Create it now, so its place among siblings is kept
+                        self._folder(child_key, child)
+                        subfolders.append((child, child_key))
+                    else:
+                        self._add_bookmark(child, folder_key, source)
+                stack.extend(reversed(subfolders))
+
+    def _folder(self, key: FolderKey, node: dict) -> _Folder:
+        folder: _Folder | None = self.folders.get(key)
+        fields: dict = {k: v for k, v in node.items() if k != "children"}
+
+        if folder is None:
+            folder = self.folders[key] = _Folder(node=fields)
+            self.stats.folders += 1
+        elif _modified(node) > _modified(folder.node):
+            ## Keep the oldest date_added, and the newest copy's other fields
+            date_added = min(
+                int(folder.node.get("date_added", 0) or 0),
+                int(node.get("date_added", 0) or 0),
+            )
+            folder.node = fields
+            folder.node["date_added"] = str(date_added)
+
+        return folder
+
+    def _add_bookmark(self, node: dict, folder_key: FolderKey, source: int) -> None:
+        self.stats.bookmarks_read += 1
+        url_key: str = normalize_url(node.get("url", ""))
+        existing: _Bookmark | None = self.bookmarks.get(url_key)
+
+        if existing is None:
+            self.bookmarks[url_key] = _Bookmark(node, folder_key, source)
+            self.folders[folder_key].children[url_key] = None
+            return
+
+        self.stats.duplicates += 1
+        if (
+            existing.node.get("name") == node.get("name")
+            and existing.folder == folder_key
+        ):
+            return
+
+        self.stats.conflicts += 1
+        if _modified(node) > _modified(existing.node):
+            if existing.folder != folder_key:
+                del self.folders[existing.folder].children[url_key]
+                self.folders[folder_key].children[url_key] = None
+            self.bookmarks[url_key] = _Bookmark(node, folder_key, source)
+
+    def to_dict(self) -> dict:
+        """Build the merged Chromium Bookmarks data, with fresh ids.
+
+        Description:
+            Permanent folders keep Chromium's ids (1-3), other nodes are numbered
+            after them. GUIDs are kept unless two merged nodes share one.
+        """
+        next_id: int = max(ROOT_FOLDER_IDS.values()) + 1
+        guids: set[str] = set()
+
+        def fresh_fields(node: dict, node_id: int) -> dict:
+            fields: dict = dict(node)
+            fields["id"] = str(node_id)
+            guid = fields.get("guid")
+            if not guid or guid in guids:
+                fields["guid"] = str(uuid.uuid4())
+            guids.add(fields["guid"])
+
+            return fields
+
+        def build(key: FolderKey, node_id: int) -> dict:
+            nonlocal next_id
+            folder: _Folder = self.folders[key]
+            out: dict = fresh_fields(folder.node, node_id)
+            children: list[dict] = []
+            for child_key in folder.children:
+                child_id: int = next_id
+                next_id += 1
+                if isinstance(child_key, tuple):
+                    children.append(build(child_key, child_id))
+                else:
+                    children.append(
+                        fresh_fields(self.bookmarks[child_key].node, child_id)
+                    )
+            out["children"] = children
+
+            return out
+
+        root_names: list[str] = list(ROOT_FOLDERS) + [
+            name for name, path in self.folders if not path and name not in ROOT_FOLDERS
+        ]
+        roots: dict = {}
+        for name in dict.fromkeys(root_names):
+            if (name, ()) not in self.folders:
+                continue
+            node_id = ROOT_FOLDER_IDS.get(name)
+            if node_id is None:
+                node_id = next_id
+                next_id += 1
+            roots[name] = build((name, ()), node_id)
+
+        self.stats.bookmarks_merged = len(self.bookmarks)
+
+        data: dict = {"roots": roots}
+        data.update(self.meta)
+        data.setdefault("version", 1)
+
+        return data
+
+
+def merge_bookmarks_files(
+    sources: t.Iterable[t.Union[str, Path]], dest: t.Union[str, Path]
+) -> MergeStats:
+    """Merge Chromium Bookmarks files, in priority order, into a new file at `dest`.
+
+    Description:
+        The merged file gets a freshly computed Chromium checksum.
+
+    Returns:
+        (MergeStats): Counts of the bookmarks read, merged and deduplicated.
+
+    """
+    merger = BookmarksMerger()
+    for source in sources:
+        log.info(f"Merging bookmarks from '{source}'")
+        with compression.open_decompressed(Path(source).expanduser()) as f:
+            merger.add(json.load(f))
+
+    dest = Path(str(dest)).expanduser()
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    dump_tree(with_checksum(merger.to_dict()), dest)
+
+    return merger.stats
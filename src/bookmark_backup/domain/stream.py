@@ -0,0 +1,602 @@
+"""Incremental reader for Chromium Bookmarks files.
+
+`JsonTokenizer` turns JSON text, fed in chunks, into parse events. `BookmarkStream`
+sits on top of it and yields each bookmark node with its folder path, holding only
+the nodes currently open (one per folder level) in memory.
+
+Bookmark nodes that fit in the buffered chunk are decoded whole by the json module's
+C scanner, so only the folders spanning a chunk boundary go through the tokenizer
+one token at a time.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import io
+import json
+from json.decoder import scanstring
+import logging
+from pathlib import Path
+import re
+import typing as t
+
+log: logging.Logger = logging.getLogger(__name__)
+
+from bookmark_backup.core import compression
+
+## Characters read from the file per chunk
+STREAM_CHUNK_SIZE: int = 64 * 1024
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?")
+NUMBER_FLOAT = re.compile(r"[.eE]")
+## A buffer ending in these may be a number cut off mid-way
+NUMBER_CHARS = re.compile(r"[-+.eE\d]*")
+LITERALS: dict[str, tuple[str, t.Any]] = {
+    "true": ("boolean", True),
+    "false": ("boolean", False),
+    "null": ("null", None),
+}
+
+## Nesting depth of the objects BookmarkStream decodes whole: the root folders and
+#  everything below them
+NODE_DEPTH: int = 2
+
+## (event name, value). Events are "start_map", "map_key", "end_map",
+#  "start_array", "end_array", "string", "number", "boolean" and "null", plus
+#  "object" for objects decoded whole (see `JsonTokenizer`).
+Event = tuple[str, t.Any]
+
+_decoder = json.JSONDecoder()
+
+## What JsonTokenizer expects next: a value, an object key, the ':' after a key, or
+#  the ',' (or closing bracket) after a value
+_VALUE, _KEY, _COLON, _COMMA = range(4)
+
+
+class StreamParseError(ValueError):
+    """Raised when the streamed JSON is malformed or ends early."""
+
+
+class JsonTokenizer:
+    """Push-based JSON tokenizer.
+
+    Description:
+        Text is passed to `feed()` in chunks of any size, which returns the events
+        for every complete token seen so far. A token split across chunks is kept
+        until the rest of it arrives. `close()` flushes the last token and checks
+        the document was complete.
+
+        With `whole_objects_from` set, an object nested at least that deep that is
+        complete in the buffer is decoded in one go by `json.JSONDecoder` and
+        returned as a single ("object", dict) event instead of its tokens.
+
+    Params:
+        whole_objects_from (int | None): Nesting depth from which to decode
+            complete objects whole. None always returns single tokens.
+    """
+
+    def __init__(self, whole_objects_from: int | None = None):
+        self.whole_objects_from = whole_objects_from
+        self._buf: str = ""
+        ## Characters consumed before the start of _buf, for error messages
+        self._offset: int = 0
+        ## Open containers, True for objects
+        self._stack: list[bool] = []
+        ## What the next token must be, see the `_VALUE`... constants
+        self._expect: int = _VALUE
+        ## The innermost container has no entries yet, so it may be closed
+        self._empty: bool = False
+        self._done: bool = False
+        ## Where to look for the closing quote of an unterminated string
+        self._quote_from: int | None = None
+
+    def _error(self, msg: str, pos: int) -> StreamParseError:
+        return StreamParseError(f"{msg} at character {self._offset + pos}")
+
+    def feed(self, chunk: str) -> list[Event]:
+        self._buf += chunk
+
+        return self._parse(final=False)
+
+    def close(self) -> list[Event]:
+        events: list[Event] = self._parse(final=True)
+        if self._stack or not self._done:
+            raise self._error("Unexpected end of JSON document", len(self._buf))
+
+        return events
+
+    def _parse(self, final: bool) -> list[Event]:
+        events: list[Event] = []
+        buf: str = self._buf
+        pos: int = 0
+        end: int = len(buf)
+
+        if self._quote_from is not None:
+            if buf.find('"', self._quote_from) == -1 and not final:
+                self._quote_from = end
+                return events
+            self._quote_from = None
+
+        while True:
+            pos = WHITESPACE.match(buf, pos).end()
+            if pos == end:
+                break
+
+            char: str = buf[pos]
+            if self._done:
+                raise self._error("Extra data", pos)
+            expect: int = self._expect
+            empty: bool = self._empty
+            self._empty = False
+
+            if char == '"':
+                if expect != _VALUE and expect != _KEY:
+                    raise self._error("Unexpected string", pos)
+                try:
+                    value, next_pos = scanstring(buf, pos + 1)
+                except json.JSONDecodeError as exc:
+                    incomplete: bool = exc.msg.startswith("Unterminated") or (
+                        exc.msg.startswith("Invalid") and exc.pos >= end - 6
+                    )
+                    if final or not incomplete:
+                        raise self._error(exc.msg, exc.pos) from exc
+                    ## Relative to the string's start, once the buffer is trimmed
+                    self._quote_from = end - pos
+                    break
+
+                if expect == _KEY:
+                    events.append(("map_key", value))
+                    self._expect = _COLON
+                else:
+                    events.append(("string", value))
+                    self._value_done()
+                pos = next_pos
+            elif char == "{" or char == "[":
+                if expect != _VALUE:
+                    raise self._error(f"Unexpected '{char}'", pos)
+                if (
+                    char == "{"
+                    and self.whole_objects_from is not None
+                    and len(self._stack) >= self.whole_objects_from
+                ):
+                    ## An object cut off by the end of the buffer (or malformed)
+                    #  fails to decode, and is read token by token instead
+                    try:
+                        value, next_pos = _decoder.raw_decode(buf, pos)
+                    except json.JSONDecodeError:
+                        pass
+                    else:
+                        events.append(("object", value))
+                        self._value_done()
+                        pos = next_pos
+                        continue
+                is_map: bool = char == "{"
+                events.append(("start_map" if is_map else "start_array", None))
+                self._stack.append(is_map)
+                ## Either the first entry, or the end of an empty container
+                self._expect = _KEY if is_map else _VALUE
+                self._empty = True
+                pos += 1
+            elif char == "}" or char == "]":
+                is_map = char == "}"
+                if (
+                    not self._stack
+                    or self._stack[-1] != is_map
+                    or not (expect == _COMMA or empty)
+                ):
+                    raise self._error(f"Unexpected '{char}'", pos)
+                self._stack.pop()
+                events.append(("end_map" if is_map else "end_array", None))
+                self._value_done()
+                pos += 1
+            elif char == ",":
+                if expect != _COMMA:
+                    raise self._error("Unexpected ','", pos)
+                self._expect = _KEY if self._stack[-1] else _VALUE
+                pos += 1
+            elif char == ":":
+                if expect != _COLON:
+                    raise self._error("Unexpected ':'", pos)
+                self._expect = _VALUE
+                pos += 1
+            else:
+                if expect != _VALUE:
+                    raise self._error("Expecting value", pos)
+                match = NUMBER.match(buf, pos)
+                number_end: int = match.end() if match else pos
+                if not final and NUMBER_CHARS.fullmatch(buf, number_end):
+                    ## The number may continue in the next chunk
+                    break
+                if match:
+                    text: str = match.group()
+                    number = float(text) if NUMBER_FLOAT.search(text) else int(text)
+                    events.append(("number", number))
+                    self._value_done()
+                    pos = number_end
+                    continue
+
+                literal: str | None = next(
+                    (word for word in LITERALS if buf.startswith(word, pos)), None
+                )
+                if literal is None:
+                    if not final and any(
+                        word.startswith(buf[pos:]) for word in LITERALS
+                    ):
+                        ## A literal split across chunks
+                        break
+                    raise self._error("Expecting value", pos)
+
+                events.append(LITERALS[literal])
+                self._value_done()
+                pos += len(literal)
+
+        self._offset += pos
+        self._buf = buf[pos:]
+
+        return events
+
+    def _value_done(self) -> None:
+        if not self._stack:
+            self._done = True
+        self._expect = _COMMA
+
+
+def iter_events(
+    f: t.TextIO, chunk_size: int = STREAM_CHUNK_SIZE
+) -> t.Generator[Event, None, None]:
+    """Read `f` in chunks of `chunk_size` characters, yielding JSON parse events."""
+    tokenizer = JsonTokenizer()
+    while chunk := f.read(chunk_size):
+        yield from tokenizer.feed(chunk)
+    yield from tokenizer.close()
+
+
+@dataclass(slots=True)
+class StreamedNode:
+    """A bookmark node read by BookmarkStream.
+
+    Params:
+        node (dict): The node's fields, without "children".
+        root (str): Name of the root folder it is under, i.e. "bookmark_bar".
+        path (tuple[str, ...] | None): Titles of the folders containing the node,
+            from the root folder down. None when folder paths were not resolved.
+        position (int): The node's index in a pre-order walk of the file.
+        parent (int): Position of the containing folder, -1 for root folders.
+        depth (int): Number of folders containing the node.
+        folder (int): For folders, their number in the order their children start
+            (see `BookmarkStream.folders()`). -1 for bookmarks.
+        ancestors (tuple[int, ...]): Folder numbers of the containing folders, from
+            the root folder down.
+    """
+
+    node: dict
+    root: str
+    path: t.Optional[tuple[str, ...]]
+    position: int
+    parent: int
+    depth: int
+    folder: int = -1
+    ancestors: tuple[int, ...] = ()
+
+    @property
+    def is_folder(self) -> bool:
+        return self.node.get("type") == "folder"
+
+
+@dataclass(slots=True)
+class _Frame:
+    ## "top", "roots", "node", "children" or "value"
+    kind: str
+    container: t.Any = None
+    key: str | None = None
+    node: _Frame | None = None
+    root: str = ""
+    path: t.Optional[tuple[str, ...]] = None
+    position: int = -1
+    parent: int = -1
+    depth: int = 0
+    folder: int = -1
+    ancestors: tuple[int, ...] = ()
+
+
+class BookmarkStream:
+    """Read the nodes of a Chromium Bookmarks file without loading it whole.
+
+    Description:
+        Nodes are yielded as soon as they are complete. Chromium writes a folder's
+        "children" before its "name", so a folder is yielded after its children,
+        and finding each node's folder path takes a first pass over the file to
+        collect the folders' fields. That pass keeps one dict per folder; every other
+        structure only holds the folders currently open. Pass `with_paths=False`
+        to read the file once and get `path=None`.
+
+        After iterating, `meta` holds the top-level fields other than "roots", i.e.
+        "version" and "checksum".
+
+    Params:
+        source (str | Path | TextIO): Path to a (optionally compressed) Bookmarks
+            file, or an open text file. Folder paths need a seekable file.
+        chunk_size (int): Characters read per chunk.
+        with_paths (bool): Resolve each node's folder path.
+    """
+
+    def __init__(
+        self,
+        source: t.Union[str, Path, t.TextIO],
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        with_paths: bool = True,
+    ):
+        if not isinstance(source, (str, Path)) and with_paths:
+            if not source.seekable():
+                raise ValueError(
+                    "Resolving folder paths needs a seekable file, pass with_paths=False to stream without them."
+                )
+
+        self.source = source
+        self.chunk_size = chunk_size
+        self.with_paths = with_paths
+        self.meta: dict = {}
+        ## Every folder's fields, set when iterating with paths, see `folders()`
+        self.folder_nodes: list[dict] | None = None
+
+    def _open(self) -> t.TextIO:
+        if isinstance(self.source, (str, Path)):
+            return io.TextIOWrapper(
+                compression.open_decompressed(Path(self.source).expanduser()),
+                encoding="utf-8",
+            )
+
+        return self.source
+
+    def folders(self) -> list[dict]:
+        """Return every folder's fields (without children), in the order their
+        children start.
+        """
+        folders: list[dict] = []
+        f: t.TextIO = self._open()
+        start: int = f.tell()
+        try:
+            for _ in self._nodes(f, None, folders):
+                pass
+        finally:
+            if f is self.source:
+                f.seek(start)
+            else:
+                f.close()
+
+        return folders
+
+    def folder_names(self) -> list[str]:
+        """Return the name of every folder, in the order their children start."""
+        return [folder.get("name", "") for folder in self.folders()]
+
+    def __iter__(self) -> t.Iterator[StreamedNode]:
+        names: list[str] | None = None
+        if self.with_paths:
+            ## Kept for callers needing folder fields before a folder is yielded
+            self.folder_nodes = self.folders()
+            names = [folder.get("name", "") for folder in self.folder_nodes]
+
+        f: t.TextIO = self._open()
+        try:
+            yield from self._nodes(f, names)
+        finally:
+            if f is not self.source:
+                f.close()
+
+    def _nodes(
+        self,
+        f: t.TextIO,
+        names: list[str] | None,
+        collect_folders: list[dict] | None = None,
+    ) -> t.Generator[StreamedNode, None, None]:
+        tokenizer = JsonTokenizer(whole_objects_from=NODE_DEPTH)
+        assembler = NodeAssembler(names=names, collect_folders=collect_folders)
+        self.meta = assembler.meta
+
+        while chunk := f.read(self.chunk_size):
+            yield from assembler.feed(tokenizer.feed(chunk))
+        yield from assembler.feed(tokenizer.close())
+
+
+class NodeAssembler:
+    """Push-based builder turning JsonTokenizer events into StreamedNodes.
+
+    Description:
+        Accepts "object" events for nodes decoded whole, producing the same
+        StreamedNodes, in the same order, as the node's individual tokens would.
+
+    Params:
+        names (list[str] | None): Folder names from a first pass (see
+            `BookmarkStream.folder_names()`), to resolve node paths with.
+        collect_folders (list[dict] | None): If given, filled with every folder's
+            fields, in the order their children start.
+    """
+
+    def __init__(
+        self,
+        names: list[str] | None = None,
+        collect_folders: list[dict] | None = None,
+    ):
+        self.names = names
+        self.collect_folders = collect_folders
+        ## Top-level fields other than "roots"
+        self.meta: dict = {}
+
+        self._stack: list[_Frame] = []
+        self._position: int = 0
+        self._folders: int = 0
+
+    def _add_value(self, frame: _Frame, value: t.Any) -> None:
+        match frame.kind:
+            case "value":
+                if isinstance(frame.container, list):
+                    frame.container.append(value)
+                else:
+                    frame.container[frame.key] = value
+            case "node":
+                frame.container[frame.key] = value
+            case "top":
+                self.meta[frame.key] = value
+            case _:
+                log.debug(f"Skipping unexpected value in '{frame.kind}': {value!r}")
+
+    def _add_object(self, top: _Frame, obj: dict, nodes: list[StreamedNode]) -> None:
+        """Add a node decoded whole, and the nodes below it, under `top`."""
+        if top.kind != "roots" and top.kind != "children":
+            self._add_value(top, obj)
+            return
+
+        parent: _Frame | None = top.node
+        self._add_node(
+            obj,
+            nodes,
+            root=top.key if parent is None else parent.root,
+            path=top.path,
+            ancestors=top.ancestors,
+            parent=-1 if parent is None else parent.position,
+            depth=0 if parent is None else parent.depth + 1,
+        )
+
+    def _add_node(
+        self,
+        obj: dict,
+        nodes: list[StreamedNode],
+        root: str,
+        path: t.Optional[tuple[str, ...]],
+        ancestors: tuple[int, ...],
+        parent: int,
+        depth: int,
+    ) -> None:
+        position: int = self._position
+        self._position += 1
+        children = obj.pop("children", None)
+        folder: int = -1
+
+        if isinstance(children, list):
+            folder = self._folders
+            self._folders += 1
+            if self.collect_folders is not None:
+                self.collect_folders.append(obj)
+            child_path = (
+                None if self.names is None else (path or ()) + (self.names[folder],)
+            )
+            child_ancestors: tuple[int, ...] = ancestors + (folder,)
+            for child in children:
+                if isinstance(child, dict):
+                    self._add_node(
+                        child,
+                        nodes,
+                        root=root,
+                        path=child_path,
+                        ancestors=child_ancestors,
+                        parent=position,
+                        depth=depth + 1,
+                    )
+                else:
+                    log.debug(f"Skipping unexpected value in 'children': {child!r}")
+
+        nodes.append(
+            StreamedNode(
+                node=obj,
+                root=root,
+                path=None if self.names is None else (path or ()),
+                position=position,
+                parent=parent,
+                depth=depth,
+                folder=folder,
+                ancestors=ancestors,
+            )
+        )
+
+    def feed(self, events: t.Iterable[Event]) -> list[StreamedNode]:
+        """Consume parse events, returning the nodes they completed."""
+        nodes: list[StreamedNode] = []
+        stack: list[_Frame] = self._stack
+
+        for event, value in events:
+            top: _Frame | None = stack[-1] if stack else None
+
+            match event:
+                case "map_key":
+                    top.key = value
+                case "start_map":
+                    if top is None:
+                        stack.append(_Frame("top"))
+                    elif top.kind == "top" and top.key == "roots":
+                        stack.append(_Frame("roots"))
+                    elif top.kind == "roots" or top.kind == "children":
+                        parent: _Frame | None = top.node
+                        stack.append(
+                            _Frame(
+                                "node",
+                                container={},
+                                root=top.key if parent is None else parent.root,
+                                path=top.path,
+                                ancestors=top.ancestors,
+                                position=self._position,
+                                parent=-1 if parent is None else parent.position,
+                                depth=0 if parent is None else parent.depth + 1,
+                            )
+                        )
+                        self._position += 1
+                    else:
+                        stack.append(_Frame("value", container={}))
+                case "start_array":
+                    if top is not None and top.kind == "node" and top.key == "children":
+                        top.folder = self._folders
+                        self._folders += 1
+                        if self.collect_folders is not None:
+                            self.collect_folders.append(top.container)
+
+                        if self.names is None:
+                            path = None
+                        else:
+                            path = (top.path or ()) + (self.names[top.folder],)
+                        stack.append(
+                            _Frame(
+                                "children",
+                                node=top,
+                                path=path,
+                                ancestors=top.ancestors + (top.folder,),
+                            )
+                        )
+                    else:
+                        stack.append(_Frame("value", container=[]))
+                case "object":
+                    if top is None:
+                        raise StreamParseError("Bookmarks file is not a JSON object")
+                    self._add_object(top, value, nodes)
+                case "end_map" | "end_array":
+                    frame: _Frame = stack.pop()
+                    if frame.kind == "value":
+                        self._add_value(stack[-1], frame.container)
+                    elif frame.kind == "node":
+                        nodes.append(
+                            StreamedNode(
+                                node=frame.container,
+                                root=frame.root,
+                                path=None if self.names is None else (frame.path or ()),
+                                position=frame.position,
+                                parent=frame.parent,
+                                depth=frame.depth,
+                                folder=frame.folder,
+                                ancestors=frame.ancestors,
+                            )
+                        )
+                case _:
+                    if top is None:
+                        raise StreamParseError("Bookmarks file is not a JSON object")
+                    self._add_value(top, value)
+
+        return nodes
+
+
+def iter_nodes(
+    source: t.Union[str, Path, t.TextIO],
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    with_paths: bool = True,
+) -> t.Iterator[StreamedNode]:
+    """Yield every node in a Chromium Bookmarks file, see `BookmarkStream`."""
+    return iter(BookmarkStream(source, chunk_size=chunk_size, with_paths=with_paths))
@@ -0,0 +1,439 @@
+from __future__ import annotations
+
+from array import array
+import json
+import logging
+from pathlib import Path
+import typing as t
+
+log: logging.Logger = logging.getLogger(__name__)
+
+from bookmark_backup.core import compression
+from bookmark_backup.domain.stream import STREAM_CHUNK_SIZE, BookmarkStream
+
+## Node type codes, stored in BookmarkTree.types
+FOLDER: int = 0
+URL: int = 1
+NODE_TYPES: tuple[str, ...] = ("folder", "url")
+
+## Marks an absent optional value in the integer columns
+MISSING: int = -1
+## Node fields stored in their own columns. Any other fields (i.e. "meta_info") are
+#  kept as an interned JSON string per node.
+COLUMN_FIELDS: frozenset[str] = frozenset(
+    {
+        "children",
+        "date_added",
+        "date_last_used",
+        "date_modified",
+        "guid",
+        "id",
+        "name",
+        "type",
+        "url",
+    }
+)
+## GUIDs are packed into 16 bytes each; all zeroes means "no guid"
+GUID_SIZE: int = 16
+NO_GUID: bytes = bytes(GUID_SIZE)
+
+
+def _int(value: t.Any) -> int:
+    return MISSING if value is None else int(value)
+
+
+def _format_guid(raw: bytes) -> str:
+    h: str = raw.hex()
+
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+class BookmarkNode:
+    """Lightweight view of one node in a BookmarkTree."""
+
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree: BookmarkTree, index: int):
+        self.tree = tree
+        self.index = index
+
+    def __repr__(self) -> str:
+        return f"BookmarkNode(id={self.id}, type={self.type!r}, title={self.title!r})"
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, BookmarkNode)
+            and other.tree is self.tree
+            and other.index == self.index
+        )
+
+    def __hash__(self) -> int:
+        return hash((id(self.tree), self.index))
+
+    @property
+    def id(self) -> int:
+        return self.tree.ids[self.index]
+
+    @property
+    def guid(self) -> str:
+        return self.tree.guid(self.index)
+
+    @property
+    def type(self) -> str:
+        return NODE_TYPES[self.tree.types[self.index]]
+
+    @property
+    def is_folder(self) -> bool:
+        return self.tree.types[self.index] == FOLDER
+
+    @property
+    def title(self) -> str:
+        return self.tree.strings[self.tree.titles[self.index]]
+
+    @property
+    def url(self) -> str | None:
+        url_index: int = self.tree.urls[self.index]
+
+        return None if url_index == MISSING else self.tree.strings[url_index]
+
+    @property
+    def date_added(self) -> int:
+        return self.tree.date_added[self.index]
+
+    @property
+    def date_modified(self) -> int:
+        return self.tree.date_modified[self.index]
+
+    @property
+    def parent(self) -> BookmarkNode | None:
+        parent: int = self.tree.parents[self.index]
+
+        return None if parent == MISSING else BookmarkNode(self.tree, parent)
+
+    @property
+    def children(self) -> list[BookmarkNode]:
+        return [BookmarkNode(self.tree, i) for i in self.tree.child_indexes(self.index)]
+
+    @property
+    def path(self) -> tuple[str, ...]:
+        """Titles of the folders containing this node, from its root folder down."""
+        titles: list[str] = []
+        parent: int = self.tree.parents[self.index]
+        while parent != MISSING:
+            titles.append(self.tree.strings[self.tree.titles[parent]])
+            parent = self.tree.parents[parent]
+
+        return tuple(reversed(titles))
+
+    def to_dict(self) -> dict:
+        """Rebuild this node (and its children) as a Chromium Bookmarks JSON dict."""
+        return self.tree.node_dict(self.index)
+
+
+class BookmarkTree:
+    """Compact, columnar in-memory model of a Chromium Bookmarks file.
+
+    Description:
+        Node fields are stored in parallel `array` columns indexed by node position,
+        in pre-order. Titles, URLs and extra fields are interned in a shared string
+        table, and ids and timestamps are stored as integers. Nodes are accessed
+        through `BookmarkNode` views, created on demand.
+
+        Lookups by id, guid and URL build their index on first use.
+    """
+
+    def __init__(self):
+        self.ids = array("q")
+        self.parents = array("l")
+        self.types = array("b")
+        self.titles = array("l")
+        self.urls = array("l")
+        self.extras = array("l")
+        self.date_added = array("q")
+        self.date_modified = array("q")
+        self.date_last_used = array("q")
+        self.first_child = array("l")
+        self.next_sibling = array("l")
+        self.guids = bytearray()
+        ## GUIDs that are not canonical lowercase UUIDs, stored as-is
+        self.other_guids: dict[int, str] = {}
+
+        self.strings: list[str] = []
+        ## Dropped once the tree is built, and rebuilt if more nodes are added
+        self._string_index: dict[str, int] | None = {}
+
+        ## Root folder name (i.e. "bookmark_bar") -> node index
+        self.roots: dict[str, int] = {}
+        ## Top-level fields of the file other than "roots", i.e. "version"
+        self.meta: dict = {}
+
+        ## Last child appended to each folder, only needed while building
+        self._last_child: dict[int, int] = {}
+
+        self._by_id: dict[int, int] | None = None
+        self._by_guid: dict[str, int] | None = None
+        self._by_url: dict[str, list[int]] | None = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> t.Iterator[BookmarkNode]:
+        """Iterate over every node in the order added (pre-order for loaded files)."""
+        return (BookmarkNode(self, i) for i in range(len(self.ids)))
+
+    def __repr__(self) -> str:
+        return f"BookmarkTree(nodes={len(self)}, roots={list(self.roots)})"
+
+    def _add_guid(self, index: int, guid: str) -> None:
+        raw: bytes = NO_GUID
+        if guid:
+            try:
+                raw = bytes.fromhex(guid.replace("-", ""))
+            except ValueError:
+                pass
+            if len(raw) != GUID_SIZE or _format_guid(raw) != guid:
+                raw = NO_GUID
+                self.other_guids[index] = guid
+
+        start: int = index * GUID_SIZE
+        self.guids[start : start + GUID_SIZE] = raw
+
+    def guid(self, index: int) -> str:
+        start: int = index * GUID_SIZE
+        raw: bytes = bytes(self.guids[start : start + GUID_SIZE])
+        if raw == NO_GUID:
+            return self.other_guids.get(index, "")
+
+        return _format_guid(raw)
+
+    def intern(self, value: str) -> int:
+        if self._string_index is None:
+            self._string_index = {s: i for i, s in enumerate(self.strings)}
+
+        index: int | None = self._string_index.get(value)
+        if index is None:
+            index = len(self.strings)
+            self.strings.append(value)
+            self._string_index[value] = index
+
+        return index
+
+    def _grow(self, size: int) -> None:
+        """Add empty node slots up to `size` nodes."""
+        count: int = size - len(self.ids)
+        columns = (
+            self.ids,
+            self.parents,
+            self.titles,
+            self.urls,
+            self.extras,
+            self.date_added,
+            self.date_modified,
+            self.date_last_used,
+            self.first_child,
+            self.next_sibling,
+        )
+        if count == 1:
+            for column in columns:
+                column.append(MISSING)
+            self.types.append(URL)
+        else:
+            for column in columns:
+                column.extend(array(column.typecode, [MISSING]) * count)
+            self.types.extend(array("b", [URL]) * count)
+        self.guids += NO_GUID * count
+
+    def add_node(
+        self, node: dict, parent: int = MISSING, index: int | None = None
+    ) -> int:
+        """Add a node's own fields (not its children) as the last child of `parent`.
+
+        Description:
+            Nodes are appended by default. Passing `index` fills that slot instead,
+            so nodes can be added out of order (i.e. a folder after its children,
+            as BookmarkStream yields them) while keeping pre-order positions.
+
+        Returns:
+            (int): The node's index.
+
+        """
+        if index is None:
+            index = len(self.ids)
+        if index >= len(self.ids):
+            self._grow(index + 1)
+
+        self.ids[index] = int(node.get("id", 0))
+        self.parents[index] = parent
+        self.types[index] = FOLDER if node.get("type") == "folder" else URL
+        self.titles[index] = self.intern(node.get("name", ""))
+        self.urls[index] = self.intern(node["url"]) if "url" in node else MISSING
+        self.date_added[index] = _int(node.get("date_added"))
+        self.date_modified[index] = _int(node.get("date_modified"))
+        self.date_last_used[index] = _int(node.get("date_last_used"))
+        self._add_guid(index, node.get("guid", ""))
+
+        extra: dict = {k: v for k, v in node.items() if k not in COLUMN_FIELDS}
+        self.extras[index] = (
+            self.intern(json.dumps(extra, sort_keys=True)) if extra else MISSING
+        )
+
+        if parent != MISSING:
+            previous: int | None = self._last_child.get(parent)
+            if previous is None:
+                ## Dropped by finish(), find the last child the slow way
+                for previous in self.child_indexes(parent):
+                    pass
+            if previous is None:
+                self.first_child[parent] = index
+            else:
+                self.next_sibling[previous] = index
+            self._last_child[parent] = index
+
+        self._by_id = self._by_guid = self._by_url = None
+
+        return index
+
+    def finish(self) -> BookmarkTree:
+        """Drop the bookkeeping only needed while adding nodes."""
+        self._last_child = {}
+        self._string_index = None
+
+        return self
+
+    @classmethod
+    def from_dict(cls, data: dict) -> BookmarkTree:
+        tree = cls()
+        tree.meta = {k: v for k, v in data.items() if k != "roots"}
+
+        for name, root in data.get("roots", {}).items():
+            ## (node, parent index), children pushed in reverse to keep pre-order
+            stack: list[tuple[dict, int]] = [(root, MISSING)]
+            while stack:
+                node, parent = stack.pop()
+                index = tree.add_node(node, parent=parent)
+                if parent == MISSING:
+                    tree.roots[name] = index
+
+                stack.extend(
+                    (child, index) for child in reversed(node.get("children", []))
+                )
+
+        return tree.finish()
+
+    @classmethod
+    def from_stream(
+        cls, source: t.Union[str, Path, t.TextIO], chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> BookmarkTree:
+        """Build a tree from a BookmarkStream, without loading the whole file."""
+        tree = cls()
+        stream = BookmarkStream(source, chunk_size=chunk_size, with_paths=False)
+        for streamed in stream:
+            tree.add_node(
+                streamed.node, parent=streamed.parent, index=streamed.position
+            )
+            if streamed.parent == MISSING:
+                tree.roots[streamed.root] = streamed.position
+        tree.meta = stream.meta
+
+        ## Root folders are yielded after their children, restore the file's order
+        tree.roots = dict(sorted(tree.roots.items(), key=lambda item: item[1]))
+
+        return tree.finish()
+
+    @classmethod
+    def load(cls, path: t.Union[str, Path], stream: bool = False) -> BookmarkTree:
+        """Load a (optionally compressed) Chromium Bookmarks file.
+
+        Params:
+            path (str | Path): Path to the Bookmarks file.
+            stream (bool): Read the file in chunks with BookmarkStream instead of
+                parsing it whole with `json.load`. Slower, but memory use is bounded
+                by the tree itself rather than the file's size.
+
+        """
+        if stream:
+            return cls.from_stream(path)
+
+        with compression.open_decompressed(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def node(self, index: int) -> BookmarkNode:
+        return BookmarkNode(self, index)
+
+    def root(self, name: str) -> BookmarkNode:
+        return BookmarkNode(self, self.roots[name])
+
+    def child_indexes(self, index: int) -> t.Iterator[int]:
+        child: int = self.first_child[index]
+        while child != MISSING:
+            yield child
+            child = self.next_sibling[child]
+
+    def get(self, node_id: int) -> BookmarkNode | None:
+        """Return the node with Chromium id `node_id`."""
+        if self._by_id is None:
+            self._by_id = {id_: i for i, id_ in enumerate(self.ids)}
+
+        index: int | None = self._by_id.get(int(node_id))
+
+        return None if index is None else BookmarkNode(self, index)
+
+    def get_by_guid(self, guid: str) -> BookmarkNode | None:
+        if self._by_guid is None:
+            self._by_guid = {}
+            for i in range(len(self.ids)):
+                node_guid: str = self.guid(i)
+                if node_guid:
+                    self._by_guid[node_guid] = i
+
+        index: int | None = self._by_guid.get(guid)
+
+        return None if index is None else BookmarkNode(self, index)
+
+    def find_url(self, url: str) -> list[BookmarkNode]:
+        """Return every bookmark pointing at exactly `url`."""
+        if self._by_url is None:
+            self._by_url = {}
+            for i, url_index in enumerate(self.urls):
+                if url_index != MISSING:
+                    self._by_url.setdefault(self.strings[url_index], []).append(i)
+
+        return [BookmarkNode(self, i) for i in self._by_url.get(url, [])]
+
+    def node_dict(self, index: int) -> dict:
+        """Rebuild node `index` and its children as a Chromium Bookmarks JSON dict."""
+        node: dict = {}
+        if self.types[index] == FOLDER:
+            node["children"] = [
+                self.node_dict(child) for child in self.child_indexes(index)
+            ]
+
+        for key, column in (
+            ("date_added", self.date_added),
+            ("date_last_used", self.date_last_used),
+            ("date_modified", self.date_modified),
+        ):
+            if column[index] != MISSING:
+                node[key] = str(column[index])
+
+        guid: str = self.guid(index)
+        if guid:
+            node["guid"] = guid
+        node["id"] = str(self.ids[index])
+        if self.extras[index] != MISSING:
+            node.update(json.loads(self.strings[self.extras[index]]))
+        node["name"] = self.strings[self.titles[index]]
+        node["type"] = NODE_TYPES[self.types[index]]
+        if self.urls[index] != MISSING:
+            node["url"] = self.strings[self.urls[index]]
+
+        return node
+
+    def to_dict(self) -> dict:
+        """Rebuild the whole file as a Chromium Bookmarks JSON dict."""
+        data: dict = dict(self.meta)
+        data["roots"] = {
+            name: self.node_dict(index) for name, index in self.roots.items()
+        }
+
+        return data
@@ -1,4 +1,11 @@
 from __future__ import annotations
 
+from .cache import CrawlCache
 from .controllers import Finder
-from .methods import get_browser_bookmarks_filepath, load_bookmarks_filepaths
+from .index import NameIndex
+from .methods import (
+    get_browser_bookmarks_filepath,
+    get_browser_profiles,
+    load_bookmarks_filepaths,
+)
+from .path_table import BrowserPathTable, get_path_table
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+import sqlite3
+import threading
+from typing import List, Optional, Tuple, Union
+
+log = logging.getLogger(__name__)
+
+CRAWL_CACHE_FILENAME: str = "crawl_cache.sqlite3"
+
+
+def default_cache_path() -> Path:
+    """Return the default crawl cache location, under `$XDG_CACHE_HOME` or `~/.cache`."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+
+    return Path(cache_home) / "bookmark-backup" / CRAWL_CACHE_FILENAME
+
+
+class CachedEntry:
+    """Stand-in for `os.DirEntry` rebuilt from the crawl cache."""
+
+    __slots__ = ("name", "path", "_is_dir", "_is_file", "_is_symlink")
+
+    def __init__(
+        self, dir_path: str, name: str, is_dir: bool, is_file: bool, is_symlink: bool
+    ):
+        self.name = name
+        self.path = os.path.join(dir_path, name)
+        self._is_dir = is_dir
+        self._is_file = is_file
+        self._is_symlink = is_symlink
+
+    def __repr__(self) -> str:
+        return f"<CachedEntry '{self.name}'>"
+
+    def __fspath__(self) -> str:
+        return self.path
+
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        if self._is_symlink and follow_symlinks:
+            return os.path.isdir(self.path)
+
+        return self._is_dir
+
+    def is_file(self, follow_symlinks: bool = True) -> bool:
+        if self._is_symlink and follow_symlinks:
+            return os.path.isfile(self.path)
+
+        return self._is_file
+
+    def is_symlink(self) -> bool:
+        return self._is_symlink
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        return os.stat(self.path, follow_symlinks=follow_symlinks)
+
+
+class CrawlCache:
+    """Persistent cache of directory listings, keyed by each directory's mtime.
+
+    Description:
+        A directory's mtime changes whenever an entry is added, removed or renamed
+        in it. Crawls that use the cache `stat` each directory and only re-scan the
+        ones whose mtime differs from the cached listing, which is much cheaper than
+        `scandir` on large or network filesystems.
+
+        Safe to share between the threads of a parallel crawl. Call `save()` (or
+        use the cache as a context manager) to persist updated listings.
+    """
+
+    def __init__(self, path: Union[str, Path, None] = None):
+        self.path: Path = Path(path).expanduser() if path else default_cache_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, entries TEXT NOT NULL)"
+        )
+
+        ## Cached listings, loaded from the database in one query on first use
+        self._rows: Optional[dict[str, Tuple[int, str]]] = None
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __enter__(self) -> CrawlCache:
+        return self
+
+    def __exit__(self, exc_type, exc_val, traceback):
+        self.close()
+
+        return False
+
+    def scan(self, dir_path: str) -> List[os.DirEntry]:
+        """List a directory, from the cache if its mtime is unchanged.
+
+        Raises:
+            OSError: If the directory cannot be read.
+
+        """
+        mtime_ns: int = os.stat(dir_path).st_mtime_ns
+
+        with self._lock:
+            row: Optional[Tuple[int, str]] = self._load().get(dir_path)
+
+        if row is not None and row[0] == mtime_ns:
+            self.hits += 1
+            return [
+                CachedEntry(
+                    dir_path, name, bool(flags & 1), bool(flags & 2), bool(flags & 4)
+                )
+                for name, flags in json.loads(row[1])
+            ]
+
+        self.misses += 1
+        with os.scandir(dir_path) as it:
+            entries: List[os.DirEntry] = list(it)
+
+        listing: list[tuple[str, int]] = []
+        for entry in entries:
+            try:
+                flags: int = (
+                    entry.is_dir(follow_symlinks=False)
+                    | entry.is_file(follow_symlinks=False) << 1
+                    | entry.is_symlink() << 2
+                )
+            except OSError:
+                continue
+            listing.append((entry.name, flags))
+
+        with self._lock:
+            if row is not None:
+                ## Forget the listings of subdirectories that no longer exist
+                current = {name for name, _ in listing}
+                for name, flags in json.loads(row[1]):
+                    if flags & 1 and name not in current:
+                        self._invalidate(os.path.join(dir_path, name))
+
+            new_row = (mtime_ns, json.dumps(listing, separators=(",", ":")))
+            self._rows[dir_path] = new_row
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dirs (path, mtime_ns, entries) VALUES (?, ?, ?)",
+                (dir_path, *new_row),
+            )
+
+        return entries
+
+    def _load(self) -> dict[str, Tuple[int, str]]:
+        if self._rows is None:
+            self._rows = {
+                path: (mtime_ns, entries)
+                for path, mtime_ns, entries in self._conn.execute(
+                    "SELECT path, mtime_ns, entries FROM dirs"
+                )
+            }
+
+        return self._rows
+
+    def _invalidate(self, path: str) -> None:
+        prefix: str = path.rstrip(os.sep) + os.sep
+        if self._rows is not None:
+            for cached_path in [
+                p for p in self._rows if p == path or p.startswith(prefix)
+            ]:
+                del self._rows[cached_path]
+        self._conn.execute(
+            "DELETE FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?",
+            (path, len(prefix), prefix),
+        )
+
+    def invalidate(self, path: Union[str, Path, None] = None) -> None:
+        """Drop cached listings for `path` and everything below it, or for all paths."""
+        with self._lock:
+            if path is None:
+                self._rows = {}
+                self._conn.execute("DELETE FROM dirs")
+            else:
+                self._invalidate(str(Path(path).expanduser()))
+            self._conn.commit()
+
+    def save(self) -> None:
+        with self._lock:
+            self._conn.commit()
+
+    def close(self) -> None:
+        self.save()
+        self._conn.close()
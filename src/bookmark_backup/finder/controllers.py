@@ -1,26 +1,87 @@
 from __future__ import annotations
 
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass
+from fnmatch import fnmatch, fnmatchcase
 import logging
 import os
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 
 log = logging.getLogger(__name__)
 
+from .cache import CachedEntry, CrawlCache
+from .index import NameIndex
+
+## Directory names skipped while crawling. Browser profiles contain large cache trees
+#  that never hold a bookmarks file.
+DEFAULT_SKIP_DIRS: frozenset[str] = frozenset(
+    {
+        ".cache",
+        "__pycache__",
+        "Cache",
+        "CacheStorage",
+        "Code Cache",
+        "DawnCache",
+        "GPUCache",
+        "GrShaderCache",
+        "ShaderCache",
+    }
+)
+## Default number of threads used by Finder.walk_parallel()
+DEFAULT_CRAWL_WORKERS: int = 8
+
 
 class Finder:
-    def __init__(self, path: str):
-        """Initialize the DirectoryController with a directory path."""
+    def __init__(
+        self,
+        path: str,
+        max_depth: Optional[int] = None,
+        include: Optional[Iterable[str]] = None,
+        exclude: Optional[Iterable[str]] = None,
+        skip_dirs: Iterable[str] = DEFAULT_SKIP_DIRS,
+        follow_symlinks: bool = False,
+        cache: Optional[CrawlCache] = None,
+    ):
+        """Initialize the DirectoryController with a directory path.
+
+        Args:
+            path (str): The directory to crawl.
+            max_depth (int | None): How many directory levels below `path` to descend.
+                `0` only lists `path` itself, `None` is unlimited.
+            include (Iterable[str] | None): Glob patterns; only files whose name
+                matches one of them are returned.
+            exclude (Iterable[str] | None): Glob patterns; files and directories whose
+                name matches one of them are skipped, and excluded directories are not
+                descended into.
+            skip_dirs (Iterable[str]): Directory names never descended into, i.e. caches.
+            follow_symlinks (bool): Descend into symlinked directories. Directories
+                already visited are skipped, so symlink loops are not followed.
+            cache (CrawlCache | None): Reuse the cached listing of directories whose
+                mtime has not changed since the last crawl.
+
+        """
         self.path = Path(path)
         self.files: List[Path] = []
         self.dirs: List[Path] = []
+        ## Built on demand by build_index()
+        self.index: Optional[NameIndex] = None
+
+        self.max_depth = max_depth
+        self.include: list[str] = list(include or [])
+        self.exclude: list[str] = list(exclude or [])
+        self.skip_dirs: frozenset[str] = frozenset(skip_dirs)
+        self.follow_symlinks = follow_symlinks
+        self.cache = cache
 
         self.logger = log.getChild("Finder")
 
     def __enter__(self):
         self.crawl_directory()
 
+        return self
+
     def __exit__(self, exc_type, exc_val, traceback):
         if exc_val:
             self.logger.error(f"({exc_type}): {exc_val}")
@@ -29,36 +90,289 @@ class Finder:
 
         return True
 
-    def crawl_directory(self) -> None:
-        """Recursively crawl the directory and populate files and dirs lists."""
+    def _excluded(self, name: str) -> bool:
+        return any(fnmatch(name, pattern) for pattern in self.exclude)
+
+    def _included(self, name: str) -> bool:
+        return not self.include or any(
+            fnmatch(name, pattern) for pattern in self.include
+        )
+
+    def _scan(self, dir_path: str) -> list[os.DirEntry]:
+        """List a directory's entries, or an empty list if it cannot be read."""
+        try:
+            if self.cache is not None:
+                return self.cache.scan(dir_path)
+
+            with os.scandir(dir_path) as it:
+                return list(it)
+        except OSError as exc:
+            self.logger.debug(f"Skipping unreadable directory '{dir_path}': {exc}")
+
+            return []
+
+    def _filter(
+        self,
+        entries: list[os.DirEntry | CachedEntry],
+        depth: int,
+        visited: set[tuple[int, int]],
+    ) -> tuple[list[os.DirEntry], list[str]]:
+        """Apply the crawl rules to a directory's entries.
+
+        Returns:
+            (tuple[list[os.DirEntry], list[str]]): The entries to yield, and the paths
+                of the subdirectories to descend into.
+
+        """
+        matches: list[os.DirEntry] = []
+        subdirs: list[str] = []
+
+        for entry in entries:
+            if self._excluded(entry.name):
+                continue
+
+            try:
+                is_dir: bool = entry.is_dir(follow_symlinks=self.follow_symlinks)
+            except OSError:
+                continue
+
+            if is_dir:
+                if entry.name in self.skip_dirs:
+                    continue
+
+                if self.follow_symlinks:
+                    entry_stat = entry.stat()
+                    inode = (entry_stat.st_dev, entry_stat.st_ino)
+                    if inode in visited:
+                        continue
+                    visited.add(inode)
+
+                matches.append(entry)
+
+                if self.max_depth is None or depth < self.max_depth:
+                    subdirs.append(entry.path)
+            elif entry.is_file() and self._included(entry.name):
+                matches.append(entry)
+
+        return matches, subdirs
+
+    def _root_visited(self) -> set[tuple[int, int]]:
         if not self.path.is_dir():
             raise ValueError(f"{self.path} is not a valid directory.")
 
-        for entry in os.scandir(self.path):
-            entry_path = Path(entry.path)
+        visited: set[tuple[int, int]] = set()
+        if self.follow_symlinks:
+            root_stat = self.path.stat()
+            visited.add((root_stat.st_dev, root_stat.st_ino))
+
+        return visited
+
+    def walk(self, stop_at: Optional[str] = None) -> Iterator[os.DirEntry]:
+        """Lazily yield the directory entries below `self.path`.
+
+        Description:
+            Walks the tree iteratively with `os.scandir`, so deep trees cannot hit
+            the recursion limit and nothing is collected in memory. Directories are
+            yielded before their contents. Directories that cannot be read are
+            logged and skipped.
+
+        Args:
+            stop_at (str | None): Stop walking after yielding the first file with
+                this name, i.e. "Bookmarks".
+
+        Yields:
+            os.DirEntry: Each matching file and directory entry.
+
+        """
+        visited: set[tuple[int, int]] = self._root_visited()
+
+        ## Stack of (directory path, depth of its entries)
+        stack: list[tuple[str, int]] = [(str(self.path), 0)]
+        while stack:
+            dir_path, depth = stack.pop()
+            matches, subdirs = self._filter(self._scan(dir_path), depth, visited)
+
+            for entry in matches:
+                yield entry
+
+                if stop_at is not None and entry.name == stop_at and entry.is_file():
+                    return
+
+            ## Push in reverse so directories are walked in scandir order
+            stack.extend((subdir, depth + 1) for subdir in reversed(subdirs))
 
-            if entry.is_dir():
-                self.dirs.append(entry_path)
-                # Recursively crawl into subdirectories
-                sub_controller = Finder(entry_path)
-                sub_controller.crawl_directory()
-                self.files.extend(sub_controller.files)
-                self.dirs.extend(sub_controller.dirs)
-            elif entry.is_file():
-                self.files.append(entry_path)
+    def walk_parallel(
+        self,
+        workers: int = DEFAULT_CRAWL_WORKERS,
+        ordered: bool = False,
+        stop_at: Optional[str] = None,
+    ) -> Iterator[os.DirEntry]:
+        """Yield the same entries as `walk()`, scanning directories on a thread pool.
 
-    def search_in_names(self, text: str) -> Tuple[List[Path], List[Path]]:
+        Description:
+            Sibling subtrees are scanned concurrently, which hides `scandir` latency
+            on network filesystems (SMB/NFS). At most `workers * 4` directory scans
+            are queued at once, the rest wait in a pending list.
+
+        Args:
+            workers (int): Number of threads scanning directories.
+            ordered (bool): Yield entries sorted by path instead of in completion
+                order. The whole result set is collected before yielding.
+            stop_at (str | None): Stop after yielding the first file with this name.
+
+        Yields:
+            os.DirEntry: Each matching file and directory entry.
+
+        """
+        if ordered:
+            entries = sorted(
+                self.walk_parallel(workers=workers, stop_at=stop_at),
+                key=lambda entry: entry.path,
+            )
+            yield from entries
+            return
+
+        visited: set[tuple[int, int]] = self._root_visited()
+        max_in_flight: int = max(1, workers) * 4
+
+        pending: deque[tuple[str, int]] = deque([(str(self.path), 0)])
+        in_flight: dict[Future, int] = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            try:
+                while pending or in_flight:
+                    while pending and len(in_flight) < max_in_flight:
+                        dir_path, depth = pending.popleft()
+                        in_flight[pool.submit(self._scan, dir_path)] = depth
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        depth = in_flight.pop(future)
+                        matches, subdirs = self._filter(future.result(), depth, visited)
+
+                        for entry in matches:
+                            yield entry
+
+                            if (
+                                stop_at is not None
+                                and entry.name == stop_at
+                                and entry.is_file()
+                            ):
+                                return
+
+                        pending.extend((subdir, depth + 1) for subdir in subdirs)
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+    def find(self, name: str) -> Optional[Path]:
+        """Return the first file named `name` below `self.path`, or None."""
+        for entry in self.walk(stop_at=name):
+            if entry.name == name and not entry.is_dir(
+                follow_symlinks=self.follow_symlinks
+            ):
+                return Path(entry.path)
+
+        return None
+
+    def crawl_directory(self, workers: Optional[int] = None) -> None:
+        """Crawl the directory and populate files and dirs lists.
+
+        Args:
+            workers (int | None): Scan directories on this many threads, see
+                `walk_parallel()`. Crawls serially when `None` or `1`.
+
+        """
+        self.index = None
+
+        if workers is not None and workers > 1:
+            entries: Iterable[os.DirEntry] = self.walk_parallel(workers=workers)
+        else:
+            entries = self.walk()
+
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=self.follow_symlinks):
+                self.dirs.append(Path(entry.path))
+            else:
+                self.files.append(Path(entry.path))
+
+    def build_index(self) -> NameIndex:
+        """Index the crawled file and directory names for repeated searches.
+
+        Description:
+            Once built, `search_in_names()`, `search_prefix()` and `search_glob()`
+            use the index instead of scanning every crawled path. The index is
+            dropped when the directory is crawled again.
+
+        Returns:
+            NameIndex: The index, also stored as `self.index`.
+
+        """
+        self.index = NameIndex(files=self.files, dirs=self.dirs)
+
+        return self.index
+
+    def search_in_names(
+        self, text: str, ignore_case: bool = False
+    ) -> Tuple[List[Path], List[Path]]:
         """Search for the specified text in file and directory names.
 
         Args:
             text (str): The text to search for in names.
+            ignore_case (bool): Match regardless of case.
 
         Returns:
             Tuple[List[Path], List[Path]]: Lists of matching files and directories.
 
         """
-        matched_files = [file for file in self.files if text in file.name]
-        matched_dirs = [dir for dir in self.dirs if text in dir.name]
+        if self.index is not None:
+            return self.index.substring(text, ignore_case=ignore_case)
+
+        if ignore_case:
+            text = text.lower()
+            matched_files = [file for file in self.files if text in file.name.lower()]
+            matched_dirs = [dir for dir in self.dirs if text in dir.name.lower()]
+        else:
+            matched_files = [file for file in self.files if text in file.name]
+            matched_dirs = [dir for dir in self.dirs if text in dir.name]
+
+        return matched_files, matched_dirs
+
+    def search_prefix(
+        self, text: str, ignore_case: bool = False
+    ) -> Tuple[List[Path], List[Path]]:
+        """Search for file and directory names starting with the specified text."""
+        if self.index is not None:
+            return self.index.prefix(text, ignore_case=ignore_case)
+
+        return self._search_linear(
+            lambda name: (
+                name.lower().startswith(text.lower())
+                if ignore_case
+                else name.startswith(text)
+            )
+        )
+
+    def search_glob(
+        self, pattern: str, ignore_case: bool = False
+    ) -> Tuple[List[Path], List[Path]]:
+        """Search for file and directory names matching a glob pattern, i.e. "Profile *"."""
+        if self.index is not None:
+            return self.index.glob(pattern, ignore_case=ignore_case)
+
+        return self._search_linear(
+            lambda name: (
+                fnmatchcase(name.lower(), pattern.lower())
+                if ignore_case
+                else fnmatchcase(name, pattern)
+            )
+        )
+
+    def _search_linear(
+        self, predicate: Callable[[str], bool]
+    ) -> Tuple[List[Path], List[Path]]:
+        matched_files = [file for file in self.files if predicate(file.name)]
+        matched_dirs = [dir for dir in self.dirs if predicate(dir.name)]
 
         return matched_files, matched_dirs
 
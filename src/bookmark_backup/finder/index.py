@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from fnmatch import fnmatchcase
+import logging
+from pathlib import Path
+import re
+from typing import Iterable, List, Optional, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+## Characters that start a wildcard in a glob pattern
+GLOB_WILDCARDS = re.compile(r"[*?\[]")
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class NameIndex:
+    """Index of file and directory names for fast repeated name searches.
+
+    Description:
+        Paths are grouped by name, so each query works on the (usually much smaller)
+        set of distinct names rather than every path. Lowercased names are indexed
+        by trigram for substring queries and kept sorted for prefix queries, so a
+        query costs roughly the size of its result. Matches are returned in the
+        order the paths were crawled, the same as an unindexed search.
+    """
+
+    def __init__(self, files: Iterable[Path], dirs: Iterable[Path]):
+        self._files: List[Path] = list(files)
+        self._dirs: List[Path] = list(dirs)
+        ## name -> (positions of matching files, positions of matching dirs)
+        self._paths: dict[str, Tuple[List[int], List[int]]] = {}
+        for position, file in enumerate(self._files):
+            self._paths.setdefault(file.name, ([], []))[0].append(position)
+        for position, dir in enumerate(self._dirs):
+            self._paths.setdefault(dir.name, ([], []))[1].append(position)
+
+        ## lowercased name -> names
+        self._lower: dict[str, List[str]] = {}
+        for name in self._paths:
+            self._lower.setdefault(name.lower(), []).append(name)
+        self._sorted_lower: List[str] = sorted(self._lower)
+
+        ## trigram -> lowercased names containing it
+        self._trigrams: dict[str, Set[str]] = {}
+        for lower in self._lower:
+            for trigram in _trigrams(lower):
+                self._trigrams.setdefault(trigram, set()).add(lower)
+
+        log.debug(
+            f"Indexed {len(self._paths)} distinct names, {len(self._trigrams)} trigrams"
+        )
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def _collect(self, names: Iterable[str]) -> Tuple[List[Path], List[Path]]:
+        file_positions: List[int] = []
+        dir_positions: List[int] = []
+        for name in names:
+            files, dirs = self._paths[name]
+            file_positions.extend(files)
+            dir_positions.extend(dirs)
+
+        ## Back into crawl order
+        return (
+            [self._files[i] for i in sorted(file_positions)],
+            [self._dirs[i] for i in sorted(dir_positions)],
+        )
+
+    def _candidates(self, text: str) -> Optional[Set[str]]:
+        """Return the lowercased names that may contain `text`, or None if any may."""
+        trigrams = _trigrams(text.lower())
+        if not trigrams:
+            return None
+
+        ## Intersect starting from the rarest trigram
+        postings = sorted(
+            (self._trigrams.get(trigram, set()) for trigram in trigrams), key=len
+        )
+        candidates: Set[str] = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                break
+
+        return candidates
+
+    def _names(self, lowers: Iterable[str]) -> Iterable[str]:
+        for lower in lowers:
+            yield from self._lower[lower]
+
+    def substring(
+        self, text: str, ignore_case: bool = False
+    ) -> Tuple[List[Path], List[Path]]:
+        """Return files and directories whose name contains `text`."""
+        candidates = self._candidates(text)
+        lowers = self._lower.keys() if candidates is None else candidates
+
+        if ignore_case:
+            needle = text.lower()
+            names = (name for name in self._names(lowers) if needle in name.lower())
+        else:
+            names = (name for name in self._names(lowers) if text in name)
+
+        return self._collect(names)
+
+    def _prefixed(self, text: str) -> List[str]:
+        """Return the lowercased names that start with `text`, ignoring case."""
+        needle = text.lower()
+        lowers: List[str] = []
+        for i in range(
+            bisect_left(self._sorted_lower, needle), len(self._sorted_lower)
+        ):
+            if not self._sorted_lower[i].startswith(needle):
+                break
+            lowers.append(self._sorted_lower[i])
+
+        return lowers
+
+    def prefix(
+        self, text: str, ignore_case: bool = False
+    ) -> Tuple[List[Path], List[Path]]:
+        """Return files and directories whose name starts with `text`."""
+        names = self._names(self._prefixed(text))
+        if not ignore_case:
+            names = (name for name in names if name.startswith(text))
+
+        return self._collect(names)
+
+    def glob(
+        self, pattern: str, ignore_case: bool = False
+    ) -> Tuple[List[Path], List[Path]]:
+        """Return files and directories whose name matches the glob `pattern`.
+
+        Description:
+            Candidates are narrowed with the pattern's literal prefix (sorted names)
+            or its longest literal chunk (trigrams) before matching each name.
+        """
+        literal_prefix: str = GLOB_WILDCARDS.split(pattern, maxsplit=1)[0]
+        if literal_prefix == pattern:
+            ## No wildcards, this is an exact name lookup
+            lowers: Iterable[str] = (
+                [pattern.lower()] if pattern.lower() in self._lower else []
+            )
+        elif literal_prefix:
+            lowers = self._prefixed(literal_prefix)
+        else:
+            chunks = [
+                chunk
+                for chunk in re.split(r"\[[^\]]*\]|[*?]", pattern)
+                if len(chunk) >= 3
+            ]
+            candidates = self._candidates(max(chunks, key=len)) if chunks else None
+            lowers = self._lower.keys() if candidates is None else candidates
+
+        if ignore_case:
+            pattern = pattern.lower()
+            names = (
+                name
+                for name in self._names(lowers)
+                if fnmatchcase(name.lower(), pattern)
+            )
+        else:
+            names = (name for name in self._names(lowers) if fnmatchcase(name, pattern))
+
+        return self._collect(names)
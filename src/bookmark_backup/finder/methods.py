@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 import logging
+import os
 from pathlib import Path
 
 log = logging.getLogger(__name__)
@@ -9,6 +10,8 @@ log = logging.getLogger(__name__)
 from bookmark_backup.core.constants import supported_browsers, supported_os_types
 from bookmark_backup.core.validators import validate_browser, validate_os_type
 
+from .path_table import DEFAULT_PROFILE, get_path_table
+
 CWD: Path = Path(__file__).parent
 BOOKMARKS_FILE_PATH_JSON: Path = CWD / "bookmarks_file_paths.json"
 
@@ -23,14 +26,46 @@ def load_bookmarks_filepaths() -> dict:
     return _dict
 
 
-def get_browser_bookmarks_filepath(os_type: str, browser: str) -> str:
+def get_browser_bookmarks_filepath(
+    os_type: str, browser: str, profile: str = DEFAULT_PROFILE
+) -> str:
     os_type = validate_os_type(os_type)
     browser = validate_browser(browser)
 
-    bookmarks_filepaths = load_bookmarks_filepaths()
-
-    bookmarks_file_path = Path(bookmarks_filepaths[os_type][browser]["bookmarks_file"])
-    if "~" in str(bookmarks_file_path):
-        bookmarks_file_path = bookmarks_file_path.expanduser()
+    bookmarks_file_path: Path = get_path_table(BOOKMARKS_FILE_PATH_JSON).resolve(
+        os_type=os_type, browser=browser, profile=profile
+    )
 
     return str(bookmarks_file_path)
+
+
+def get_browser_profiles(os_type: str, browser: str) -> list[str]:
+    """Find a browser's profile directories that contain a bookmarks file.
+
+    Description:
+        Chromium-based browsers keep the first profile in "Default" and any
+        additional profiles in "Profile 1", "Profile 2", ... next to it.
+
+    Returns:
+        (list[str]): Names of the profile directories, i.e. ["Default", "Profile 1"].
+
+    """
+    default_file = Path(
+        get_browser_bookmarks_filepath(os_type=os_type, browser=browser)
+    )
+    user_data_dir: Path = default_file.parent.parent
+
+    if not user_data_dir.is_dir():
+        log.debug(f"No user data directory found for [{browser}] at '{user_data_dir}'")
+        return []
+
+    profiles: list[str] = []
+    for entry in sorted(os.scandir(user_data_dir), key=lambda e: e.name):
+        if not entry.is_dir():
+            continue
+        if entry.name != DEFAULT_PROFILE and not entry.name.startswith("Profile "):
+            continue
+        if (Path(entry.path) / default_file.name).is_file():
+            profiles.append(entry.name)
+
+    return profiles
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import json
+import logging
+import os
+from pathlib import Path
+import re
+import threading
+import time
+from types import MappingProxyType
+import typing as t
+
+log = logging.getLogger(__name__)
+
+## Name of the profile directory the paths in the path table JSON point to
+DEFAULT_PROFILE: str = "Default"
+## Minimum number of seconds between checks of the JSON file's mtime
+PATH_TABLE_CHECK_INTERVAL: float = 2.0
+## Environment variables in a path, i.e. `%LOCALAPPDATA%`, `$HOME` or `${HOME}`
+_ENV_VAR_PATTERN = re.compile(r"%(\w+)%|\$\{?(\w+)")
+
+
+def expand_path(path: str) -> Path:
+    """Expand `~` and environment variables (i.e. `%LOCALAPPDATA%`, `$HOME`) in a path."""
+    return Path(os.path.expandvars(os.path.expanduser(path)))
+
+
+def expansion_environment(env_vars: t.Iterable[str]) -> tuple[str | None, ...]:
+    """Return the home directory and the values of `env_vars`, which paths expand to."""
+    return (os.path.expanduser("~"), *(os.environ.get(name) for name in env_vars))
+
+
+@dataclass(frozen=True)
+class BrowserPathTable:
+    """Immutable, indexed lookup of browser bookmarks file paths.
+
+    Description:
+        Paths are loaded from the JSON file once and expanded up front, keyed by
+        `(os_type, browser)`. Lookups for other profiles are derived from the
+        "Default" profile's path and memoized. The table is stale once the home
+        directory or a variable its paths use changes, i.e. in a `serve` server
+        running a command with a client's environment.
+    """
+
+    source: Path
+    mtime_ns: int
+    paths: t.Mapping[tuple[str, str], Path]
+    ## Environment variables used by the paths, and the environment they expanded in
+    env_vars: tuple[str, ...] = ()
+    environment: tuple[str | None, ...] = ()
+    _profile_paths: dict[tuple[str, str, str], Path] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+
+    @classmethod
+    def load(cls, source: t.Union[str, Path]) -> BrowserPathTable:
+        source = Path(source)
+        log.debug(f"Loading browser path table from '{source}'")
+
+        with open(source, "r") as f:
+            mtime_ns: int = os.fstat(f.fileno()).st_mtime_ns
+            data: dict = json.load(f)
+
+        raw_paths: dict[tuple[str, str], str] = {
+            (os_type, browser): entry["bookmarks_file"]
+            for os_type, browsers in data.items()
+            for browser, entry in browsers.items()
+        }
+        env_vars: tuple[str, ...] = tuple(
+            sorted(
+                {
+                    "".join(match)
+                    for path in raw_paths.values()
+                    for match in _ENV_VAR_PATTERN.findall(path)
+                }
+            )
+        )
+        paths: dict[tuple[str, str], Path] = {
+            key: expand_path(path) for key, path in raw_paths.items()
+        }
+
+        return cls(
+            source=source,
+            mtime_ns=mtime_ns,
+            paths=MappingProxyType(paths),
+            env_vars=env_vars,
+            environment=expansion_environment(env_vars),
+        )
+
+    def expanded_here(self) -> bool:
+        """True if the paths expanded in the current home directory and environment."""
+        return self.environment == expansion_environment(self.env_vars)
+
+    def is_stale(self) -> bool:
+        if not self.expanded_here():
+            return True
+        try:
+            return self.source.stat().st_mtime_ns != self.mtime_ns
+        except FileNotFoundError:
+            return False
+
+    def resolve(
+        self, os_type: str, browser: str, profile: str = DEFAULT_PROFILE
+    ) -> Path:
+        """Return the bookmarks file path for a browser profile.
+
+        Raises:
+            KeyError: If the OS type/browser pair is not in the table.
+
+        """
+        key: tuple[str, str, str] = (os_type, browser, profile)
+        try:
+            return self._profile_paths[key]
+        except KeyError:
+            pass
+
+        path: Path = self.paths[(os_type, browser)]
+        if profile != DEFAULT_PROFILE:
+            ## Profiles are sibling directories of "Default" in the browser's user data dir
+            path = path.parent.parent / profile / path.name
+
+        self._profile_paths[key] = path
+
+        return path
+
+
+_path_table: BrowserPathTable | None = None
+_path_table_checked: float = 0.0
+_path_table_lock = threading.Lock()
+
+
+def get_path_table(
+    source: t.Union[str, Path], refresh: bool = False
+) -> BrowserPathTable:
+    """Return the cached path table for `source`, reloading it if the file changed.
+
+    Params:
+        source (str | Path): Path to the path table JSON file.
+        refresh (bool): Check the file's mtime now instead of waiting for
+            `PATH_TABLE_CHECK_INTERVAL` to pass.
+
+    """
+    global _path_table, _path_table_checked
+
+    if not isinstance(source, Path):
+        source = Path(source)
+
+    table: BrowserPathTable | None = _path_table
+    now: float = time.monotonic()
+
+    if (
+        table is not None
+        and table.source == source
+        and not refresh
+        and now - _path_table_checked < PATH_TABLE_CHECK_INTERVAL
+        and table.expanded_here()
+    ):
+        return table
+
+    with _path_table_lock:
+        if (
+            _path_table is None
+            or _path_table.source != source
+            or _path_table.is_stale()
+        ):
+            _path_table = BrowserPathTable.load(source)
+        _path_table_checked = now
+
+        return _path_table
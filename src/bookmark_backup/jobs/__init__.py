@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+from .engine import AsyncBackupEngine, BackupResult, backup_dest_for
+from .fleet import (
+    DEFAULT_MAX_WORKERS,
+    abackup_all,
+    backup_all,
+    discover_bookmarks_files,
+)
+from .verify import VerifyResult, verify_store
+from .watch import BookmarksWatcher
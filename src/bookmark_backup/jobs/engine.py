@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import asdict, dataclass
+import logging
+from pathlib import Path
+import time
+import typing as t
+
+log = logging.getLogger(__name__)
+
+from bookmark_backup.core import compression
+from bookmark_backup.core.constants import DEFAULT_DEST_CONCURRENCY, DEFAULT_MAX_WORKERS
+from bookmark_backup.core.throttle import DestinationLimiter
+from bookmark_backup.domain.Bookmarks import BookmarksFile
+from bookmark_backup.storage import as_destination, join_url
+from bookmark_backup.store import Snapshot
+
+@dataclass
+class BackupResult:
+    browser: str
+    profile: str
+    source: str | None = None
+    dest: str | None = None
+    ok: bool = False
+    snapshot_id: str | None = None
+    ## The bookmarks file was unchanged since its last backup to `dest`, so it
+    #  was not backed up again
+    skipped: bool = False
+    error: str | None = None
+    duration: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def backup_dest_for(
+    bookmarks: BookmarksFile,
+    dest: t.Union[str, Path],
+    mode: str,
+    compress: str | None,
+) -> t.Union[str, Path]:
+    """Return where a profile's backup goes under `dest`.
+
+    Description:
+        Store modes share one backup store at `dest`. Copy mode writes each profile
+        to `<dest>/<browser>/<profile>/Bookmarks`. A storage URL `dest` gives a URL.
+    """
+    if mode != "copy":
+        return dest
+
+    filename: str = Path(bookmarks.bookmarks_file).name
+    if compress:
+        filename += compression.FILE_EXTENSIONS[compress]
+
+    if isinstance(dest, str):
+        return join_url(dest, bookmarks.browser, bookmarks.profile, filename)
+
+    return dest / bookmarks.browser / bookmarks.profile / filename
+
+
+class AsyncBackupEngine:
+    """Back up many browser profiles concurrently on an asyncio event loop.
+
+    Description:
+        Up to `max_workers` backups run at the same time. Each one reads, checks and
+        compresses its file in worker threads, then waits for a write slot on its
+        destination, so backups to a slow destination overlap with preparing the
+        next ones instead of running one after another.
+
+        Every destination (the `dest` passed to `backup()`) gets its own
+        DestinationLimiter, created with the engine's defaults or the limits set
+        with `set_limit()`.
+
+        An engine's locks belong to the event loop it first runs on, create one
+        engine per `asyncio.run()`.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        dest_concurrency: int = DEFAULT_DEST_CONCURRENCY,
+        bytes_per_second: float | None = None,
+    ):
+        self.max_workers: int = max(1, max_workers)
+        self.dest_concurrency: int = dest_concurrency
+        self.bytes_per_second: float | None = bytes_per_second
+
+        self._workers = asyncio.Semaphore(self.max_workers)
+        self._limits: dict[t.Union[str, Path], tuple[int, float | None]] = {}
+        self._limiters: dict[t.Union[str, Path], DestinationLimiter] = {}
+
+    def set_limit(
+        self,
+        dest: t.Union[str, Path],
+        concurrency: int | None = None,
+        bytes_per_second: float | None = None,
+    ) -> None:
+        """Override the concurrency and write rate of one destination."""
+        key: t.Union[str, Path] = as_destination(dest)
+        self._limits[key] = (
+            concurrency or self.dest_concurrency,
+            bytes_per_second,
+        )
+        self._limiters.pop(key, None)
+
+    def limiter(self, dest: t.Union[str, Path]) -> DestinationLimiter:
+        key: t.Union[str, Path] = as_destination(dest)
+        if key not in self._limiters:
+            concurrency, bytes_per_second = self._limits.get(
+                key, (self.dest_concurrency, self.bytes_per_second)
+            )
+            self._limiters[key] = DestinationLimiter(
+                concurrency=concurrency, bytes_per_second=bytes_per_second
+            )
+
+        return self._limiters[key]
+
+    async def backup(
+        self,
+        bookmarks: BookmarksFile,
+        dest: t.Union[str, Path],
+        mode: str = "copy",
+        overwrite: bool = False,
+        compress: str | None = None,
+        verify: bool = True,
+        skip_unchanged: bool = True,
+    ) -> BackupResult:
+        """Back up one profile under `dest`, see `backup_dest_for()`.
+
+        Description:
+            Failures are recorded on the BackupResult instead of raised. Cancelling
+            the task discards a backup that has not been moved into place yet.
+        """
+        dest = as_destination(dest)
+        result = BackupResult(
+            browser=bookmarks.browser,
+            profile=bookmarks.profile,
+            source=bookmarks.bookmarks_file,
+        )
+        backup_dest: t.Union[str, Path] = backup_dest_for(
+            bookmarks, dest, mode=mode, compress=compress
+        )
+        result.dest = str(backup_dest)
+
+        async with self._workers:
+            start: float = time.perf_counter()
+            try:
+                backup: t.Union[bool, Snapshot, None] = (
+                    await asyncio.to_thread(
+                        bookmarks.unchanged_backup, backup_dest, mode, compress
+                    )
+                    if skip_unchanged
+                    else None
+                )
+                if backup is not None:
+                    result.skipped = True
+                else:
+                    backup = await bookmarks.abackup(
+                        backup_dest,
+                        overwrite=overwrite,
+                        mode=mode,
+                        compress=compress,
+                        verify=verify,
+                        limiter=self.limiter(dest),
+                        skip_unchanged=False,
+                    )
+                if isinstance(backup, Snapshot):
+                    result.snapshot_id = backup.id
+                result.ok = True
+            except Exception as exc:
+                log.debug(
+                    f"({type(exc)}) Error backing up [{bookmarks.browser}] profile '{bookmarks.profile}'. Details: {exc}"
+                )
+                result.error = f"{type(exc).__name__}: {exc}"
+            finally:
+                result.duration = time.perf_counter() - start
+
+        return result
+
+    async def backup_many(
+        self,
+        bookmarks_files: t.Iterable[BookmarksFile],
+        dest: t.Union[str, Path],
+        mode: str = "copy",
+        overwrite: bool = False,
+        compress: str | None = None,
+        verify: bool = True,
+        skip_unchanged: bool = True,
+    ) -> list[BackupResult]:
+        """Back up every profile in `bookmarks_files` under `dest`.
+
+        Description:
+            Cancelling the call cancels every backup still running.
+
+        Returns:
+            (list[BackupResult]): One result per profile, in the order given.
+
+        """
+        tasks: list[asyncio.Task] = [
+            asyncio.create_task(
+                self.backup(
+                    bookmarks,
+                    dest,
+                    mode=mode,
+                    overwrite=overwrite,
+                    compress=compress,
+                    verify=verify,
+                    skip_unchanged=skip_unchanged,
+                )
+            )
+            for bookmarks in bookmarks_files
+        ]
+
+        return list(await asyncio.gather(*tasks))
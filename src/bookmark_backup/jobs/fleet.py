@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from pathlib import Path
+import typing as t
+
+log = logging.getLogger(__name__)
+
+from bookmark_backup import finder
+from bookmark_backup.core import compression, detect_env
+from bookmark_backup.core.constants import (
+    DEFAULT_DEST_CONCURRENCY,
+    DEFAULT_MAX_WORKERS,
+    supported_browsers,
+)
+from bookmark_backup.core.metrics import timed
+from bookmark_backup.core.validators import validate_browser, validate_os_type
+from bookmark_backup.domain.Bookmarks import BookmarksFile, get_bookmarks_file
+from bookmark_backup.storage import as_destination
+
+from .engine import AsyncBackupEngine, BackupResult, backup_dest_for
+
+def discover_bookmarks_files(browsers: list[str] | None = None) -> list[BookmarksFile]:
+    """Find every profile with a bookmarks file for each supported browser on the host.
+
+    Params:
+        browsers (list[str] | None): Only look for these browsers. Defaults to all
+            supported browsers.
+
+    Returns:
+        (list[BookmarksFile]): One BookmarksFile per browser profile found.
+
+    """
+    os_type: str = validate_os_type(os_type=detect_env.get_environment().os_type)
+    browsers = (
+        [validate_browser(b) for b in browsers] if browsers else supported_browsers()
+    )
+
+    bookmarks_files: list[BookmarksFile] = []
+    for browser in browsers:
+        with timed("find_profiles"):
+            profiles: list[str] = finder.get_browser_profiles(
+                os_type=os_type, browser=browser
+            )
+        for profile in profiles:
+            bookmarks_files.append(get_bookmarks_file(browser=browser, profile=profile))
+
+    log.debug(f"Discovered {len(bookmarks_files)} bookmarks file(s)")
+
+    return bookmarks_files
+
+
+async def abackup_all(
+    dest: t.Union[str, Path],
+    mode: str = "copy",
+    overwrite: bool = False,
+    compress: str | None = None,
+    browsers: list[str] | None = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    verify: bool = True,
+    dest_concurrency: int = DEFAULT_DEST_CONCURRENCY,
+    bytes_per_second: float | None = None,
+    skip_unchanged: bool = True,
+) -> list[BackupResult]:
+    """Back up every browser profile on the host concurrently, on the running event loop.
+
+    Description:
+        See `backup_all()`. Cancelling the call cancels the backups still running.
+    """
+    dest = as_destination(dest)
+    compress = compression.validate_compression(compress)
+    bookmarks_files: list[BookmarksFile] = await asyncio.to_thread(
+        discover_bookmarks_files, browsers
+    )
+
+    engine = AsyncBackupEngine(
+        max_workers=max_workers,
+        dest_concurrency=dest_concurrency,
+        bytes_per_second=bytes_per_second,
+    )
+
+    return await engine.backup_many(
+        bookmarks_files,
+        dest,
+        mode=mode,
+        overwrite=overwrite,
+        compress=compress,
+        verify=verify,
+        skip_unchanged=skip_unchanged,
+    )
+
+
+def backup_all(
+    dest: t.Union[str, Path],
+    mode: str = "copy",
+    overwrite: bool = False,
+    compress: str | None = None,
+    browsers: list[str] | None = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    verify: bool = True,
+    dest_concurrency: int = DEFAULT_DEST_CONCURRENCY,
+    bytes_per_second: float | None = None,
+    skip_unchanged: bool = True,
+) -> list[BackupResult]:
+    """Back up every browser profile on the host concurrently.
+
+    Description:
+        Failures are recorded on each profile's BackupResult instead of raised, so one
+        bad profile does not stop the others from being backed up. Runs
+        `abackup_all()` on a new event loop; call that instead from async code.
+
+    Params:
+        dest (str | Path): Destination directory, or backup store root for store modes.
+        mode (str): Backup mode passed to `BookmarksFile.backup_bookmarks_file()`.
+        overwrite (bool): Overwrite existing backups (copy mode only).
+        compress (str | None): Compression format for the backups.
+        browsers (list[str] | None): Only back up these browsers.
+        max_workers (int): Maximum number of profiles backed up at the same time.
+        verify (bool): Check each file's Chromium checksum while backing it up.
+        dest_concurrency (int): Maximum number of backups written to `dest` at the
+            same time.
+        bytes_per_second (float | None): Maximum write rate to `dest`, unlimited if
+            None.
+        skip_unchanged (bool): Skip profiles whose bookmarks file has not changed
+            since its last backup to `dest`, see `BookmarksFile.unchanged_backup()`.
+
+    Returns:
+        (list[BackupResult]): One result per profile, in discovery order.
+
+    """
+    return asyncio.run(
+        abackup_all(
+            dest,
+            mode=mode,
+            overwrite=overwrite,
+            compress=compress,
+            browsers=browsers,
+            max_workers=max_workers,
+            verify=verify,
+            dest_concurrency=dest_concurrency,
+            bytes_per_second=bytes_per_second,
+            skip_unchanged=skip_unchanged,
+        )
+    )
@@ -0,0 +1,254 @@
+"""Back up bookmarks files when the browser changes them.
+
+Each bookmarks file's directory is watched with inotify where available, so the
+process sleeps until a browser writes. Elsewhere (or with `use_inotify=False`) the
+files are stat-ed on an interval that backs off while nothing changes. Browsers
+write the file in bursts, so a backup runs only once the file has not changed for
+`settle` seconds.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from pathlib import Path
+import typing as t
+
+log = logging.getLogger(__name__)
+
+from bookmark_backup.core import compression
+from bookmark_backup.core.fileio import FileSignature, file_signature
+from bookmark_backup.core.inotify import (
+    IN_CLOSE_WRITE,
+    IN_CREATE,
+    IN_DELETE,
+    IN_IGNORED,
+    IN_MOVED_TO,
+    IN_ONLYDIR,
+    IN_Q_OVERFLOW,
+    Inotify,
+    inotify_available,
+)
+from bookmark_backup.domain.Bookmarks import BookmarksFile
+from bookmark_backup.storage import as_destination
+
+from .engine import AsyncBackupEngine, BackupResult
+
+## Seconds a file must go unchanged before it is backed up
+DEFAULT_SETTLE_SECONDS: float = 2.0
+## Polling starts at this interval, doubling while nothing changes, up to the max
+DEFAULT_POLL_INTERVAL: float = 1.0
+DEFAULT_MAX_POLL_INTERVAL: float = 30.0
+## Browsers replace the bookmarks file with a rename, or rewrite it in place
+WATCH_MASK: int = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+
+
+class BookmarksWatcher:
+    """Back up bookmarks files after each burst of changes settles.
+
+    Params:
+        bookmarks_files (list[BookmarksFile]): The profiles to watch.
+        dest (str | Path): Destination directory, or backup store root for store modes.
+        mode (str): Backup mode, see `BookmarksFile.backup_bookmarks_file()`. Copy
+            mode overwrites each profile's previous copy.
+        compress (str | None): Compression format for the backups.
+        verify (bool): Check each file's Chromium checksum while backing it up.
+        settle (float): Seconds a file must go unchanged before it is backed up.
+        poll_interval (float): First polling interval, when inotify is not used.
+        max_poll_interval (float): Longest polling interval.
+        use_inotify (bool): Use inotify when available, instead of polling.
+        engine (AsyncBackupEngine | None): Runs the backups, a default engine if None.
+        on_result (Callable | None): Called with the BackupResult of each backup.
+    """
+
+    def __init__(
+        self,
+        bookmarks_files: list[BookmarksFile],
+        dest: t.Union[str, Path],
+        mode: str = "store",
+        compress: str | None = None,
+        verify: bool = True,
+        settle: float = DEFAULT_SETTLE_SECONDS,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        max_poll_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+        use_inotify: bool = True,
+        engine: AsyncBackupEngine | None = None,
+        on_result: t.Callable[[BackupResult], None] | None = None,
+    ):
+        self.dest: t.Union[str, Path] = as_destination(dest)
+        self.mode: str = mode
+        self.compress: str | None = compression.validate_compression(compress)
+        self.verify: bool = verify
+        self.settle: float = settle
+        self.poll_interval: float = poll_interval
+        self.max_poll_interval: float = max(poll_interval, max_poll_interval)
+        self.use_inotify: bool = use_inotify and inotify_available()
+        self.engine: AsyncBackupEngine | None = engine
+        self.on_result = on_result
+
+        self.files: dict[Path, BookmarksFile] = {
+            Path(bookmarks.bookmarks_file).expanduser(): bookmarks
+            for bookmarks in bookmarks_files
+            if bookmarks.bookmarks_file is not None
+        }
+        ## Signature of each file as of its last successful backup
+        self.backed_up: dict[Path, FileSignature] = {}
+
+        self._timers: dict[Path, asyncio.TimerHandle] = {}
+        self._running: dict[Path, asyncio.Task] = {}
+        self._inotify: Inotify | None = None
+        ## Watch descriptor -> directory, and directory -> watched files in it
+        self._watches: dict[int, Path] = {}
+        self._dir_files: dict[Path, dict[str, Path]] = {}
+        ## Files that are polled because their directory could not be watched
+        self._polled: set[Path] = set()
+
+    @property
+    def method(self) -> str:
+        return "inotify" if self.use_inotify else "polling"
+
+    def changed(self, path: Path) -> None:
+        """Record a change to `path`, (re)starting its settle timer."""
+        timer: asyncio.TimerHandle | None = self._timers.pop(path, None)
+        if timer is not None:
+            timer.cancel()
+        self._timers[path] = asyncio.get_running_loop().call_later(
+            self.settle, self._settled, path
+        )
+
+    def _settled(self, path: Path) -> None:
+        self._timers.pop(path, None)
+        if path in self._running:
+            ## Back up again once the running backup finishes
+            self.changed(path)
+            return
+
+        signature: FileSignature = file_signature(path)
+        if signature is None:
+            log.debug(f"Bookmarks file '{path}' is gone, not backing it up.")
+            return
+        if signature == self.backed_up.get(path):
+            log.debug(f"Bookmarks file '{path}' is unchanged since its last backup.")
+            return
+
+        self._running[path] = asyncio.create_task(self._backup(path, signature))
+
+    async def _backup(self, path: Path, signature: FileSignature) -> None:
+        try:
+            result: BackupResult = await self.engine.backup(
+                self.files[path],
+                self.dest,
+                mode=self.mode,
+                overwrite=True,
+                compress=self.compress,
+                verify=self.verify,
+            )
+            if result.ok:
+                self.backed_up[path] = signature
+            if self.on_result is not None:
+                self.on_result(result)
+        finally:
+            self._running.pop(path, None)
+
+    def _start_inotify(self) -> None:
+        for path in self.files:
+            self._dir_files.setdefault(path.parent, {})[path.name] = path
+
+        self._inotify = Inotify()
+        for directory, names in self._dir_files.items():
+            try:
+                self._watches[self._inotify.add_watch(directory, WATCH_MASK)] = (
+                    directory
+                )
+            except OSError as exc:
+                log.warning(
+                    f"Could not watch directory '{directory}', polling it instead. Details: {exc}"
+                )
+                self._polled.update(names.values())
+
+        asyncio.get_running_loop().add_reader(self._inotify.fileno(), self._on_inotify)
+
+    def _on_inotify(self) -> None:
+        for event in self._inotify.read_events():
+            if event.mask & IN_Q_OVERFLOW:
+                log.warning("inotify queue overflowed, checking every bookmarks file.")
+                for path in self.files:
+                    self.changed(path)
+                continue
+
+            directory: Path | None = self._watches.get(event.wd)
+            if directory is None:
+                continue
+            if event.mask & IN_IGNORED:
+                ## The directory was removed, i.e. the profile was deleted
+                log.warning(f"Stopped watching '{directory}', polling it instead.")
+                del self._watches[event.wd]
+                self._polled.update(self._dir_files[directory].values())
+                continue
+
+            path: Path | None = self._dir_files[directory].get(event.name)
+            if path is not None:
+                self.changed(path)
+
+    async def _poll(self, paths: t.Callable[[], t.Iterable[Path]]) -> None:
+        """Stat `paths()` on an interval that backs off while nothing changes."""
+        signatures: dict[Path, FileSignature] = {}
+        interval: float = self.poll_interval
+        while True:
+            changed: bool = False
+            for path in list(paths()):
+                signature: FileSignature = file_signature(path)
+                if path in signatures and signatures[path] != signature:
+                    self.changed(path)
+                    changed = True
+                signatures[path] = signature
+
+            interval = (
+                self.poll_interval
+                if changed
+                else min(interval * 2, self.max_poll_interval)
+            )
+            await asyncio.sleep(interval)
+
+    async def run(
+        self, initial: bool = False, stop: asyncio.Event | None = None
+    ) -> None:
+        """Watch the bookmarks files until `stop` is set or the task is cancelled.
+
+        Params:
+            initial (bool): Back up every file that changed since its last backup
+                by this watcher when starting (on first run, every file).
+            stop (asyncio.Event | None): Stop watching once set. Running backups are
+                allowed to finish.
+
+        """
+        if self.engine is None:
+            self.engine = AsyncBackupEngine()
+
+        if self.use_inotify:
+            self._start_inotify()
+            poller = asyncio.create_task(self._poll(lambda: self._polled))
+        else:
+            poller = asyncio.create_task(self._poll(lambda: self.files))
+        log.info(
+            f"Watching {len(self.files)} bookmarks file(s) with {self.method}, backing up to '{self.dest}'"
+        )
+
+        if initial:
+            for path in self.files:
+                self._settled(path)
+
+        try:
+            await (stop or asyncio.Event()).wait()
+        finally:
+            poller.cancel()
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+            if self._inotify is not None:
+                asyncio.get_running_loop().remove_reader(self._inotify.fileno())
+                self._inotify.close()
+                self._inotify = None
+                self._watches.clear()
+            if self._running:
+                await asyncio.gather(*self._running.values(), return_exceptions=True)
@@ -0,0 +1,4 @@
+from __future__ import annotations
+
+from .controllers import IndexStats, SearchIndex, SearchResult
+from .methods import build_match_query, default_index_path
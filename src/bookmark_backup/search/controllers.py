@@ -0,0 +1,446 @@
+from __future__ import annotations
+
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+import hashlib
+import logging
+from pathlib import Path
+import sqlite3
+import tempfile
+import typing as t
+
+log = logging.getLogger(__name__)
+
+from bookmark_backup.domain.Bookmarks import BookmarksFile
+from bookmark_backup.domain.stream import BookmarkStream
+from bookmark_backup.store import BackupStore, Snapshot, hash_file
+
+from .methods import FOLDER_SEPARATOR, build_match_query, default_index_path
+
+## Scope of the sources indexed from the browsers' live bookmarks files
+LIVE_SCOPE: str = "live"
+## Rows sent to SQLite per executemany() call while indexing a file
+INSERT_BATCH_SIZE: int = 5000
+DEFAULT_SEARCH_LIMIT: int = 20
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS sources (
+    key TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,
+    browser TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    snapshot_id TEXT,
+    timestamp TEXT,
+    signature TEXT NOT NULL,
+    document_id INTEGER NOT NULL REFERENCES documents (id)
+);
+CREATE INDEX IF NOT EXISTS sources_scope ON sources (scope);
+CREATE INDEX IF NOT EXISTS sources_document ON sources (document_id);
+CREATE TABLE IF NOT EXISTS bookmarks (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    UNIQUE (url, title, folder)
+);
+CREATE TABLE IF NOT EXISTS links (
+    document_id INTEGER NOT NULL,
+    bookmark_id INTEGER NOT NULL,
+    PRIMARY KEY (document_id, bookmark_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS links_bookmark ON links (bookmark_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS bookmarks_fts USING fts5 (
+    title, url, folder, content='bookmarks', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS bookmarks_ai AFTER INSERT ON bookmarks BEGIN
+    INSERT INTO bookmarks_fts (rowid, title, url, folder)
+    VALUES (new.id, new.title, new.url, new.folder);
+END;
+CREATE TRIGGER IF NOT EXISTS bookmarks_ad AFTER DELETE ON bookmarks BEGIN
+    INSERT INTO bookmarks_fts (bookmarks_fts, rowid, title, url, folder)
+    VALUES ('delete', old.id, old.title, old.url, old.folder);
+END;
+CREATE TEMP TABLE IF NOT EXISTS incoming (
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    folder TEXT NOT NULL
+);
+"""
+
+
+@dataclass
+class SearchResult:
+    title: str
+    url: str
+    folder: str
+    ## (browser, profile, snapshot id or None for the live file, timestamp)
+    sources: list[tuple[str, str, str | None, str | None]] = field(default_factory=list)
+
+    @property
+    def live(self) -> bool:
+        return any(snapshot_id is None for _, _, snapshot_id, _ in self.sources)
+
+    @property
+    def snapshot_count(self) -> int:
+        return sum(snapshot_id is not None for _, _, snapshot_id, _ in self.sources)
+
+
+@dataclass
+class IndexStats:
+    indexed: int = 0
+    reused: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+
+class SearchIndex:
+    """Persistent full-text index of bookmarks in live files and backup snapshots.
+
+    Description:
+        Each source (a browser profile's bookmarks file, or a snapshot in a backup
+        store) points at a document, keyed by the hash of its contents (see
+        `_document_digest()` for incremental snapshots), so identical snapshots are
+        only parsed and indexed once. Bookmarks are stored once per
+        distinct (url, title, folder) and linked to the documents containing them,
+        so the SQLite FTS5 index grows with the number of distinct bookmarks rather
+        than the number of snapshots.
+
+        `update_live()` only re-reads live files whose size or mtime changed, and
+        `update_store()` only reads snapshots not yet in the index, since snapshots
+        never change once taken.
+    """
+
+    def __init__(self, path: t.Union[str, Path, None] = None):
+        self.path: Path = Path(path).expanduser() if path else default_index_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        try:
+            self._conn.executescript(SCHEMA)
+        except sqlite3.OperationalError as exc:
+            self._conn.close()
+            if "fts5" in str(exc):
+                raise RuntimeError(
+                    f"Searching bookmarks requires SQLite built with FTS5 support. Details: {exc}"
+                ) from exc
+            raise
+
+    def __enter__(self) -> SearchIndex:
+        return self
+
+    def __exit__(self, exc_type, exc_val, traceback):
+        self.close()
+
+        return False
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _source_signature(self, key: str) -> str | None:
+        row = self._conn.execute(
+            "SELECT signature FROM sources WHERE key = ?", (key,)
+        ).fetchone()
+
+        return row[0] if row else None
+
+    def _index_document(self, path: Path) -> int:
+        """Load a bookmarks file's bookmarks into the `incoming` table.
+
+        Returns:
+            (int): The number of bookmarks read.
+
+        """
+        batch: list[tuple[str, str, str]] = []
+        for streamed in BookmarkStream(path):
+            if streamed.is_folder:
+                continue
+            batch.append(
+                (
+                    streamed.node.get("name", ""),
+                    streamed.node.get("url", ""),
+                    FOLDER_SEPARATOR.join(streamed.path),
+                )
+            )
+            if len(batch) >= INSERT_BATCH_SIZE:
+                self._conn.executemany("INSERT INTO incoming VALUES (?, ?, ?)", batch)
+                batch.clear()
+        self._conn.executemany("INSERT INTO incoming VALUES (?, ?, ?)", batch)
+
+        self._conn.execute(
+            "INSERT OR IGNORE INTO bookmarks (title, url, folder) SELECT DISTINCT title, url, folder FROM incoming"
+        )
+        return self._conn.execute("SELECT count(*) FROM incoming").fetchone()[0]
+
+    def _document(
+        self, digest: str, read: t.Callable[[], t.ContextManager[Path]]
+    ) -> tuple[int, bool]:
+        """Return the id of the document with `digest`, indexing it if it is new.
+
+        Returns:
+            (tuple[int, bool]): The document id, and whether it was indexed now.
+
+        """
+        row = self._conn.execute(
+            "SELECT id FROM documents WHERE digest = ?", (digest,)
+        ).fetchone()
+        if row:
+            return row[0], False
+
+        document_id: int = self._conn.execute(
+            "INSERT INTO documents (digest) VALUES (?)", (digest,)
+        ).lastrowid
+        with read() as path:
+            count: int = self._index_document(path)
+        self._conn.execute(
+            """INSERT OR IGNORE INTO links (document_id, bookmark_id)
+            SELECT ?, b.id FROM incoming i
+            JOIN bookmarks b ON b.url = i.url AND b.title = i.title AND b.folder = i.folder""",
+            (document_id,),
+        )
+        self._conn.execute("DELETE FROM incoming")
+        log.debug(f"Indexed {count} bookmark(s) for document {digest[:12]}")
+
+        return document_id, True
+
+    def _set_source(
+        self,
+        key: str,
+        scope: str,
+        browser: str,
+        profile: str,
+        signature: str,
+        digest: str,
+        read: t.Callable[[], t.ContextManager[Path]],
+        stats: IndexStats,
+        snapshot: Snapshot | None = None,
+    ) -> None:
+        document_id, indexed = self._document(digest, read)
+        if indexed:
+            stats.indexed += 1
+        else:
+            stats.reused += 1
+
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                scope,
+                browser,
+                profile,
+                snapshot.id if snapshot else None,
+                snapshot.timestamp if snapshot else None,
+                signature,
+                document_id,
+            ),
+        )
+
+    def _remove_missing(self, scope: str, seen: set[str], stats: IndexStats) -> None:
+        for (key,) in self._conn.execute(
+            "SELECT key FROM sources WHERE scope = ?", (scope,)
+        ).fetchall():
+            if key not in seen:
+                self._conn.execute("DELETE FROM sources WHERE key = ?", (key,))
+                stats.removed += 1
+
+    def _collect_garbage(self) -> None:
+        """Drop documents no source points at, and bookmarks no document contains."""
+        orphans: list[tuple[int]] = self._conn.execute(
+            "SELECT id FROM documents WHERE id NOT IN (SELECT document_id FROM sources)"
+        ).fetchall()
+        if not orphans:
+            return
+
+        self._conn.executemany("DELETE FROM links WHERE document_id = ?", orphans)
+        self._conn.executemany("DELETE FROM documents WHERE id = ?", orphans)
+        self._conn.execute(
+            "DELETE FROM bookmarks WHERE NOT EXISTS (SELECT 1 FROM links WHERE bookmark_id = bookmarks.id)"
+        )
+
+    def update_live(
+        self, bookmarks_files: list[BookmarksFile], stats: IndexStats | None = None
+    ) -> IndexStats:
+        """Index the browsers' current bookmarks files, skipping unchanged ones.
+
+        Params:
+            bookmarks_files (list[BookmarksFile]): Every live profile to search.
+                Previously indexed profiles not in the list are dropped.
+
+        """
+        stats = stats or IndexStats()
+        seen: set[str] = set()
+        with self._conn:
+            for bookmarks in bookmarks_files:
+                path = Path(bookmarks.bookmarks_file).expanduser()
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+
+                key: str = f"{LIVE_SCOPE}:{path}"
+                signature: str = f"{stat.st_size}:{stat.st_mtime_ns}"
+                seen.add(key)
+                if self._source_signature(key) == signature:
+                    stats.unchanged += 1
+                    continue
+
+                digest, _ = hash_file(path)
+                self._set_source(
+                    key=key,
+                    scope=LIVE_SCOPE,
+                    browser=bookmarks.browser,
+                    profile=bookmarks.profile,
+                    signature=signature,
+                    digest=digest,
+                    read=lambda: nullcontext(path),
+                    stats=stats,
+                )
+
+            self._remove_missing(LIVE_SCOPE, seen, stats)
+            self._collect_garbage()
+
+        return stats
+
+    def update_store(
+        self, store: BackupStore, stats: IndexStats | None = None
+    ) -> IndexStats:
+        """Index the snapshots in a backup store that are not indexed yet."""
+        stats = stats or IndexStats()
+        scope: str = str(Path(store.root).resolve())
+        seen: set[str] = set()
+
+        snapshots: list[Snapshot] = store.snapshots()
+        index: dict[str, Snapshot] = {snapshot.id: snapshot for snapshot in snapshots}
+        digests: dict[str, str] = {}
+
+        with self._conn:
+            for snapshot in snapshots:
+                try:
+                    digest: str = _document_digest(snapshot, index, digests)
+                except KeyError as exc:
+                    log.warning(
+                        f"Not indexing snapshot {snapshot.id}, its parent snapshot {exc} is missing from store '{store.root}'"
+                    )
+                    continue
+
+                key: str = f"{scope}:{snapshot.id}"
+                seen.add(key)
+                if self._source_signature(key) == digest:
+                    stats.unchanged += 1
+                    continue
+
+                self._set_source(
+                    key=key,
+                    scope=scope,
+                    browser=snapshot.browser,
+                    profile=snapshot.profile,
+                    signature=digest,
+                    digest=digest,
+                    read=lambda snapshot=snapshot: _snapshot_file(store, snapshot),
+                    stats=stats,
+                    snapshot=snapshot,
+                )
+
+            self._remove_missing(scope, seen, stats)
+            self._collect_garbage()
+
+        return stats
+
+    def search(
+        self,
+        query: str,
+        limit: int = DEFAULT_SEARCH_LIMIT,
+        browser: str | None = None,
+        raw: bool = False,
+    ) -> list[SearchResult]:
+        """Return the bookmarks best matching `query` in their title, URL or folder.
+
+        Params:
+            query (str): Words to search for, each matched as a prefix.
+            limit (int): Maximum number of results.
+            browser (str | None): Only return bookmarks found in this browser.
+            raw (bool): Pass `query` to FTS5 as-is, to use its query syntax.
+
+        """
+        match_query: str = query if raw else build_match_query(query)
+        if not match_query:
+            return []
+
+        sql: str = """SELECT b.id, b.title, b.url, b.folder
+            FROM bookmarks_fts JOIN bookmarks b ON b.id = bookmarks_fts.rowid
+            WHERE bookmarks_fts MATCH ?"""
+        params: list = [match_query]
+        if browser is not None:
+            sql += """ AND EXISTS (SELECT 1 FROM links l
+                JOIN sources s ON s.document_id = l.document_id
+                WHERE l.bookmark_id = b.id AND s.browser = ?)"""
+            params.append(browser)
+        ## bm25 with title matches weighted over URL and folder matches
+        sql += " ORDER BY bm25(bookmarks_fts, 10.0, 4.0, 2.0) LIMIT ?"
+        params.append(limit)
+
+        results: list[SearchResult] = []
+        for bookmark_id, title, url, folder in self._conn.execute(sql, params):
+            sources = self._conn.execute(
+                """SELECT s.browser, s.profile, s.snapshot_id, s.timestamp FROM links l
+                JOIN sources s ON s.document_id = l.document_id
+                WHERE l.bookmark_id = ? ORDER BY s.timestamp""",
+                (bookmark_id,),
+            ).fetchall()
+            results.append(SearchResult(title, url, folder, sources))
+
+        return results
+
+
+def _document_digest(
+    snapshot: Snapshot, index: dict[str, Snapshot], digests: dict[str, str]
+) -> str:
+    """Return the key of the document a snapshot rebuilds to.
+
+    Description:
+        Full snapshots are keyed by their blob's hash. A delta's blob only holds the
+        changes against its parent, and the same delta (i.e. "no changes") applied
+        to different parents gives different files, so a delta is keyed by the hash
+        of its parent's key and its own blob hash.
+
+    Params:
+        index (dict[str, Snapshot]): The store's snapshots by id.
+        digests (dict[str, str]): Keys computed so far by snapshot id, filled in
+            for every snapshot on the chain.
+
+    Raises:
+        KeyError: If a snapshot on the chain is missing from `index`.
+
+    """
+    chain: list[Snapshot] = []
+    current: Snapshot = snapshot
+    while current.id not in digests and current.kind != "full":
+        chain.append(current)
+        current = index[current.parent]
+    if current.id not in digests:
+        digests[current.id] = current.hash
+
+    digest: str = digests[current.id]
+    for delta in reversed(chain):
+        digest = hashlib.sha256(f"{digest}:{delta.hash}".encode("ascii")).hexdigest()
+        digests[delta.id] = digest
+
+    return digest
+
+
+@contextmanager
+def _snapshot_file(store: BackupStore, snapshot: Snapshot) -> t.Iterator[Path]:
+    """Yield a path to a file holding a snapshot's contents."""
+    if snapshot.kind == "full":
+        ## BookmarkStream decompresses blobs itself
+        yield store.blob_path(snapshot.hash)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="bookmark-backup-search-") as tmp:
+        yield store.materialize(snapshot.id, dest=Path(tmp) / "Bookmarks")
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import logging
+import os
+from pathlib import Path
+import re
+
+log = logging.getLogger(__name__)
+
+SEARCH_INDEX_FILENAME: str = "search_index.sqlite3"
+## Separates folder titles in the indexed folder path
+FOLDER_SEPARATOR: str = " / "
+
+## Runs of characters FTS5's unicode61 tokenizer treats as part of a word
+_QUERY_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def default_index_path() -> Path:
+    """Return the default search index location, under `$XDG_CACHE_HOME` or `~/.cache`."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+
+    return Path(cache_home) / "bookmark-backup" / SEARCH_INDEX_FILENAME
+
+
+def build_match_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching every word as a prefix.
+
+    Description:
+        `python docs` becomes `"python"* "docs"*`, so FTS5 operators and
+        punctuation in the search text are never interpreted as query syntax.
+    """
+    terms: list[str] = _QUERY_TERM.findall(text)
+
+    return " ".join(f'"{term}"*' for term in terms)
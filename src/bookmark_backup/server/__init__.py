@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import importlib
+import typing as t
+
+from .methods import (
+    ServerError,
+    ServerUnavailable,
+    call,
+    default_socket_path,
+    forward_command,
+    forwarding_disabled,
+    server_running,
+)
+
+if t.TYPE_CHECKING:
+    from .controllers import BackupServer, ServerAlreadyRunning
+
+## The server pulls in socketserver and the CLI, import it on first use so
+#  forwarding a command does not pay for it
+_LAZY: dict[str, str] = {
+    "BackupServer": "controllers",
+    "ServerAlreadyRunning": "controllers",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        return getattr(importlib.import_module(f".{_LAZY[name]}", __name__), name)
+
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
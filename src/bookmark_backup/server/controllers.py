@@ -0,0 +1,328 @@
+"""Long-running server that runs CLI commands sent over a Unix socket.
+
+One process keeps the package imported and its caches warm across commands:
+resolved browser paths, the digests and checksum results of unchanged bookmarks
+files, and the parsed manifests of backup stores. Commands run one at a time, in
+the client's working directory and environment, with their output sent back to the
+client.
+
+Methods:
+    ping: Returns the server's pid and uptime.
+    run: Runs `{"argv": [...], "cwd": "...", "env": {...}}` as a CLI command,
+        returning its `exit_code`, `stdout` and `stderr`. Without `cwd` or `env`,
+        the command runs in the server's.
+    stats: Returns request counts and cache hit rates.
+    shutdown: Stops the server once the response is sent.
+
+"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import logging
+import os
+from pathlib import Path
+import socketserver
+import sys
+import threading
+import time
+import traceback
+import typing as t
+
+log = logging.getLogger(__name__)
+
+from .methods import (
+    INTERNAL_ERROR,
+    INVALID_PARAMS,
+    INVALID_REQUEST,
+    METHOD_NOT_FOUND,
+    PARSE_ERROR,
+    ServerError,
+    ServerUnavailable,
+    connect,
+    default_socket_path,
+    encode_message,
+    read_message,
+)
+
+class ServerAlreadyRunning(RuntimeError):
+    pass
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: _UnixServer
+
+    def handle(self) -> None:
+        ## A client may send several requests on one connection
+        while True:
+            try:
+                request: dict | None = read_message(self.rfile)
+            except ValueError as exc:
+                self._reply(None, error=(PARSE_ERROR, str(exc)))
+                return
+            if request is None:
+                return
+
+            request_id = request.get("id")
+            try:
+                result = self.server.backup_server.dispatch(request)
+            except ServerError as exc:
+                self._reply(request_id, error=(exc.code, str(exc)))
+                continue
+            except Exception as exc:
+                log.exception(f"Request {request_id} failed")
+                self._reply(request_id, error=(INTERNAL_ERROR, str(exc)))
+                continue
+
+            self._reply(request_id, result=result)
+            if request.get("method") == "shutdown":
+                self.server.backup_server.stop_soon()
+                return
+
+    def _reply(
+        self,
+        request_id: t.Any,
+        result: t.Any = None,
+        error: tuple[int, str] | None = None,
+    ) -> None:
+        response: dict = {"jsonrpc": "2.0", "id": request_id}
+        if error is not None:
+            response["error"] = {"code": error[0], "message": error[1]}
+        else:
+            response["result"] = result
+
+        try:
+            self.wfile.write(encode_message(response))
+        except OSError as exc:
+            log.debug(f"Could not send response to client: {exc}")
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    backup_server: BackupServer
+
+
+class BackupServer:
+    """Serve CLI commands from one warm process on a Unix socket.
+
+    Params:
+        socket_path (str | Path | None): Where to listen, see
+            `server.methods.default_socket_path()`.
+
+    Usage:
+        with BackupServer() as server:
+            server.serve_forever()
+    """
+
+    def __init__(self, socket_path: t.Union[str, Path, None] = None):
+        self.socket_path: Path = (
+            Path(socket_path).expanduser() if socket_path else default_socket_path()
+        )
+        self.started: float = time.monotonic()
+        self.requests: dict[str, int] = {}
+        self.errors: int = 0
+
+        self._server: _UnixServer | None = None
+        ## Commands share the process' cwd and stdout, so they run one at a time
+        self._run_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._parser = None
+
+    def start(self) -> BackupServer:
+        """Bind the socket.
+
+        Raises:
+            ServerAlreadyRunning: If another server is listening on the socket.
+
+        """
+        if self.socket_path.exists():
+            try:
+                connect(self.socket_path).close()
+            except ServerUnavailable:
+                log.info(f"Removing stale socket '{self.socket_path}'")
+                self.socket_path.unlink()
+            else:
+                raise ServerAlreadyRunning(
+                    f"A server is already listening on '{self.socket_path}'"
+                )
+
+        self.socket_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        ## Only the user running the server may connect to it
+        umask: int = os.umask(0o177)
+        try:
+            self._server = _UnixServer(str(self.socket_path), _Handler)
+        finally:
+            os.umask(umask)
+        self._server.backup_server = self
+        log.info(f"Listening on '{self.socket_path}'")
+
+        return self
+
+    def serve_forever(self) -> None:
+        if self._server is None:
+            self.start()
+        self._server.serve_forever()
+
+    def stop_soon(self) -> None:
+        """Stop serving from a request handler, without waiting for it to return."""
+        threading.Thread(target=self.stop, name="server-shutdown", daemon=True).start()
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self.socket_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> BackupServer:
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def dispatch(self, request: dict) -> t.Any:
+        if request.get("jsonrpc") != "2.0" or not isinstance(
+            request.get("method"), str
+        ):
+            raise ServerError(INVALID_REQUEST, "Not a JSON-RPC 2.0 request")
+
+        method: str = request["method"]
+        params = request.get("params") or {}
+        if not isinstance(params, dict):
+            raise ServerError(INVALID_PARAMS, "params must be an object")
+
+        with self._stats_lock:
+            self.requests[method] = self.requests.get(method, 0) + 1
+
+        match method:
+            case "ping":
+                return {"pid": os.getpid(), "uptime": self.uptime}
+            case "run":
+                return self.run(
+                    params.get("argv"), params.get("cwd"), params.get("env")
+                )
+            case "stats":
+                return self.stats()
+            case "shutdown":
+                return {"stopping": True}
+            case _:
+                raise ServerError(METHOD_NOT_FOUND, f"Unknown method: {method}")
+
+    @property
+    def uptime(self) -> float:
+        return round(time.monotonic() - self.started, 3)
+
+    def run(self, argv: t.Any, cwd: t.Any = None, env: t.Any = None) -> dict:
+        """Run a CLI command line, returning its exit code and output.
+
+        Params:
+            argv (list[str]): The command line, without the program name.
+            cwd (str | None): Directory to run the command in.
+            env (dict[str, str] | None): Environment variables to run the command
+                with, replacing the server's until it returns.
+
+        """
+        if not isinstance(argv, list) or not all(isinstance(a, str) for a in argv):
+            raise ServerError(INVALID_PARAMS, "argv must be a list of strings")
+        if cwd is not None and not (isinstance(cwd, str) and os.path.isdir(cwd)):
+            raise ServerError(INVALID_PARAMS, f"cwd is not a directory: {cwd}")
+        if env is not None and not (
+            isinstance(env, dict)
+            and all(isinstance(k, str) and isinstance(v, str) for k, v in env.items())
+        ):
+            raise ServerError(INVALID_PARAMS, "env must map strings to strings")
+
+        from bookmark_backup.cli import cli_main
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        exit_code: int = 0
+        with self._run_lock:
+            previous_cwd: str = os.getcwd()
+            previous_env: dict[str, str] = dict(os.environ)
+            try:
+                if cwd is not None:
+                    os.chdir(cwd)
+                if env is not None:
+                    _replace_environ(env)
+                if self._parser is None:
+                    self._parser = cli_main.build_parser()
+                with (
+                    contextlib.redirect_stdout(stdout),
+                    contextlib.redirect_stderr(stderr),
+                ):
+                    try:
+                        args = cli_main.parse_args(self._parser, argv)
+                        if args.command in cli_main.LOCAL_COMMANDS:
+                            print(
+                                f"[ERROR] The '{args.command}' command cannot run on the server.",
+                                file=sys.stderr,
+                            )
+                            exit_code = 1
+                        else:
+                            cli_main.execute(args)
+                    except SystemExit as exc:
+                        exit_code = _exit_code(exc)
+                    except Exception:
+                        traceback.print_exc()
+                        exit_code = 1
+            finally:
+                os.chdir(previous_cwd)
+                if env is not None:
+                    _replace_environ(previous_env)
+
+        if exit_code:
+            with self._stats_lock:
+                self.errors += 1
+
+        return {
+            "exit_code": exit_code,
+            "stdout": stdout.getvalue(),
+            "stderr": stderr.getvalue(),
+        }
+
+    def stats(self) -> dict:
+        from bookmark_backup.domain.checksum import CHECKSUM_CACHE
+        from bookmark_backup.store.methods import DIGEST_CACHE
+
+        with self._stats_lock:
+            requests: dict[str, int] = dict(self.requests)
+            errors: int = self.errors
+
+        return {
+            "pid": os.getpid(),
+            "uptime": self.uptime,
+            "socket": str(self.socket_path),
+            "requests": requests,
+            "failed_commands": errors,
+            "caches": {
+                name: {"files": len(cache), "hits": cache.hits, "misses": cache.misses}
+                for name, cache in (
+                    ("digests", DIGEST_CACHE),
+                    ("checksums", CHECKSUM_CACHE),
+                )
+            },
+        }
+
+
+def _exit_code(exc: SystemExit) -> int:
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, int):
+        return exc.code
+
+    ## sys.exit("message") prints the message and exits with 1
+    print(exc.code, file=sys.stderr)
+
+    return 1
+
+
+def _replace_environ(env: dict[str, str]) -> None:
+    """Make `env` the process' environment, setting only the variables that differ."""
+    for name in [name for name in os.environ if name not in env]:
+        del os.environ[name]
+    for name, value in env.items():
+        if os.environ.get(name) != value:
+            os.environ[name] = value
@@ -0,0 +1,198 @@
+"""Client side of the `serve` daemon's JSON-RPC protocol.
+
+Requests and responses are JSON-RPC 2.0 objects, one per line, over a Unix socket.
+Kept to the standard library's `socket` and `json` so forwarding a command costs
+less than importing the modules that run it.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+import os
+from pathlib import Path
+import socket
+import sys
+import typing as t
+
+log = logging.getLogger(__name__)
+
+from bookmark_backup.core.constants import NO_DAEMON_ENV, SOCKET_ENV
+
+SOCKET_NAME: str = "bookmark-backup.sock"
+## Longest request or response line accepted, in bytes
+MAX_MESSAGE_BYTES: int = 64 * 1024 * 1024
+## Seconds to wait for a server to accept a connection
+CONNECT_TIMEOUT: float = 1.0
+
+## JSON-RPC 2.0 error codes
+PARSE_ERROR: int = -32700
+INVALID_REQUEST: int = -32600
+METHOD_NOT_FOUND: int = -32601
+INVALID_PARAMS: int = -32602
+INTERNAL_ERROR: int = -32603
+
+_request_ids = itertools.count(1)
+
+
+class ServerError(RuntimeError):
+    """An error response from the server."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code: int = code
+
+
+class ServerUnavailable(ConnectionError):
+    """No server is listening on the socket."""
+
+
+def default_socket_path() -> Path:
+    """Return the server's socket path.
+
+    Description:
+        `$BOOKMARK_BACKUP_SOCKET` if set, else the user's runtime directory
+        (`$XDG_RUNTIME_DIR`), else `~/.cache/bookmark-backup`.
+    """
+    if os.environ.get(SOCKET_ENV):
+        return Path(os.environ[SOCKET_ENV]).expanduser()
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return Path(os.environ["XDG_RUNTIME_DIR"]) / SOCKET_NAME
+
+    return Path("~/.cache/bookmark-backup").expanduser() / SOCKET_NAME
+
+
+def forwarding_disabled() -> bool:
+    return os.environ.get(NO_DAEMON_ENV, "").lower() in ("1", "true", "yes")
+
+
+def encode_message(message: dict) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def read_message(f: t.BinaryIO) -> dict | None:
+    """Read one message from a socket file, None if the peer closed the connection.
+
+    Raises:
+        ValueError: If the line is not a JSON object, or is too long.
+
+    """
+    line: bytes = f.readline(MAX_MESSAGE_BYTES + 1)
+    if not line:
+        return None
+    if len(line) > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Message is over {MAX_MESSAGE_BYTES} bytes")
+
+    message = json.loads(line)
+    if not isinstance(message, dict):
+        raise ValueError("Message is not a JSON object")
+
+    return message
+
+
+def connect(socket_path: t.Union[str, Path, None] = None) -> socket.socket:
+    """Connect to the server.
+
+    Raises:
+        ServerUnavailable: If no server is listening on the socket.
+
+    """
+    path: Path = Path(socket_path) if socket_path else default_socket_path()
+    if not hasattr(socket, "AF_UNIX"):
+        raise ServerUnavailable("Unix sockets are not supported on this platform")
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(str(path))
+    except OSError as exc:
+        sock.close()
+        raise ServerUnavailable(f"No server listening on '{path}': {exc}") from exc
+    ## Commands can run for a while, only the connection attempt is timed out
+    sock.settimeout(None)
+
+    return sock
+
+
+def call(
+    method: str,
+    params: dict | None = None,
+    socket_path: t.Union[str, Path, None] = None,
+) -> t.Any:
+    """Call a method on the server and return its result.
+
+    Raises:
+        ServerUnavailable: If no server is listening on the socket.
+        ServerError: If the server returned an error, or closed the connection
+            without answering.
+
+    """
+    request: dict = {"jsonrpc": "2.0", "id": next(_request_ids), "method": method}
+    if params is not None:
+        request["params"] = params
+
+    with connect(socket_path) as sock, sock.makefile("rb") as f:
+        try:
+            sock.sendall(encode_message(request))
+            response: dict | None = read_message(f)
+        except (OSError, ValueError) as exc:
+            raise ServerError(
+                INTERNAL_ERROR, f"Lost connection to server: {exc}"
+            ) from exc
+
+    if response is None:
+        raise ServerError(INTERNAL_ERROR, "Server closed the connection")
+    if "error" in response:
+        error: dict = response["error"]
+        raise ServerError(error.get("code", INTERNAL_ERROR), error.get("message", ""))
+
+    return response.get("result")
+
+
+def server_running(socket_path: t.Union[str, Path, None] = None) -> bool:
+    try:
+        call("ping", socket_path=socket_path)
+    except (ServerUnavailable, ServerError):
+        return False
+
+    return True
+
+
+def forward_command(
+    argv: list[str], socket_path: t.Union[str, Path, None] = None
+) -> int | None:
+    """Run a CLI command on the server, printing its output here.
+
+    Description:
+        The command runs in this process' working directory, with its environment
+        variables (i.e. `HOME`, `XDG_*`, `AWS_*`).
+
+    Params:
+        argv (list[str]): The command line, without the program name.
+
+    Returns:
+        (int): The command's exit code.
+        (None): If no server is running, so the command should run locally.
+
+    """
+    try:
+        result: dict = call(
+            "run",
+            {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)},
+            socket_path=socket_path,
+        )
+    except ServerUnavailable:
+        return None
+    except ServerError as exc:
+        ## The command may have run part way, so it is not retried locally
+        print(f"[ERROR] bookmark-backup server failed to run the command: {exc}")
+
+        return 1
+
+    if result.get("stdout"):
+        print(result["stdout"], end="", flush=True)
+    if result.get("stderr"):
+        print(result["stderr"], end="", file=sys.stderr, flush=True)
+
+    return int(result.get("exit_code", 0))
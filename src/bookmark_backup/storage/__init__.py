@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import importlib
+import typing as t
+
+from .methods import (
+    as_destination,
+    is_remote_url,
+    join_url,
+    remote_cache_dir,
+    split_object_url,
+)
+
+if t.TYPE_CHECKING:
+    from .controllers import (
+        LocalBackend,
+        S3Backend,
+        StorageBackend,
+        StorageError,
+        TransferStats,
+        WebDAVBackend,
+        open_backend,
+    )
+    from .sync import RemoteStore, SyncStats
+
+## Backends pull in http.client and xml, import them on first use so local-only
+#  commands do not pay for them
+_LAZY: dict[str, str] = {
+    "LocalBackend": "controllers",
+    "S3Backend": "controllers",
+    "StorageBackend": "controllers",
+    "StorageError": "controllers",
+    "TransferStats": "controllers",
+    "WebDAVBackend": "controllers",
+    "open_backend": "controllers",
+    "RemoteStore": "sync",
+    "SyncStats": "sync",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        return getattr(importlib.import_module(f".{_LAZY[name]}", __name__), name)
+
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
@@ -0,0 +1,831 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import hashlib
+import http.client
+import logging
+import os
+from pathlib import Path
+import queue
+import shutil
+import socket
+import tempfile
+import threading
+import typing as t
+from urllib.parse import parse_qs, unquote, urlsplit
+import xml.etree.ElementTree as ET
+
+log = logging.getLogger(__name__)
+
+from bookmark_backup.core.fileio import file_lock
+
+from .methods import EMPTY_SHA256, sign_v4, uri_encode
+
+## Objects at least this large are uploaded to S3 in parts
+MULTIPART_THRESHOLD: int = 8 * 1024 * 1024
+## S3 requires parts of at least 5MiB, except the last
+MULTIPART_PART_SIZE: int = 8 * 1024 * 1024
+## Connections kept open per host, and parts uploaded at the same time
+DEFAULT_POOL_SIZE: int = 8
+DEFAULT_TIMEOUT: float = 60.0
+## Bytes read from a file per socket write when sending it as a request body
+UPLOAD_BLOCK_SIZE: int = 256 * 1024
+S3_XMLNS: str = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+DAV_XMLNS: str = "{DAV:}"
+
+
+## A request body: bytes, or a file sent from its start
+Body = t.Union[bytes, memoryview, t.BinaryIO, None]
+
+
+def _body_length(body: Body) -> int:
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        return len(body)
+
+    return os.fstat(body.fileno()).st_size
+
+
+def _read_range(path: Path, offset: int, length: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(offset)
+
+        return f.read(length)
+
+
+class StorageError(OSError):
+    """A storage backend request failed."""
+
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class TransferStats:
+    requests: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def add(self, sent: int = 0, received: int = 0) -> None:
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += sent
+            self.bytes_received += received
+
+
+class StorageBackend:
+    """Where a backup store's objects live, addressed by '/'-separated keys.
+
+    Description:
+        Subclasses implement the object operations below. Keys mirror the layout of
+        a local BackupStore (`manifest.jsonl`, `blobs/ab/<digest>`), so a store can
+        be copied between backends as-is.
+    """
+
+    scheme: str = ""
+
+    def __init__(self):
+        self.stats = TransferStats()
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        raise NotImplementedError
+
+    def put_file(self, key: str, path: t.Union[str, Path]) -> None:
+        self.put_bytes(key, Path(path).read_bytes())
+
+    def get_bytes(self, key: str) -> bytes:
+        """Return an object's contents, raising FileNotFoundError if it is missing."""
+        raise NotImplementedError
+
+    def get_versioned(self, key: str) -> tuple[bytes, str | None]:
+        """Return an object's contents and version tag, for `put_bytes_if()`.
+
+        Description:
+            The tag is the object's ETag on HTTP backends. Backends that cannot
+            tell versions apart return None.
+        """
+        return self.get_bytes(key), None
+
+    def put_bytes_if(self, key: str, data: bytes, version: str | None) -> bool:
+        """Write an object only if it is still at `version`.
+
+        Params:
+            version (str | None): The tag `get_versioned()` returned, or None to
+                only write the object if it does not exist.
+
+        Returns:
+            (bool): False if the object changed since it was read, so nothing was
+                written.
+
+        """
+        self.put_bytes(key, data)
+
+        return True
+
+    def get_file(self, key: str, dest: t.Union[str, Path]) -> Path:
+        """Download an object to `dest`, through a temporary file."""
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=dest.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(self.get_bytes(key))
+            os.replace(tmp_name, dest)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+        return dest
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def list(self, prefix: str = "") -> t.Iterator[str]:
+        """Yield the keys of every object under `prefix`."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> StorageBackend:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class LocalBackend(StorageBackend):
+    """Objects stored as files under a local directory."""
+
+    scheme = "file"
+
+    def __init__(self, root: t.Union[str, Path]):
+        super().__init__()
+        self.root: Path = Path(str(root)).expanduser()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(root='{self.root}')"
+
+    def _path(self, key: str) -> Path:
+        return self.root.joinpath(*key.split("/"))
+
+    def exists(self, key: str) -> bool:
+        self.stats.add()
+        return self._path(key).exists()
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        path: Path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self.stats.add(sent=len(data))
+
+    def put_file(self, key: str, path: t.Union[str, Path]) -> None:
+        dest: Path = self._path(key)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp_name: str = f"{dest}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            shutil.copyfile(path, tmp_name)
+            os.replace(tmp_name, dest)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self.stats.add(sent=dest.stat().st_size)
+
+    def get_bytes(self, key: str) -> bytes:
+        data: bytes = self._path(key).read_bytes()
+        self.stats.add(received=len(data))
+
+        return data
+
+    def get_versioned(self, key: str) -> tuple[bytes, str | None]:
+        data: bytes = self.get_bytes(key)
+
+        return data, hashlib.sha256(data).hexdigest()
+
+    def put_bytes_if(self, key: str, data: bytes, version: str | None) -> bool:
+        path: Path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(path):
+            try:
+                current: str | None = hashlib.sha256(path.read_bytes()).hexdigest()
+            except FileNotFoundError:
+                current = None
+            if current != version:
+                return False
+            self.put_bytes(key, data)
+
+        return True
+
+    def delete(self, key: str) -> None:
+        self.stats.add()
+        self._path(key).unlink(missing_ok=True)
+
+    def list(self, prefix: str = "") -> t.Iterator[str]:
+        self.stats.add()
+        base: Path = self._path(prefix.rstrip("/")) if prefix else self.root
+        if not base.exists():
+            return
+        for dirpath, _, filenames in os.walk(base):
+            for filename in filenames:
+                ## Temporary and lock files
+                if filename.startswith(".") or ".tmp-" in filename:
+                    continue
+                yield Path(dirpath, filename).relative_to(self.root).as_posix()
+
+
+class ConnectionPool:
+    """Thread-safe pool of keep-alive HTTP(S) connections to one host."""
+
+    def __init__(
+        self,
+        scheme: str,
+        host: str,
+        port: int | None = None,
+        size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue(
+            maxsize=size
+        )
+
+    def _connect(self) -> http.client.HTTPConnection:
+        cls = (
+            http.client.HTTPSConnection
+            if self.scheme == "https"
+            else http.client.HTTPConnection
+        )
+
+        conn = cls(
+            self.host, self.port, timeout=self.timeout, blocksize=UPLOAD_BLOCK_SIZE
+        )
+        conn.connect()
+        ## Headers and body may go out in separate writes, do not wait to coalesce them
+        conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        return conn
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Body = None,
+        headers: dict[str, str] | None = None,
+    ) -> tuple[int, dict[str, str], bytes]:
+        """Send a request, returning (status, lowercased headers, body).
+
+        Description:
+            A pooled connection the server has since closed is retried once on a
+            fresh connection. A file body is streamed from its start, on each try.
+        """
+        headers = dict(headers or {})
+        streamed: bool = body is not None and not isinstance(
+            body, (bytes, bytearray, memoryview)
+        )
+        if streamed:
+            headers["Content-Length"] = str(_body_length(body))
+        for attempt in range(2):
+            conn: http.client.HTTPConnection | None = None
+            try:
+                conn = self._idle.get_nowait()
+                reused: bool = True
+            except queue.Empty:
+                reused = False
+
+            try:
+                if conn is None:
+                    conn = self._connect()
+                if streamed:
+                    body.seek(0)
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data: bytes = response.read()
+            except (http.client.HTTPException, ConnectionError, OSError) as exc:
+                if conn is not None:
+                    conn.close()
+                if reused and attempt == 0:
+                    log.debug(f"Retrying {method} {path} on a new connection: {exc}")
+                    continue
+                raise StorageError(
+                    f"{method} {self.scheme}://{self.host}:{self.port}{path} failed: {exc}"
+                ) from exc
+
+            response_headers: dict[str, str] = {
+                k.lower(): v for k, v in response.getheaders()
+            }
+            if response.will_close:
+                conn.close()
+            else:
+                try:
+                    self._idle.put_nowait(conn)
+                except queue.Full:
+                    conn.close()
+
+            return response.status, response_headers, data
+
+        raise AssertionError("unreachable")
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class _HTTPBackend(StorageBackend):
+    def __init__(
+        self,
+        scheme: str,
+        host: str,
+        port: int | None,
+        prefix: str,
+        pool_size: int = DEFAULT_POOL_SIZE,
+    ):
+        super().__init__()
+        self.host_header: str = host if port is None else f"{host}:{port}"
+        self.prefix: str = prefix.strip("/")
+        self.pool = ConnectionPool(scheme, host, port, size=pool_size)
+
+    def _key_path(self, key: str) -> str:
+        return "/" + "/".join(
+            uri_encode(part) for part in f"{self.prefix}/{key}".strip("/").split("/")
+        )
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        body: Body = None,
+        headers: dict[str, str] | None = None,
+        query: dict[str, str] | None = None,
+        ok: tuple[int, ...] = (200, 201, 204),
+    ) -> tuple[int, dict[str, str], bytes]:
+        raise NotImplementedError
+
+    def get_versioned(self, key: str) -> tuple[bytes, str | None]:
+        _, headers, data = self._request("GET", self._key_path(key))
+
+        return data, headers.get("etag")
+
+    def put_bytes_if(self, key: str, data: bytes, version: str | None) -> bool:
+        """Write an object with a conditional PUT, see `StorageBackend.put_bytes_if()`.
+
+        Description:
+            Sends `If-Match: <version>`, or `If-None-Match: *` to create the object.
+            The server answers 412 if the object changed. A server that ignores the
+            conditions writes the object unconditionally.
+        """
+        headers: dict[str, str] = (
+            {"If-Match": version} if version is not None else {"If-None-Match": "*"}
+        )
+        try:
+            self._put(key, data, headers)
+        except StorageError as exc:
+            if exc.status == 412:
+                return False
+            raise
+
+        return True
+
+    def _put(self, key: str, body: Body, headers: dict[str, str]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class S3Backend(_HTTPBackend):
+    """Objects in an S3-compatible bucket, signed with AWS Signature Version 4.
+
+    Description:
+        Uses path-style addressing (`<endpoint>/<bucket>/<key>`), which every
+        S3-compatible server supports. Large objects are uploaded in parts, several
+        at a time, over pooled keep-alive connections.
+
+    Params:
+        bucket (str): The bucket name.
+        prefix (str): Key prefix of the backup store in the bucket.
+        endpoint (str | None): i.e. `http://127.0.0.1:9000`. Defaults to
+            `$AWS_ENDPOINT_URL`, then AWS S3 in `region`.
+        region (str | None): Defaults to `$AWS_REGION`, `$AWS_DEFAULT_REGION`, then
+            "us-east-1".
+        access_key / secret_key / session_token (str | None): Default to the
+            `AWS_ACCESS_KEY_ID`, `AWS_SECRET_ACCESS_KEY` and `AWS_SESSION_TOKEN`
+            environment variables.
+    """
+
+    scheme = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint: str | None = None,
+        region: str | None = None,
+        access_key: str | None = None,
+        secret_key: str | None = None,
+        session_token: str | None = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        multipart_threshold: int = MULTIPART_THRESHOLD,
+        part_size: int = MULTIPART_PART_SIZE,
+    ):
+        self.bucket: str = bucket
+        self.region: str = (
+            region
+            or os.environ.get("AWS_REGION")
+            or os.environ.get("AWS_DEFAULT_REGION")
+            or "us-east-1"
+        )
+        endpoint = (
+            endpoint
+            or os.environ.get("AWS_ENDPOINT_URL")
+            or f"https://s3.{self.region}.amazonaws.com"
+        )
+        parts = urlsplit(endpoint)
+        super().__init__(
+            parts.scheme or "https",
+            parts.hostname,
+            parts.port,
+            prefix=f"{bucket}/{prefix.strip('/')}",
+            pool_size=pool_size,
+        )
+        self.key_prefix: str = prefix.strip("/")
+        self.access_key: str = access_key or os.environ.get("AWS_ACCESS_KEY_ID", "")
+        self.secret_key: str = secret_key or os.environ.get("AWS_SECRET_ACCESS_KEY", "")
+        self.session_token: str | None = session_token or os.environ.get(
+            "AWS_SESSION_TOKEN"
+        )
+        self.multipart_threshold: int = max(multipart_threshold, part_size)
+        self.part_size: int = part_size
+        self.pool_size: int = pool_size
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(bucket='{self.bucket}', prefix='{self.key_prefix}', endpoint='{self.pool.scheme}://{self.host_header}')"
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        body: Body = None,
+        headers: dict[str, str] | None = None,
+        query: dict[str, str] | None = None,
+        ok: tuple[int, ...] = (200, 204),
+    ) -> tuple[int, dict[str, str], bytes]:
+        query = query or {}
+        if body is None:
+            payload_hash: str = EMPTY_SHA256
+        elif isinstance(body, (bytes, bytearray, memoryview)):
+            payload_hash = hashlib.sha256(body).hexdigest()
+        else:
+            body.seek(0)
+            payload_hash = hashlib.file_digest(body, "sha256").hexdigest()
+        signed: dict[str, str] = sign_v4(
+            method,
+            self.host_header,
+            path,
+            query,
+            headers or {},
+            payload_hash,
+            access_key=self.access_key,
+            secret_key=self.secret_key,
+            region=self.region,
+            timestamp=datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+            session_token=self.session_token,
+        )
+        target: str = path
+        if query:
+            target += "?" + "&".join(
+                f"{uri_encode(k)}={uri_encode(v)}" if v != "" else uri_encode(k)
+                for k, v in sorted(query.items())
+            )
+
+        status, response_headers, data = self.pool.request(
+            method, target, body=body, headers=signed
+        )
+        self.stats.add(sent=_body_length(body), received=len(data))
+        if status not in ok:
+            if status == 404:
+                raise FileNotFoundError(f"{method} s3://{self.bucket}{path}: not found")
+            raise StorageError(
+                f"{method} s3://{self.bucket}{path} failed with HTTP {status}: {data[:300]!r}",
+                status=status,
+            )
+
+        return status, response_headers, data
+
+    def exists(self, key: str) -> bool:
+        try:
+            self._request("HEAD", self._key_path(key))
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        if len(data) >= self.multipart_threshold:
+            ## Parts are slices of one buffer, not copies
+            view = memoryview(data)
+            self._put_multipart(
+                key, len(data), lambda offset, length: view[offset : offset + length]
+            )
+        else:
+            self._put(key, data, {})
+
+    def put_file(self, key: str, path: t.Union[str, Path]) -> None:
+        """Upload a file, streaming it instead of reading it into memory.
+
+        Description:
+            A large file is uploaded in parts, each read from the file when it is
+            sent, so at most `pool_size` parts are held in memory at a time.
+        """
+        path = Path(path)
+        size: int = path.stat().st_size
+        if size >= self.multipart_threshold:
+            self._put_multipart(
+                key, size, lambda offset, length: _read_range(path, offset, length)
+            )
+            return
+
+        with open(path, "rb") as f:
+            self._put(key, f, {})
+
+    def _put(self, key: str, body: Body, headers: dict[str, str]) -> None:
+        self._request("PUT", self._key_path(key), body=body, headers=headers)
+
+    def _put_multipart(
+        self, key: str, size: int, read_part: t.Callable[[int, int], Body]
+    ) -> None:
+        """Upload an object of `size` bytes in parts.
+
+        Params:
+            read_part (Callable[[int, int], bytes]): Returns the `length` bytes of
+                the object at `offset`, called from the upload threads.
+
+        """
+        path: str = self._key_path(key)
+        _, _, body = self._request("POST", path, query={"uploads": ""})
+        upload_id: str = ET.fromstring(body).findtext(f"{S3_XMLNS}UploadId") or ""
+        if not upload_id:
+            upload_id = ET.fromstring(body).findtext("UploadId") or ""
+
+        def upload_part(number: int) -> str:
+            _, headers, _ = self._request(
+                "PUT",
+                path,
+                body=read_part((number - 1) * self.part_size, self.part_size),
+                query={"partNumber": str(number), "uploadId": upload_id},
+            )
+
+            return headers.get("etag", "")
+
+        numbers: list[int] = list(
+            range(1, (size + self.part_size - 1) // self.part_size + 1)
+        )
+        try:
+            with ThreadPoolExecutor(max_workers=self.pool_size) as pool:
+                etags: list[str] = list(pool.map(upload_part, numbers))
+
+            complete: str = "".join(
+                f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+                for number, etag in zip(numbers, etags)
+            )
+            self._request(
+                "POST",
+                path,
+                body=f"<CompleteMultipartUpload>{complete}</CompleteMultipartUpload>".encode(
+                    "utf-8"
+                ),
+                query={"uploadId": upload_id},
+            )
+        except BaseException:
+            try:
+                self._request("DELETE", path, query={"uploadId": upload_id})
+            except Exception as exc:
+                log.warning(f"Could not abort multipart upload of '{key}': {exc}")
+            raise
+
+    def get_bytes(self, key: str) -> bytes:
+        return self._request("GET", self._key_path(key))[2]
+
+    def delete(self, key: str) -> None:
+        try:
+            self._request("DELETE", self._key_path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix: str = "") -> t.Iterator[str]:
+        full_prefix: str = "/".join(p for p in (self.key_prefix, prefix) if p)
+        strip: int = len(self.key_prefix) + 1 if self.key_prefix else 0
+        token: str | None = None
+        while True:
+            query: dict[str, str] = {"list-type": "2", "prefix": full_prefix}
+            if token:
+                query["continuation-token"] = token
+            _, _, body = self._request(
+                "GET", f"/{uri_encode(self.bucket)}", query=query
+            )
+            root = ET.fromstring(body)
+            ns: str = S3_XMLNS if root.tag.startswith(S3_XMLNS) else ""
+            for contents in root.iter(f"{ns}Contents"):
+                yield (contents.findtext(f"{ns}Key") or "")[strip:]
+            token = root.findtext(f"{ns}NextContinuationToken")
+            if root.findtext(f"{ns}IsTruncated") != "true" or not token:
+                return
+
+
+class WebDAVBackend(_HTTPBackend):
+    """Objects on a WebDAV server, i.e. Nextcloud, or Apache with mod_dav.
+
+    Params:
+        url (str): `http(s)://host[:port]/path` of the backup store's collection.
+        username / password (str | None): HTTP Basic credentials. Default to the
+            URL's credentials, then `$WEBDAV_USERNAME` and `$WEBDAV_PASSWORD`.
+    """
+
+    scheme = "webdav"
+
+    def __init__(
+        self,
+        url: str,
+        username: str | None = None,
+        password: str | None = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+    ):
+        parts = urlsplit(url)
+        super().__init__(
+            parts.scheme, parts.hostname, parts.port, parts.path, pool_size=pool_size
+        )
+        username = (
+            username
+            or unquote(parts.username or "")
+            or os.environ.get("WEBDAV_USERNAME")
+        )
+        password = (
+            password
+            or unquote(parts.password or "")
+            or os.environ.get("WEBDAV_PASSWORD")
+        )
+        self._auth: dict[str, str] = {}
+        if username:
+            import base64
+
+            token: str = base64.b64encode(
+                f"{username}:{password or ''}".encode("utf-8")
+            ).decode("ascii")
+            self._auth["Authorization"] = f"Basic {token}"
+        ## Collections known to exist, so MKCOL is sent once per directory
+        self._collections: set[str] = set()
+        self._collections_lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(url='{self.pool.scheme}://{self.host_header}/{self.prefix}')"
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        body: Body = None,
+        headers: dict[str, str] | None = None,
+        query: dict[str, str] | None = None,
+        ok: tuple[int, ...] = (200, 201, 204),
+    ) -> tuple[int, dict[str, str], bytes]:
+        status, response_headers, data = self.pool.request(
+            method, path, body=body, headers={**self._auth, **(headers or {})}
+        )
+        self.stats.add(sent=_body_length(body), received=len(data))
+        if status not in ok:
+            if status == 404:
+                raise FileNotFoundError(f"{method} {path}: not found")
+            raise StorageError(
+                f"{method} {path} failed with HTTP {status}: {data[:300]!r}",
+                status=status,
+            )
+
+        return status, response_headers, data
+
+    def _ensure_collection(self, key: str) -> None:
+        parts: list[str] = f"{self.prefix}/{key}".strip("/").split("/")[:-1]
+        for depth in range(1, len(parts) + 1):
+            collection: str = "/".join(parts[:depth])
+            if collection in self._collections:
+                continue
+            ## Held across the request, so parallel uploads do not create it twice
+            with self._collections_lock:
+                if collection in self._collections:
+                    continue
+                path: str = "/" + "/".join(uri_encode(p) for p in parts[:depth]) + "/"
+                ## 405 means the collection already exists
+                self._request("MKCOL", path, ok=(200, 201, 204, 405))
+                self._collections.add(collection)
+
+    def exists(self, key: str) -> bool:
+        try:
+            self._request("HEAD", self._key_path(key))
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        self._put(key, data, {})
+
+    def put_file(self, key: str, path: t.Union[str, Path]) -> None:
+        """Upload a file, streaming it instead of reading it into memory."""
+        with open(path, "rb") as f:
+            self._put(key, f, {})
+
+    def _put(self, key: str, body: Body, headers: dict[str, str]) -> None:
+        self._ensure_collection(key)
+        self._request("PUT", self._key_path(key), body=body, headers=headers)
+
+    def get_bytes(self, key: str) -> bytes:
+        return self._request("GET", self._key_path(key))[2]
+
+    def delete(self, key: str) -> None:
+        try:
+            self._request("DELETE", self._key_path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix: str = "") -> t.Iterator[str]:
+        base: str = self._key_path(prefix.rstrip("/")) if prefix else self._key_path("")
+        root_path: str = self._key_path("").rstrip("/") + "/"
+        pending: list[str] = [base.rstrip("/") + "/"]
+        while pending:
+            collection: str = pending.pop()
+            try:
+                _, _, body = self._request(
+                    "PROPFIND",
+                    collection,
+                    headers={"Depth": "1", "Content-Type": "application/xml"},
+                    ok=(207,),
+                )
+            except FileNotFoundError:
+                continue
+
+            for response in ET.fromstring(body).iter(f"{DAV_XMLNS}response"):
+                href: str = urlsplit(response.findtext(f"{DAV_XMLNS}href") or "").path
+                if href.rstrip("/") == collection.rstrip("/"):
+                    continue
+                if response.find(f".//{DAV_XMLNS}collection") is not None:
+                    pending.append(href.rstrip("/") + "/")
+                elif href.startswith(root_path):
+                    yield unquote(href[len(root_path) :])
+
+
+def open_backend(url: t.Union[str, Path]) -> StorageBackend:
+    """Open the storage backend a URL or path points to.
+
+    Description:
+        - `/path` or `file:///path`: LocalBackend
+        - `s3://bucket/prefix[?endpoint=http://host:port&region=...]`: S3Backend
+        - `webdav://host/path`, `webdavs://host/path`: WebDAVBackend over http(s)
+        - `sftp://`: not supported, mount the server (i.e. with sshfs) and use
+          its local path instead.
+    """
+    if isinstance(url, Path):
+        return LocalBackend(url)
+
+    parts = urlsplit(url)
+    options: dict[str, str] = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+
+    match parts.scheme.lower():
+        case "" | "file":
+            return LocalBackend(unquote(parts.path) if parts.scheme else url)
+        case "s3":
+            return S3Backend(
+                bucket=parts.hostname or "",
+                prefix=unquote(parts.path),
+                endpoint=options.get("endpoint"),
+                region=options.get("region"),
+            )
+        case "webdav" | "webdavs":
+            scheme: str = "https" if parts.scheme.lower() == "webdavs" else "http"
+            return WebDAVBackend(parts._replace(scheme=scheme, query="").geturl())
+        case "sftp":
+            raise ValueError(
+                "SFTP destinations are not supported, mount the server (i.e. with sshfs) and back up to its local path."
+            )
+        case _:
+            raise ValueError(f"Unsupported storage URL: {url}")
@@ -0,0 +1,322 @@
+"""In-process S3 and WebDAV stand-in, for tests and benchmarks without a real server.
+
+Implements the subset of each protocol the storage backends use, keeping objects
+in memory. Signatures are not checked, only that S3 requests carry one. Objects'
+ETags are the MD5 of their contents, and `If-Match`/`If-None-Match` on PUT are
+honored like S3 and WebDAV servers that support conditional writes do.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+import threading
+import time
+import typing as t
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+import uuid
+from xml.sax.saxutils import escape
+
+log = logging.getLogger(__name__)
+
+S3_XMLNS: str = "http://s3.amazonaws.com/doc/2006-03-01/"
+## Keys per ListObjectsV2 page, like S3
+LIST_PAGE_SIZE: int = 1000
+
+
+def _etag(data: bytes) -> str:
+    return f'"{hashlib.md5(data, usedforsecurity=False).hexdigest()}"'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: _FakeHTTPServer
+
+    def log_message(self, format: str, *args) -> None:
+        log.debug(format % args)
+
+    def _body(self) -> bytes:
+        length: int = int(self.headers.get("Content-Length") or 0)
+
+        return self.rfile.read(length) if length else b""
+
+    def _precondition_failed(self, current: bytes | None) -> bool:
+        """True if a conditional write does not match the object's current version."""
+        if_match: str | None = self.headers.get("If-Match")
+        if_none_match: str | None = self.headers.get("If-None-Match")
+        if if_match is not None and (current is None or if_match != _etag(current)):
+            return True
+
+        return if_none_match == "*" and current is not None
+
+    def _send(
+        self,
+        status: int,
+        body: bytes = b"",
+        headers: dict[str, str] | None = None,
+        content_type: str = "application/xml",
+    ) -> None:
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        if body:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _dispatch(self) -> None:
+        fake: FakeObjectServer = self.server.fake
+        fake.requests[self.command] += 1
+        if fake.latency:
+            time.sleep(fake.latency)
+
+        parts = urlsplit(self.path)
+        path: str = unquote(parts.path)
+        query: dict[str, str] = {
+            k: v[-1] for k, v in parse_qs(parts.query, keep_blank_values=True).items()
+        }
+        body: bytes = self._body()
+
+        if fake.protocol == "s3":
+            if "authorization" not in {k.lower() for k in self.headers.keys()}:
+                self._send(403, b"<Error><Code>AccessDenied</Code></Error>")
+                return
+            self._s3(path, query, body)
+        else:
+            self._webdav(path, body)
+
+    do_GET = do_PUT = do_POST = do_HEAD = do_DELETE = _dispatch
+    do_MKCOL = do_PROPFIND = _dispatch
+
+    def _s3(self, path: str, query: dict[str, str], body: bytes) -> None:
+        fake: FakeObjectServer = self.server.fake
+        bucket, _, key = path.lstrip("/").partition("/")
+        full: str = f"{bucket}/{key}"
+
+        match self.command:
+            case "GET" if not key and query.get("list-type") == "2":
+                self._list_objects(bucket, query)
+            case "GET" | "HEAD":
+                data: bytes | None = fake.objects.get(full)
+                if data is None:
+                    self._send(404, b"<Error><Code>NoSuchKey</Code></Error>")
+                else:
+                    self._send(
+                        200, data, {"ETag": _etag(data)}, "application/octet-stream"
+                    )
+            case "PUT" if "uploadId" in query:
+                with fake.lock:
+                    fake.uploads[query["uploadId"]][int(query["partNumber"])] = body
+                self._send(200, headers={"ETag": f'"part-{query["partNumber"]}"'})
+            case "PUT":
+                with fake.lock:
+                    if self._precondition_failed(fake.objects.get(full)):
+                        self._send(
+                            412, b"<Error><Code>PreconditionFailed</Code></Error>"
+                        )
+                        return
+                    fake.objects[full] = body
+                self._send(200, headers={"ETag": _etag(body)})
+            case "POST" if "uploads" in query:
+                upload_id: str = uuid.uuid4().hex
+                with fake.lock:
+                    fake.uploads[upload_id] = {}
+                self._send(
+                    200,
+                    f'<InitiateMultipartUploadResult xmlns="{S3_XMLNS}"><Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>'.encode(),
+                )
+            case "POST" if "uploadId" in query:
+                with fake.lock:
+                    parts: dict[int, bytes] = fake.uploads.pop(query["uploadId"])
+                    fake.objects[full] = b"".join(parts[n] for n in sorted(parts))
+                self._send(
+                    200,
+                    f'<CompleteMultipartUploadResult xmlns="{S3_XMLNS}"><Key>{escape(key)}</Key></CompleteMultipartUploadResult>'.encode(),
+                )
+            case "DELETE" if "uploadId" in query:
+                with fake.lock:
+                    fake.uploads.pop(query["uploadId"], None)
+                self._send(204)
+            case "DELETE":
+                with fake.lock:
+                    fake.objects.pop(full, None)
+                self._send(204)
+            case _:
+                self._send(405)
+
+    def _list_objects(self, bucket: str, query: dict[str, str]) -> None:
+        fake: FakeObjectServer = self.server.fake
+        prefix: str = f"{bucket}/{query.get('prefix', '')}"
+        start_after: str = query.get("continuation-token", "")
+        with fake.lock:
+            keys: list[str] = sorted(
+                k[len(bucket) + 1 :]
+                for k in fake.objects
+                if k.startswith(prefix) and k[len(bucket) + 1 :] > start_after
+            )
+        page: list[str] = keys[:LIST_PAGE_SIZE]
+        truncated: bool = len(keys) > LIST_PAGE_SIZE
+        contents: str = "".join(
+            f"<Contents><Key>{escape(k)}</Key><Size>{len(fake.objects.get(f'{bucket}/{k}', b''))}</Size></Contents>"
+            for k in page
+        )
+        token: str = (
+            f"<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>"
+            if truncated
+            else ""
+        )
+        self._send(
+            200,
+            f'<ListBucketResult xmlns="{S3_XMLNS}"><Name>{escape(bucket)}</Name><KeyCount>{len(page)}</KeyCount><IsTruncated>{str(truncated).lower()}</IsTruncated>{token}{contents}</ListBucketResult>'.encode(),
+        )
+
+    def _webdav(self, path: str, body: bytes) -> None:
+        fake: FakeObjectServer = self.server.fake
+        key: str = path.strip("/")
+        parent: str = key.rpartition("/")[0]
+
+        match self.command:
+            case "GET" | "HEAD":
+                data: bytes | None = fake.objects.get(key)
+                if data is None:
+                    self._send(404)
+                else:
+                    self._send(
+                        200,
+                        data,
+                        {"ETag": _etag(data)},
+                        content_type="application/octet-stream",
+                    )
+            case "PUT":
+                if parent and parent not in fake.collections:
+                    self._send(409)
+                    return
+                with fake.lock:
+                    existed: bool = key in fake.objects
+                    if self._precondition_failed(fake.objects.get(key)):
+                        self._send(412)
+                        return
+                    fake.objects[key] = body
+                self._send(204 if existed else 201, headers={"ETag": _etag(body)})
+            case "MKCOL":
+                if key in fake.collections:
+                    self._send(405)
+                elif parent and parent not in fake.collections:
+                    self._send(409)
+                else:
+                    with fake.lock:
+                        fake.collections.add(key)
+                    self._send(201)
+            case "DELETE":
+                with fake.lock:
+                    found: bool = fake.objects.pop(key, None) is not None
+                self._send(204 if found else 404)
+            case "PROPFIND":
+                self._propfind(key)
+            case _:
+                self._send(405)
+
+    def _propfind(self, key: str) -> None:
+        fake: FakeObjectServer = self.server.fake
+        if key and key not in fake.collections:
+            self._send(404)
+            return
+
+        prefix: str = f"{key}/" if key else ""
+        with fake.lock:
+            children: set[tuple[str, bool]] = set()
+            for name in list(fake.objects) + list(fake.collections):
+                if not name.startswith(prefix) or name == key:
+                    continue
+                child, _, rest = name[len(prefix) :].partition("/")
+                children.add((child, bool(rest) or name in fake.collections))
+
+        def response(href: str, collection: bool) -> str:
+            resourcetype: str = "<D:collection/>" if collection else ""
+            return f"<D:response><D:href>{quote(href)}</D:href><D:propstat><D:prop><D:resourcetype>{resourcetype}</D:resourcetype></D:prop><D:status>HTTP/1.1 200 OK</D:status></D:propstat></D:response>"
+
+        responses: str = response(f"/{prefix}", True) + "".join(
+            response(f"/{prefix}{child}" + ("/" if collection else ""), collection)
+            for child, collection in sorted(children)
+        )
+        self._send(
+            207, f'<D:multistatus xmlns:D="DAV:">{responses}</D:multistatus>'.encode()
+        )
+
+
+class _FakeHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    fake: FakeObjectServer
+
+
+class FakeObjectServer:
+    """An S3 or WebDAV server on localhost, running in a background thread.
+
+    Params:
+        protocol (str): "s3" or "webdav".
+        latency (float): Seconds added to every request, to simulate a remote server.
+
+    Usage:
+        with FakeObjectServer("s3") as server:
+            backend = S3Backend("bucket", endpoint=server.url)
+    """
+
+    def __init__(self, protocol: str = "s3", latency: float = 0.0):
+        if protocol not in ("s3", "webdav"):
+            raise ValueError(
+                f"Invalid protocol: {protocol}. Must be one of ['s3', 'webdav']"
+            )
+
+        self.protocol: str = protocol
+        self.latency: float = latency
+        self.objects: dict[str, bytes] = {}
+        self.collections: set[str] = set()
+        self.uploads: dict[str, dict[int, bytes]] = {}
+        ## Requests received, by HTTP method
+        self.requests: Counter[str] = Counter()
+        self.lock = threading.Lock()
+
+        self._server: _FakeHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+
+        return f"http://{host}:{port}"
+
+    def start(self) -> FakeObjectServer:
+        self._server = _FakeHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-object-server", daemon=True
+        )
+        self._thread.start()
+
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> FakeObjectServer:
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def storage_url(self, path: str = "bookmarks") -> str:
+        """Return a storage URL for `open_backend()` pointing at this server."""
+        host, port = self._server.server_address[:2]
+        if self.protocol == "s3":
+            bucket, _, prefix = path.strip("/").partition("/")
+            return f"s3://{bucket}/{prefix}?endpoint={self.url}"
+
+        return f"webdav://{host}:{port}/{path.strip('/')}"
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import logging
+import os
+from pathlib import Path
+import typing as t
+from urllib.parse import quote, urlsplit
+
+log = logging.getLogger(__name__)
+
+## URL schemes of remote storage backends
+REMOTE_SCHEMES: tuple[str, ...] = ("s3", "webdav", "webdavs", "sftp")
+## sha256 of an empty body, used when signing requests without one
+EMPTY_SHA256: str = hashlib.sha256(b"").hexdigest()
+
+
+def is_remote_url(value: t.Union[str, Path, None]) -> bool:
+    """True if `value` is a remote storage URL, i.e. `s3://bucket/prefix`."""
+    if value is None or isinstance(value, Path):
+        return False
+
+    return urlsplit(str(value)).scheme.lower() in REMOTE_SCHEMES
+
+
+def as_destination(dest: t.Union[str, Path]) -> t.Union[str, Path]:
+    """Return a storage URL unchanged, or a local destination as an expanded Path."""
+    if is_remote_url(dest):
+        return str(dest)
+
+    return Path(str(dest)).expanduser()
+
+
+def split_object_url(url: str) -> tuple[str, str]:
+    """Split the URL of one object into its container URL and the object's name.
+
+    Description:
+        `s3://bucket/backups/Bookmarks.gz?endpoint=...` becomes
+        (`s3://bucket/backups?endpoint=...`, `Bookmarks.gz`).
+    """
+    parts = urlsplit(url)
+    parent, _, name = parts.path.rstrip("/").rpartition("/")
+    if not name:
+        raise ValueError(f"Storage URL '{url}' does not name an object.")
+
+    return parts._replace(path=parent).geturl(), name
+
+
+def join_url(url: str, *names: str) -> str:
+    """Append path segments to a storage URL, keeping its query string."""
+    parts = urlsplit(url)
+    path: str = "/".join([parts.path.rstrip("/"), *(n.strip("/") for n in names)])
+
+    return parts._replace(path=path).geturl()
+
+
+def remote_cache_dir(url: str) -> Path:
+    """Return the local working copy of the backup store at a remote URL.
+
+    Description:
+        Lives under `$XDG_CACHE_HOME` (or `~/.cache`), named by a hash of the URL so
+        credentials in the URL never end up in a path.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    digest: str = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+
+    return Path(cache_home) / "bookmark-backup" / "remote" / digest
+
+
+def uri_encode(value: str, safe: str = "-_.~") -> str:
+    """Percent-encode `value` the way AWS Signature Version 4 expects."""
+    return quote(value, safe=safe)
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+def sign_v4(
+    method: str,
+    host: str,
+    path: str,
+    query: dict[str, str],
+    headers: dict[str, str],
+    payload_hash: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    timestamp: str,
+    service: str = "s3",
+    session_token: str | None = None,
+) -> dict[str, str]:
+    """Return the headers that sign a request with AWS Signature Version 4.
+
+    Params:
+        path (str): The request path, already URI-encoded.
+        query (dict[str, str]): Query parameters, not yet encoded.
+        headers (dict[str, str]): Extra headers to sign, i.e. Content-Type.
+        payload_hash (str): Hex sha256 of the request body.
+        timestamp (str): Request time as `YYYYMMDDTHHMMSSZ`.
+
+    Returns:
+        (dict[str, str]): `headers` plus Host, X-Amz-Date, X-Amz-Content-Sha256,
+            X-Amz-Security-Token (with a session token) and Authorization.
+
+    """
+    date: str = timestamp[:8]
+    signed: dict[str, str] = {
+        **{k.lower(): str(v).strip() for k, v in headers.items()},
+        "host": host,
+        "x-amz-content-sha256": payload_hash,
+        "x-amz-date": timestamp,
+    }
+    if session_token:
+        signed["x-amz-security-token"] = session_token
+
+    names: list[str] = sorted(signed)
+    canonical_query: str = "&".join(
+        f"{uri_encode(k)}={uri_encode(v)}" for k, v in sorted(query.items())
+    )
+    canonical_request: str = "\n".join(
+        [
+            method,
+            path,
+            canonical_query,
+            "".join(f"{name}:{signed[name]}\n" for name in names),
+            ";".join(names),
+            payload_hash,
+        ]
+    )
+
+    scope: str = f"{date}/{region}/{service}/aws4_request"
+    string_to_sign: str = "\n".join(
+        [
+            "AWS4-HMAC-SHA256",
+            timestamp,
+            scope,
+            hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+        ]
+    )
+    key: bytes = _hmac(f"AWS4{secret_key}".encode("utf-8"), date)
+    for part in (region, service, "aws4_request"):
+        key = _hmac(key, part)
+    signature: str = hmac.new(
+        key, string_to_sign.encode("utf-8"), hashlib.sha256
+    ).hexdigest()
+
+    out: dict[str, str] = {k: v for k, v in signed.items() if k != "host"}
+    out["authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+        f"SignedHeaders={';'.join(names)}, Signature={signature}"
+    )
+
+    return out
@@ -0,0 +1,295 @@
+"""Keep a local BackupStore in sync with a copy on a storage backend.
+
+Remote stores are worked on through a local copy (see `remote_cache_dir()`):
+snapshots are added locally as usual, then pushed. Blobs are content-addressed, so
+a push only uploads the blobs the remote manifest does not already reference.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+import threading
+import time
+import typing as t
+
+log = logging.getLogger(__name__)
+
+from bookmark_backup.core.metrics import count, timed
+from bookmark_backup.store import BackupStore, Snapshot, SnapshotNotFoundError
+from bookmark_backup.store.controllers import MANIFEST_FILENAME
+from bookmark_backup.store.methods import blob_relpath
+
+from .controllers import DEFAULT_POOL_SIZE, StorageBackend, StorageError, open_backend
+from .methods import remote_cache_dir
+
+## Times a push re-reads and merges the remote manifest after another writer changed it
+MANIFEST_PUSH_ATTEMPTS: int = 5
+
+
+@dataclass
+class SyncStats:
+    snapshots: int = 0
+    blobs_transferred: int = 0
+    ## Blobs the other side already had
+    blobs_skipped: int = 0
+    bytes_transferred: int = 0
+    requests: int = 0
+    duration: float = 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes_transferred / 1e6 / self.duration if self.duration else 0.0
+
+
+## Serializes pushes that share a local copy, so they do not upload the same blobs
+_PUSH_LOCKS: dict[Path, threading.Lock] = {}
+_PUSH_LOCKS_GUARD = threading.Lock()
+
+
+def _push_lock(root: Path) -> threading.Lock:
+    with _PUSH_LOCKS_GUARD:
+        return _PUSH_LOCKS.setdefault(root.resolve(), threading.Lock())
+
+
+def _merge_manifests(first: bytes, second: bytes) -> bytes:
+    """Union two manifests by snapshot id, keeping `first`'s order, then `second`'s."""
+    lines: dict[str, str] = {}
+    for raw in (first, second):
+        for line in raw.decode("utf-8").splitlines():
+            if line.strip():
+                lines.setdefault(json.loads(line)["id"], line)
+
+    return "".join(line + "\n" for line in lines.values()).encode("utf-8")
+
+
+class RemoteStore:
+    """A BackupStore on a storage backend, worked on through a local copy.
+
+    Params:
+        url (str): The storage URL, see `open_backend()`.
+        compress (str | None): Compression applied to new blobs.
+        cache_dir (str | Path | None): The local copy, `remote_cache_dir(url)` if None.
+        backend (StorageBackend | None): Use this backend instead of opening `url`.
+        max_workers (int): Blobs transferred at the same time.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        compress: str | None = None,
+        cache_dir: t.Union[str, Path, None] = None,
+        backend: StorageBackend | None = None,
+        max_workers: int = DEFAULT_POOL_SIZE,
+    ):
+        self.url: str = url
+        self.backend: StorageBackend = backend or open_backend(url)
+        self.store = BackupStore(cache_dir or remote_cache_dir(url), compress=compress)
+        self.max_workers: int = max(1, max_workers)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(backend={self.backend!r}, cache='{self.store.root}')"
+
+    def close(self) -> None:
+        self.backend.close()
+
+    def __enter__(self) -> RemoteStore:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _remote_manifest(self) -> bytes:
+        return self._remote_manifest_versioned()[0]
+
+    def _remote_manifest_versioned(self) -> tuple[bytes, str | None]:
+        """Return the remote manifest and its version, None if it does not exist."""
+        try:
+            return self.backend.get_versioned(MANIFEST_FILENAME)
+        except FileNotFoundError:
+            return b"", None
+
+    def _write_local_manifest(self, data: bytes) -> None:
+        self.store.init()
+        with self.store.manifest_lock():
+            fd, tmp_name = tempfile.mkstemp(
+                dir=self.store.root, prefix=".tmp-manifest-"
+            )
+            try:
+                with os.fdopen(fd, "wb") as tmp:
+                    tmp.write(data)
+                    tmp.flush()
+                    os.fsync(tmp.fileno())
+                os.replace(tmp_name, self.store.manifest_path)
+            except BaseException:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
+
+    def _local_manifest(self) -> bytes:
+        if not self.store.manifest_path.exists():
+            return b""
+
+        return self.store.manifest_path.read_bytes()
+
+    def pull(
+        self,
+        snapshot_ids: t.Iterable[str] | None = None,
+        latest_of: tuple[str, str] | None = None,
+    ) -> SyncStats:
+        """Merge the remote manifest into the local copy and download blobs it lacks.
+
+        Params:
+            snapshot_ids (Iterable[str] | None): Only download the blobs these
+                snapshots need, including their delta chains. All blobs if None.
+            latest_of (tuple[str, str] | None): Only download the blobs of this
+                (browser, profile)'s newest snapshot, i.e. before adding an
+                incremental snapshot on top of it.
+
+        """
+        stats = SyncStats()
+        requests_before: int = self.backend.stats.requests
+        start: float = time.perf_counter()
+
+        self._write_local_manifest(
+            _merge_manifests(self._remote_manifest(), self._local_manifest())
+        )
+        snapshots: list[Snapshot] = self.store.snapshots()
+        stats.snapshots = len(snapshots)
+        index: dict[str, Snapshot] = {s.id: s for s in snapshots}
+
+        if latest_of is not None:
+            latest = self.store.latest(browser=latest_of[0], profile=latest_of[1])
+            snapshot_ids = [latest.id] if latest else []
+
+        if snapshot_ids is None:
+            wanted: list[Snapshot] = snapshots
+        else:
+            wanted = []
+            for sid in snapshot_ids:
+                if sid not in index:
+                    raise SnapshotNotFoundError(
+                        f"Could not find snapshot '{sid}' in store '{self.url}'."
+                    )
+                wanted.extend(self.store._chain(index[sid], index))
+
+        missing: list[str] = sorted(
+            {s.hash for s in wanted if not self.store.has_blob(s.hash)}
+        )
+        stats.blobs_skipped = len({s.hash for s in wanted}) - len(missing)
+
+        def download(digest: str) -> int:
+            return (
+                self.backend.get_file(
+                    blob_relpath(digest).as_posix(), self.store.blob_path(digest)
+                )
+                .stat()
+                .st_size
+            )
+
+        with (
+            timed("download") as phase,
+            ThreadPoolExecutor(max_workers=self.max_workers) as pool,
+        ):
+            for size in pool.map(download, missing):
+                stats.blobs_transferred += 1
+                stats.bytes_transferred += size
+            phase.bytes = stats.bytes_transferred
+
+        stats.requests = self.backend.stats.requests - requests_before
+        stats.duration = time.perf_counter() - start
+        count("remote_requests", stats.requests)
+        count("blobs_skipped", stats.blobs_skipped)
+        log.info(
+            f"Pulled {stats.blobs_transferred} blob(s) ({stats.bytes_transferred} bytes) from {self.url} in {stats.requests} request(s)"
+        )
+
+        return stats
+
+    def push(self) -> SyncStats:
+        """Upload the blobs the remote store lacks, then the merged manifest.
+
+        Description:
+            Blobs go first, so the remote manifest never lists a snapshot whose blob
+            has not been uploaded yet. That makes every blob the remote manifest
+            references safe to skip, so a push costs one request for the manifest,
+            one per new blob, and one to write the manifest back, without listing
+            the remote store.
+
+            The manifest is written back with a conditional PUT on the version that
+            was read. If another process pushed in between, its manifest is read and
+            merged again, up to `MANIFEST_PUSH_ATTEMPTS` times, so concurrent pushes
+            to one store do not drop each other's snapshots. On servers that ignore
+            conditional writes, only one process may push to a store at a time.
+
+        Raises:
+            StorageError: If the remote manifest changed on every attempt.
+
+        """
+        stats = SyncStats()
+        requests_before: int = self.backend.stats.requests
+        start: float = time.perf_counter()
+
+        with _push_lock(self.store.root):
+            snapshots: list[Snapshot] = self.store.snapshots()
+            stats.snapshots = len(snapshots)
+            digests: set[str] = {s.hash for s in snapshots}
+            uploaded: set[str] = set()
+
+            def upload(digest: str) -> int:
+                path: Path = self.store.blob_path(digest)
+                self.backend.put_file(blob_relpath(digest).as_posix(), path)
+
+                return path.stat().st_size
+
+            for attempt in range(1, MANIFEST_PUSH_ATTEMPTS + 1):
+                remote_manifest, version = self._remote_manifest_versioned()
+                remote_blobs: set[str] = {
+                    json.loads(line)["hash"]
+                    for line in remote_manifest.decode("utf-8").splitlines()
+                    if line.strip()
+                }
+                ## Blobs uploaded by an earlier attempt are not referenced yet
+                missing: list[str] = sorted(digests - remote_blobs - uploaded)
+                stats.blobs_skipped = len(digests - uploaded) - len(missing)
+
+                with (
+                    timed("upload") as phase,
+                    ThreadPoolExecutor(max_workers=self.max_workers) as pool,
+                ):
+                    for size in pool.map(upload, missing):
+                        stats.blobs_transferred += 1
+                        stats.bytes_transferred += size
+                    phase.bytes = stats.bytes_transferred
+                uploaded.update(missing)
+
+                merged: bytes = _merge_manifests(
+                    remote_manifest, self._local_manifest()
+                )
+                if merged == remote_manifest or self.backend.put_bytes_if(
+                    MANIFEST_FILENAME, merged, version
+                ):
+                    break
+                count("manifest_conflicts")
+                log.info(
+                    f"Remote manifest of {self.url} changed during push, merging again (attempt {attempt}/{MANIFEST_PUSH_ATTEMPTS})"
+                )
+            else:
+                raise StorageError(
+                    f"Could not update the manifest of {self.url}, it changed on each of {MANIFEST_PUSH_ATTEMPTS} attempts"
+                )
+            self._write_local_manifest(merged)
+
+        stats.requests = self.backend.stats.requests - requests_before
+        stats.duration = time.perf_counter() - start
+        count("remote_requests", stats.requests)
+        count("blobs_skipped", stats.blobs_skipped)
+        log.info(
+            f"Pushed {stats.blobs_transferred} blob(s) ({stats.bytes_transferred} bytes) to {self.url} in {stats.requests} request(s), skipped {stats.blobs_skipped} already there"
+        )
+
+        return stats
@@ -0,0 +1,5 @@
+from __future__ import annotations
+
+from .controllers import BackupStore, Snapshot, SnapshotNotFoundError
+from .methods import hash_file
+from .retention import PrunePlan, RetentionPolicy, plan_prune, prune_store
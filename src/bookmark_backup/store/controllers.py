@@ -0,0 +1,686 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timezone
+import functools
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+import threading
+import typing as t
+import uuid
+
+log = logging.getLogger(__name__)
+
+from bookmark_backup.core import compression
+from bookmark_backup.core.copy_engine import get_copy_engine
+from bookmark_backup.core.fileio import (
+    FileSignature,
+    file_lock,
+    file_signature,
+    fsync_dir,
+)
+from bookmark_backup.core.metrics import count, timed
+
+from .incremental import (
+    apply_delta,
+    diff_trees,
+    dump_tree,
+    flatten_tree,
+    load_tree,
+    rebuild_tree,
+)
+from .methods import (
+    DIGEST_CACHE,
+    HASH_ALGORITHM,
+    HASH_CHUNK_SIZE,
+    blob_relpath,
+    hash_file,
+)
+
+MANIFEST_FILENAME: str = "manifest.jsonl"
+## Store a full checkpoint after this many snapshots in an incremental chain
+DEFAULT_CHECKPOINT_INTERVAL: int = 10
+## Blobs unlinked per task when removing snapshots
+DELETE_BATCH_SIZE: int = 1000
+DELETE_WORKERS: int = 4
+## Bytes at the end of the parsed part of a manifest compared before reading only
+#  the lines appended since, to notice a manifest that was replaced instead
+MANIFEST_TAIL_CHECK: int = 64
+
+
+class SnapshotNotFoundError(FileNotFoundError):
+    pass
+
+
+@dataclass
+class Snapshot:
+    id: str
+    browser: str
+    profile: str
+    timestamp: str
+    hash: str
+    size: int
+    source: str | None = None
+    ## "full" snapshots hold the whole file, "delta" snapshots hold the node-level
+    #  changes against their parent snapshot
+    kind: str = "full"
+    parent: str | None = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Snapshot:
+        known: frozenset[str] = _snapshot_fields(cls)
+        if known.issuperset(data):
+            return cls(**data)
+
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+@functools.cache
+def _snapshot_fields(cls: type) -> frozenset[str]:
+    return frozenset(f.name for f in fields(cls))
+
+
+@dataclass(frozen=True)
+class _ParsedManifest:
+    """The snapshots parsed from the first `size` bytes of a manifest file."""
+
+    dev: int
+    ino: int
+    size: int = 0
+    tail: bytes = b""
+    snapshots: tuple[Snapshot, ...] = ()
+
+    def same_file(self, st: os.stat_result) -> bool:
+        return (st.st_dev, st.st_ino) == (
+            self.dev,
+            self.ino,
+        ) and st.st_size >= self.size
+
+    def extended(self, data: bytes, st: os.stat_result) -> _ParsedManifest:
+        """Return a copy with the lines in `data` parsed and added."""
+        complete: int = data.rfind(b"\n") + 1
+        added: list[Snapshot] = [
+            Snapshot.from_dict(json.loads(line))
+            for line in data[:complete].splitlines()
+            if line.strip()
+        ]
+        ## A last line without a newline is either still being appended, and left
+        #  for the next read, or the end of a file written without one
+        if data[complete:].strip():
+            try:
+                added.append(Snapshot.from_dict(json.loads(data[complete:])))
+                complete = len(data)
+            except ValueError:
+                pass
+        size: int = self.size + complete
+        tail: bytes = (self.tail + data[:complete])[-MANIFEST_TAIL_CHECK:]
+
+        return _ParsedManifest(
+            self.dev, self.ino, size, tail, self.snapshots + tuple(added)
+        )
+
+
+class BackupStore:
+    """Content-addressed backup repository.
+
+    Description:
+        Bookmark files are stored once per unique content hash under `blobs/`,
+        and every backup appends a line to `manifest.jsonl` describing the
+        snapshot (browser, profile, timestamp, hash). Backing up an unchanged
+        file costs one hash and one manifest line.
+
+        Incremental snapshots store only the bookmark nodes that changed since the
+        previous snapshot, with a full checkpoint every `checkpoint_every` snapshots.
+    """
+
+    ## Shared by every instance, so threads backing up into the same store do not
+    #  interleave manifest lines. Writers also take `manifest_lock()`, which other
+    #  processes writing to the store respect.
+    _manifest_lock = threading.Lock()
+    ## Parsed manifests by path, shared by every instance so a long-running process
+    #  only parses the lines appended since it last read a store
+    _manifest_cache: dict[Path, _ParsedManifest] = {}
+
+    def __init__(self, root: t.Union[str, Path], compress: str | None = None):
+        self.root: Path = Path(str(root)).expanduser()
+        ## Compression applied to newly written file blobs. Existing blobs are
+        #  detected and decompressed on read regardless of this setting.
+        self.compress: str | None = compress
+        self.manifest_path: Path = self.root / MANIFEST_FILENAME
+
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(root='{self.root}')"
+
+    def init(self) -> None:
+        """Create the store's directory layout if it does not exist."""
+        (self.root / "blobs").mkdir(parents=True, exist_ok=True)
+        self.manifest_path.touch(exist_ok=True)
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / blob_relpath(digest)
+
+    def has_blob(self, digest: str) -> bool:
+        return self.blob_path(digest).exists()
+
+    def _write_blob(
+        self,
+        src: Path,
+        on_chunk: t.Callable[[bytes], None] | None = None,
+    ) -> tuple[str, int, bool]:
+        """Copy `src` into the store, hashing the bytes that are written.
+
+        Description:
+            The copy goes to a temporary file first, and is named by the digest of
+            what was written to it. A file replaced while it is read is stored under
+            the address of the bytes actually copied, never another file's.
+
+            Blobs are never hard-linked to `src`: a later write to `src` would
+            change every snapshot stored under the blob. Uncompressed blobs are
+            copied with the copy engine, which shares the data with a reflink where
+            the filesystem supports one.
+
+        Params:
+            on_chunk (Callable | None): Called with each chunk of the blob's contents.
+
+        Returns:
+            (tuple[str, int, bool]): The blob's digest, its uncompressed size, and
+                whether it was written (False if a blob with the same content
+                already existed).
+
+        """
+        digest = hashlib.new(HASH_ALGORITHM)
+        size: int = 0
+
+        def feed(chunk: bytes) -> None:
+            nonlocal size
+            digest.update(chunk)
+            size += len(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+
+        ## Written under blobs/ so the rename into the fan-out directory stays on one
+        #  filesystem, and a crash never leaves a partial blob
+        fd, tmp_name = tempfile.mkstemp(dir=self.root / "blobs", prefix=".tmp-")
+        try:
+            os.close(fd)
+            if self.compress:
+                with (
+                    open(src, "rb") as f_src,
+                    compression.open_compressed_writer(
+                        tmp_name, self.compress
+                    ) as f_dest,
+                ):
+                    while chunk := f_src.read(HASH_CHUNK_SIZE):
+                        f_dest.write(chunk)
+                        feed(chunk)
+                method: str = "buffered"
+            else:
+                method = get_copy_engine().copy(src, tmp_name, on_chunk=feed)
+
+            if method == "buffered":
+                hexdigest: str = digest.hexdigest()
+            else:
+                ## The bytes never passed through Python, hash the blob's own copy
+                hexdigest, size = hash_file(tmp_name, on_chunk=on_chunk)
+
+            blob_path: Path = self.blob_path(hexdigest)
+            if blob_path.exists():
+                log.debug(f"Blob {hexdigest} already in store, discarding copy.")
+                Path(tmp_name).unlink()
+
+                return hexdigest, size, False
+
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_name, blob_path)
+        except Exception:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+        return hexdigest, size, True
+
+    def _write_blob_bytes(self, data: bytes) -> str:
+        digest: str = hashlib.new(HASH_ALGORITHM, data).hexdigest()
+        blob_path: Path = self.blob_path(digest)
+        if blob_path.exists():
+            return digest
+
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=blob_path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_name, blob_path)
+        except Exception:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+        return digest
+
+    @contextmanager
+    def manifest_lock(self) -> t.Iterator[None]:
+        """Hold the manifest for writing, against other threads and processes.
+
+        Description:
+            Appending a snapshot and rewriting the manifest (i.e. pruning) both take
+            this lock, so a snapshot appended by one process is never lost when
+            another replaces the manifest. Uses `.manifest.jsonl.lock` in the store.
+        """
+        with self._manifest_lock, file_lock(self.manifest_path):
+            yield
+
+    def _append_manifest(
+        self, snapshot: Snapshot, write_blob: t.Callable[[], t.Any] | None = None
+    ) -> None:
+        """Append `snapshot` to the manifest.
+
+        Params:
+            write_blob (Callable | None): Writes the snapshot's blob again if a prune
+                removed it after it was written, and before the manifest was locked.
+
+        """
+        with timed("manifest_write"), self.manifest_lock():
+            if write_blob is not None and not self.has_blob(snapshot.hash):
+                log.info(
+                    f"Blob {snapshot.hash} was pruned before it was recorded, writing it again"
+                )
+                write_blob()
+            with open(self.manifest_path, "a") as f:
+                f.write(json.dumps(snapshot.to_dict()) + "\n")
+
+    def add_file(
+        self,
+        src: t.Union[str, Path],
+        browser: str,
+        profile: str = "Default",
+        on_chunk: t.Callable[[bytes], None] | None = None,
+    ) -> Snapshot:
+        """Add a snapshot of `src` to the store.
+
+        Params:
+            src (str | Path): The bookmarks file to back up.
+            browser (str): Name of the browser the file belongs to.
+            profile (str): Name of the browser profile the file belongs to.
+            on_chunk (Callable | None): Called with each chunk of `src` stored.
+
+        Returns:
+            (Snapshot): The manifest entry recorded for this backup.
+
+        """
+        src = Path(str(src)).expanduser()
+        if not src.exists():
+            raise FileNotFoundError(f"Could not find file to back up: {src}")
+
+        self.init()
+
+        ## A file this process already stored is not read again while its blob is
+        #  still there, unless the caller needs to see its contents
+        signature: FileSignature = file_signature(src)
+        cached: tuple[str, int] | None = (
+            DIGEST_CACHE.get(src, signature) if on_chunk is None else None
+        )
+        if cached is not None and self.has_blob(cached[0]):
+            digest, size = cached
+            count("hash_cache_hits")
+        else:
+            with timed("write_blob") as phase:
+                digest, size, written = self._write_blob(src, on_chunk=on_chunk)
+                phase.bytes = size
+            if written:
+                log.info(f"Stored new blob {digest} ({size} bytes) from '{src}'")
+            if file_signature(src) == signature:
+                DIGEST_CACHE.put(src, signature, (digest, size))
+
+        def write_blob() -> None:
+            if self._write_blob(src)[0] != digest:
+                raise RuntimeError(
+                    f"Blob {digest} was pruned from store '{self.root}' while '{src}' changed, back it up again."
+                )
+
+        return self._record(
+            browser=browser,
+            profile=profile,
+            digest=digest,
+            size=size,
+            src=src,
+            write_blob=write_blob,
+        )
+
+    def _record(
+        self,
+        browser: str,
+        profile: str,
+        digest: str,
+        size: int,
+        src: Path,
+        kind: str = "full",
+        parent: str | None = None,
+        write_blob: t.Callable[[], t.Any] | None = None,
+    ) -> Snapshot:
+        now: datetime = datetime.now(timezone.utc)
+        snapshot = Snapshot(
+            id=f"{now.strftime('%Y%m%dT%H%M%SZ')}-{uuid.uuid4().hex[:8]}",
+            browser=browser,
+            profile=profile,
+            timestamp=now.isoformat(),
+            hash=digest,
+            size=size,
+            source=str(src),
+            kind=kind,
+            parent=parent,
+        )
+        self._append_manifest(snapshot, write_blob)
+
+        return snapshot
+
+    def add_incremental(
+        self,
+        src: t.Union[str, Path],
+        browser: str,
+        profile: str = "Default",
+        checkpoint_every: int = DEFAULT_CHECKPOINT_INTERVAL,
+        on_chunk: t.Callable[[bytes], None] | None = None,
+    ) -> Snapshot:
+        """Add a snapshot of `src` holding only the nodes changed since the last snapshot.
+
+        Params:
+            src (str | Path): The bookmarks file to back up.
+            browser (str): Name of the browser the file belongs to.
+            profile (str): Name of the browser profile the file belongs to.
+            checkpoint_every (int): Store a full copy instead of a delta once the
+                chain since the last full snapshot reaches this length.
+            on_chunk (Callable | None): Called with the contents of `src` as it is
+                read.
+
+        Returns:
+            (Snapshot): The manifest entry recorded for this backup.
+
+        """
+        src = Path(str(src)).expanduser()
+        if not src.exists():
+            raise FileNotFoundError(f"Could not find file to back up: {src}")
+
+        index: dict[str, Snapshot] = {s.id: s for s in self.snapshots()}
+        previous: Snapshot | None = self.latest(browser=browser, profile=profile)
+
+        if previous is None or len(self._chain(previous, index)) >= checkpoint_every:
+            log.info(f"Writing full checkpoint for [{browser}] profile '{profile}'")
+            return self.add_file(
+                src=src, browser=browser, profile=profile, on_chunk=on_chunk
+            )
+
+        with timed("read") as phase:
+            raw: bytes = src.read_bytes()
+            phase.bytes = len(raw)
+        if on_chunk is not None:
+            with timed("verify", nbytes=len(raw)):
+                on_chunk(raw)
+        with timed("diff", nbytes=len(raw)):
+            delta: dict = diff_trees(
+                self._load_tree(previous, index), flatten_tree(json.loads(raw))
+            )
+            data: bytes = json.dumps(
+                delta, sort_keys=True, separators=(",", ":")
+            ).encode("utf-8")
+        with timed("write_blob", nbytes=len(data)):
+            digest: str = self._write_blob_bytes(data)
+        log.info(
+            f"Stored delta of {len(delta['upsert'])} changed and {len(delta['remove'])} removed node(s) against snapshot {previous.id}"
+        )
+
+        return self._record(
+            browser=browser,
+            profile=profile,
+            digest=digest,
+            size=len(data),
+            src=src,
+            kind="delta",
+            parent=previous.id,
+            write_blob=lambda: self._write_blob_bytes(data),
+        )
+
+    def _chain(self, snapshot: Snapshot, index: dict[str, Snapshot]) -> list[Snapshot]:
+        """Return the snapshots from the nearest full checkpoint up to `snapshot`."""
+        chain: list[Snapshot] = [snapshot]
+        while chain[-1].kind == "delta":
+            if chain[-1].parent not in index:
+                raise SnapshotNotFoundError(
+                    f"Parent snapshot '{chain[-1].parent}' of '{chain[-1].id}' is missing from store '{self.root}'."
+                )
+            chain.append(index[chain[-1].parent])
+
+        return list(reversed(chain))
+
+    def _load_tree(
+        self, snapshot: Snapshot, index: dict[str, Snapshot]
+    ) -> tuple[dict, dict[str, dict]]:
+        """Replay a snapshot's delta chain on top of its full checkpoint."""
+        checkpoint, *deltas = self._chain(snapshot, index)
+        tree = load_tree(self.blob_path(checkpoint.hash))
+
+        for delta_snapshot in deltas:
+            with compression.open_decompressed(
+                self.blob_path(delta_snapshot.hash)
+            ) as f:
+                tree = apply_delta(tree, json.load(f))
+
+        return tree
+
+    def snapshots(
+        self, browser: str | None = None, profile: str | None = None
+    ) -> list[Snapshot]:
+        """Return the store's snapshots in the order they were taken."""
+        if not self.manifest_path.exists():
+            return []
+
+        with timed("manifest_read"):
+            parsed: _ParsedManifest = self._read_manifest()
+
+        return [
+            snapshot
+            for snapshot in parsed.snapshots
+            if (browser is None or snapshot.browser == browser)
+            and (profile is None or snapshot.profile == profile)
+        ]
+
+    def _read_manifest(self) -> _ParsedManifest:
+        """Parse the manifest, reusing the snapshots parsed by an earlier call.
+
+        Description:
+            The manifest is only appended to, except when it is replaced whole (i.e.
+            by a prune). If it is the same file as last time and has grown, only the
+            new lines are parsed.
+        """
+        with open(self.manifest_path, "rb") as f:
+            st: os.stat_result = os.fstat(f.fileno())
+            parsed: _ParsedManifest | None = self._manifest_cache.get(
+                self.manifest_path
+            )
+            if parsed is not None and parsed.same_file(st):
+                if st.st_size == parsed.size:
+                    count("manifest_cache_hits")
+                    return parsed
+
+                f.seek(parsed.size - len(parsed.tail))
+                if f.read(len(parsed.tail)) == parsed.tail:
+                    data: bytes = f.read()
+                    parsed = parsed.extended(data, st)
+                    self._manifest_cache[self.manifest_path] = parsed
+
+                    return parsed
+
+                f.seek(0)
+
+            parsed = _ParsedManifest(st.st_dev, st.st_ino).extended(f.read(), st)
+            self._manifest_cache[self.manifest_path] = parsed
+
+            return parsed
+
+    def _unlink_blobs(self, digests: list[str]) -> int:
+        removed: int = 0
+        for digest in digests:
+            try:
+                self.blob_path(digest).unlink()
+                removed += 1
+            except FileNotFoundError:
+                log.debug(f"Blob {digest} was already removed from store.")
+
+        return removed
+
+    def remove_snapshots(
+        self,
+        snapshot_ids: t.Iterable[str],
+        batch_size: int = DELETE_BATCH_SIZE,
+        max_workers: int = DELETE_WORKERS,
+    ) -> tuple[list[Snapshot], int]:
+        """Remove snapshots from the manifest, then delete blobs no snapshot uses.
+
+        Description:
+            The manifest is rewritten once, atomically, keeping the remaining lines
+            as they were. Only the blobs of removed snapshots are considered for
+            deletion, so the blobs directory is never listed; they are unlinked in
+            batches across a thread pool, while the manifest is still locked. A
+            backup that found its blob before the prune checks it again once it
+            holds the lock, so the manifest never records a snapshot without its
+            blob. A crash part way through can only leave unreferenced blobs behind.
+
+        Params:
+            snapshot_ids (Iterable[str]): Ids of the snapshots to remove.
+            batch_size (int): Blobs unlinked per task.
+            max_workers (int): Maximum number of batches deleted at the same time.
+
+        Returns:
+            (tuple[list[Snapshot], int]): The removed snapshots and the number of
+                blobs deleted.
+
+        Raises:
+            ValueError: If a remaining incremental snapshot is rebuilt from one of
+                the snapshots to remove.
+
+        """
+        remove: set[str] = set(snapshot_ids)
+        if not remove or not self.manifest_path.exists():
+            return [], 0
+
+        removed: list[Snapshot] = []
+        kept_lines: list[str] = []
+        ## Blobs and delta parents still used by the remaining snapshots
+        used_hashes: set[str] = set()
+        parents: dict[str, str] = {}
+
+        with self.manifest_lock():
+            with open(self.manifest_path, "r") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    data: dict = json.loads(line)
+                    if data["id"] in remove:
+                        removed.append(Snapshot.from_dict(data))
+                        continue
+                    kept_lines.append(line if line.endswith("\n") else line + "\n")
+                    used_hashes.add(data["hash"])
+                    if data.get("parent") is not None:
+                        parents[data["id"]] = data["parent"]
+
+            for child, parent in parents.items():
+                if parent in remove:
+                    raise ValueError(
+                        f"Cannot remove snapshot '{parent}', incremental snapshot '{child}' is rebuilt from it."
+                    )
+
+            fd, tmp_name = tempfile.mkstemp(dir=self.root, prefix=".tmp-manifest-")
+            try:
+                with os.fdopen(fd, "w") as tmp:
+                    tmp.writelines(kept_lines)
+                    ## On disk before it replaces the manifest, so a crash cannot
+                    #  leave an empty or partial manifest in its place
+                    tmp.flush()
+                    with timed("fsync"):
+                        os.fsync(tmp.fileno())
+                os.replace(tmp_name, self.manifest_path)
+            except Exception:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
+            fsync_dir(self.root)
+
+            unused: list[str] = sorted(
+                {snapshot.hash for snapshot in removed} - used_hashes
+            )
+            batches: list[list[str]] = [
+                unused[i : i + batch_size] for i in range(0, len(unused), batch_size)
+            ]
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+                blobs_removed: int = sum(pool.map(self._unlink_blobs, batches))
+
+        log.info(
+            f"Removed {len(removed)} snapshot(s) and {blobs_removed} blob(s) from store '{self.root}'"
+        )
+
+        return removed, blobs_removed
+
+    def get_snapshot(self, snapshot_id: str) -> Snapshot:
+        for snapshot in self.snapshots():
+            if snapshot.id == snapshot_id:
+                return snapshot
+
+        raise SnapshotNotFoundError(
+            f"Could not find snapshot '{snapshot_id}' in store '{self.root}'."
+        )
+
+    def latest(self, browser: str, profile: str = "Default") -> Snapshot | None:
+        _snapshots = self.snapshots(browser=browser, profile=profile)
+
+        return _snapshots[-1] if _snapshots else None
+
+    def snapshot_path(self, snapshot_id: str) -> Path:
+        """Return the path to the blob holding a full snapshot's contents.
+
+        Description:
+            The blob may be compressed, use `materialize()` to get the plain file.
+        """
+        snapshot: Snapshot = self.get_snapshot(snapshot_id)
+        if snapshot.kind != "full":
+            raise ValueError(
+                f"Snapshot '{snapshot_id}' is incremental, use materialize() to rebuild it."
+            )
+        blob_path: Path = self.blob_path(snapshot.hash)
+
+        if not blob_path.exists():
+            raise FileNotFoundError(
+                f"Blob {snapshot.hash} for snapshot '{snapshot_id}' is missing from store '{self.root}'."
+            )
+
+        return blob_path
+
+    def materialize(self, snapshot_id: str, dest: t.Union[str, Path]) -> Path:
+        """Write the full contents of a snapshot to `dest`.
+
+        Description:
+            Full snapshots are copied from their blob. Incremental snapshots are
+            rebuilt by replaying their deltas on top of the last full checkpoint.
+
+        Returns:
+            (Path): The path the snapshot was written to.
+
+        """
+        dest = Path(str(dest)).expanduser()
+        snapshot: Snapshot = self.get_snapshot(snapshot_id)
+
+        if snapshot.kind == "full":
+            compression.decompress_file(self.snapshot_path(snapshot_id), dest)
+        else:
+            index: dict[str, Snapshot] = {s.id: s for s in self.snapshots()}
+            meta, nodes = self._load_tree(snapshot, index)
+            dump_tree(rebuild_tree(meta, nodes), dest)
+
+        return dest
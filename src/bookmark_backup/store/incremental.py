@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import json
+import logging
+import typing as t
+
+log = logging.getLogger(__name__)
+
+from bookmark_backup.core import compression
+
+## Chromium writes its Bookmarks file with a 3-space indent
+CHROMIUM_JSON_INDENT: int = 3
+
+
+def node_key(node: dict) -> str:
+    """Return a stable key for a Chromium bookmark node, preferring its guid."""
+    if node.get("guid"):
+        return node["guid"]
+
+    return f"id:{node.get('id')}"
+
+
+def flatten_tree(data: dict) -> tuple[dict, dict[str, dict]]:
+    """Flatten a parsed Chromium Bookmarks file into per-node entries.
+
+    Description:
+        Each entry holds a node's own fields and, for folders, the ordered keys of
+        its children. Keeping sibling order on the parent means inserting or moving
+        a bookmark only changes the entries of the folders involved.
+
+    Params:
+        data (dict): The parsed Bookmarks JSON.
+
+    Returns:
+        (tuple[dict, dict[str, dict]]): The file's top-level metadata (everything
+            except the node tree, plus the key of each root folder), and a mapping
+            of node key to node entry.
+
+    """
+    meta: dict = {k: v for k, v in data.items() if k != "roots"}
+    roots: dict = data.get("roots", {})
+    meta["roots"] = {name: node_key(node) for name, node in roots.items()}
+
+    nodes: dict[str, dict] = {}
+    stack: list[dict] = list(roots.values())
+
+    while stack:
+        node: dict = stack.pop()
+        entry: dict = {"node": {k: v for k, v in node.items() if k != "children"}}
+
+        if "children" in node:
+            entry["children"] = [node_key(child) for child in node["children"]]
+            stack.extend(node["children"])
+
+        nodes[node_key(node)] = entry
+
+    return meta, nodes
+
+
+def _splice(old: list[str], new: list[str]) -> list:
+    """Return `[start, stop, replacement]` such that `old[start:stop] = replacement` gives `new`."""
+    start: int = 0
+    limit: int = min(len(old), len(new))
+    while start < limit and old[start] == new[start]:
+        start += 1
+
+    end: int = 0
+    while end < limit - start and old[-1 - end] == new[-1 - end]:
+        end += 1
+
+    return [start, len(old) - end, new[start : len(new) - end]]
+
+
+def diff_trees(
+    old: tuple[dict, dict[str, dict]], new: tuple[dict, dict[str, dict]]
+) -> dict:
+    """Compute the node-level delta that turns flattened tree `old` into `new`.
+
+    Description:
+        Added or edited nodes are stored whole under "upsert" and deleted nodes are
+        listed under "remove". When only a folder's child order changed, just the
+        changed slice of its child list is stored under "splice", so adding one
+        bookmark to a large folder does not re-store the whole folder.
+    """
+    old_meta, old_nodes = old
+    new_meta, new_nodes = new
+
+    upsert: dict[str, dict] = {}
+    splice: dict[str, list] = {}
+    for key, entry in new_nodes.items():
+        old_entry: dict | None = old_nodes.get(key)
+        if old_entry == entry:
+            continue
+
+        if (
+            old_entry is not None
+            and old_entry["node"] == entry["node"]
+            and "children" in old_entry
+            and "children" in entry
+        ):
+            splice[key] = _splice(old_entry["children"], entry["children"])
+        else:
+            upsert[key] = entry
+
+    remove: list[str] = [key for key in old_nodes if key not in new_nodes]
+
+    delta: dict = {"upsert": upsert, "splice": splice, "remove": remove}
+    if old_meta != new_meta:
+        delta["meta"] = new_meta
+
+    return delta
+
+
+def apply_delta(
+    tree: tuple[dict, dict[str, dict]], delta: dict
+) -> tuple[dict, dict[str, dict]]:
+    """Apply a delta from `diff_trees` to a flattened tree, in place."""
+    meta, nodes = tree
+
+    for key in delta.get("remove", []):
+        nodes.pop(key, None)
+    nodes.update(delta.get("upsert", {}))
+
+    for key, (start, stop, replacement) in delta.get("splice", {}).items():
+        children: list[str] = list(nodes[key]["children"])
+        children[start:stop] = replacement
+        nodes[key] = {**nodes[key], "children": children}
+
+    if "meta" in delta:
+        meta = delta["meta"]
+
+    return meta, nodes
+
+
+def rebuild_tree(meta: dict, nodes: dict[str, dict]) -> dict:
+    """Rebuild a nested Chromium Bookmarks structure from a flattened tree."""
+
+    def build(key: str) -> dict:
+        entry: dict = nodes[key]
+        node: dict = dict(entry["node"])
+        if "children" in entry:
+            node["children"] = [build(child) for child in entry["children"]]
+
+        return node
+
+    data: dict = {k: v for k, v in meta.items() if k != "roots"}
+    data["roots"] = {name: build(key) for name, key in meta.get("roots", {}).items()}
+
+    return data
+
+
+def load_tree(path: t.Any) -> tuple[dict, dict[str, dict]]:
+    with compression.open_decompressed(path) as f:
+        return flatten_tree(json.load(f))
+
+
+def dump_tree(data: dict, path: t.Any) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=CHROMIUM_JSON_INDENT, ensure_ascii=False)
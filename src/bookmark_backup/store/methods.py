@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+from pathlib import Path
+import typing as t
+
+log = logging.getLogger(__name__)
+
+from bookmark_backup.core.fileio import SignatureCache
+
+## Read files in 1MiB chunks when hashing
+HASH_CHUNK_SIZE: int = 1024 * 1024
+HASH_ALGORITHM: str = "sha256"
+## Digest and size of each file hashed by this process, reused while it is unchanged
+DIGEST_CACHE: SignatureCache[tuple[str, int]] = SignatureCache()
+
+
+def hash_file(
+    path: t.Union[str, Path],
+    chunk_size: int = HASH_CHUNK_SIZE,
+    on_chunk: t.Callable[[bytes], None] | None = None,
+) -> tuple[str, int]:
+    """Hash a file's contents without loading it into memory.
+
+    Params:
+        path (str | Path): Path to the file to hash.
+        chunk_size (int): Number of bytes to read at a time.
+        on_chunk (Callable | None): Also called with each chunk read, so other
+            checks can share the read.
+
+    Returns:
+        (tuple[str, int]): The file's hex digest and its size in bytes.
+
+    """
+    digest = hashlib.new(HASH_ALGORITHM)
+    size: int = 0
+
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+            size += len(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+
+    return digest.hexdigest(), size
+
+
+def blob_relpath(digest: str) -> Path:
+    """Return a blob's path relative to the store root, fanned out by digest prefix."""
+    return Path("blobs") / digest[:2] / digest
@@ -0,0 +1,187 @@
+"""Grandfather-father-son retention for a BackupStore's snapshots.
+
+Which snapshots to keep is decided from the manifest alone (browser, profile,
+timestamp, delta parent), without touching blobs, so planning is linear in the
+number of snapshots.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime
+import logging
+from pathlib import Path
+import typing as t
+
+log = logging.getLogger(__name__)
+
+from .controllers import BackupStore, Snapshot
+
+## Retention periods, shortest first, and the key of the bucket a local time falls in
+RETENTION_PERIODS: dict[str, t.Callable[[datetime], tuple]] = {
+    "hourly": lambda dt: (dt.year, dt.month, dt.day, dt.hour),
+    "daily": lambda dt: (dt.year, dt.month, dt.day),
+    "weekly": lambda dt: dt.isocalendar()[:2],
+    "monthly": lambda dt: (dt.year, dt.month),
+    "yearly": lambda dt: (dt.year,),
+}
+
+
+@dataclass
+class RetentionPolicy:
+    """How many snapshots to keep per browser/profile.
+
+    Description:
+        `last` keeps the N newest snapshots. Each period keeps the newest snapshot
+        in each of the N most recent hours/days/weeks/months/years that have one.
+        A snapshot kept by any rule is kept. The newest snapshot of each
+        browser/profile is always kept.
+    """
+
+    last: int = 1
+    hourly: int = 0
+    daily: int = 0
+    weekly: int = 0
+    monthly: int = 0
+    yearly: int = 0
+
+    def __post_init__(self):
+        for name, value in self.counts().items():
+            if value < 0:
+                raise ValueError(f"Retention count '{name}' must be >= 0, got {value}")
+
+    def counts(self) -> dict[str, int]:
+        return {
+            "last": self.last,
+            **{period: getattr(self, period) for period in RETENTION_PERIODS},
+        }
+
+
+@dataclass
+class PrunePlan:
+    keep: list[Snapshot] = field(default_factory=list)
+    remove: list[Snapshot] = field(default_factory=list)
+    ## Snapshots kept only because a kept incremental snapshot is rebuilt from them
+    dependencies: int = 0
+    ## Blobs deleted when the plan was applied
+    blobs_removed: int = 0
+
+
+def _local_time(snapshot: Snapshot) -> datetime:
+    return datetime.fromisoformat(snapshot.timestamp).astimezone()
+
+
+def select_kept(snapshots: list[Snapshot], policy: RetentionPolicy) -> set[str]:
+    """Return the ids of one browser/profile's snapshots that `policy` keeps.
+
+    Params:
+        snapshots (list[Snapshot]): One browser/profile's snapshots, oldest first.
+        policy (RetentionPolicy): Counts of snapshots to keep.
+
+    """
+    if not snapshots:
+        return set()
+
+    newest_first: list[Snapshot] = snapshots[::-1]
+    keep: set[str] = {snapshot.id for snapshot in newest_first[: max(1, policy.last)]}
+
+    periods = [
+        (RETENTION_PERIODS[period], count)
+        for period, count in policy.counts().items()
+        if period != "last" and count > 0
+    ]
+    if not periods:
+        return keep
+
+    ## Newest snapshot in each bucket, for each period
+    seen: list[set[tuple]] = [set() for _ in periods]
+    for snapshot in newest_first:
+        local_time: datetime = _local_time(snapshot)
+        for (bucket_key, count), buckets in zip(periods, seen):
+            if len(buckets) >= count:
+                continue
+            key: tuple = bucket_key(local_time)
+            if key not in buckets:
+                buckets.add(key)
+                keep.add(snapshot.id)
+
+    return keep
+
+
+def plan_prune(
+    snapshots: list[Snapshot], policy: RetentionPolicy, browser: str | None = None
+) -> PrunePlan:
+    """Decide which of a store's snapshots a retention policy removes.
+
+    Description:
+        Snapshots are grouped by browser and profile and `policy` applied to each
+        group. Incremental snapshots that are kept also keep every snapshot in their
+        delta chain back to the full checkpoint, so they can still be rebuilt.
+
+    Params:
+        snapshots (list[Snapshot]): Every snapshot in the store, oldest first.
+        policy (RetentionPolicy): Counts of snapshots to keep per group.
+        browser (str | None): Only prune this browser's snapshots.
+
+    Returns:
+        (PrunePlan): The snapshots to keep and to remove, oldest first.
+
+    """
+    groups: dict[tuple[str, str], list[Snapshot]] = {}
+    for snapshot in snapshots:
+        groups.setdefault((snapshot.browser, snapshot.profile), []).append(snapshot)
+
+    keep: set[str] = set()
+    for (group_browser, _), group in groups.items():
+        if browser is not None and group_browser != browser:
+            keep.update(snapshot.id for snapshot in group)
+        else:
+            keep.update(select_kept(group, policy))
+
+    ## Walk each kept delta's chain, stopping at snapshots already known kept
+    index: dict[str, Snapshot] = {snapshot.id: snapshot for snapshot in snapshots}
+    plan = PrunePlan()
+    for snapshot_id in list(keep):
+        parent: str | None = index[snapshot_id].parent
+        while parent is not None and parent not in keep and parent in index:
+            keep.add(parent)
+            plan.dependencies += 1
+            parent = index[parent].parent
+
+    for snapshot in snapshots:
+        (plan.keep if snapshot.id in keep else plan.remove).append(snapshot)
+
+    return plan
+
+
+def prune_store(
+    store: t.Union[str, Path, BackupStore],
+    policy: RetentionPolicy,
+    browser: str | None = None,
+    dry_run: bool = False,
+) -> PrunePlan:
+    """Remove the snapshots a retention policy does not keep from a backup store.
+
+    Params:
+        store (str | Path | BackupStore): The backup store, or its root path.
+        policy (RetentionPolicy): Counts of snapshots to keep per browser/profile.
+        browser (str | None): Only prune this browser's snapshots.
+        dry_run (bool): Plan the prune without removing anything.
+
+    Returns:
+        (PrunePlan): The snapshots kept and removed.
+
+    """
+    if not isinstance(store, BackupStore):
+        store = BackupStore(store)
+
+    plan: PrunePlan = plan_prune(store.snapshots(), policy, browser=browser)
+    log.info(
+        f"Retention keeps {len(plan.keep)} and removes {len(plan.remove)} snapshot(s) in store '{store.root}'"
+    )
+    if plan.remove and not dry_run:
+        _, plan.blobs_removed = store.remove_snapshots(
+            snapshot.id for snapshot in plan.remove
+        )
+
+    return plan
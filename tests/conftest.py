@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import typing as t
+
+from bookmark_backup.core import backup_state
+from bookmark_backup.domain.Bookmarks import BookmarksFile, ChromeBookmarksFile
+
+import pytest
+
+## A node spec: ("title", "https://url") for a bookmark, ("title", [specs]) for a folder
+NodeSpec = tuple[str, t.Union[str, list]]
+
+
+@pytest.fixture(autouse=True)
+def isolated_env(tmp_path_factory, monkeypatch):
+    """Keep caches, state and sockets out of the user's home, and never forward to a server."""
+    root: Path = tmp_path_factory.mktemp("env")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(root / "cache"))
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(root / "run"))
+    monkeypatch.setenv("BOOKMARK_BACKUP_NO_DAEMON", "1")
+    monkeypatch.delenv("BOOKMARK_BACKUP_SOCKET", raising=False)
+    ## Opened again under the new cache directory on first use
+    monkeypatch.setattr(backup_state, "_backup_state", None)
+    monkeypatch.setattr(backup_state, "_backup_state_failed", False)
+
+
+class BookmarksBuilder:
+    """Build Chromium Bookmarks data from nested (title, url or children) specs."""
+
+    def __init__(self):
+        self._next_id: int = 1
+
+    def _node(self, spec: NodeSpec) -> dict:
+        title, value = spec
+        node_id: str = str(self._next_id)
+        self._next_id += 1
+        if isinstance(value, str):
+            return {
+                "date_added": "13300000000000000",
+                "guid": f"00000000-0000-4000-8000-{int(node_id):012d}",
+                "id": node_id,
+                "name": title,
+                "type": "url",
+                "url": value,
+            }
+
+        ## Chromium writes a folder's children before its name
+        return {
+            "children": [self._node(child) for child in value],
+            "date_added": "13300000000000000",
+            "date_modified": "0",
+            "guid": f"00000000-0000-4000-8000-{int(node_id):012d}",
+            "id": node_id,
+            "name": title,
+            "type": "folder",
+        }
+
+    def build(
+        self, bar: list[NodeSpec] = (), other: list[NodeSpec] = (), synced=()
+    ) -> dict:
+        self._next_id = 1
+        roots: dict = {
+            "bookmark_bar": self._node(("Bookmarks bar", list(bar))),
+            "other": self._node(("Other bookmarks", list(other))),
+            "synced": self._node(("Mobile bookmarks", list(synced))),
+        }
+
+        return {"checksum": "", "roots": roots, "version": 1}
+
+
+@pytest.fixture
+def make_bookmarks() -> t.Callable[..., dict]:
+    """Return a function building Bookmarks data with a valid checksum."""
+    from bookmark_backup.domain.checksum import with_checksum
+
+    def make(bar: list[NodeSpec] = (), other: list[NodeSpec] = (), synced=()) -> dict:
+        return with_checksum(BookmarksBuilder().build(bar, other, synced))
+
+    return make
+
+
+@pytest.fixture
+def write_bookmarks(make_bookmarks) -> t.Callable[..., Path]:
+    """Return a function writing a Bookmarks file the way Chromium formats it."""
+
+    def write(path: Path, data: dict | None = None, **specs) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                data if data is not None else make_bookmarks(**specs),
+                f,
+                indent=3,
+                ensure_ascii=False,
+            )
+
+        return path
+
+    return write
+
+
+@pytest.fixture
+def chrome_bookmarks(tmp_path, write_bookmarks) -> BookmarksFile:
+    """A Chrome BookmarksFile reading a Bookmarks file under `tmp_path`."""
+    path: Path = write_bookmarks(
+        tmp_path / "profile" / "Bookmarks",
+        bar=[("Python", "https://www.python.org/")],
+        other=[("Docs", [("Library", "https://docs.python.org/3/library/")])],
+    )
+    bookmarks = ChromeBookmarksFile()
+    bookmarks.bookmarks_file = str(path)
+
+    return bookmarks
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import os
+from pathlib import Path
+
+from bookmark_backup.core.throttle import DestinationLimiter
+from bookmark_backup.store import BackupStore, Snapshot
+
+import pytest
+
+@pytest.mark.parametrize("compress", [None, "gzip"])
+def test_abackup_streams_the_file_into_place(tmp_path, chrome_bookmarks, compress):
+    dest = tmp_path / "backups" / ("Bookmarks.gz" if compress else "Bookmarks")
+    limiter = DestinationLimiter(concurrency=1)
+
+    assert asyncio.run(
+        chrome_bookmarks.abackup(dest, compress=compress, limiter=limiter)
+    )
+
+    raw: bytes = dest.read_bytes()
+    assert (gzip.decompress(raw) if compress else raw) == (
+        chrome_bookmarks.bookmarks_path.read_bytes()
+    )
+    ## Only the backup is left behind, no temporary files
+    assert [p.name for p in dest.parent.iterdir()] == [dest.name]
+
+
+def test_abackup_does_not_read_the_file_into_memory(
+    chrome_bookmarks, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(
+        type(chrome_bookmarks.bookmarks_path),
+        "read_bytes",
+        lambda self: pytest.fail(f"read {self} into memory"),
+    )
+
+    assert asyncio.run(
+        chrome_bookmarks.abackup(tmp_path / "Bookmarks.gz", compress="gzip")
+    )
+
+
+def test_cancelled_abackup_leaves_the_destination_alone(tmp_path, chrome_bookmarks):
+    dest = tmp_path / "Bookmarks"
+    dest.write_text("previous")
+
+    async def cancel_while_waiting() -> None:
+        limiter = DestinationLimiter(concurrency=1)
+        async with limiter.slot():
+            task = asyncio.create_task(
+                chrome_bookmarks.abackup(dest, overwrite=True, limiter=limiter)
+            )
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    asyncio.run(cancel_while_waiting())
+
+    assert dest.read_text() == "previous"
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith(".")] == []
+
+
+def test_restore_keeps_the_previous_version_apart_from_the_store(
+    tmp_path, chrome_bookmarks, write_bookmarks
+):
+    store = BackupStore(tmp_path / "store")
+    backup = write_bookmarks(tmp_path / "backup", bar=[("b", "https://b.test/")])
+    snapshot: Snapshot = store.add_file(src=backup, browser="chrome")
+    previous: bytes = chrome_bookmarks.bookmarks_path.read_bytes()
+
+    chrome_bookmarks.restore_bookmarks_file(str(store.root), snapshot_id=snapshot.id)
+
+    saved: Snapshot = store.latest(browser="chrome")
+    bak = Path(f"{chrome_bookmarks.bookmarks_file}.bak")
+    assert bak.read_bytes() == previous
+    assert not os.path.samefile(bak, store.blob_path(saved.hash))
+
+    ## Editing the .bak file leaves the snapshot of the previous version alone
+    bak.write_text("edited")
+    assert store.blob_path(saved.hash).read_bytes() == previous
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from bookmark_backup.store import BackupStore, Snapshot
+
+import pytest
+
+@pytest.fixture
+def copies(chrome_bookmarks, monkeypatch) -> list[Path]:
+    """Record the copies the copy engine makes, so a skipped backup can be told apart."""
+    made: list[Path] = []
+    copy = chrome_bookmarks.copy_engine.copy
+    monkeypatch.setattr(
+        chrome_bookmarks.copy_engine,
+        "copy",
+        lambda src, dest, **kwargs: (
+            made.append(Path(dest)) or copy(src, dest, **kwargs)
+        ),
+    )
+
+    return made
+
+
+def touch(path: Path) -> None:
+    """Move a file's mtime forward without changing its contents."""
+    mtime_ns: int = path.stat().st_mtime_ns
+    os.utime(path, ns=(mtime_ns, mtime_ns + 1_000_000_000))
+
+
+def test_unchanged_copy_is_skipped(tmp_path, chrome_bookmarks, copies):
+    dest: Path = tmp_path / "backup" / "Bookmarks"
+    assert chrome_bookmarks.unchanged_backup(dest) is None
+
+    assert chrome_bookmarks.backup_bookmarks_file(dest) is True
+    assert chrome_bookmarks.unchanged_backup(dest) is True
+    assert chrome_bookmarks.backup_bookmarks_file(dest) is True
+
+    assert copies == [dest]
+
+
+def test_touching_the_source_invalidates_the_backup(tmp_path, chrome_bookmarks):
+    dest: Path = tmp_path / "Bookmarks"
+    chrome_bookmarks.backup_bookmarks_file(dest)
+
+    touch(chrome_bookmarks.bookmarks_path)
+
+    assert chrome_bookmarks.unchanged_backup(dest) is None
+
+
+@pytest.mark.parametrize("change", ["remove", "edit"])
+def test_changed_copy_invalidates_the_backup(tmp_path, chrome_bookmarks, change):
+    dest: Path = tmp_path / "Bookmarks"
+    chrome_bookmarks.backup_bookmarks_file(dest)
+
+    if change == "remove":
+        dest.unlink()
+    else:
+        dest.write_text("{}")
+
+    assert chrome_bookmarks.unchanged_backup(dest) is None
+
+
+def test_mode_and_compression_must_match(tmp_path, chrome_bookmarks):
+    dest: Path = tmp_path / "Bookmarks"
+    chrome_bookmarks.backup_bookmarks_file(dest)
+
+    assert chrome_bookmarks.unchanged_backup(dest, compress="gzip") is None
+    assert chrome_bookmarks.unchanged_backup(dest, mode="store") is None
+    assert chrome_bookmarks.unchanged_backup(dest, compress=None) is True
+
+
+def test_skip_unchanged_false_backs_up_again(tmp_path, chrome_bookmarks, copies):
+    dest: Path = tmp_path / "Bookmarks"
+    chrome_bookmarks.backup_bookmarks_file(dest)
+
+    assert chrome_bookmarks.backup_bookmarks_file(
+        dest, overwrite=True, skip_unchanged=False
+    )
+
+    assert copies == [dest, dest]
+
+
+def test_unchanged_snapshot_survives_appends(
+    tmp_path, chrome_bookmarks, write_bookmarks
+):
+    root: Path = tmp_path / "store"
+    snapshot: Snapshot = chrome_bookmarks.backup_bookmarks_file(root, mode="store")
+
+    ## Another browser backing up to the same store only appends to the manifest
+    other = write_bookmarks(
+        tmp_path / "other" / "Bookmarks", bar=[("a", "https://a.test/")]
+    )
+    BackupStore(root).add_file(src=other, browser="vivaldi")
+
+    assert chrome_bookmarks.unchanged_backup(root, mode="store") == snapshot
+    assert chrome_bookmarks.backup_bookmarks_file(root, mode="store") == snapshot
+    assert len(BackupStore(root).snapshots()) == 2
+
+
+def test_pruning_the_store_invalidates_the_snapshot(
+    tmp_path, chrome_bookmarks, write_bookmarks
+):
+    root: Path = tmp_path / "store"
+    other = write_bookmarks(
+        tmp_path / "other" / "Bookmarks", bar=[("a", "https://a.test/")]
+    )
+    pruned: Snapshot = BackupStore(root).add_file(src=other, browser="vivaldi")
+    chrome_bookmarks.backup_bookmarks_file(root, mode="store")
+
+    ## Removing any snapshot replaces the manifest
+    BackupStore(root).remove_snapshots([pruned.id])
+
+    assert chrome_bookmarks.unchanged_backup(root, mode="store") is None
+
+
+def test_missing_blob_invalidates_the_snapshot(tmp_path, chrome_bookmarks):
+    root: Path = tmp_path / "store"
+    snapshot: Snapshot = chrome_bookmarks.backup_bookmarks_file(root, mode="store")
+
+    BackupStore(root).blob_path(snapshot.hash).unlink()
+
+    assert chrome_bookmarks.unchanged_backup(root, mode="store") is None
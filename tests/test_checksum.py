@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+
+from bookmark_backup.core import copy_engine
+from bookmark_backup.core.copy_engine import CopyMethodUnsupported
+from bookmark_backup.core.fileio import file_signature
+from bookmark_backup.domain import Bookmarks
+from bookmark_backup.domain.checksum import (
+    CHECKSUM_CACHE,
+    ChecksumVerifier,
+    compute_checksum,
+    repair_checksum,
+    verify_file,
+)
+
+import pytest
+
+SPECS: dict = {
+    "bar": [
+        ("Python", "https://www.python.org/"),
+        ("Dev", [("PyPI", "https://pypi.org/")]),
+    ],
+    "other": [("Ünïcödé ☃", "https://example.com/☃")],
+}
+
+
+def chromium_checksum(data: dict) -> str:
+    """The checksum as Chromium's BookmarkCodec builds it, written out by hand."""
+    md5 = hashlib.md5()
+
+    def update(node: dict) -> None:
+        md5.update(node["id"].encode("ascii"))
+        md5.update(node["name"].encode("utf-16-le"))
+        if node["type"] == "url":
+            md5.update(b"url")
+            md5.update(node["url"].encode("utf-8"))
+            return
+        md5.update(b"folder")
+        for child in node["children"]:
+            update(child)
+
+    for root in ("bookmark_bar", "other", "synced"):
+        update(data["roots"][root])
+
+    return md5.hexdigest()
+
+
+def test_checksum_matches_chromium(make_bookmarks):
+    data: dict = make_bookmarks(**SPECS)
+
+    assert compute_checksum(data) == chromium_checksum(data)
+    assert data["checksum"] == chromium_checksum(data)
+
+
+def test_checksum_ignores_other_roots_and_fields(make_bookmarks):
+    data: dict = make_bookmarks(**SPECS)
+    data["roots"]["bookmark_bar"]["date_modified"] = "13400000000000000"
+    data["roots"]["custom_root"] = {"id": "99", "name": "x", "type": "folder"}
+
+    assert compute_checksum(data) == chromium_checksum(make_bookmarks(**SPECS))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 4096])
+def test_verifier_matches_compute_checksum(make_bookmarks, chunk_size):
+    data: dict = make_bookmarks(**SPECS)
+    raw: bytes = json.dumps(data, indent=3, ensure_ascii=False).encode("utf-8")
+
+    verifier = ChecksumVerifier()
+    for start in range(0, len(raw), chunk_size):
+        verifier.feed(raw[start : start + chunk_size])
+    result = verifier.close()
+
+    assert result.actual == compute_checksum(data)
+    assert result.matches and result.valid
+
+
+def test_verify_file_detects_edits_and_repair_fixes_them(
+    tmp_path, make_bookmarks, write_bookmarks
+):
+    data: dict = make_bookmarks(**SPECS)
+    data["roots"]["bookmark_bar"]["children"][0]["name"] = "Edited"
+    path = write_bookmarks(tmp_path / "Bookmarks", data)
+
+    result = verify_file(path)
+    assert not result.valid
+    assert result.expected == make_bookmarks(**SPECS)["checksum"]
+
+    assert repair_checksum(path) == chromium_checksum(data)
+    assert verify_file(path).matches
+
+
+def test_verify_file_reads_compressed_files(tmp_path, make_bookmarks, write_bookmarks):
+    path = write_bookmarks(tmp_path / "Bookmarks", **SPECS)
+    compressed = tmp_path / "Bookmarks.gz"
+    compressed.write_bytes(gzip.compress(path.read_bytes()))
+
+    assert verify_file(compressed).matches
+
+
+def test_verify_file_reports_unparseable_files(tmp_path):
+    path = tmp_path / "Bookmarks"
+    path.write_text('{"roots": {"bookmark_bar": ')
+
+    result = verify_file(path)
+
+    assert result.error is not None
+    assert not result.valid
+
+
+def test_verified_copy_uses_the_copy_engine(tmp_path, chrome_bookmarks, monkeypatch):
+    copies: list = []
+    copy = chrome_bookmarks.copy_engine.copy
+    monkeypatch.setattr(
+        chrome_bookmarks.copy_engine,
+        "copy",
+        lambda src, dest, **kwargs: copies.append(dest) or copy(src, dest, **kwargs),
+    )
+
+    dest = tmp_path / "backup" / "Bookmarks"
+    assert chrome_bookmarks.backup_bookmarks_file(dest, verify=True) is True
+
+    assert copies == [dest]
+    assert dest.read_bytes() == chrome_bookmarks.bookmarks_path.read_bytes()
+    ## Cached for the source, so the next backup of the unchanged file is not checked again
+    signature = file_signature(chrome_bookmarks.bookmarks_path)
+    assert CHECKSUM_CACHE.get(chrome_bookmarks.bookmarks_path, signature).matches
+
+
+def unsupported(src_fd: int, dest_fd: int, size: int) -> None:
+    raise CopyMethodUnsupported("disabled by the test")
+
+
+def in_kernel(src_fd: int, dest_fd: int, size: int) -> None:
+    """Stands in for copy_file_range(), which copies without Python seeing the bytes."""
+    while data := os.read(src_fd, size or 1):
+        os.write(dest_fd, data)
+
+
+@pytest.mark.parametrize(
+    "copy_file_range, read_again", [(in_kernel, True), (unsupported, False)]
+)
+def test_verified_copy_reads_the_file_once(
+    tmp_path, chrome_bookmarks, monkeypatch, copy_file_range, read_again
+):
+    monkeypatch.setitem(copy_engine._COPY_FUNCS, "reflink", unsupported)
+    monkeypatch.setitem(copy_engine._COPY_FUNCS, "copy_file_range", copy_file_range)
+    ## A copy between the same filesystems skips probing, starting from a fresh engine
+    monkeypatch.setattr(chrome_bookmarks, "copy_engine", copy_engine.CopyEngine())
+    verified: list = []
+    monkeypatch.setattr(
+        Bookmarks,
+        "verify_file",
+        lambda path: verified.append(path) or verify_file(path),
+    )
+
+    dest = tmp_path / "backup" / "Bookmarks"
+    assert chrome_bookmarks.backup_bookmarks_file(dest, verify=True) is True
+
+    assert verified == ([dest] if read_again else [])
+    assert dest.read_bytes() == chrome_bookmarks.bookmarks_path.read_bytes()
+    signature = file_signature(chrome_bookmarks.bookmarks_path)
+    assert CHECKSUM_CACHE.get(chrome_bookmarks.bookmarks_path, signature).matches
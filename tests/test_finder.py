@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from bookmark_backup.finder import Finder
+
+import pytest
+
+## Names that sort differently from the order they are crawled in
+TREE: list[str] = [
+    "zeta/Bookmarks",
+    "zeta/Profile 2/Bookmarks",
+    "alpha/Bookmarks.bak",
+    "alpha/Profile 1/bookmarks",
+    "Default/Bookmarks",
+    "Default/Preferences",
+    "mid/Profile 10/History",
+]
+
+
+@pytest.fixture
+def finder(tmp_path) -> Finder:
+    for relpath in TREE:
+        path: Path = tmp_path / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("")
+
+    finder = Finder(str(tmp_path))
+    finder.crawl_directory()
+    ## Crawl order, not name order
+    finder.files.reverse()
+    finder.dirs.reverse()
+
+    return finder
+
+
+@pytest.mark.parametrize(
+    "search, text",
+    [
+        ("search_in_names", "ookmark"),
+        ("search_in_names", "Profile"),
+        ("search_prefix", "Bookmarks"),
+        ("search_prefix", "Pro"),
+        ("search_glob", "Bookmarks*"),
+        ("search_glob", "Profile *"),
+        ("search_glob", "*s"),
+    ],
+)
+@pytest.mark.parametrize("ignore_case", [False, True])
+def test_indexed_search_matches_unindexed_search(finder, search, text, ignore_case):
+    unindexed = getattr(finder, search)(text, ignore_case=ignore_case)
+
+    finder.build_index()
+    indexed = getattr(finder, search)(text, ignore_case=ignore_case)
+
+    assert indexed == unindexed
+    assert any(unindexed)
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import copy
+import json
+from pathlib import Path
+
+from bookmark_backup.store import BackupStore, Snapshot
+from bookmark_backup.store.incremental import (
+    apply_delta,
+    diff_trees,
+    flatten_tree,
+    rebuild_tree,
+)
+
+import pytest
+
+BASE: dict = {
+    "bar": [
+        ("Python", "https://www.python.org/"),
+        ("Dev", [("PyPI", "https://pypi.org/"), ("Docs", "https://docs.python.org/")]),
+        ("News", "https://news.test/"),
+    ],
+    "other": [("Library", [("Reading", "https://reading.test/")])],
+}
+
+
+def find(data: dict, name: str) -> tuple[list, int]:
+    """Return the children list holding the node called `name`, and its position."""
+    stack: list[dict] = list(data["roots"].values())
+    while stack:
+        node: dict = stack.pop()
+        for position, child in enumerate(node.get("children", [])):
+            if child["name"] == name:
+                return node["children"], position
+            stack.append(child)
+
+    raise KeyError(name)
+
+
+def add_bookmark(data: dict) -> None:
+    children, _ = find(data, "PyPI")
+    children.insert(1, {**children[0], "guid": "new", "id": "99", "name": "New"})
+
+
+def remove_bookmark(data: dict) -> None:
+    children, position = find(data, "Docs")
+    del children[position]
+
+
+def rename_bookmark(data: dict) -> None:
+    children, position = find(data, "News")
+    children[position]["name"] = "Renamed"
+
+
+def move_bookmark(data: dict) -> None:
+    children, position = find(data, "Python")
+    node: dict = children.pop(position)
+    target, _ = find(data, "Reading")
+    target.append(node)
+
+
+def reorder_folder(data: dict) -> None:
+    children, _ = find(data, "Python")
+    children.reverse()
+
+
+def remove_folder(data: dict) -> None:
+    children, position = find(data, "Dev")
+    del children[position]
+
+
+def change_meta(data: dict) -> None:
+    data["checksum"] = "0" * 32
+    data["version"] = 2
+
+
+EDITS: list = [
+    add_bookmark,
+    remove_bookmark,
+    rename_bookmark,
+    move_bookmark,
+    reorder_folder,
+    remove_folder,
+    change_meta,
+]
+
+
+@pytest.fixture
+def base(make_bookmarks) -> dict:
+    return make_bookmarks(**BASE)
+
+
+@pytest.mark.parametrize("edit", EDITS)
+def test_apply_delta_round_trips(base, edit):
+    new: dict = copy.deepcopy(base)
+    edit(new)
+
+    delta: dict = diff_trees(flatten_tree(base), flatten_tree(new))
+    meta, nodes = apply_delta(flatten_tree(base), delta)
+
+    assert rebuild_tree(meta, nodes) == new
+
+
+def test_delta_survives_json(base):
+    new: dict = copy.deepcopy(base)
+    for edit in EDITS:
+        edit(new)
+
+    delta: dict = diff_trees(flatten_tree(base), flatten_tree(new))
+    delta = json.loads(json.dumps(delta))
+
+    assert rebuild_tree(*apply_delta(flatten_tree(base), delta)) == new
+
+
+def test_unchanged_tree_gives_an_empty_delta(base):
+    delta: dict = diff_trees(flatten_tree(base), flatten_tree(copy.deepcopy(base)))
+
+    assert delta == {"upsert": {}, "splice": {}, "remove": []}
+
+
+def test_inserting_a_bookmark_splices_its_folder(base):
+    new: dict = copy.deepcopy(base)
+    add_bookmark(new)
+
+    delta: dict = diff_trees(flatten_tree(base), flatten_tree(new))
+
+    ## Only the new node is stored whole, its folder just records the insert
+    assert list(delta["upsert"]) == ["new"]
+    assert list(delta["splice"].values()) == [[1, 1, ["new"]]]
+    assert delta["remove"] == []
+
+
+def test_materialize_rebuilds_every_snapshot(tmp_path, base, write_bookmarks):
+    store = BackupStore(tmp_path / "store")
+    path: Path = tmp_path / "Bookmarks"
+    versions: list[tuple[Snapshot, dict]] = []
+
+    data: dict = copy.deepcopy(base)
+    for edit in [None, *EDITS]:
+        if edit is not None:
+            edit(data)
+        write_bookmarks(path, data)
+        snapshot: Snapshot = store.add_incremental(
+            src=path, browser="chrome", checkpoint_every=4
+        )
+        versions.append((snapshot, copy.deepcopy(data)))
+
+    ## A full checkpoint, then three deltas, again and again
+    assert [s.kind for s, _ in versions] == ["full", "delta", "delta", "delta"] * 2
+    for snapshot, expected in versions:
+        restored: Path = store.materialize(snapshot.id, tmp_path / snapshot.id)
+        assert json.loads(restored.read_bytes()) == expected
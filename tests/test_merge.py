@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+from bookmark_backup.domain.checksum import verify_file
+from bookmark_backup.domain.merge import (
+    BookmarksMerger,
+    merge_bookmarks_files,
+    normalize_url,
+)
+
+import pytest
+
+def walk(data: dict) -> list[tuple[str, str, str]]:
+    """Return (folder path, title, url) for each bookmark, in file order."""
+    found: list[tuple[str, str, str]] = []
+
+    def visit(node: dict, path: str) -> None:
+        for child in node.get("children", []):
+            if child["type"] == "folder":
+                visit(child, f"{path}/{child['name']}")
+            else:
+                found.append((path, child["name"], child["url"]))
+
+    for name, root in data["roots"].items():
+        visit(root, name)
+
+    return found
+
+
+def touch(data: dict, title: str, modified: int) -> dict:
+    """Set `date_modified` on the bookmark called `title`."""
+    stack: list[dict] = list(data["roots"].values())
+    while stack:
+        node: dict = stack.pop()
+        if node["name"] == title and node["type"] == "url":
+            node["date_modified"] = str(modified)
+        stack.extend(node.get("children", []))
+
+    return data
+
+
+def merge(*sources: dict) -> BookmarksMerger:
+    merger = BookmarksMerger()
+    for data in sources:
+        merger.add(data)
+
+    return merger
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("HTTPS://Example.COM/Path/", "https://example.com/Path"),
+        ("https://example.com:443/", "https://example.com"),
+        ("http://example.com:80/a", "http://example.com/a"),
+        ("http://example.com:8080/a", "http://example.com:8080/a"),
+        ("https://example.com/?b=2&a=1", "https://example.com?a=1&b=2"),
+        (
+            "https://example.com/a?utm_source=x&id=3&fbclid=y&UTM_Medium=z",
+            "https://example.com/a?id=3",
+        ),
+        ("https://example.com/a?q=", "https://example.com/a?q="),
+        ("https://example.com/a#", "https://example.com/a"),
+        ("https://example.com/a#part", "https://example.com/a#part"),
+        ("https://user:pw@Example.com/", "https://user:pw@example.com"),
+        ("  https://example.com/a  ", "https://example.com/a"),
+        ("javascript:alert(1)", "javascript:alert(1)"),
+        ("chrome://settings/", "chrome://settings/"),
+        ("https://example.com:99999/", "https://example.com:99999/"),
+    ],
+)
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+def test_duplicates_are_merged_once(make_bookmarks):
+    first: dict = make_bookmarks(
+        bar=[("Python", "https://www.python.org/"), ("Docs", "https://docs.test/")]
+    )
+    second: dict = make_bookmarks(
+        bar=[
+            ("Python", "https://WWW.python.org/?utm_source=mail"),
+            ("PyPI", "https://pypi.org/"),
+        ]
+    )
+
+    merger = merge(first, second)
+
+    assert walk(merger.to_dict()) == [
+        ("bookmark_bar", "Python", "https://www.python.org/"),
+        ("bookmark_bar", "Docs", "https://docs.test/"),
+        ("bookmark_bar", "PyPI", "https://pypi.org/"),
+    ]
+    assert merger.stats.bookmarks_read == 4
+    assert merger.stats.bookmarks_merged == 3
+    assert merger.stats.duplicates == 1
+    assert merger.stats.conflicts == 0
+
+
+def test_newest_copy_wins_a_conflict(make_bookmarks):
+    older: dict = touch(
+        make_bookmarks(bar=[("Old title", "https://a.test/")]), "Old title", 100
+    )
+    newer: dict = touch(
+        make_bookmarks(bar=[("New title", "https://a.test/")]), "New title", 200
+    )
+
+    ## Whichever source comes first
+    for sources in [(older, newer), (newer, older)]:
+        merger = merge(*sources)
+        assert walk(merger.to_dict()) == [
+            ("bookmark_bar", "New title", "https://a.test/")
+        ]
+        assert merger.stats.conflicts == 1
+
+
+def test_earlier_source_wins_a_tie(make_bookmarks):
+    first: dict = make_bookmarks(bar=[("First", "https://a.test/")])
+    second: dict = make_bookmarks(bar=[("Second", "https://a.test/")])
+
+    assert walk(merge(first, second).to_dict()) == [
+        ("bookmark_bar", "First", "https://a.test/")
+    ]
+
+
+def test_newer_copy_moves_the_bookmark_to_its_folder(make_bookmarks):
+    first: dict = make_bookmarks(
+        bar=[("A", "https://a.test/"), ("B", "https://b.test/")],
+    )
+    second: dict = touch(
+        make_bookmarks(other=[("Moved", [("A", "https://a.test/")])]), "A", 1
+    )
+    touch(first, "A", 0)
+
+    merged: dict = merge(first, second).to_dict()
+
+    assert walk(merged) == [
+        ("bookmark_bar", "B", "https://b.test/"),
+        ("other/Moved", "A", "https://a.test/"),
+    ]
+
+
+def test_folders_merge_by_path_in_first_seen_order(make_bookmarks):
+    first: dict = make_bookmarks(
+        bar=[("Dev", [("PyPI", "https://pypi.org/")]), ("News", "https://news.test/")]
+    )
+    second: dict = make_bookmarks(
+        bar=[
+            ("Tools", [("Git", "https://git.test/")]),
+            ("Dev", [("Docs", "https://docs.test/")]),
+        ],
+        other=[("Dev", [("Other dev", "https://other.test/")])],
+    )
+
+    merger = merge(first, second)
+
+    assert walk(merger.to_dict()) == [
+        ("bookmark_bar/Dev", "PyPI", "https://pypi.org/"),
+        ("bookmark_bar/Dev", "Docs", "https://docs.test/"),
+        ("bookmark_bar", "News", "https://news.test/"),
+        ("bookmark_bar/Tools", "Git", "https://git.test/"),
+        ("other/Dev", "Other dev", "https://other.test/"),
+    ]
+    ## The three roots, plus bookmark_bar/Dev, bookmark_bar/Tools and other/Dev
+    assert merger.stats.folders == 6
+
+
+def test_merged_ids_and_guids_are_unique(make_bookmarks):
+    ## The builder numbers both sources alike, so their ids and guids collide
+    first: dict = make_bookmarks(bar=[("Dev", [("A", "https://a.test/")])])
+    second: dict = make_bookmarks(bar=[("Ops", [("B", "https://b.test/")])])
+
+    merged: dict = merge(first, second).to_dict()
+
+    nodes: list[dict] = []
+    stack: list[dict] = list(merged["roots"].values())
+    while stack:
+        node: dict = stack.pop()
+        nodes.append(node)
+        stack.extend(node.get("children", []))
+    assert len({node["id"] for node in nodes}) == len(nodes)
+    assert len({node["guid"] for node in nodes}) == len(nodes)
+    assert [merged["roots"][name]["id"] for name in merged["roots"]] == ["1", "2", "3"]
+
+
+def test_merge_bookmarks_files_writes_a_valid_checksum(tmp_path, write_bookmarks):
+    sources = [
+        write_bookmarks(tmp_path / "a" / "Bookmarks", bar=[("A", "https://a.test/")]),
+        write_bookmarks(tmp_path / "b" / "Bookmarks", bar=[("B", "https://b.test/")]),
+    ]
+
+    stats = merge_bookmarks_files(sources, tmp_path / "merged" / "Bookmarks")
+
+    assert stats.sources == 2
+    assert stats.bookmarks_merged == 2
+    assert verify_file(tmp_path / "merged" / "Bookmarks").matches
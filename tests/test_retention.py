@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import json
+import os
+from pathlib import Path
+import subprocess
+import sys
+import textwrap
+
+from bookmark_backup.store import (
+    BackupStore,
+    RetentionPolicy,
+    Snapshot,
+    plan_prune,
+    prune_store,
+)
+from bookmark_backup.store.retention import select_kept
+
+import pytest
+
+START: datetime = datetime(2026, 3, 2, 8, 0).astimezone()
+
+
+def snap(
+    id: str,
+    hours: float,
+    parent: str | None = None,
+    browser: str = "chrome",
+    profile: str = "Default",
+) -> Snapshot:
+    """A snapshot taken `hours` after START, a delta if it has a parent."""
+    return Snapshot(
+        id=id,
+        browser=browser,
+        profile=profile,
+        timestamp=(START + timedelta(hours=hours)).isoformat(),
+        hash=f"hash-{id}",
+        size=1,
+        kind="delta" if parent else "full",
+        parent=parent,
+    )
+
+
+def test_last_keeps_the_newest_snapshots():
+    snapshots = [snap(str(n), n) for n in range(5)]
+
+    assert select_kept(snapshots, RetentionPolicy(last=3)) == {"2", "3", "4"}
+    ## The newest snapshot is always kept
+    assert select_kept(snapshots, RetentionPolicy(last=0)) == {"4"}
+    assert select_kept([], RetentionPolicy()) == set()
+
+
+def test_periods_keep_the_newest_snapshot_of_each_bucket():
+    ## Every 6 hours for 3 days, starting at 08:00 on day one
+    snapshots = [snap(str(n), n * 6) for n in range(12)]
+
+    kept: set[str] = select_kept(snapshots, RetentionPolicy(last=1, daily=2))
+
+    ## 02:00 on day four, and 20:00 on day three
+    assert kept == {"11", "10"}
+
+
+def test_policy_rejects_negative_counts():
+    with pytest.raises(ValueError):
+        RetentionPolicy(daily=-1)
+
+
+def test_kept_deltas_keep_their_chain():
+    snapshots = [
+        snap("a", 0),
+        snap("b", 1, parent="a"),
+        snap("c", 2, parent="b"),
+        snap("d", 3),
+        snap("e", 4, parent="d"),
+    ]
+
+    plan = plan_prune(snapshots, RetentionPolicy(last=1))
+    assert [s.id for s in plan.keep] == ["d", "e"]
+    assert [s.id for s in plan.remove] == ["a", "b", "c"]
+    assert plan.dependencies == 1
+
+    plan = plan_prune(snapshots[:3], RetentionPolicy(last=1))
+    assert [s.id for s in plan.keep] == ["a", "b", "c"]
+    assert plan.remove == []
+    assert plan.dependencies == 2
+
+
+def test_policy_applies_per_profile_and_browser_filter():
+    snapshots = [
+        snap("c1", 0),
+        snap("p1", 1, profile="Profile 1"),
+        snap("c2", 2),
+        snap("p2", 3, profile="Profile 1"),
+        snap("v1", 4, browser="vivaldi"),
+        snap("v2", 5, browser="vivaldi"),
+    ]
+
+    plan = plan_prune(snapshots, RetentionPolicy(last=1))
+    assert {s.id for s in plan.keep} == {"c2", "p2", "v2"}
+
+    plan = plan_prune(snapshots, RetentionPolicy(last=1), browser="vivaldi")
+    assert [s.id for s in plan.remove] == ["v1"]
+
+
+def test_prune_store_keeps_kept_snapshots_restorable(tmp_path, write_bookmarks):
+    store = BackupStore(tmp_path / "store")
+    path: Path = tmp_path / "Bookmarks"
+    added: list[Snapshot] = []
+    for n in range(4):
+        write_bookmarks(
+            path, bar=[(f"site {i}", f"https://{i}.test/") for i in range(n + 1)]
+        )
+        added.append(
+            store.add_incremental(src=path, browser="chrome", profile="Default")
+        )
+    expected: dict = json.loads(path.read_bytes())
+
+    plan = prune_store(store, RetentionPolicy(last=1))
+
+    ## The newest delta needs its whole chain
+    assert plan.remove == []
+    restored: Path = store.materialize(added[-1].id, tmp_path / "restored")
+    assert json.loads(restored.read_bytes()) == expected
+
+
+def test_remove_snapshots_waits_for_the_manifest_lock(tmp_path, write_bookmarks):
+    store = BackupStore(tmp_path / "store")
+    path = write_bookmarks(tmp_path / "Bookmarks", bar=[("a", "https://a.test/")])
+    first: Snapshot = store.add_file(src=path, browser="chrome")
+
+    ## Another process appends a snapshot while this one holds the manifest
+    script: str = textwrap.dedent(
+        f"""
+        from bookmark_backup.store import BackupStore
+        BackupStore({str(store.root)!r}).add_file(src={str(path)!r}, browser="vivaldi")
+        """
+    )
+    env: dict = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    with store.manifest_lock():
+        appender = subprocess.Popen([sys.executable, "-c", script], env=env)
+        with pytest.raises(subprocess.TimeoutExpired):
+            appender.wait(timeout=0.5)
+    assert appender.wait(timeout=30) == 0
+
+    store.remove_snapshots([first.id])
+
+    assert [s.browser for s in store.snapshots()] == ["vivaldi"]
+
+
+def test_prune_between_finding_and_recording_a_blob_keeps_it(
+    tmp_path, write_bookmarks, monkeypatch
+):
+    store = BackupStore(tmp_path / "store")
+    path = write_bookmarks(tmp_path / "Bookmarks", bar=[("a", "https://a.test/")])
+    first: Snapshot = store.add_file(src=path, browser="chrome")
+
+    ## Another process prunes the snapshot whose blob the next backup found in place
+    has_blob = store.has_blob
+    pruned: list = []
+
+    def prune_after_checking(digest: str) -> bool:
+        found: bool = has_blob(digest)
+        if not pruned:
+            pruned.extend(BackupStore(store.root).remove_snapshots([first.id])[0])
+        return found
+
+    monkeypatch.setattr(store, "has_blob", prune_after_checking)
+    second: Snapshot = store.add_file(src=path, browser="chrome")
+    monkeypatch.undo()
+
+    assert [s.id for s in pruned] == [first.id]
+    assert [s.id for s in store.snapshots()] == [second.id]
+    assert store.has_blob(second.hash)
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from bookmark_backup.search import SearchIndex
+from bookmark_backup.store import BackupStore
+
+import pytest
+
+@pytest.fixture
+def index(tmp_path):
+    try:
+        with SearchIndex(tmp_path / "index.sqlite3") as index:
+            yield index
+    except RuntimeError as exc:
+        pytest.skip(str(exc))
+
+
+def found_in(index: SearchIndex, query: str) -> set[tuple[str, str | None]]:
+    return {
+        (profile, snapshot_id)
+        for result in index.search(query)
+        for _, profile, snapshot_id, _ in result.sources
+    }
+
+
+def test_identical_deltas_of_different_profiles_are_indexed_separately(
+    tmp_path, write_bookmarks, index
+):
+    store = BackupStore(tmp_path / "store")
+    snapshots: dict[str, list[str]] = {}
+    for profile, title in (("A", "alpha"), ("B", "bravo")):
+        path = write_bookmarks(
+            tmp_path / profile / "Bookmarks", bar=[(title, f"https://{title}.test/")]
+        )
+        ## Two backups of an unchanged file: a full snapshot, then an empty delta
+        snapshots[profile] = [
+            store.add_incremental(src=path, browser="chrome", profile=profile).id
+            for _ in range(2)
+        ]
+    second_a, second_b = snapshots["A"][1], snapshots["B"][1]
+    assert store.get_snapshot(second_a).hash == store.get_snapshot(second_b).hash, (
+        "both profiles should store the same empty delta"
+    )
+
+    index.update_store(store)
+
+    assert found_in(index, "alpha") == {("A", id) for id in snapshots["A"]}
+    assert found_in(index, "bravo") == {("B", id) for id in snapshots["B"]}
+
+
+def test_update_store_only_indexes_new_snapshots(tmp_path, write_bookmarks, index):
+    store = BackupStore(tmp_path / "store")
+    path = write_bookmarks(tmp_path / "Bookmarks", bar=[("alpha", "https://a.test/")])
+    store.add_incremental(src=path, browser="chrome", profile="Default")
+
+    first = index.update_store(store)
+    write_bookmarks(
+        path, bar=[("alpha", "https://a.test/"), ("beta", "https://b.test/")]
+    )
+    store.add_incremental(src=path, browser="chrome", profile="Default")
+    second = index.update_store(store)
+
+    assert (first.indexed, second.indexed, second.unchanged) == (1, 1, 1)
+    assert len(found_in(index, "alpha")) == 2
+    assert len(found_in(index, "beta")) == 1
+
+
+def test_removed_snapshots_are_dropped(tmp_path, write_bookmarks, index):
+    store = BackupStore(tmp_path / "store")
+    path = write_bookmarks(tmp_path / "Bookmarks", bar=[("alpha", "https://a.test/")])
+    snapshot = store.add_file(src=path, browser="chrome", profile="Default")
+    index.update_store(store)
+
+    store.remove_snapshots([snapshot.id])
+    stats = index.update_store(store)
+
+    assert stats.removed == 1
+    assert index.search("alpha") == []
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+
+from bookmark_backup.cli import cli_main
+from bookmark_backup.server import BackupServer, ServerError, forward_command
+from bookmark_backup.server.methods import INVALID_PARAMS
+
+import pytest
+
+@pytest.fixture
+def server(tmp_path) -> BackupServer:
+    return BackupServer(tmp_path / "bb.sock")
+
+
+def test_run_returns_the_exit_code_and_output(server):
+    result: dict = server.run(["--help"])
+
+    assert result["exit_code"] == 0
+    assert "usage:" in result["stdout"]
+
+
+def test_run_returns_argparse_errors(server):
+    result: dict = server.run(["no-such-command"])
+
+    assert result["exit_code"] == 2
+    assert "invalid choice" in result["stderr"]
+    assert server.errors == 1
+
+
+def test_run_refuses_local_commands(server):
+    result: dict = server.run(["watch", "--dest", "backups"])
+
+    assert result["exit_code"] == 1
+    assert "cannot run on the server" in result["stderr"]
+
+
+def test_run_reports_exceptions(server, monkeypatch):
+    def fail(args) -> None:
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(cli_main, "run_command", fail)
+
+    result: dict = server.run(["snapshots", "--store", "."])
+
+    assert result["exit_code"] == 1
+    assert "RuntimeError: boom" in result["stderr"]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"argv": "backup"},
+        {"argv": ["backup", 1]},
+        {"argv": [], "cwd": "/no/such/dir"},
+        {"argv": [], "env": ["HOME=/"]},
+        {"argv": [], "env": {"HOME": 1}},
+    ],
+)
+def test_run_rejects_invalid_params(server, params):
+    with pytest.raises(ServerError) as exc_info:
+        server.dispatch({"jsonrpc": "2.0", "id": 1, "method": "run", "params": params})
+
+    assert exc_info.value.code == INVALID_PARAMS
+
+
+def test_run_uses_the_clients_cwd_and_environment(server, tmp_path, monkeypatch):
+    seen: dict = {}
+
+    def record(args) -> None:
+        seen.update(cwd=os.getcwd(), env=dict(os.environ))
+
+    monkeypatch.setattr(cli_main, "run_command", record)
+    monkeypatch.setenv("BB_SERVER_ONLY", "1")
+    before: dict = dict(os.environ)
+
+    env: dict = {"HOME": str(tmp_path), "AWS_REGION": "eu-west-1"}
+    result: dict = server.run(["snapshots", "--store", "."], cwd=str(tmp_path), env=env)
+
+    assert result["exit_code"] == 0
+    assert seen == {"cwd": str(tmp_path), "env": env}
+    assert dict(os.environ) == before
+
+
+def test_forward_command_sends_the_environment(server, tmp_path, monkeypatch, capsys):
+    def show(args) -> None:
+        print(os.environ.get("BB_CLIENT_VAR"))
+
+    monkeypatch.setattr(cli_main, "run_command", show)
+    server.start()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        monkeypatch.setenv("BB_CLIENT_VAR", "from-client")
+        exit_code = forward_command(
+            ["snapshots", "--store", "."], socket_path=server.socket_path
+        )
+    finally:
+        server.stop()
+        thread.join(timeout=5)
+
+    assert exit_code == 0
+    assert capsys.readouterr().out == "from-client\n"
+
+
+@pytest.mark.parametrize(
+    "argv, expected",
+    [
+        (["backup-all", "--dest", "x"], True),
+        (["--browser", "chrome", "backup", "--dest", "x"], True),
+        (["--browser=chrome", "--timings", "backup", "--dest", "x"], True),
+        (["--metrics-json", "watch", "backup-all", "--dest", "x"], True),
+        (["watch", "--dest", "x"], False),
+        (["--browser", "chrome", "serve"], False),
+        (["--no-daemon", "backup-all", "--dest", "x"], False),
+        (["--no-d", "backup-all", "--dest", "x"], False),
+        ([], True),
+    ],
+)
+def test_forwardable(argv, expected):
+    assert cli_main.forwardable(argv) is expected
+
+
+def test_main_forwards_before_parsing(monkeypatch):
+    from bookmark_backup.server import methods
+
+    forwarded: list = []
+    monkeypatch.delenv("BOOKMARK_BACKUP_NO_DAEMON")
+    monkeypatch.setattr(
+        methods, "forward_command", lambda argv: forwarded.append(argv) or 0
+    )
+    monkeypatch.setattr(
+        cli_main, "build_parser", lambda: pytest.fail("parser built before forwarding")
+    )
+    monkeypatch.setattr(sys, "argv", ["bookmark-backup", "--browser", "nope", "backup"])
+
+    cli_main.main()
+
+    assert forwarded == [["--browser", "nope", "backup"]]
+
+
+def test_run_resolves_browser_paths_in_the_clients_home(
+    server, tmp_path, write_bookmarks
+):
+    homes: list = []
+    for name in ("first", "second"):
+        home = tmp_path / name
+        write_bookmarks(
+            home / ".config" / "google-chrome" / "Default" / "Bookmarks",
+            bar=[(name, f"https://{name}.test/")],
+        )
+        env: dict = dict(os.environ, HOME=str(home), XDG_CACHE_HOME=str(home / "cache"))
+        argv: list = ["--browser", "chrome", "backup", "--dest", str(home / "copy")]
+        result: dict = server.run(argv, env=env)
+        assert result["exit_code"] == 0, result["stderr"]
+        homes.append(home)
+
+    for home in homes:
+        assert home.name in (home / "copy").read_text()
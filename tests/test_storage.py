@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from pathlib import Path
+import shutil
+
+from bookmark_backup.storage import RemoteStore
+from bookmark_backup.storage.controllers import (
+    LocalBackend,
+    S3Backend,
+    StorageBackend,
+    WebDAVBackend,
+)
+from bookmark_backup.storage.fake import FakeObjectServer
+from bookmark_backup.store.controllers import MANIFEST_FILENAME
+
+import pytest
+
+@pytest.fixture(scope="module")
+def servers() -> dict[str, FakeObjectServer]:
+    """One server per protocol, shared by the tests of this module."""
+    started: dict[str, FakeObjectServer] = {}
+    yield started
+    for server in started.values():
+        server.stop()
+
+
+@pytest.fixture(params=["local", "s3", "webdav"])
+def backend(request, tmp_path, servers) -> StorageBackend:
+    if request.param == "local":
+        with LocalBackend(tmp_path / "remote") as backend:
+            yield backend
+        return
+
+    if request.param not in servers:
+        servers[request.param] = FakeObjectServer(request.param).start()
+    server: FakeObjectServer = servers[request.param]
+    ## Each test works under its own prefix
+    prefix: str = tmp_path.name
+    backend: StorageBackend = (
+        S3Backend(
+            "bucket",
+            prefix,
+            endpoint=server.url,
+            access_key="key",
+            secret_key="secret",
+            multipart_threshold=0,
+            part_size=1000,
+        )
+        if request.param == "s3"
+        else WebDAVBackend(f"{server.url}/{prefix}")
+    )
+    backend.server = server
+    with backend:
+        yield backend
+
+
+@pytest.fixture
+def large_file(tmp_path) -> Path:
+    path = tmp_path / "large.bin"
+    path.write_bytes(bytes(range(256)) * 18)
+
+    return path
+
+
+def test_put_file_streams_the_file(backend, large_file, monkeypatch):
+    data: bytes = large_file.read_bytes()
+    monkeypatch.setattr(
+        Path, "read_bytes", lambda self: pytest.fail(f"read {self} into memory")
+    )
+
+    puts: int = backend.server.requests["PUT"] if hasattr(backend, "server") else 0
+    backend.put_file("blobs/ab/large", large_file)
+
+    monkeypatch.undo()
+    assert backend.get_bytes("blobs/ab/large") == data
+    if isinstance(backend, S3Backend):
+        ## 4608 bytes in 1000 byte parts
+        assert backend.server.requests["PUT"] - puts == 5
+
+
+def test_put_bytes_if_only_writes_the_version_read(backend):
+    assert backend.put_bytes_if("manifest.jsonl", b"first\n", None)
+    assert not backend.put_bytes_if("manifest.jsonl", b"again\n", None)
+
+    data, version = backend.get_versioned("manifest.jsonl")
+    assert data == b"first\n"
+    assert backend.put_bytes_if("manifest.jsonl", b"second\n", version)
+    assert not backend.put_bytes_if("manifest.jsonl", b"stale\n", version)
+    assert backend.get_bytes("manifest.jsonl") == b"second\n"
+
+
+def test_local_put_file_removes_its_temporary_file_on_error(
+    tmp_path, large_file, monkeypatch
+):
+    backend = LocalBackend(tmp_path / "remote")
+
+    def fail(src, dest) -> None:
+        Path(dest).write_bytes(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(shutil, "copyfile", fail)
+    with pytest.raises(OSError, match="disk full"):
+        backend.put_file("blobs/ab/large", large_file)
+
+    assert list((tmp_path / "remote").rglob("*")) == [
+        tmp_path / "remote" / "blobs",
+        tmp_path / "remote" / "blobs" / "ab",
+    ]
+
+
+def test_concurrent_pushes_keep_each_others_snapshots(
+    tmp_path, backend, write_bookmarks
+):
+    stores: list[RemoteStore] = [
+        RemoteStore("unused", cache_dir=tmp_path / name, backend=backend)
+        for name in ("first", "second")
+    ]
+    for number, remote in enumerate(stores):
+        path = write_bookmarks(
+            tmp_path / f"Bookmarks{number}", bar=[(f"site {number}", "https://a.test")]
+        )
+        remote.store.add_file(src=path, browser="chrome", profile=f"P{number}")
+
+    ## The second store pushes between the first one reading and writing the manifest
+    put_bytes_if = backend.put_bytes_if
+    calls: list = []
+
+    def interleaved(key: str, data: bytes, version: str | None) -> bool:
+        if not calls:
+            calls.append(key)
+            stores[1].push()
+        return put_bytes_if(key, data, version)
+
+    backend.put_bytes_if = interleaved
+    stores[0].push()
+
+    manifest: bytes = backend.get_bytes(MANIFEST_FILENAME)
+    assert {s.id for r in stores for s in r.store.snapshots()} == {
+        s.id for s in stores[0].store.snapshots()
+    }
+    assert len(manifest.splitlines()) == 2
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+from pathlib import Path
+
+from bookmark_backup.core.copy_engine import get_copy_engine
+from bookmark_backup.store import BackupStore, Snapshot
+
+import pytest
+
+@pytest.fixture(params=[None, "gzip"])
+def store(request, tmp_path) -> BackupStore:
+    return BackupStore(tmp_path / "store", compress=request.param)
+
+
+def blob_bytes(store: BackupStore, digest: str) -> bytes:
+    raw: bytes = store.blob_path(digest).read_bytes()
+
+    return gzip.decompress(raw) if store.compress else raw
+
+
+def test_blob_is_named_by_its_contents(store, tmp_path, write_bookmarks):
+    path = write_bookmarks(tmp_path / "Bookmarks", bar=[("a", "https://a.test/")])
+
+    snapshot: Snapshot = store.add_file(src=path, browser="chrome")
+
+    data: bytes = blob_bytes(store, snapshot.hash)
+    assert data == path.read_bytes()
+    assert snapshot.hash == hashlib.sha256(data).hexdigest()
+    assert snapshot.size == len(data)
+    ## Only the blob is left under blobs/, no temporary files
+    assert [p for p in (store.root / "blobs").rglob("*") if p.is_file()] == [
+        store.blob_path(snapshot.hash)
+    ]
+
+
+def test_file_replaced_while_it_is_stored(
+    store, tmp_path, write_bookmarks, monkeypatch
+):
+    path = write_bookmarks(tmp_path / "Bookmarks", bar=[("a", "https://a.test/")])
+    replacement = write_bookmarks(tmp_path / "new", bar=[("b", "https://b.test/")])
+
+    ## The browser replaces the file after it was first opened for the backup
+    real_open = open
+    opened: list = []
+
+    def replace_after_first_open(file, *args, **kwargs):
+        if Path(file) == path:
+            if opened and replacement.exists():
+                os.replace(replacement, path)
+            opened.append(file)
+        return real_open(file, *args, **kwargs)
+
+    monkeypatch.setattr("builtins.open", replace_after_first_open)
+    snapshot: Snapshot = store.add_file(src=path, browser="chrome")
+    monkeypatch.undo()
+
+    data: bytes = blob_bytes(store, snapshot.hash)
+    assert snapshot.hash == hashlib.sha256(data).hexdigest()
+    assert snapshot.size == len(data)
+
+
+def test_unchanged_file_is_not_read_again(
+    store, tmp_path, write_bookmarks, monkeypatch
+):
+    path = write_bookmarks(tmp_path / "Bookmarks", bar=[("a", "https://a.test/")])
+    first: Snapshot = store.add_file(src=path, browser="chrome")
+
+    monkeypatch.setattr(
+        get_copy_engine(), "copy", lambda *args, **kwargs: pytest.fail("copied again")
+    )
+    second: Snapshot = store.add_file(src=path, browser="vivaldi")
+
+    assert second.hash == first.hash
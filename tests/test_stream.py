@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import gzip
+import io
+import json
+
+from bookmark_backup.domain.stream import (
+    BookmarkStream,
+    JsonTokenizer,
+    StreamParseError,
+    iter_events,
+)
+
+import pytest
+
+SPECS: dict = {
+    "bar": [
+        ("Python", "https://www.python.org/"),
+        ("Dev", [("PyPI", "https://pypi.org/"), ("Empty", [])]),
+    ],
+    "other": [("Ünïcödé ☃", 'https://example.com/?q="quoted"')],
+}
+
+
+def expected_nodes(data: dict) -> list[tuple[str, str, tuple[str, ...]]]:
+    """(root, name, folder path) of every node, folders after their children."""
+    nodes: list = []
+
+    def walk(node: dict, root: str, path: tuple[str, ...]) -> None:
+        for child in node.get("children", []):
+            walk(child, root, path + (node["name"],))
+        nodes.append((root, node["name"], path))
+
+    for root, node in data["roots"].items():
+        walk(node, root, ())
+
+    return nodes
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 64 * 1024])
+def test_stream_yields_every_node_with_its_path(
+    tmp_path, make_bookmarks, write_bookmarks, chunk_size
+):
+    data: dict = make_bookmarks(**SPECS)
+    path = write_bookmarks(tmp_path / "Bookmarks", data)
+
+    stream = BookmarkStream(path, chunk_size=chunk_size)
+    nodes = list(stream)
+
+    assert [(n.root, n.node["name"], n.path) for n in nodes] == expected_nodes(data)
+    assert all("children" not in n.node for n in nodes)
+    assert sorted(n.position for n in nodes) == list(range(len(nodes)))
+    assert stream.meta["checksum"] == data["checksum"]
+
+
+def test_whole_objects_and_tokens_give_the_same_nodes(
+    tmp_path, make_bookmarks, write_bookmarks
+):
+    path = write_bookmarks(tmp_path / "Bookmarks", make_bookmarks(**SPECS))
+
+    def fields(chunk_size: int) -> list:
+        return [
+            (
+                n.node,
+                n.root,
+                n.path,
+                n.position,
+                n.parent,
+                n.depth,
+                n.folder,
+                n.ancestors,
+            )
+            for n in BookmarkStream(path, chunk_size=chunk_size)
+        ]
+
+    ## One character per chunk never holds a whole node, the default chunk holds
+    #  the whole file
+    assert fields(1) == fields(64 * 1024)
+
+
+def test_stream_reads_compressed_files(tmp_path, make_bookmarks, write_bookmarks):
+    data: dict = make_bookmarks(**SPECS)
+    path = write_bookmarks(tmp_path / "Bookmarks", data)
+    compressed = tmp_path / "Bookmarks.gz"
+    compressed.write_bytes(gzip.compress(path.read_bytes()))
+
+    names = [n.node["name"] for n in BookmarkStream(compressed, with_paths=False)]
+
+    assert names == [name for _, name, _ in expected_nodes(data)]
+
+
+def test_stream_without_paths_accepts_unseekable_files(make_bookmarks):
+    text: str = json.dumps(make_bookmarks(**SPECS))
+
+    class Unseekable(io.StringIO):
+        def seekable(self) -> bool:
+            return False
+
+    with pytest.raises(ValueError):
+        BookmarkStream(Unseekable(text))
+    nodes = list(BookmarkStream(Unseekable(text), with_paths=False))
+
+    assert all(n.path is None for n in nodes)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1024])
+def test_tokenizer_events_match_json(chunk_size):
+    doc = {"a": [1, -2.5e3, True, False, None, 'x\\u00e9"y'], "b": {"c": {}}, "d": []}
+    text: str = json.dumps(doc)
+
+    def build(events) -> object:
+        stack: list = [[]]
+        keys: list = [None]
+        for event, value in events:
+            if event in ("start_map", "start_array"):
+                stack.append({} if event == "start_map" else [])
+                keys.append(None)
+                continue
+            if event == "map_key":
+                keys[-1] = value
+                continue
+            if event in ("end_map", "end_array"):
+                value = stack.pop()
+                keys.pop()
+            parent = stack[-1]
+            if isinstance(parent, dict):
+                parent[keys[-1]] = value
+            else:
+                parent.append(value)
+
+        return stack[0][0]
+
+    assert build(iter_events(io.StringIO(text), chunk_size=chunk_size)) == doc
+
+
+def test_tokenizer_decodes_complete_nested_objects_whole():
+    tokenizer = JsonTokenizer(whole_objects_from=2)
+    events = tokenizer.feed('{"a": {"b": {"c": [1, {"d": 2}]}, "e": {"f": ')
+    events += tokenizer.feed("3}}}")
+    events += tokenizer.close()
+
+    assert ("object", {"c": [1, {"d": 2}]}) in events
+    ## Cut off when first fed, so read token by token
+    assert ("object", {"f": 3}) not in events
+    assert ("number", 3) in events
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '{"a": 1',
+        '{"a": 1}}',
+        '{"a" 1}',
+        '{"a": tru}',
+        "[1, 2",
+        "[1 2]",
+        "[1, 2,]",
+        '{"a": 1,}',
+        "{,}",
+        '{"roots": {"x": {"a": }}}',
+    ],
+)
+def test_malformed_json_raises(text):
+    tokenizer = JsonTokenizer(whole_objects_from=2)
+    with pytest.raises(StreamParseError):
+        tokenizer.feed(text)
+        tokenizer.close()